@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试音频夹具
+
+fixtures/manifest.json 列出每段测试语音（16kHz 单声道 16-bit WAV）、模拟 ASR 返回的识别文本
+和模拟 Chat 返回的回复。可以把真实录音放进 fixtures/ 并在 manifest 中登记。
+
+运行本文件重新生成内置的合成语音：python benchmark/fixtures.py
+（合成语音为带音节包络的谐波信号，能触发 VAD，但不是可识别的真实语音）
+"""
+
+import json
+import os
+import wave
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST_PATH = os.path.join(FIXTURE_DIR, "manifest.json")
+SAMPLE_RATE = 16000
+
+# 内置夹具：(文件名, 识别文本, 回复文本)
+BUILTIN_FIXTURES = [
+    ("greeting.wav", "你好小元",
+     "你好呀！我是小元，很高兴见到你。今天有什么想聊的吗？"),
+    ("weather.wav", "今天天气怎么样",
+     "今天天气晴朗，气温二十度左右。很适合出门散步，记得带上水哦。"),
+    ("story.wav", "给我讲一个关于小猫钓鱼的故事吧",
+     "好呀。从前有一只小猫，跟着妈妈去河边钓鱼。它一会儿去捉蜻蜓，一会儿去追蝴蝶，"
+     "结果一条鱼也没钓到。后来它一心一意地钓，终于钓到了一条大鱼。做事要专心才能成功哦！"),
+]
+
+
+@dataclass
+class Fixture:
+    """一段测试语音"""
+    name: str
+    samples: np.ndarray  # int16 PCM
+    transcript: str
+    reply: str
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+def synthesize_speech(syllables: int, seed: int = 0) -> np.ndarray:
+    """
+    生成类语音信号：每个音节 180-260ms 的谐波（基频 120-260Hz 滑动）+ 起止包络，音节间 40-120ms 停顿，
+    前后各 300ms 低电平噪声
+    """
+    rng = np.random.default_rng(seed)
+    lead = rng.normal(0, 60, int(0.3 * SAMPLE_RATE))
+    parts = [lead]
+    for _ in range(syllables):
+        duration = rng.uniform(0.18, 0.26)
+        t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = np.linspace(rng.uniform(160, 260), rng.uniform(120, 220), len(t))
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.sin(np.pi * t / duration) ** 0.6
+        parts.append(voiced * envelope * rng.uniform(5000, 9000) + rng.normal(0, 60, len(t)))
+        parts.append(rng.normal(0, 60, int(rng.uniform(0.04, 0.12) * SAMPLE_RATE)))
+    parts.append(rng.normal(0, 60, int(0.3 * SAMPLE_RATE)))
+    signal = np.concatenate(parts)
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def write_wav(path: str, samples: np.ndarray):
+    """写入 16kHz 单声道 16-bit WAV"""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.astype("<i2").tobytes())
+
+
+def read_wav(path: str) -> np.ndarray:
+    """读取 16kHz 单声道 16-bit WAV"""
+    with wave.open(path, "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2 or wav.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: 需要 16kHz 单声道 16-bit WAV")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").astype(np.int16)
+
+
+def load_fixtures() -> List[Fixture]:
+    """按 manifest 加载全部夹具"""
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return [
+        Fixture(
+            name=item["wav"],
+            samples=read_wav(os.path.join(FIXTURE_DIR, item["wav"])),
+            transcript=item["transcript"],
+            reply=item["reply"],
+        )
+        for item in manifest
+    ]
+
+
+def generate_builtin_fixtures():
+    """生成内置合成语音和 manifest"""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    manifest = []
+    for seed, (filename, transcript, reply) in enumerate(BUILTIN_FIXTURES):
+        samples = synthesize_speech(len(transcript), seed=seed)
+        write_wav(os.path.join(FIXTURE_DIR, filename), samples)
+        manifest.append({"wav": filename, "transcript": transcript, "reply": reply})
+        print(f"{filename}: {len(samples) / SAMPLE_RATE:.2f}s  {transcript}")
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    generate_builtin_fixtures()
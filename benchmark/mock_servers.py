@@ -0,0 +1,598 @@
+# -*- coding: utf-8 -*-
+"""
+豆包语音 / 对话服务本地模拟服务器
+
+功能：
+1. MockASRServer：流式语音识别（二进制帧协议），边收音频边返回中间结果，最后一包后返回最终结果
+2. MockTTSServer：双向流式语音合成（事件帧协议），同时兼容 robot_controller 使用的 JSON 文本帧
+3. MockChatServer：OpenAI 兼容的 SSE 流式对话接口（HTTP/1.1 chunked，支持 keep-alive）
+4. 每个环节的延迟 = 基准值 ± 抖动（均匀分布，可指定随机种子复现）
+
+帧编解码在本文件内独立实现，不依赖 chatbot / robot_controller 的 volc_protocol，
+两边实现不一致时客户端会直接解析失败，顺带校验了协议模块。
+
+单独运行：python benchmark/mock_servers.py --asr-final-ms 300 --jitter-ms 50
+"""
+
+import asyncio
+import gzip
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import websockets
+
+# ==================== 协议常量 ====================
+MSG_FULL_CLIENT_REQUEST = 0b0001
+MSG_AUDIO_ONLY_REQUEST = 0b0010
+MSG_FULL_SERVER_RESPONSE = 0b1001
+MSG_AUDIO_ONLY_RESPONSE = 0b1011
+
+FLAG_NONE = 0b0000
+FLAG_POS_SEQUENCE = 0b0001
+FLAG_LAST_PACKAGE = 0b0010
+FLAG_NEG_SEQUENCE = 0b0011
+FLAG_WITH_EVENT = 0b0100
+
+SERIAL_RAW = 0b0000
+SERIAL_JSON = 0b0001
+COMPRESS_NONE = 0b0000
+COMPRESS_GZIP = 0b0001
+
+EVENT_START_CONNECTION = 1
+EVENT_FINISH_CONNECTION = 2
+EVENT_CONNECTION_STARTED = 50
+EVENT_CONNECTION_FINISHED = 52
+EVENT_START_SESSION = 100
+EVENT_CANCEL_SESSION = 101
+EVENT_FINISH_SESSION = 102
+EVENT_SESSION_STARTED = 150
+EVENT_SESSION_CANCELED = 151
+EVENT_SESSION_FINISHED = 152
+EVENT_TASK_REQUEST = 200
+EVENT_TTS_SENTENCE_START = 350
+EVENT_TTS_SENTENCE_END = 351
+EVENT_TTS_RESPONSE = 352
+
+_SESSION_EVENTS = (EVENT_START_SESSION, EVENT_CANCEL_SESSION, EVENT_FINISH_SESSION, EVENT_TASK_REQUEST)
+
+_U32 = struct.Struct('>I')
+_I32 = struct.Struct('>i')
+
+
+def _header(message_type: int, flags: int, serialization: int, compression: int = COMPRESS_NONE) -> bytes:
+    """生成 4 字节 header"""
+    return bytes((0x11, (message_type << 4) | flags, (serialization << 4) | compression, 0x00))
+
+
+# ==================== 延迟模型 ====================
+@dataclass
+class Latency:
+    """延迟 = base_ms ± jitter_ms（毫秒，均匀分布，不小于 0）"""
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """采样一次延迟（秒）"""
+        if self.jitter_ms <= 0:
+            return max(0.0, self.base_ms) / 1000
+        return max(0.0, self.base_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+
+@dataclass
+class MockProfile:
+    """模拟服务器延迟配置（毫秒）"""
+    connect: Latency = field(default_factory=lambda: Latency(80, 20))          # WebSocket 握手（DNS/TLS/鉴权）
+    chat_connect: Latency = field(default_factory=lambda: Latency(150, 30))    # 对话接口新建 TCP/TLS 连接
+    asr_partial: Latency = field(default_factory=lambda: Latency(60, 20))      # 中间结果
+    asr_final: Latency = field(default_factory=lambda: Latency(250, 50))       # 最后一包 → 最终结果
+    chat_first_token: Latency = field(default_factory=lambda: Latency(600, 150))
+    chat_stall: Latency = field(default_factory=lambda: Latency(4000, 1000))   # 首 token 偶发卡顿的额外延迟
+    chat_stall_rate: float = 0.0    # 首 token 卡顿的概率（0-1）
+    chat_token: Latency = field(default_factory=lambda: Latency(30, 10))       # token 间隔
+    tts_first_audio: Latency = field(default_factory=lambda: Latency(200, 50))  # TaskRequest → 首帧音频
+    tts_frame: Latency = field(default_factory=lambda: Latency(20, 5))         # 音频帧间隔
+    tts_bytes_per_char: int = 4800  # 每个字的音频字节数（24kHz 16-bit PCM 约 100ms）
+    tts_frame_bytes: int = 4800     # 每帧音频字节数
+    seed: Optional[int] = None
+
+    def scaled_jitter(self, jitter_ms: float) -> "MockProfile":
+        """把所有环节的抖动统一设为 jitter_ms"""
+        for name in ("connect", "chat_connect", "asr_partial", "asr_final", "chat_first_token",
+                     "chat_token", "tts_first_audio", "tts_frame"):
+            getattr(self, name).jitter_ms = jitter_ms
+        return self
+
+
+# ==================== WebSocket 基类 ====================
+class _MockWebSocketServer:
+    """在给定事件循环上运行的 WebSocket 模拟服务器"""
+
+    path = "/"
+
+    def __init__(self, profile: MockProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.port = 0
+        self.connections = 0
+        self._server = None
+
+    async def _process_request(self, connection, request):
+        """握手阶段模拟建连延迟"""
+        self.connections += 1
+        await asyncio.sleep(self.profile.connect.sample(self.rng))
+        return None
+
+    async def start(self, host: str, port: int = 0):
+        """启动服务器"""
+        self._server = await websockets.serve(
+            self._handler, host, port,
+            process_request=self._process_request,
+            max_size=None
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """停止服务器"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def url(self, host: str) -> str:
+        return f"ws://{host}:{self.port}{self.path}"
+
+    async def _handler(self, websocket):
+        raise NotImplementedError
+
+
+# ==================== ASR ====================
+class MockASRServer(_MockWebSocketServer):
+    """
+    流式语音识别模拟服务器
+
+    识别文本由调用方通过 transcript 指定（模拟服务器不做真实识别）：
+    每收到一帧音频多"识别"出一个字作为中间结果，收到最后一包后按 asr_final 延迟返回完整文本。
+    """
+
+    path = "/api/v3/sauc/bigmodel_async"
+
+    def __init__(self, profile: MockProfile, rng: random.Random):
+        super().__init__(profile, rng)
+        self.transcript = "今天天气怎么样"
+        self.sessions = 0
+
+    @staticmethod
+    def _response(seq: int, text: str, definite: bool) -> bytes:
+        """构建识别结果帧（最后一包使用负序号）"""
+        payload = json.dumps({
+            "result": {
+                "text": text,
+                "utterances": [{"text": text, "definite": definite}]
+            }
+        }, ensure_ascii=False).encode('utf-8')
+        flags = FLAG_NEG_SEQUENCE if definite else FLAG_POS_SEQUENCE
+        return (_header(MSG_FULL_SERVER_RESPONSE, flags, SERIAL_JSON)
+                + _I32.pack(-seq if definite else seq) + _U32.pack(len(payload)) + payload)
+
+    async def _handler(self, websocket):
+        transcript = self.transcript
+        seq = 0
+        frames = 0
+        partial_tasks: List[asyncio.Task] = []
+
+        async def send_partial(previous: Optional[asyncio.Task], seq: int, text: str):
+            # 中间结果按序号顺序发出，抖动只影响到达时间
+            await asyncio.sleep(self.profile.asr_partial.sample(self.rng))
+            if previous is not None:
+                await previous
+            await websocket.send(self._response(seq, text, False))
+
+        try:
+            async for message in websocket:
+                if not isinstance(message, bytes) or len(message) < 8:
+                    continue
+                message_type = message[1] >> 4
+                flags = message[1] & 0x0F
+
+                if message_type == MSG_FULL_CLIENT_REQUEST:
+                    # 初始化请求，校验 payload 能正确解码
+                    size = _U32.unpack_from(message, 4)[0]
+                    payload = message[8:8 + size]
+                    if message[2] & 0x0F == COMPRESS_GZIP:
+                        payload = gzip.decompress(payload)
+                    json.loads(payload)
+                    self.sessions += 1
+                    transcript = self.transcript
+                    continue
+
+                if message_type != MSG_AUDIO_ONLY_REQUEST:
+                    continue
+
+                frames += 1
+                if flags == FLAG_LAST_PACKAGE:
+                    await asyncio.gather(*partial_tasks)
+                    await asyncio.sleep(self.profile.asr_final.sample(self.rng))
+                    seq += 1
+                    await websocket.send(self._response(seq, transcript, True))
+                    break
+
+                reveal = min(frames, len(transcript) - 1)
+                if reveal > 0:
+                    seq += 1
+                    previous = partial_tasks[-1] if partial_tasks else None
+                    partial_tasks.append(asyncio.create_task(
+                        send_partial(previous, seq, transcript[:reveal])
+                    ))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in partial_tasks:
+                task.cancel()
+
+
+# ==================== TTS ====================
+class MockTTSServer(_MockWebSocketServer):
+    """
+    双向流式语音合成模拟服务器
+
+    二进制事件帧：StartConnection/StartSession/TaskRequest/FinishSession/FinishConnection，
+    TaskRequest 按顺序合成，每句音频前后各返回 TTSSentenceStart / TTSSentenceEnd，
+    FinishSession 等全部合成完成后返回 SessionFinished。
+    JSON 文本帧（robot_controller 的 TTSClient）：每个 TaskRequest 合成完即返回 SessionFinished。
+    音频内容为静音，长度按字数计算。
+    """
+
+    path = "/api/v3/tts/bidirection"
+
+    def __init__(self, profile: MockProfile, rng: random.Random):
+        super().__init__(profile, rng)
+        self.sessions = 0
+        self.tasks = 0
+
+    @staticmethod
+    def _event_frame(event: int, id_value: Optional[str] = None, payload: Optional[dict] = None) -> bytes:
+        """构建带事件号的 JSON 响应帧"""
+        frame = _header(MSG_FULL_SERVER_RESPONSE, FLAG_WITH_EVENT, SERIAL_JSON) + _U32.pack(event)
+        if id_value is not None:
+            id_bytes = id_value.encode('utf-8')
+            frame += _U32.pack(len(id_bytes)) + id_bytes
+        body = json.dumps(payload or {}).encode('utf-8')
+        return frame + _U32.pack(len(body)) + body
+
+    @staticmethod
+    def _audio_frame(session_id: str, audio: bytes) -> bytes:
+        """构建音频响应帧"""
+        sid = session_id.encode('utf-8')
+        return (_header(MSG_AUDIO_ONLY_RESPONSE, FLAG_WITH_EVENT, SERIAL_RAW)
+                + _U32.pack(EVENT_TTS_RESPONSE) + _U32.pack(len(sid)) + sid
+                + _U32.pack(len(audio)) + audio)
+
+    @staticmethod
+    def _parse_event(message: bytes):
+        """解析客户端事件帧，返回 (event, session_id, payload)"""
+        event = _U32.unpack_from(message, 4)[0]
+        offset = 8
+        session_id = ""
+        if event in _SESSION_EVENTS:
+            sid_size = _U32.unpack_from(message, offset)[0]
+            offset += 4
+            session_id = message[offset:offset + sid_size].decode('utf-8')
+            offset += sid_size
+        size = _U32.unpack_from(message, offset)[0]
+        offset += 4
+        payload = json.loads(message[offset:offset + size] or b"{}")
+        return event, session_id, payload
+
+    async def _synthesize(self, text: str, send_audio):
+        """按字数生成静音音频并分帧发送"""
+        self.tasks += 1
+        total = max(1, len(text.strip())) * self.profile.tts_bytes_per_char
+        frame_bytes = self.profile.tts_frame_bytes
+        await asyncio.sleep(self.profile.tts_first_audio.sample(self.rng))
+        sent = 0
+        while sent < total:
+            size = min(frame_bytes, total - sent)
+            await send_audio(bytes(size))
+            sent += size
+            if sent < total:
+                await asyncio.sleep(self.profile.tts_frame.sample(self.rng))
+
+    async def _handler(self, websocket):
+        pending: Optional[asyncio.Task] = None
+
+        async def chain(previous: Optional[asyncio.Task], coro):
+            """合成任务按 TaskRequest 顺序串行执行"""
+            if previous is not None:
+                await previous
+            await coro
+
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    await self._handle_json(websocket, json.loads(message))
+                    continue
+                if len(message) < 8 or (message[1] & 0x0F) != FLAG_WITH_EVENT:
+                    continue
+
+                event, session_id, payload = self._parse_event(message)
+                if event == EVENT_START_CONNECTION:
+                    await websocket.send(self._event_frame(EVENT_CONNECTION_STARTED, str(uuid.uuid4())))
+                elif event == EVENT_START_SESSION:
+                    self.sessions += 1
+                    await websocket.send(self._event_frame(EVENT_SESSION_STARTED, session_id))
+                elif event == EVENT_TASK_REQUEST:
+                    text = payload.get("req_params", {}).get("text", "")
+
+                    async def sentence(text=text, session_id=session_id):
+                        async def send_audio(audio):
+                            await websocket.send(self._audio_frame(session_id, audio))
+
+                        await websocket.send(self._event_frame(EVENT_TTS_SENTENCE_START, session_id, {"text": text}))
+                        await self._synthesize(text, send_audio)
+                        await websocket.send(self._event_frame(EVENT_TTS_SENTENCE_END, session_id, {"text": text}))
+
+                    pending = asyncio.create_task(chain(pending, sentence()))
+                elif event in (EVENT_FINISH_SESSION, EVENT_CANCEL_SESSION):
+                    if pending is not None:
+                        if event == EVENT_CANCEL_SESSION:
+                            pending.cancel()
+                        try:
+                            await pending
+                        except asyncio.CancelledError:
+                            pass
+                        pending = None
+                    done_event = EVENT_SESSION_FINISHED if event == EVENT_FINISH_SESSION else EVENT_SESSION_CANCELED
+                    await websocket.send(self._event_frame(done_event, session_id))
+                elif event == EVENT_FINISH_CONNECTION:
+                    await websocket.send(self._event_frame(EVENT_CONNECTION_FINISHED, ""))
+                    break
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _handle_json(self, websocket, request: dict):
+        """JSON 文本帧方言（robot_controller TTSClient）"""
+        event = request.get("event")
+        if event == EVENT_START_CONNECTION:
+            await websocket.send(json.dumps({"event": EVENT_CONNECTION_STARTED}))
+        elif event == EVENT_START_SESSION:
+            self.sessions += 1
+            await websocket.send(json.dumps({
+                "event": EVENT_SESSION_STARTED, "session_id": request.get("session_id", "")
+            }))
+        elif event == EVENT_TASK_REQUEST:
+            await self._synthesize(request.get("text", ""), websocket.send)
+            await websocket.send(json.dumps({
+                "event": EVENT_SESSION_FINISHED, "session_id": request.get("session_id", "")
+            }))
+
+
+# ==================== Chat ====================
+class MockChatServer:
+    """
+    OpenAI 兼容的对话模拟服务器（SSE 流式 / 非流式）
+
+    回复内容由调用方通过 reply 指定，流式时每个 token 为 token_chars 个字。
+    """
+
+    path = "/api/v3/chat/completions"
+    token_chars = 2
+
+    def __init__(self, profile: MockProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.reply = "今天天气晴朗，气温二十度左右，很适合出门散步。"
+        self.requests = 0
+        self.connections = 0
+        self.port = 0
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _sample(self, latency: Latency) -> float:
+        # random.Random 不是线程安全的，多个请求线程共用时加锁
+        with self._lock:
+            return latency.sample(self.rng)
+
+    def _first_token_delay(self) -> float:
+        """首 token 延迟，按 chat_stall_rate 的概率叠加一次长卡顿"""
+        with self._lock:
+            delay = self.profile.chat_first_token.sample(self.rng)
+            if self.rng.random() < self.profile.chat_stall_rate:
+                delay += self.profile.chat_stall.sample(self.rng)
+        return delay
+
+    def start(self, host: str, port: int = 0):
+        """启动服务器（后台线程）"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                # 每条新连接模拟一次 TCP/TLS 握手，keep-alive 复用的连接不再计入
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                time.sleep(server._sample(server.profile.chat_connect))
+
+            def do_HEAD(self):
+                # 客户端预热/保活请求
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                reply = server.reply
+                time.sleep(server._first_token_delay())
+
+                if not body.get("stream"):
+                    data = json.dumps({
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}}]
+                    }, ensure_ascii=False).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    step = server.token_chars
+                    for i in range(0, len(reply), step):
+                        if i:
+                            time.sleep(server._sample(server.profile.chat_token))
+                        event = {"choices": [{"index": 0, "delta": {"content": reply[i:i + step]}}]}
+                        self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+                    self._write_chunk("data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _write_chunk(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止服务器"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def url(self, host: str) -> str:
+        return f"http://{host}:{self.port}{self.path}"
+
+
+# ==================== 组合启动 ====================
+class MockServers:
+    """
+    在后台线程中启动全部模拟服务器
+
+    使用示例:
+        with MockServers(MockProfile(seed=1)) as servers:
+            servers.asr.transcript = "你好"
+            servers.chat.reply = "你好！"
+            print(servers.urls)
+    """
+
+    def __init__(self, profile: Optional[MockProfile] = None, host: str = "127.0.0.1"):
+        self.profile = profile or MockProfile()
+        self.host = host
+        rng = random.Random(self.profile.seed)
+        self.asr = MockASRServer(self.profile, random.Random(rng.random()))
+        self.tts = MockTTSServer(self.profile, random.Random(rng.random()))
+        self.chat = MockChatServer(self.profile, random.Random(rng.random()))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def urls(self) -> Dict[str, str]:
+        return {
+            "asr": self.asr.url(self.host),
+            "tts": self.tts.url(self.host),
+            "chat": self.chat.url(self.host),
+        }
+
+    def start(self) -> "MockServers":
+        """启动服务器，返回后即可连接"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        for server in (self.asr, self.tts):
+            asyncio.run_coroutine_threadsafe(server.start(self.host), self._loop).result()
+        self.chat.start(self.host)
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.chat.stop()
+        if self._loop:
+            for server in (self.asr, self.tts):
+                asyncio.run_coroutine_threadsafe(server.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_profile_arguments(parser):
+    """命令行参数：各环节延迟与抖动（毫秒）"""
+    defaults = MockProfile()
+    parser.add_argument("--connect-ms", type=float, default=defaults.connect.base_ms, help="WebSocket 建连延迟")
+    parser.add_argument("--chat-connect-ms", type=float, default=defaults.chat_connect.base_ms, help="Chat 新建 HTTP 连接")
+    parser.add_argument("--asr-final-ms", type=float, default=defaults.asr_final.base_ms, help="ASR 最后一包到最终结果")
+    parser.add_argument("--chat-first-token-ms", type=float, default=defaults.chat_first_token.base_ms, help="Chat 首 token")
+    parser.add_argument("--chat-stall-rate", type=float, default=defaults.chat_stall_rate, help="Chat 首 token 偶发卡顿概率（0-1）")
+    parser.add_argument("--chat-token-ms", type=float, default=defaults.chat_token.base_ms, help="Chat token 间隔")
+    parser.add_argument("--tts-first-audio-ms", type=float, default=defaults.tts_first_audio.base_ms, help="TTS 首帧音频")
+    parser.add_argument("--jitter-ms", type=float, default=None, help="统一设置所有环节的抖动")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（复现抖动序列）")
+
+
+def profile_from_args(args) -> MockProfile:
+    """根据命令行参数构建延迟配置"""
+    profile = MockProfile(seed=args.seed)
+    profile.connect.base_ms = args.connect_ms
+    profile.chat_connect.base_ms = args.chat_connect_ms
+    profile.asr_final.base_ms = args.asr_final_ms
+    profile.chat_first_token.base_ms = args.chat_first_token_ms
+    profile.chat_stall_rate = args.chat_stall_rate
+    profile.chat_token.base_ms = args.chat_token_ms
+    profile.tts_first_audio.base_ms = args.tts_first_audio_ms
+    if args.jitter_ms is not None:
+        profile.scaled_jitter(args.jitter_ms)
+    return profile
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="启动本地豆包 ASR/TTS/Chat 模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    servers = MockServers(profile_from_args(args), host=args.host).start()
+    for name, url in servers.urls.items():
+        print(f"{name:>5}: {url}")
+    print("按 Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servers.stop()
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+"""
+端到端延迟基准测试
+
+功能：
+1. 启动本地模拟服务器（mock_servers.py），把 chatbot / robot_controller 的服务地址指向本地
+2. 用 WAV 夹具（fixtures.py）代替麦克风，按实时速度写入录音环形缓冲区
+3. 无界面驱动完整对话流程：
+   - chatbot：ASRWorker → ChatWorker → StreamingTTSWorker（与主窗口相同的信号连接）
+   - robot：VoiceAssistantRobot 状态机（唤醒 → 录音识别 → 对话 → 合成播放）
+4. 统计每轮的 ASR 最终结果、首 token、首帧音频、总耗时的 p50 / p95
+
+计时起点为夹具最后一帧音频写入录音缓冲区的时刻（即用户说完话），播放按音频时长空等，不出声。
+chatbot 与 robot_controller 都有顶层 config 模块，同一进程只能导入其中一个，--target all 时分别在子进程中运行。
+
+使用示例：
+    python benchmark/run_benchmark.py --target chatbot --rounds 5 --seed 1
+    python benchmark/run_benchmark.py --chat-first-token-ms 800 --jitter-ms 100 --json result.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import types
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from fixtures import Fixture, load_fixtures, SAMPLE_RATE
+from mock_servers import MockServers, add_profile_arguments, profile_from_args
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHATBOT_DIR = os.path.join(ROOT_DIR, "chatbot")
+ROBOT_DIR = os.path.join(ROOT_DIR, "robot_controller")
+
+# 统计指标：(键, 显示名称)
+METRICS = [
+    ("asr_final", "ASR 最终结果"),
+    ("first_token", "首 token"),
+    ("first_audio", "首帧音频"),
+    ("total", "总耗时"),
+]
+
+# 模拟 TTS 返回 24kHz 16-bit PCM 长度的音频，robot 无界面播放按此速率空等
+PLAYBACK_BYTES_PER_SECOND = 24000 * 2
+
+# 夹具播放完之后继续写入的低电平噪声（模拟安静房间里的麦克风底噪）
+NOISE_LEVEL = 60
+
+
+def install_mock_secrets():
+    """注入假的 api_secrets 模块，保证真实密钥不会发往本地模拟服务器"""
+    secrets = types.ModuleType("api_secrets")
+    secrets.ASR_APPID = "mock-appid"
+    secrets.ASR_ACCESS_TOKEN = "mock-token"
+    secrets.ASR_RESOURCE_ID = "volc.seedasr.sauc.duration"
+    secrets.CHAT_API_KEY = "mock-key"
+    secrets.TTS_APPID = "mock-appid"
+    secrets.TTS_ACCESS_TOKEN = "mock-token"
+    secrets.TTS_RESOURCE_ID = "seed-tts-2.0"
+    sys.modules["api_secrets"] = secrets
+
+
+# ==================== 计时 ====================
+class TurnTimer:
+    """
+    单轮对话计时器（线程安全）
+
+    各环节只记录第一次到达的时间，结果为相对说话结束时刻的毫秒数。
+    """
+
+    def __init__(self, fixture: Fixture):
+        self.fixture = fixture
+        self.speech_end: Optional[float] = None
+        self.error: Optional[str] = None
+        self._marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def speech_ended(self):
+        """夹具最后一帧写入录音缓冲区"""
+        with self._lock:
+            if self.speech_end is None:
+                self.speech_end = time.perf_counter()
+
+    def mark(self, name: str):
+        """记录某个环节到达的时间（重复调用以第一次为准）"""
+        now = time.perf_counter()
+        with self._lock:
+            self._marks.setdefault(name, now)
+
+    def fail(self, error: str):
+        """记录本轮失败原因"""
+        with self._lock:
+            if self.error is None:
+                self.error = error
+
+    def result(self) -> Dict[str, Optional[float]]:
+        """各环节延迟（毫秒），未到达的环节为 None"""
+        result = {"fixture": self.fixture.name, "error": self.error}
+        for key, _ in METRICS:
+            mark = self._marks.get(key)
+            if mark is None or self.speech_end is None:
+                result[key] = None
+            else:
+                result[key] = (mark - self.speech_end) * 1000
+        return result
+
+
+class FixtureFeed:
+    """
+    夹具音频源
+
+    say() 登记的语音在下一次开始录音后写入，其余时间写入底噪，模拟常开的麦克风。
+    """
+
+    def __init__(self, chunk_samples: int):
+        self.chunk_samples = chunk_samples
+        self._utterances: "queue.Queue[tuple]" = queue.Queue()
+        self._current: Optional[np.ndarray] = None
+        self._timer: Optional[TurnTimer] = None
+        self._offset = 0
+        self._rng = np.random.default_rng(0)
+
+    @property
+    def chunk_seconds(self) -> float:
+        return self.chunk_samples / SAMPLE_RATE
+
+    def say(self, samples: np.ndarray, timer: TurnTimer):
+        """登记一段语音"""
+        self._utterances.put((samples, timer))
+
+    def next_chunk(self, recording: bool) -> bytes:
+        """取下一帧音频（语音或底噪）"""
+        if self._current is None and recording:
+            try:
+                self._current, self._timer = self._utterances.get_nowait()
+                self._offset = 0
+            except queue.Empty:
+                pass
+
+        if self._current is None:
+            noise = self._rng.normal(0, NOISE_LEVEL, self.chunk_samples)
+            return noise.astype(np.int16).tobytes()
+
+        chunk = self._current[self._offset:self._offset + self.chunk_samples]
+        self._offset += self.chunk_samples
+        if len(chunk) < self.chunk_samples:
+            tail = self._rng.normal(0, NOISE_LEVEL, self.chunk_samples - len(chunk))
+            chunk = np.concatenate([chunk, tail.astype(np.int16)])
+        if self._offset >= len(self._current):
+            self._current = None
+            self._timer.speech_ended()
+        return chunk.tobytes()
+
+
+# ==================== 统计 ====================
+def summarize(results: List[dict]) -> Dict[str, dict]:
+    """计算各指标的 p50 / p95（只统计成功的轮次）"""
+    summary = {}
+    for key, _ in METRICS:
+        values = [r[key] for r in results if r[key] is not None and r["error"] is None]
+        if values:
+            summary[key] = {
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "count": len(values),
+            }
+        else:
+            summary[key] = {"p50": None, "p95": None, "count": 0}
+    return summary
+
+
+def print_report(target: str, results: List[dict], summary: Dict[str, dict], servers: MockServers):
+    """打印统计表"""
+    failed = [r for r in results if r["error"] is not None]
+    print()
+    print(f"========== {target}：{len(results)} 轮，失败 {len(failed)} 轮 ==========")
+    print(f"{'指标':<12}{'p50':>10}{'p95':>10}{'样本':>6}")
+    for key, label in METRICS:
+        stats = summary[key]
+        if stats["count"]:
+            print(f"{label:<12}{stats['p50']:>8.0f}ms{stats['p95']:>8.0f}ms{stats['count']:>6}")
+        else:
+            print(f"{label:<12}{'-':>10}{'-':>10}{0:>6}")
+    print(f"模拟服务器：ASR 连接 {servers.asr.connections} 次，TTS 连接 {servers.tts.connections} 次，"
+          f"TTS 合成 {servers.tts.tasks} 段，Chat 连接 {servers.chat.connections} 次 / 请求 {servers.chat.requests} 次")
+    for r in failed:
+        print(f"  失败 {r['fixture']}: {r['error']}")
+
+
+def _turns(fixtures: List[Fixture], rounds: int, warmup: int) -> List[tuple]:
+    """生成 (夹具, 是否预热) 序列，预热轮不计入统计"""
+    turns = [(fixtures[i % len(fixtures)], True) for i in range(warmup)]
+    turns += [(fixture, False) for _ in range(rounds) for fixture in fixtures]
+    return turns
+
+
+# ==================== chatbot ====================
+def run_chatbot(servers: MockServers, fixtures: List[Fixture], rounds: int,
+                warmup: int, timeout: float, hedge: bool = False) -> List[dict]:
+    """驱动 chatbot 的 ASRWorker / ChatWorker / StreamingTTSWorker"""
+    sys.path.insert(0, CHATBOT_DIR)
+
+    from PyQt6.QtCore import Qt, QCoreApplication
+    import asr_connection_pool
+    import chat_http_client
+    import voice_assistant as va
+    from pcm_player import PCMPlayer
+
+    # 模块内以 from config import 方式取地址，需要改各模块自己的名字
+    asr_connection_pool.ASR_WS_URL = servers.urls["asr"]
+    chat_http_client.CHAT_API_URL = servers.urls["chat"]
+    va.ASR_WS_URL = servers.urls["asr"]
+    va.CHAT_API_URL = servers.urls["chat"]
+    va.TTS_WS_URL = servers.urls["tts"]
+    hedger = va.get_chat_hedger()
+    hedger.enabled = hedge
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    direct = Qt.ConnectionType.DirectConnection
+
+    class FixtureRecorder(va.AudioRecorder):
+        """用夹具代替 PyAudio：后台线程按实时速度写入环形缓冲区"""
+
+        def __init__(self, feed: FixtureFeed):
+            super().__init__()
+            self.feed = feed
+
+        def open(self, device_index: int = None) -> bool:
+            if self.stream is not None:
+                return True
+            self.stream = threading.Thread(target=self._capture, daemon=True)
+            self.stream.start()
+            return True
+
+        def _capture(self):
+            thread = self.stream
+            next_time = time.monotonic()
+            while self.stream is thread:
+                self.ring.write(self.feed.next_chunk(self.is_recording))
+                with self._data_ready:
+                    self._data_ready.notify_all()
+                next_time += self.feed.chunk_seconds
+                time.sleep(max(0.0, next_time - time.monotonic()))
+
+        def cleanup(self):
+            self.stream = None
+
+    class HeadlessPCMPlayer(PCMPlayer):
+        """不出声的输出流：后台线程按实时速度消费缓冲区，代替 PyAudio 输出回调"""
+
+        def open(self) -> bool:
+            if self.stream is not None:
+                return True
+            self._closed = False
+            self.stream = threading.Thread(target=self._drain, daemon=True)
+            self.stream.start()
+            return True
+
+        def _drain(self):
+            thread = self.stream
+            frame_seconds = self.frame_samples / self.sample_rate
+            next_time = time.monotonic()
+            while self.stream is thread:
+                self._render(self.frame_samples)
+                next_time += frame_seconds
+                time.sleep(max(0.0, next_time - time.monotonic()))
+
+        def close(self):
+            with self._cond:
+                self._closed = True
+                self._cursor = self.ring.position
+                self._cond.notify_all()
+            self.stream = None
+
+    feed = FixtureFeed(va.AUDIO_CHUNK)
+    recorder = FixtureRecorder(feed)
+    recorder.open()
+    player = HeadlessPCMPlayer()
+    player.open()
+    va.get_asr_connection_pool().start()
+    va.get_chat_http_client().start()
+
+    history: List[Dict[str, str]] = []
+    results = []
+
+    for fixture, is_warmup in _turns(fixtures, rounds, warmup):
+        servers.asr.transcript = fixture.transcript
+        servers.chat.reply = fixture.reply
+        timer = TurnTimer(fixture)
+        asr_done = threading.Event()
+        turn_done = threading.Event()
+        recognized = {}
+
+        signals = va.WorkerSignals()
+        tts = va.StreamingTTSWorker(signals, player)
+        chat = va.ChatWorker(signals)
+        asr = va.ASRWorker(signals, recorder)
+
+        def on_asr_finished(text):
+            if text:
+                timer.mark("asr_final")
+            recognized["text"] = text
+            asr_done.set()
+
+        def on_chat_chunk(chunk):
+            timer.mark("first_token")
+            tts.add_text_chunk(chunk)
+
+        def on_chat_reply(reply):
+            history.extend([
+                {"role": "user", "content": recognized["text"]},
+                {"role": "assistant", "content": reply},
+            ])
+            tts.finish_text()
+
+        def on_error(error):
+            timer.fail(error)
+            turn_done.set()
+
+        def on_tts_finished():
+            timer.mark("total")
+            turn_done.set()
+
+        signals.asr_finished.connect(on_asr_finished, direct)
+        signals.asr_error.connect(on_error, direct)
+        signals.chat_chunk.connect(on_chat_chunk, direct)
+        signals.chat_reply.connect(on_chat_reply, direct)
+        signals.chat_error.connect(on_error, direct)
+        signals.tts_started.connect(lambda: timer.mark("first_audio"), direct)
+        signals.tts_finished.connect(on_tts_finished, direct)
+        signals.tts_error.connect(on_error, direct)
+
+        feed.say(fixture.samples, timer)
+        asr.start()
+
+        if not asr_done.wait(fixture.duration + timeout):
+            timer.fail("等待识别结果超时")
+            asr.stop()
+        elif not recognized["text"]:
+            timer.fail("识别结果为空")
+        else:
+            tts.start()
+            chat.set_input(recognized["text"], history)
+            chat.start()
+            if not turn_done.wait(timeout):
+                timer.fail("等待播放完成超时")
+
+        for worker in (asr, chat, tts):
+            worker.stop()
+            worker.wait(2000)
+
+        result = timer.result()
+        label = "预热" if is_warmup else f"{len(results) + 1}"
+        print(f"[chatbot] {label} {fixture.name}: " + _format_turn(result))
+        if not is_warmup:
+            results.append(result)
+
+    recorder.stop()
+    recorder.cleanup()
+    player.close()
+    va.get_asr_connection_pool().stop()
+    va.get_chat_http_client().stop()
+    app.quit()
+    if hedge:
+        print(f"[chatbot] 对冲 {hedger.hedges} 次，胜出 {hedger.hedge_wins} 次，费用保护拦下 {hedger.suppressed} 次")
+    return results
+
+
+# ==================== robot ====================
+async def run_robot(servers: MockServers, fixtures: List[Fixture], rounds: int,
+                    warmup: int, timeout: float, hedge: bool = False) -> List[dict]:
+    """驱动 robot_controller 的 VoiceAssistantRobot 状态机"""
+    sys.path.insert(0, ROBOT_DIR)
+
+    import config
+    config.ASR_CONFIG["ws_url"] = servers.urls["asr"]
+    config.CHAT_CONFIG["api_url"] = servers.urls["chat"]
+    config.TTS_CONFIG["ws_url"] = servers.urls["tts"]
+    config.MEM0_CONFIG["enabled"] = False
+    config.CHAT_CONFIG["hedge_enabled"] = hedge
+    config.WAKE_WORD_CONFIG["engine"] = "energy"
+    config.SYSTEM_CONFIG["log_file"] = None
+    config.SYSTEM_CONFIG["log_level"] = "WARNING"
+
+    import main as robot_main
+    from core.audio_player import StreamingAudioPlayer
+    from core.audio_recorder import AudioRecorder
+    from core.state_machine import RobotEvent, RobotState
+
+    class FixtureRecorder(AudioRecorder):
+        """用夹具代替 arecord：后台任务按实时速度写入环形缓冲区"""
+
+        def __init__(self, config, feed: FixtureFeed):
+            super().__init__(config)
+            self.feed = feed
+
+        async def open(self) -> bool:
+            if self.is_open():
+                return True
+            self._data_event = asyncio.Event()
+            self._capture_task = asyncio.create_task(self._capture())
+            return True
+
+        async def _capture(self):
+            loop = asyncio.get_running_loop()
+            next_time = loop.time()
+            while True:
+                self._ring.write(self.feed.next_chunk(self._recording))
+                self._data_event.set()
+                next_time += self.feed.chunk_seconds
+                await asyncio.sleep(max(0.0, next_time - loop.time()))
+
+    class HeadlessStreamingPlayer(StreamingAudioPlayer):
+        """不出声的流式播放器：不启动 aplay，每段音频按时长空等"""
+
+        async def _spawn(self, sample_rate: int, audio_format: str):
+            return None
+
+        async def _output(self, chunk: bytes):
+            await asyncio.sleep(len(chunk) / PLAYBACK_BYTES_PER_SECOND)
+
+    robot = robot_main.VoiceAssistantRobot()
+
+    feed = FixtureFeed(config.AUDIO_CONFIG["chunk_size"] // 2)
+    recorder = FixtureRecorder(robot.audio_recorder.config, feed)
+    recorder.set_silence_params(
+        config.SYSTEM_CONFIG["silence_threshold"],
+        config.SYSTEM_CONFIG["silence_duration"]
+    )
+    robot.audio_recorder = recorder
+    player = HeadlessStreamingPlayer(robot.stream_player.config)
+    robot.stream_player = player
+
+    # 包装回调：识别、对话、播放、回到待机时打点
+    current: Dict[str, object] = {}
+    asr_set_callbacks = robot.asr_client.set_callbacks
+    chat_set_callbacks = robot.chat_client.set_callbacks
+
+    def set_asr_callbacks(on_partial=None, on_final=None, on_error=None):
+        def final(text):
+            current["timer"].mark("asr_final")
+            if on_final:
+                on_final(text)
+        asr_set_callbacks(on_partial=on_partial, on_final=final, on_error=on_error)
+
+    def set_chat_callbacks(on_chunk=None, on_complete=None, on_error=None):
+        def chunk(text):
+            current["timer"].mark("first_token")
+            if on_chunk:
+                on_chunk(text)
+        chat_set_callbacks(on_chunk=chunk, on_complete=on_complete, on_error=on_error)
+
+    robot.asr_client.set_callbacks = set_asr_callbacks
+    robot.chat_client.set_callbacks = set_chat_callbacks
+    player.set_on_start(lambda: current["timer"].mark("first_audio"))
+
+    async def on_idle(context):
+        await robot._on_enter_idle(context)
+        if "timer" in current:
+            current["timer"].mark("total")
+            current["done"].set()
+
+    async def on_error(context):
+        if "timer" in current:
+            current["timer"].fail("状态机进入 ERROR")
+            current["done"].set()
+        await robot._on_enter_error(context)
+
+    robot.state_machine.register_state_callback(RobotState.IDLE, on_idle)
+    robot.state_machine.register_state_callback(RobotState.ERROR, on_error)
+
+    await robot.asr_client.start_pool()
+    await robot.chat_client.start_keepalive()
+    await recorder.open()
+    state_machine_task = asyncio.create_task(robot.state_machine.start())
+    while robot.state_machine._event_queue is None:
+        await asyncio.sleep(0.01)
+
+    results = []
+    for fixture, is_warmup in _turns(fixtures, rounds, warmup):
+        servers.asr.transcript = fixture.transcript
+        servers.chat.reply = fixture.reply
+        timer = TurnTimer(fixture)
+        current["timer"] = timer
+        current["done"] = asyncio.Event()
+
+        feed.say(fixture.samples, timer)
+        await robot.state_machine.emit_event(RobotEvent.WAKE_WORD_DETECTED)
+        try:
+            await asyncio.wait_for(current["done"].wait(), fixture.duration + timeout)
+        except asyncio.TimeoutError:
+            timer.fail("等待回到待机超时")
+        # ERROR 状态自行恢复需要 2s，等它回到待机再开始下一轮
+        while robot.state_machine.state != RobotState.IDLE:
+            await asyncio.sleep(0.1)
+
+        result = timer.result()
+        label = "预热" if is_warmup else f"{len(results) + 1}"
+        print(f"[robot] {label} {fixture.name}: " + _format_turn(result))
+        if not is_warmup:
+            results.append(result)
+
+    current.clear()
+    if hedge:
+        hedger = robot.chat_client.hedger
+        print(f"[robot] 对冲 {hedger.hedges} 次，胜出 {hedger.hedge_wins} 次，费用保护拦下 {hedger.suppressed} 次")
+    await robot.shutdown()
+    state_machine_task.cancel()
+    try:
+        await state_machine_task
+    except asyncio.CancelledError:
+        pass
+    return results
+
+
+def _format_turn(result: dict) -> str:
+    """单轮结果的一行摘要"""
+    parts = []
+    for key, label in METRICS:
+        value = result[key]
+        parts.append(f"{label} {value:.0f}ms" if value is not None else f"{label} -")
+    if result["error"]:
+        parts.append(f"失败: {result['error']}")
+    return "，".join(parts)
+
+
+# ==================== 入口 ====================
+def run_target(target: str, args) -> int:
+    """在当前进程中运行单个目标"""
+    install_mock_secrets()
+    fixtures = load_fixtures()
+    profile = profile_from_args(args)
+
+    with MockServers(profile) as servers:
+        if target == "chatbot":
+            results = run_chatbot(servers, fixtures, args.rounds, args.warmup, args.timeout, args.hedge)
+        else:
+            results = asyncio.run(run_robot(servers, fixtures, args.rounds, args.warmup, args.timeout, args.hedge))
+        summary = summarize(results)
+        print_report(target, results, summary, servers)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "target": target,
+                "profile": {k: v for k, v in vars(args).items()
+                            if k.endswith("_ms") or k in ("seed", "chat_stall_rate", "hedge")},
+                "summary": summary,
+                "turns": results,
+            }, f, ensure_ascii=False, indent=2)
+
+    return 1 if any(r["error"] for r in results) else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="语音对话端到端延迟基准测试（本地模拟服务器）")
+    parser.add_argument("--target", choices=["chatbot", "robot", "all"], default="all")
+    parser.add_argument("--rounds", type=int, default=3, help="每个夹具的测试轮数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热轮数（不计入统计）")
+    parser.add_argument("--timeout", type=float, default=30.0, help="单轮超时（秒）")
+    parser.add_argument("--json", default=None, help="结果写入 JSON 文件（--target all 时按目标加后缀）")
+    parser.add_argument("--hedge", action="store_true", help="启用对话首片段对冲请求")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.target != "all":
+        return run_target(args.target, args)
+
+    # 两个目标的 config 模块同名，分别在子进程中运行
+    status = 0
+    for target in ("chatbot", "robot"):
+        # 后出现的参数覆盖前面的，--target / --json 追加在原参数之后
+        argv = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + ["--target", target]
+        if args.json:
+            root, ext = os.path.splitext(args.json)
+            argv += ["--json", f"{root}.{target}{ext or '.json'}"]
+        status |= subprocess.call(argv)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
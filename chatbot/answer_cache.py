@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+本地答案缓存
+
+功能：
+1. 缓存每个用户问过的简单问题和回复，连同合成好的 PCM 音频一起保存
+2. 再次问到相同或相近的问题时直接播放缓存的音频，跳过对话模型和语音合成
+3. 按用户隔离：不同用户（含未识别的访客）的缓存互不命中
+4. 有效期（TTL）+ 最久未使用淘汰（LRU），内存占用有上限
+
+匹配方式：
+- 先按归一化文本（去掉空白、标点和句末语气词）精确匹配
+- 再用字符二元组哈希向量（与 chat_router.py 相同）找最相近的一条，相似度达到阈值后逐字比对：
+  两个问题只在语气词、客套词（ANSWER_CACHE_IGNORABLE_CHARS）上不同才算命中，
+  "中国的首都" 和 "美国的首都"、"加四百五十六" 和 "加四百五十七" 这类只差一个实词的问题不会命中
+
+不缓存的问题：
+- 时效性问题（日期、时间、天气、"刚才/最近"等，见 ANSWER_CACHE_EXCLUDE_KEYWORDS）
+- 依赖上下文的问题：缓存键不含对话历史，"然后呢"、"再讲一个"、"他是谁"这类追问和指代上文的问题
+  （ANSWER_CACHE_EXCLUDE_KEYWORDS），以及"为什么"、"什么意思"这类整句只是追问的问题
+  （ANSWER_CACHE_FOLLOWUP_QUESTIONS）都不缓存
+- 超过字数上限的问题（长问题重复的概率低，改写后意思也容易变）
+"""
+
+import re
+import threading
+from difflib import SequenceMatcher
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_HOURS,
+    ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MAX_CHARS, ANSWER_CACHE_MAX_AUDIO_SECONDS,
+    ANSWER_CACHE_EXCLUDE_KEYWORDS, ANSWER_CACHE_FOLLOWUP_QUESTIONS, ANSWER_CACHE_IGNORABLE_CHARS,
+    TTS_SAMPLE_RATE
+)
+from chat_router import get_chat_router
+
+
+@dataclass
+class CachedAnswer:
+    """一条缓存的问答"""
+    user_id: str
+    question: str
+    reply: str
+    vector: np.ndarray = field(repr=False)
+    audio: Optional[bytes] = field(default=None, repr=False)  # 16-bit 单声道 PCM，未合成完整时为 None
+    sample_rate: int = TTS_SAMPLE_RATE
+    created: float = field(default_factory=time.time)
+    hits: int = 0
+
+    @property
+    def audio_seconds(self) -> float:
+        """缓存音频时长（秒）"""
+        return len(self.audio) / 2 / self.sample_rate if self.audio else 0.0
+
+
+class AnswerCache:
+    """
+    本地答案缓存
+
+    使用示例:
+        cache = get_answer_cache()
+        entry = cache.lookup(user_id, "你叫什么名字")
+        if entry and entry.audio:
+            ...  # 直接播放 entry.audio
+        else:
+            ...  # 正常调用对话模型，结束后
+            cache.put(user_id, question, reply, audio)
+    """
+
+    # 归一化时去掉的空白和标点
+    _STRIP_PATTERN = re.compile(r'[\s，。！？、,.!?~～…"“”\'‘’]+')
+    # 句末语气词（"你叫什么名字呀" 与 "你叫什么名字" 视为同一问题）
+    _PARTICLE_PATTERN = re.compile(r'[呀啊吧呢嘛哦哇啦呗]+$')
+
+    # 访客（未识别用户）的缓存分区
+    GUEST = "_guest"
+
+    def __init__(self, enabled: bool = None, max_entries: int = None, ttl_hours: float = None,
+                 similarity: float = None, max_chars: int = None, max_audio_seconds: float = None):
+        """
+        初始化缓存
+
+        Args:
+            enabled: 是否启用缓存
+            max_entries: 最多缓存的问答条数
+            ttl_hours: 有效期（小时）
+            similarity: 向量相似度阈值
+            max_chars: 可缓存问题的最大字数
+            max_audio_seconds: 可缓存音频的最大时长（秒）
+        """
+        self.enabled = ANSWER_CACHE_ENABLED if enabled is None else enabled
+        self.max_entries = max_entries or ANSWER_CACHE_MAX_ENTRIES
+        self.ttl = (ttl_hours or ANSWER_CACHE_TTL_HOURS) * 3600
+        self.similarity = similarity or ANSWER_CACHE_SIMILARITY
+        self.max_chars = max_chars or ANSWER_CACHE_MAX_CHARS
+        self.max_audio_seconds = max_audio_seconds or ANSWER_CACHE_MAX_AUDIO_SECONDS
+        self.exclude_keywords = list(ANSWER_CACHE_EXCLUDE_KEYWORDS)
+        self.followup_questions = set(ANSWER_CACHE_FOLLOWUP_QUESTIONS)
+        self.ignorable = set(ANSWER_CACHE_IGNORABLE_CHARS)
+
+        # (用户, 归一化问题) -> CachedAnswer，顺序即最近使用顺序（末尾最新）
+        self._entries: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.lookups = 0    # 查询次数（不含不可缓存的问题）
+        self.hits = 0       # 命中次数
+        self.evictions = 0  # 淘汰次数（含过期）
+
+    # ==================== 规则 ====================
+
+    def normalize(self, text: str) -> str:
+        """去掉空白、标点和句末语气词，英文转小写"""
+        text = self._STRIP_PATTERN.sub('', text or '').lower()
+        return self._PARTICLE_PATTERN.sub('', text) or text
+
+    def is_cacheable(self, text: str) -> bool:
+        """
+        问题是否可以走缓存
+
+        Args:
+            text: 用户问题
+
+        Returns:
+            bool: 启用缓存、字数不超限，且不是时效性问题或依赖上下文的追问
+        """
+        if not self.enabled:
+            return False
+        normalized = self.normalize(text)
+        if not normalized or len(normalized) > self.max_chars:
+            return False
+        if normalized in self.followup_questions:
+            return False
+        return not any(keyword in normalized for keyword in self.exclude_keywords)
+
+    def is_paraphrase(self, a: str, b: str) -> bool:
+        """
+        两个归一化问题是否只在语气词、客套词上不同
+
+        Args:
+            a: 归一化问题
+            b: 归一化问题
+
+        Returns:
+            bool: 所有不同的字都是可忽略的字
+        """
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+            if tag != "equal" and not set(a[i1:i2] + b[j1:j2]) <= self.ignorable:
+                return False
+        return True
+
+    def _key(self, user_id: Optional[str], text: str) -> Tuple[str, str]:
+        return (user_id or self.GUEST, self.normalize(text))
+
+    # ==================== 查询与写入 ====================
+
+    def lookup(self, user_id: Optional[str], text: str) -> Optional[CachedAnswer]:
+        """
+        查找缓存的回复
+
+        Args:
+            user_id: 当前用户 ID（None 表示访客）
+            text: 用户问题
+
+        Returns:
+            命中的 CachedAnswer，未命中返回 None
+        """
+        if not self.is_cacheable(text):
+            return None
+
+        key = self._key(user_id, text)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            self._expire(now)
+
+            entry = self._entries.get(key)
+            score = 1.0
+            if entry is None:
+                entry, score = self._nearest(key[0], get_chat_router().embed(key[1]))
+            if entry is None or score < self.similarity:
+                return None
+            if entry.question != key[1] and not self.is_paraphrase(entry.question, key[1]):
+                # 向量相近但有实词不同（数字、人名地名、目标语言等），不能用缓存的回复
+                return None
+
+            self._entries.move_to_end((entry.user_id, entry.question))
+            entry.hits += 1
+            self.hits += 1
+
+        print(f"[AnswerCache] 命中 \"{entry.question}\"（相似度 {score:.2f}，"
+              f"音频 {entry.audio_seconds:.1f}s，累计命中 {self.hits}/{self.lookups}）")
+        return entry
+
+    def _nearest(self, user_id: str, vector: np.ndarray) -> Tuple[Optional[CachedAnswer], float]:
+        """同一用户分区内向量最相近的一条（调用方持有锁）"""
+        best, best_score = None, 0.0
+        for (owner, _), entry in self._entries.items():
+            if owner != user_id:
+                continue
+            score = float(vector @ entry.vector)
+            if score > best_score:
+                best, best_score = entry, score
+        return best, best_score
+
+    def put(self, user_id: Optional[str], question: str, reply: str,
+            audio: Optional[bytes] = None, sample_rate: int = None):
+        """
+        写入一条问答（同一问题已存在时覆盖）
+
+        Args:
+            user_id: 当前用户 ID（None 表示访客）
+            question: 用户问题
+            reply: 模型回复
+            audio: 回复的完整 PCM 音频（可选）
+            sample_rate: 音频采样率
+        """
+        if not reply or not self.is_cacheable(question):
+            return
+
+        entry = CachedAnswer(
+            user_id=user_id or self.GUEST,
+            question=self.normalize(question),
+            reply=reply,
+            vector=get_chat_router().embed(self.normalize(question)),
+            audio=audio or None,
+            sample_rate=sample_rate or TTS_SAMPLE_RATE
+        )
+        if entry.audio_seconds > self.max_audio_seconds:
+            entry.audio = None
+
+        key = (entry.user_id, entry.question)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        print(f"[AnswerCache] 缓存 \"{entry.question}\"（音频 {entry.audio_seconds:.1f}s，共 {len(self)} 条）")
+
+    def _expire(self, now: float):
+        """删除过期条目（调用方持有锁）"""
+        expired = [key for key, entry in self._entries.items() if now - entry.created > self.ttl]
+        for key in expired:
+            del self._entries[key]
+            self.evictions += 1
+
+    def clear(self, user_id: Optional[str] = None):
+        """
+        清空缓存
+
+        Args:
+            user_id: 只清空该用户的缓存，None 表示全部清空
+        """
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == user_id]:
+                    del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """命中统计"""
+        with self._lock:
+            audio_bytes = sum(len(e.audio) for e in self._entries.values() if e.audio)
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "audio_mb": audio_bytes / 1024 / 1024
+            }
+
+
+# 全局单例
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """
+    获取答案缓存单例
+
+    Returns:
+        AnswerCache 实例
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
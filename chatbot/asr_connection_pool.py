@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+ASR WebSocket 连接池
+
+功能：
+1. 预先建立 1~2 条已完成 DNS/TLS/鉴权握手的 ASR WebSocket 连接
+2. 每次录音直接取用一条就绪连接，省去 150-400ms 的握手时间
+3. 连接被取走后在后台自动补充
+
+说明：
+- 豆包流式 ASR 一条连接只承载一次识别会话，用完即关闭，不会归还
+- WebSocket 连接与创建它的事件循环绑定，因此连接池自带一个常驻事件循环线程，
+  ASRWorker 的识别协程通过 run() 提交到同一个循环上执行
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Optional, Deque, Tuple
+
+import websockets
+
+from config import (
+    ASR_APPID, ASR_ACCESS_TOKEN, ASR_WS_URL, ASR_RESOURCE_ID,
+    ASR_POOL_SIZE, ASR_POOL_MAX_IDLE
+)
+
+
+def _is_open(websocket) -> bool:
+    """判断连接是否仍处于 OPEN 状态（兼容新旧版 websockets）"""
+    state = getattr(websocket, "state", None)
+    if state is not None:
+        return getattr(state, "name", "") == "OPEN"
+    return bool(getattr(websocket, "open", False))
+
+
+class ASRConnectionPool:
+    """
+    ASR 预热连接池
+
+    使用示例:
+        pool = get_asr_connection_pool()
+        pool.start()
+
+        # 在 ASR 线程中
+        pool.run(stream_coroutine())
+
+        # 在连接池事件循环中（协程内）
+        websocket = pool.acquire_nowait() or await pool.connect()
+    """
+
+    # 两次建连之间的最小间隔（秒），避免服务端频繁断开时疯狂重连
+    MIN_CONNECT_INTERVAL = 1.0
+    # 建连失败后的最大退避时间（秒）
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, size: int = None, max_idle: float = None):
+        """
+        初始化连接池
+
+        Args:
+            size: 保持的预热连接数
+            max_idle: 预热连接最长空闲时间（秒），超时后主动替换
+        """
+        self.size = ASR_POOL_SIZE if size is None else size
+        self.max_idle = max_idle or ASR_POOL_MAX_IDLE
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._idle: Deque[Tuple[object, float]] = deque()  # (websocket, 建立时间)
+        self._refill_event: Optional[asyncio.Event] = None
+        self._maintain_task: Optional[asyncio.Task] = None
+        self._started = threading.Event()
+
+        # 统计信息
+        self.hits = 0    # 直接取到预热连接的次数
+        self.misses = 0  # 需要现场建连的次数
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动连接池事件循环线程，并开始预热连接"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=2)
+        print(f"[ASRPool] 连接池已启动，预热连接数: {self.size}")
+
+    def _run_loop(self):
+        """事件循环线程主函数"""
+        asyncio.set_event_loop(self._loop)
+        self._refill_event = asyncio.Event()
+        if self.size > 0:
+            self._maintain_task = self._loop.create_task(self._maintain())
+        self._loop.call_soon(self._started.set)
+        self._loop.run_forever()
+
+        # 循环停止后关闭残留连接
+        self._loop.run_until_complete(self._close_idle())
+        self._loop.close()
+
+    def stop(self):
+        """停止连接池，关闭所有预热连接"""
+        if not self._loop or not self._thread:
+            return
+
+        def _shutdown():
+            if self._maintain_task:
+                self._maintain_task.cancel()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(_shutdown)
+        self._thread.join(timeout=2)
+        self._thread = None
+        print(f"[ASRPool] 连接池已停止（命中 {self.hits} 次，未命中 {self.misses} 次）")
+
+    def run(self, coro):
+        """
+        在连接池事件循环上运行协程并阻塞等待结果（供 ASR 工作线程调用）
+
+        Args:
+            coro: 待执行的协程
+
+        Returns:
+            协程返回值
+        """
+        if not self._loop or not self._thread or not self._thread.is_alive():
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    # ==================== 连接获取 ====================
+
+    async def connect(self):
+        """
+        建立一条新的已鉴权 ASR 连接
+
+        Returns:
+            WebSocket 连接对象
+        """
+        headers = {
+            "X-Api-App-Key": ASR_APPID,
+            "X-Api-Access-Key": ASR_ACCESS_TOKEN,
+            "X-Api-Resource-Id": ASR_RESOURCE_ID,
+            "X-Api-Connect-Id": str(uuid.uuid4())
+        }
+        return await websockets.connect(
+            ASR_WS_URL,
+            additional_headers=headers,
+            ping_interval=20,
+            ping_timeout=10
+        )
+
+    def acquire_nowait(self):
+        """
+        取出一条预热连接（必须在连接池事件循环中调用）
+
+        Returns:
+            WebSocket 连接对象，没有可用连接时返回 None
+        """
+        now = time.time()
+        websocket = None
+
+        while self._idle:
+            candidate, created_at = self._idle.popleft()
+            if _is_open(candidate) and now - created_at < self.max_idle:
+                websocket = candidate
+                break
+            # 已断开或空闲过久的连接直接丢弃
+            asyncio.ensure_future(self._safe_close(candidate))
+
+        if websocket is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        # 通知后台补充连接
+        if self._refill_event:
+            self._refill_event.set()
+
+        return websocket
+
+    # ==================== 后台维护 ====================
+
+    async def _maintain(self):
+        """后台维护任务：保持池中有 size 条可用连接，并替换过期连接"""
+        backoff = self.MIN_CONNECT_INTERVAL
+        last_connect = 0.0
+
+        while True:
+            self._prune()
+
+            if len(self._idle) < self.size:
+                # 限制建连频率
+                wait = self.MIN_CONNECT_INTERVAL - (time.time() - last_connect)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                last_connect = time.time()
+                try:
+                    start = time.time()
+                    websocket = await self.connect()
+                    self._idle.append((websocket, time.time()))
+                    backoff = self.MIN_CONNECT_INTERVAL
+                    print(f"[ASRPool] 预热连接就绪，握手耗时 {(time.time() - start) * 1000:.0f}ms")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"[ASRPool] 预热连接失败: {e}，{backoff:.0f}s 后重试")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.MAX_BACKOFF)
+                continue
+
+            # 池已满，等待取用通知或定期检查过期连接
+            self._refill_event.clear()
+            try:
+                await asyncio.wait_for(self._refill_event.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune(self):
+        """移除已断开或空闲过久的连接"""
+        now = time.time()
+        alive: Deque[Tuple[object, float]] = deque()
+        for websocket, created_at in self._idle:
+            if _is_open(websocket) and now - created_at < self.max_idle:
+                alive.append((websocket, created_at))
+            else:
+                asyncio.ensure_future(self._safe_close(websocket))
+        self._idle = alive
+
+    async def _close_idle(self):
+        """关闭所有空闲连接"""
+        while self._idle:
+            websocket, _ = self._idle.popleft()
+            await self._safe_close(websocket)
+
+    @staticmethod
+    async def _safe_close(websocket):
+        """关闭连接，忽略异常"""
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
+# 全局单例
+_asr_connection_pool: Optional[ASRConnectionPool] = None
+
+
+def get_asr_connection_pool() -> ASRConnectionPool:
+    """
+    获取 ASR 连接池单例
+
+    Returns:
+        ASRConnectionPool 实例
+    """
+    global _asr_connection_pool
+    if _asr_connection_pool is None:
+        _asr_connection_pool = ASRConnectionPool()
+    return _asr_connection_pool
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+对冲式对话请求
+
+功能：
+1. 发出流式对话请求后，如果超过预算时间还没收到第一个 SSE 片段，再发一个完全相同的请求
+2. 两个请求谁先收到第一个片段就用谁，另一个立即断开
+3. 预算时间取最近若干次首片段延迟的百分位数（限制在上下限之间），样本不足时用默认值
+4. 费用保护：每分钟最多对冲若干次，且对冲次数不超过总请求数的一定比例
+5. 统计对冲次数、对冲请求胜出次数、被费用保护拦下的次数
+
+说明：
+- 对冲只影响"等首字"阶段，首片段到达之后只读取胜出的那一路
+- 被断开的请求如果已在服务端开始生成，仍会按实际生成的 token 计费，所以要有费用保护
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterator, List, Optional
+
+import requests
+
+from config import (
+    CHAT_HEDGE_ENABLED, CHAT_HEDGE_PERCENTILE, CHAT_HEDGE_DEFAULT_DELAY_MS,
+    CHAT_HEDGE_MIN_DELAY_MS, CHAT_HEDGE_MAX_DELAY_MS,
+    CHAT_HEDGE_MAX_PER_MINUTE, CHAT_HEDGE_MAX_RATIO
+)
+from chat_http_client import ChatHTTPClient
+
+
+class HedgedStream:
+    """胜出的流式响应：第一个片段已读出，其余行从 lines 继续读取"""
+
+    def __init__(self, response: requests.Response, first_line: bytes, lines: Iterator[bytes], hedged: bool):
+        self.response = response
+        self.first_line = first_line
+        self.lines = lines
+        self.hedged = hedged  # 是否由对冲请求胜出
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """按顺序返回全部行（包括已读出的第一个片段）"""
+        yield self.first_line
+        yield from self.lines
+
+
+class _Attempt:
+    """一路请求：后台线程发送请求并读到第一个片段为止"""
+
+    def __init__(self, send: Callable[[], Optional[requests.Response]], done: threading.Event):
+        self.send = send
+        self.done = done
+        self.response: Optional[requests.Response] = None
+        self.lines: Optional[Iterator[bytes]] = None
+        self.first_line: Optional[bytes] = None
+        self.finished = False
+        self.cancelled = False
+        self.started = time.time()  # 这一路请求发出的时刻
+        self.first_line_at: Optional[float] = None  # 收到第一个片段的时刻
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            response = self.send()
+            if response is None:
+                return
+            self.response = response
+            if self.cancelled:
+                ChatHTTPClient.release(response, reuse=False)
+                return
+            self.lines = response.iter_lines()
+            for line in self.lines:
+                if self.cancelled:
+                    break
+                # 跳过空行和 SSE 注释（心跳）
+                if line and not line.startswith(b':'):
+                    self.first_line = line
+                    self.first_line_at = time.time()
+                    break
+        except Exception as e:
+            if not self.cancelled:
+                print(f"[ChatHedge] 请求异常: {e}")
+        finally:
+            self.finished = True
+            self.done.set()
+
+    def cancel(self):
+        """断开这一路请求（还在等待响应头时，响应返回后立即关闭）"""
+        self.cancelled = True
+        if self.response is not None:
+            ChatHTTPClient.release(self.response, reuse=False)
+
+
+class ChatHedger:
+    """
+    对冲请求调度与费用保护
+
+    使用示例:
+        hedger = get_chat_hedger()
+        stream = hedger.open(lambda: client.post(url, ..., stream=True), lambda: worker.is_running)
+        if stream:
+            for line in stream.iter_lines():
+                ...
+    """
+
+    # 计算百分位数所需的最少样本数
+    MIN_SAMPLES = 10
+    # 保留的首片段延迟样本数
+    HISTORY_SIZE = 50
+    # 等待期间检查是否被打断的间隔（秒）
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, enabled: bool = None, percentile: float = None,
+                 default_delay_ms: float = None, min_delay_ms: float = None, max_delay_ms: float = None,
+                 max_per_minute: int = None, max_ratio: float = None):
+        """
+        初始化对冲调度器
+
+        Args:
+            enabled: 是否启用对冲（关闭时只发一路请求）
+            percentile: 预算时间取首片段延迟的第几百分位
+            default_delay_ms: 样本不足时的预算时间（毫秒）
+            min_delay_ms: 预算时间下限（毫秒）
+            max_delay_ms: 预算时间上限（毫秒）
+            max_per_minute: 每分钟最多对冲次数
+            max_ratio: 对冲次数占总请求数的最大比例
+        """
+        self.enabled = CHAT_HEDGE_ENABLED if enabled is None else enabled
+        self.percentile = percentile or CHAT_HEDGE_PERCENTILE
+        self.default_delay = (default_delay_ms or CHAT_HEDGE_DEFAULT_DELAY_MS) / 1000
+        self.min_delay = (min_delay_ms or CHAT_HEDGE_MIN_DELAY_MS) / 1000
+        self.max_delay = (max_delay_ms or CHAT_HEDGE_MAX_DELAY_MS) / 1000
+        self.max_per_minute = CHAT_HEDGE_MAX_PER_MINUTE if max_per_minute is None else max_per_minute
+        self.max_ratio = CHAT_HEDGE_MAX_RATIO if max_ratio is None else max_ratio
+
+        self._latencies: Deque[float] = deque(maxlen=self.HISTORY_SIZE)
+        self._hedge_times: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.requests = 0     # 对话请求数（每轮算一次，不含对冲）
+        self.hedges = 0       # 发出的对冲请求数
+        self.hedge_wins = 0   # 对冲请求先到首片段的次数
+        self.suppressed = 0   # 到了预算时间但被费用保护拦下的次数
+
+    # ==================== 预算与费用保护 ====================
+
+    def budget(self) -> float:
+        """当前的对冲预算时间（秒）"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.MIN_SAMPLES:
+            delay = self.default_delay
+        else:
+            index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+            delay = samples[index]
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def _allow_hedge(self) -> bool:
+        """费用保护：每分钟次数和总体比例都不超限才允许对冲（被拦下时计入 suppressed）"""
+        now = time.time()
+        with self._lock:
+            while self._hedge_times and now - self._hedge_times[0] > 60:
+                self._hedge_times.popleft()
+            if (len(self._hedge_times) >= self.max_per_minute
+                    or self.hedges >= max(1, self.requests * self.max_ratio)):
+                self.suppressed += 1
+                return False
+            self._hedge_times.append(now)
+            self.hedges += 1
+            return True
+
+    @property
+    def win_rate(self) -> float:
+        """对冲请求的胜出比例"""
+        return self.hedge_wins / self.hedges if self.hedges else 0.0
+
+    # ==================== 请求 ====================
+
+    def open(self, send: Callable[[], Optional[requests.Response]],
+             is_running: Callable[[], bool] = lambda: True,
+             hedge: bool = True) -> Optional[HedgedStream]:
+        """
+        发出请求并等待第一个片段，超过预算时间再发一路对冲请求
+
+        Args:
+            send: 发送一次流式请求，失败返回 None（内部可自行重试）
+            is_running: 调用方是否仍需要结果，返回 False 时断开所有请求
+            hedge: 本次请求是否允许对冲
+
+        Returns:
+            HedgedStream，全部失败或被打断时返回 None
+        """
+        with self._lock:
+            self.requests += 1
+
+        done = threading.Event()
+        start = time.time()
+        attempts: List[_Attempt] = [_Attempt(send, done)]
+        hedge_at = start + self.budget() if self.enabled and hedge else None
+
+        winner: Optional[_Attempt] = None
+        while True:
+            done.wait(self.POLL_INTERVAL)
+            done.clear()
+
+            winner = next((a for a in attempts if a.finished and a.first_line is not None), None)
+            if winner is not None:
+                break
+            if not is_running():
+                break
+            if all(a.finished for a in attempts):
+                # 所有请求都失败（或流结束时没有任何片段）
+                break
+
+            if hedge_at is not None and len(attempts) == 1 and time.time() >= hedge_at:
+                if self._allow_hedge():
+                    print(f"[ChatHedge] {(time.time() - start) * 1000:.0f}ms 未收到首片段，发出对冲请求")
+                    attempts.append(_Attempt(send, done))
+                else:
+                    print("[ChatHedge] 超过预算时间，对冲次数已达上限，继续等待")
+                hedge_at = None
+
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+
+        if winner is None:
+            return None
+
+        # 按胜出请求自己的首片段延迟统计（对冲请求从它发出时算起，不含之前等待的预算时间，
+        # 否则每次对冲胜出都会抬高百分位数，预算时间越来越长）
+        latency = winner.first_line_at - winner.started
+        waited = time.time() - start
+        hedged = winner is not attempts[0]
+        with self._lock:
+            self._latencies.append(latency)
+            if hedged:
+                self.hedge_wins += 1
+        if len(attempts) > 1:
+            side = "对冲请求" if hedged else "原请求"
+            print(f"[ChatHedge] {side}胜出，首片段 {latency * 1000:.0f}ms（本轮共等待 {waited * 1000:.0f}ms，"
+                  f"累计对冲 {self.hedges} 次，胜出 {self.hedge_wins} 次）")
+        return HedgedStream(winner.response, winner.first_line, winner.lines, hedged)
+
+
+# 全局单例
+_chat_hedger: Optional[ChatHedger] = None
+
+
+def get_chat_hedger() -> ChatHedger:
+    """
+    获取对冲调度器单例
+
+    Returns:
+        ChatHedger 实例
+    """
+    global _chat_hedger
+    if _chat_hedger is None:
+        _chat_hedger = ChatHedger()
+    return _chat_hedger
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+对话模型 HTTP 长连接客户端
+
+功能：
+1. 进程内共用一个 requests.Session，底层 urllib3 连接池保持与对话接口的 keep-alive 连接
+2. 启动时预先建立连接（DNS/TCP/TLS 握手），首轮对话不用现场握手
+3. 后台线程在空闲时定期发送轻量请求，防止服务端或中间网络设备回收空闲连接
+
+说明：
+- 每次现场建立 TLS 连接要多花 100-300ms，直接计入首 token 延迟
+- 预热请求只访问接口所在主机的根路径（HEAD），不调用模型，不产生费用
+- 流式响应只有读完或 close() 后连接才会放回连接池，调用方提前结束时要关闭响应
+- 对话接口不可用时熔断（见 circuit_breaker.py），post 直接抛出 CircuitOpenError，不再等满超时
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import CHAT_API_URL, CHAT_HTTP_POOL_SIZE, CHAT_HTTP_KEEPALIVE_INTERVAL, CIRCUIT_PROBE_TIMEOUT
+from circuit_breaker import CircuitOpenError, get_circuit_breaker
+
+
+class ChatHTTPClient:
+    """
+    对话接口长连接客户端
+
+    使用示例:
+        client = get_chat_http_client()
+        client.start()
+
+        response = client.post(CHAT_API_URL, headers=headers, data=body, stream=True)
+    """
+
+    # 预热请求超时（秒）
+    WARM_TIMEOUT = 5
+
+    def __init__(self, url: str = None, pool_size: int = None, keepalive_interval: float = None):
+        """
+        初始化客户端
+
+        Args:
+            url: 对话接口地址（用于确定预热的主机）
+            pool_size: 连接池大小，也是预热的连接数（主对话 + 推测式对话并发）
+            keepalive_interval: 空闲多久（秒）后发送一次保活请求，0 表示不保活
+        """
+        self.url = url or CHAT_API_URL
+        self.pool_size = pool_size or CHAT_HTTP_POOL_SIZE
+        self.keepalive_interval = (CHAT_HTTP_KEEPALIVE_INTERVAL
+                                   if keepalive_interval is None else keepalive_interval)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.breaker = get_circuit_breaker("对话", probe=self.probe)
+
+        self._last_used = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self.requests = 0  # 发出的对话请求数
+        self.warmups = 0   # 发出的预热/保活请求数
+
+    @property
+    def origin(self) -> str:
+        """对话接口所在主机（scheme://host:port/）"""
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}/"
+
+    def start(self):
+        """后台预热连接并启动保活线程（已启动时直接返回）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止保活线程并关闭所有连接"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.session.close()
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        通过连接池发送 POST 请求（参数同 requests.post）
+
+        Returns:
+            requests.Response
+
+        Raises:
+            CircuitOpenError: 对话接口熔断中（ConnectionError 的子类）
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"对话接口熔断中: {self.origin}")
+        self.requests += 1
+        self._last_used = time.time()
+        try:
+            response = self.session.post(url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    @staticmethod
+    def release(response: requests.Response, reuse: bool = True):
+        """
+        结束流式响应：正常结束时读完剩余数据把连接放回连接池，被打断时直接关闭连接
+
+        Args:
+            response: 流式响应
+            reuse: 是否读完剩余数据以复用连接
+        """
+        if reuse:
+            try:
+                response.raw.drain_conn()
+            except Exception:
+                pass
+        response.close()
+
+    def warm(self, connections: int = None):
+        """
+        并发发送轻量请求，让连接池中保持若干条已握手的连接
+
+        Args:
+            connections: 预热的连接数，默认为连接池大小
+        """
+        count = max(1, connections or self.pool_size)
+        start = time.time()
+        # 并发请求才会各自占用一条连接，串行请求只会复用同一条
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            results = list(executor.map(lambda _: self._ping(), range(count)))
+        self._last_used = time.time()
+        print(f"[ChatHTTP] 预热 {sum(results)}/{count} 条连接，耗时 {(time.time() - start) * 1000:.0f}ms")
+
+    def _ping(self) -> bool:
+        """发送一次 HEAD 请求，任何状态码都说明连接可用"""
+        self.warmups += 1
+        try:
+            response = self.session.head(self.origin, timeout=self.WARM_TIMEOUT)
+            response.close()
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"[ChatHTTP] 预热失败: {e}")
+            return False
+
+    def probe(self) -> bool:
+        """熔断期间的健康探测（HEAD 主机根路径，任何状态码都说明接口可达）"""
+        try:
+            self.session.head(self.origin, timeout=CIRCUIT_PROBE_TIMEOUT).close()
+            return True
+        except requests.exceptions.RequestException:
+            return False
+
+    def _keepalive_loop(self):
+        """启动时预热一次，之后空闲超过保活间隔就再发一次"""
+        self.warm()
+        if self.keepalive_interval <= 0:
+            return
+        while not self._stop_event.wait(1.0):
+            if time.time() - self._last_used >= self.keepalive_interval:
+                self.warm()
+
+
+# 全局单例
+_chat_http_client: Optional[ChatHTTPClient] = None
+
+
+def get_chat_http_client() -> ChatHTTPClient:
+    """
+    获取对话 HTTP 客户端单例
+
+    Returns:
+        ChatHTTPClient 实例
+    """
+    global _chat_http_client
+    if _chat_http_client is None:
+        _chat_http_client = ChatHTTPClient()
+    return _chat_http_client
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+对话快慢路由
+
+功能：
+1. 本地判断每轮对话是简单闲聊还是需要推理的问题，不调用任何模型，耗时在 1ms 以内
+2. 简单问题走快速档（轻量模型、关闭深度思考、较小的 max_tokens），其余走完整档
+3. 按路由分别统计首片段延迟和总耗时
+
+判断依据（默认走完整档，只有明确像闲聊时才走快速档）：
+- 超过字数上限、计算类问题、"为什么/怎么/讲讲/介绍/什么是/写一篇"等完整档关键词：直接走完整档
+- 问候/应答类关键词：走快速档
+- 字符二元组哈希向量：与内置的快/慢两组示例句求余弦相似度，明显更像快速档示例时才走快速档；
+  和两组示例都不像的问题（知识问答、英文问题等）走完整档，避免快速档的 max_tokens 截断回答
+- 长度：字数越多越倾向完整档
+"""
+
+import re
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    CHAT_MODEL_NAME, CHAT_MAX_TOKENS, CHAT_THINKING, CHAT_TEMPERATURE,
+    CHAT_ROUTER_ENABLED, CHAT_FAST_MODEL_NAME, CHAT_FAST_MAX_TOKENS, CHAT_FAST_THINKING,
+    CHAT_ROUTER_MAX_FAST_CHARS, CHAT_ROUTER_THRESHOLD
+)
+
+
+@dataclass
+class ChatProfile:
+    """一组对话模型参数"""
+    name: str
+    model: str
+    max_tokens: int
+    thinking: Optional[str]
+    temperature: float
+
+
+@dataclass
+class RouteDecision:
+    """路由结果"""
+    profile: ChatProfile
+    score: float  # 越大越复杂，超过阈值走完整档
+    reason: str   # 主要判断依据（日志用）
+
+
+class ChatRouter:
+    """
+    对话快慢路由器
+
+    使用示例:
+        router = get_chat_router()
+        decision = router.route("你好呀")
+        data["model"] = decision.profile.model
+        ...
+        router.record(decision.profile.name, first_chunk_seconds, total_seconds)
+    """
+
+    # 倾向快速档的关键词（问候、应答、简单闲聊）
+    FAST_KEYWORDS = [
+        "你好", "您好", "嗨", "哈喽", "早上好", "中午好", "晚上好", "晚安", "早安",
+        "谢谢", "多谢", "再见", "拜拜", "好的", "好吧", "知道了", "没事", "哈哈",
+        "你是谁", "你叫什么", "你几岁", "在吗", "在不在", "我回来了", "我出门了",
+        "讲个笑话", "夸夸我", "陪我聊", "真棒", "厉害", "喜欢你"
+    ]
+
+    # 倾向完整档的关键词（解释、推理、生成、多步骤）
+    FULL_KEYWORDS = [
+        "为什么", "怎么", "如何", "原因", "原理", "解释", "分析", "比较", "区别",
+        "讲讲", "介绍", "什么是", "是什么", "告诉我", "你觉得", "意义", "历史", "知识",
+        "有多", "多远", "多久", "多长", "多大", "哪些",
+        "步骤", "方法", "计划", "规划", "建议", "推荐", "总结", "概括", "翻译",
+        "计算", "算一下", "多少", "写一", "编一", "作文", "故事", "诗", "代码",
+        "如果", "假如", "应该", "是否", "优缺点", "利弊", "详细", "具体"
+    ]
+
+    # 快速档示例句（语义特征的原型）
+    FAST_EXAMPLES = [
+        "你好", "早上好呀", "晚安", "谢谢你", "再见啦", "你叫什么名字", "你今年几岁了",
+        "我回来了", "好的知道了", "哈哈真好笑", "你在干嘛", "陪我聊会天吧", "你真可爱",
+        "今天好开心", "我有点累了", "你喜欢我吗", "讲个笑话", "夸夸我"
+    ]
+
+    # 完整档示例句
+    FULL_EXAMPLES = [
+        "为什么天空是蓝色的", "怎么做红烧肉", "帮我分析一下这两个方案的区别",
+        "给我讲一个关于小兔子的故事", "解释一下光合作用的原理", "帮我制定一个减肥计划",
+        "二十三乘以四十七等于多少", "把这句话翻译成英文", "推荐几本适合孩子看的书",
+        "如果明天下雨我们应该去哪里玩", "写一首关于春天的诗", "总结一下今天聊的内容"
+    ]
+
+    # 向量维度（字符二元组哈希桶数）
+    EMBED_DIM = 512
+    # 每条路由保留的延迟样本数
+    STATS_SIZE = 200
+
+    # 语义特征权重：快速档相似度比完整档高出约 0.15 才能抵消默认的完整档倾向
+    SIMILARITY_WEIGHT = 5.0
+
+    _DIGIT_PATTERN = re.compile(r'[0-9零一二三四五六七八九十百千万]+\s*[+\-*/×÷加减乘除]')
+    _STRIP_PATTERN = re.compile(r'[\s，。！？、,.!?~～…]+')
+
+    def __init__(self, enabled: bool = None, threshold: float = None, max_fast_chars: int = None):
+        """
+        初始化路由器
+
+        Args:
+            enabled: 是否启用路由（关闭时全部走完整档）
+            threshold: 打分阈值，低于阈值走快速档
+            max_fast_chars: 快速档的最大字数
+        """
+        self.enabled = CHAT_ROUTER_ENABLED if enabled is None else enabled
+        self.threshold = CHAT_ROUTER_THRESHOLD if threshold is None else threshold
+        self.max_fast_chars = max_fast_chars or CHAT_ROUTER_MAX_FAST_CHARS
+
+        self.fast_profile = ChatProfile(
+            name="fast", model=CHAT_FAST_MODEL_NAME, max_tokens=CHAT_FAST_MAX_TOKENS,
+            thinking=CHAT_FAST_THINKING, temperature=CHAT_TEMPERATURE
+        )
+        self.full_profile = ChatProfile(
+            name="full", model=CHAT_MODEL_NAME, max_tokens=CHAT_MAX_TOKENS,
+            thinking=CHAT_THINKING, temperature=CHAT_TEMPERATURE
+        )
+
+        self._fast_centroid = self._centroid(self.FAST_EXAMPLES)
+        self._full_centroid = self._centroid(self.FULL_EXAMPLES)
+
+        # 统计信息：路由名 -> 计数 / 延迟样本（秒）
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"fast": 0, "full": 0}
+        self._first_token: Dict[str, Deque[float]] = {
+            name: deque(maxlen=self.STATS_SIZE) for name in self.counts
+        }
+        self._total: Dict[str, Deque[float]] = {
+            name: deque(maxlen=self.STATS_SIZE) for name in self.counts
+        }
+
+    # ==================== 特征 ====================
+
+    def _normalize(self, text: str) -> str:
+        """去掉空白和标点"""
+        return self._STRIP_PATTERN.sub('', text or '')
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        字符二元组哈希向量（L2 归一化）
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            EMBED_DIM 维向量
+        """
+        vector = np.zeros(self.EMBED_DIM, dtype=np.float32)
+        text = self._normalize(text)
+        grams = [text[i:i + 2] for i in range(len(text) - 1)] or [text]
+        for gram in grams:
+            if gram:
+                vector[zlib.crc32(gram.encode('utf-8')) % self.EMBED_DIM] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _centroid(self, examples: List[str]) -> np.ndarray:
+        """示例句向量的归一化均值"""
+        centroid = np.mean([self.embed(text) for text in examples], axis=0)
+        norm = np.linalg.norm(centroid)
+        return centroid / norm if norm else centroid
+
+    def score(self, text: str) -> Tuple[float, str]:
+        """
+        计算复杂度打分（默认 1.0 即完整档，只有快速档的依据才会拉低）
+
+        Returns:
+            (打分, 主要依据)
+        """
+        clean = self._normalize(text)
+        length = len(clean)
+
+        if length > self.max_fast_chars:
+            return 1.0 + length / self.max_fast_chars, f"长度 {length}"
+        if self._DIGIT_PATTERN.search(text):
+            return 1.0, "计算"
+        full_hits = [k for k in self.FULL_KEYWORDS if k in clean]
+        if full_hits:
+            return 1.0, f"关键词 {full_hits[0]}"
+
+        # 长度：越接近上限越倾向完整档
+        score = 1.0 + 0.2 * length / self.max_fast_chars
+        reasons = []
+
+        fast_hits = [k for k in self.FAST_KEYWORDS if k in clean]
+        if fast_hits:
+            score -= 1.0
+            reasons.append(f"关键词 {fast_hits[0]}")
+
+        # 语义：只有比完整档示例更像快速档示例时才倾向快速档
+        vector = self.embed(clean)
+        margin = float(vector @ self._fast_centroid - vector @ self._full_centroid)
+        score -= self.SIMILARITY_WEIGHT * max(0.0, margin)
+        reasons.append(f"相似度差 {margin:+.2f}")
+
+        return score, "，".join(reasons)
+
+    # ==================== 路由与统计 ====================
+
+    def route(self, text: str) -> RouteDecision:
+        """
+        选择本轮对话使用的参数
+
+        Args:
+            text: 用户输入
+
+        Returns:
+            RouteDecision
+        """
+        if not self.enabled:
+            return RouteDecision(self.full_profile, 0.0, "路由未启用")
+
+        score, reason = self.score(text)
+        profile = self.fast_profile if score < self.threshold else self.full_profile
+        with self._lock:
+            self.counts[profile.name] += 1
+        print(f"[Router] {profile.name} ({profile.model}) 打分 {score:.2f}：{reason}")
+        return RouteDecision(profile, score, reason)
+
+    def expected_first_token(self, text: str) -> Optional[float]:
+        """
+        预计本轮的首片段延迟（不计入路由计数）
+
+        Args:
+            text: 用户输入
+
+        Returns:
+            该输入会走的路由最近首片段延迟的中位数（秒），还没有样本时返回 None
+        """
+        name = self.full_profile.name
+        if self.enabled and self.score(text)[0] < self.threshold:
+            name = self.fast_profile.name
+        with self._lock:
+            samples = list(self._first_token[name])
+        return float(np.median(samples)) if samples else None
+
+    def record(self, route: str, first_token: Optional[float], total: Optional[float]):
+        """
+        记录一轮对话的延迟
+
+        Args:
+            route: 路由名（fast / full）
+            first_token: 首片段延迟（秒）
+            total: 总耗时（秒）
+        """
+        with self._lock:
+            if first_token is not None:
+                self._first_token[route].append(first_token)
+            if total is not None:
+                self._total[route].append(total)
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        各路由的计数和延迟中位数/p95（毫秒）
+
+        Returns:
+            {路由名: {"count", "first_token_p50", "first_token_p95", "total_p50", "total_p95"}}
+        """
+        result = {}
+        with self._lock:
+            for name, count in self.counts.items():
+                entry = {"count": count}
+                for key, samples in (("first_token", self._first_token[name]), ("total", self._total[name])):
+                    if samples:
+                        values = np.array(samples) * 1000
+                        entry[f"{key}_p50"] = float(np.percentile(values, 50))
+                        entry[f"{key}_p95"] = float(np.percentile(values, 95))
+                result[name] = entry
+        return result
+
+
+# 全局单例
+_chat_router: Optional[ChatRouter] = None
+
+
+def get_chat_router() -> ChatRouter:
+    """
+    获取对话路由器单例
+
+    Returns:
+        ChatRouter 实例
+    """
+    global _chat_router
+    if _chat_router is None:
+        _chat_router = ChatRouter()
+    return _chat_router
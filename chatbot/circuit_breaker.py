@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+熔断器
+
+功能：
+1. 每个后端服务（Mem0、对话接口）一个熔断器，连续失败达到阈值后熔断（open）
+2. 熔断期间请求直接失败返回（微秒级），不再每轮对话都等满超时
+3. 后台线程定期用轻量健康检查探测熔断的服务，恢复后自动闭合（closed）
+4. 没有探测函数时，熔断一段时间后放行一个试探请求（half_open），成功则闭合
+5. 状态变化打印日志并通知监听者（界面耗时面板显示服务状态）
+
+状态：
+- closed：正常放行，记录连续失败次数
+- open：直接拒绝，等待探测成功或冷却时间结束
+- half_open：只放行一个试探请求，成功闭合、失败重新熔断
+
+说明：
+- 只有超时、连接失败、5xx 算失败；4xx、429 说明服务在线，不计入失败
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from config import (
+    CIRCUIT_BREAKER_ENABLED, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT,
+    CIRCUIT_PROBE_INTERVAL
+)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """熔断期间直接拒绝的请求（是 ConnectionError 的子类，已有的异常处理无需修改）"""
+
+
+class CircuitBreaker:
+    """
+    单个后端服务的熔断器
+
+    使用示例:
+        breaker = get_circuit_breaker("mem0", probe=client.probe)
+        if not breaker.allow():
+            return None  # 熔断中，直接失败
+        try:
+            result = send()
+            breaker.record_success()
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # 界面显示的状态名
+    STATE_NAMES = {CLOSED: "正常", OPEN: "熔断", HALF_OPEN: "试探"}
+
+    def __init__(self, name: str, probe: Optional[Callable[[], bool]] = None,
+                 failure_threshold: int = None, reset_timeout: float = None, enabled: bool = None):
+        """
+        初始化熔断器
+
+        Args:
+            name: 服务名（日志和界面显示）
+            probe: 健康检查函数，返回服务是否可用（不经过熔断器）
+            failure_threshold: 连续失败多少次后熔断
+            reset_timeout: 熔断多久（秒）后放行一个试探请求
+            enabled: 是否启用熔断
+        """
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = CIRCUIT_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.enabled = CIRCUIT_BREAKER_ENABLED if enabled is None else enabled
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[["CircuitBreaker"], None]] = []
+
+        # 统计信息
+        self.rejected = 0  # 熔断期间直接拒绝的请求数
+        self.trips = 0     # 熔断次数
+
+    @property
+    def state_name(self) -> str:
+        """当前状态的中文名"""
+        return self.STATE_NAMES[self.state]
+
+    def add_listener(self, listener: Callable[["CircuitBreaker"], None]):
+        """注册状态变化回调（在触发变化的线程中调用）"""
+        self._listeners.append(listener)
+
+    def allow(self) -> bool:
+        """
+        请求是否放行
+
+        Returns:
+            bool: False 表示熔断中，调用方应直接失败返回
+        """
+        if not self.enabled or self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if self.state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """请求成功（服务在线）"""
+        if self.state == self.CLOSED and not self._failures:
+            return
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        """请求失败（超时、连接失败、5xx）"""
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.time()
+                if self.state == self.CLOSED:
+                    self.trips += 1
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        """切换状态并通知监听者（调用方持有锁）"""
+        if state == self.state:
+            return
+        self.state = state
+        if state == self.OPEN:
+            print(f"[Circuit] {self.name} 熔断：连续失败 {self._failures} 次，后续请求直接失败")
+        elif state == self.CLOSED:
+            print(f"[Circuit] {self.name} 恢复正常")
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"[Circuit] 状态回调异常: {e}")
+
+    def check(self) -> bool:
+        """
+        熔断时执行一次健康检查，成功则闭合
+
+        Returns:
+            bool: 服务是否可用
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.probe is None:
+            return False
+        try:
+            ok = bool(self.probe())
+        except Exception:
+            ok = False
+        if ok:
+            self.record_success()
+        return ok
+
+    def stats(self) -> Dict[str, object]:
+        """熔断统计"""
+        return {"state": self.state, "trips": self.trips, "rejected": self.rejected}
+
+
+class CircuitMonitor:
+    """后台健康探测：定期探测所有处于熔断状态的服务"""
+
+    def __init__(self, interval: float = None):
+        """
+        Args:
+            interval: 探测间隔（秒）
+        """
+        self.interval = interval or CIRCUIT_PROBE_INTERVAL
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, name: str, probe: Optional[Callable[[], bool]] = None) -> CircuitBreaker:
+        """取服务的熔断器（不存在时创建），并确保后台探测线程已启动"""
+        with self._lock:
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, probe=probe)
+                self.breakers[name] = breaker
+            elif probe is not None and breaker.probe is None:
+                breaker.probe = probe
+            if breaker.enabled and not (self._thread and self._thread.is_alive()):
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, daemon=True, name="circuit-probe")
+                self._thread.start()
+            return breaker
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            for breaker in list(self.breakers.values()):
+                if breaker.state != CircuitBreaker.CLOSED:
+                    breaker.check()
+
+    def stop(self):
+        """停止后台探测线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """所有熔断器的统计"""
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+
+# 全局单例
+_circuit_monitor: Optional[CircuitMonitor] = None
+
+
+def get_circuit_monitor() -> CircuitMonitor:
+    """
+    获取熔断探测器单例
+
+    Returns:
+        CircuitMonitor 实例
+    """
+    global _circuit_monitor
+    if _circuit_monitor is None:
+        _circuit_monitor = CircuitMonitor()
+    return _circuit_monitor
+
+
+def get_circuit_breaker(name: str, probe: Optional[Callable[[], bool]] = None) -> CircuitBreaker:
+    """
+    获取服务的熔断器（同名共用一个）
+
+    Args:
+        name: 服务名
+        probe: 健康检查函数（第一次提供时生效）
+
+    Returns:
+        CircuitBreaker 实例
+    """
+    return get_circuit_monitor().get(name, probe)
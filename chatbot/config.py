@@ -24,6 +24,9 @@ except ImportError:
         "2. 在 api_secrets.py 中填入真实的 API 密钥"
     )
 
+# 运行时数据目录（合成音频缓存、记忆镜像、写入队列、迁移日志等，不放在源码目录里）
+DATA_DIR = os.path.expanduser("~/.xiaoyuan_chatbot")
+
 # ==================== 豆包语音识别配置 ====================
 # 语音识别 WebSocket 接口地址
 # bigmodel: 双向流式模式（需要1.0资源ID: volc.bigasr.sauc.duration）
@@ -38,11 +41,22 @@ AUDIO_RATE = 16000  # 16kHz 采样率
 # 双向流式模式推荐单包 200ms（文档建议100-200ms，200ms性能最优）
 AUDIO_CHUNK = 3200  # 200ms/帧 (16000 * 0.2 = 3200 samples)
 
-# 静音检测配置
-SILENCE_THRESHOLD = 1000  # 静音振幅阈值（低于此值视为静音，建议 500-1500）
-SILENCE_TIMEOUT = 1.5  # 静音超时时间（秒），超过此时间自动结束录音
+# 录音环形缓冲区配置（固定容量，内存占用不随录音时长增长，见 audio_ring.py）
+AUDIO_RING_SECONDS = 30  # 缓冲区保留的最长音频（秒），超长录音只丢弃最早的部分
+AUDIO_PREROLL_MS = 500  # 按下按钮前保留的音频（毫秒），大于 0 时麦克风常开，0 表示按下才开麦
+
+# 静音检测配置（VAD：自适应噪声基底 + 拖尾平滑，见 vad.py）
+VAD_MIN_RMS = 300  # RMS 阈值下限（安静环境下的语音判定阈值，建议 200-500）
+VAD_NOISE_RATIO = 3.0  # 语音判定阈值 = 背景噪声 RMS × 此倍数（嘈杂环境下自动抬高阈值）
+VAD_HANGOVER = 0.2  # 拖尾时长（秒），语音帧之后仍视为有声，避免字间停顿打断
+VAD_MIN_SPEECH = 0.2  # 连续语音超过此时长（秒）才开始静音计时，过滤咳嗽、敲击等杂音
+SILENCE_TIMEOUT = 1.0  # 静音超时时间（秒，不含拖尾），超过此时间自动结束录音
 FINAL_WAIT_TIMEOUT = 1.5  # 发送最后一包后等待最终结果的超时时间（秒）
 
+# ASR 连接池配置（预热 WebSocket 连接，省去每次录音的 DNS/TLS/鉴权握手）
+ASR_POOL_SIZE = 1  # 保持的预热连接数（建议 1-2，0 表示关闭预热）
+ASR_POOL_MAX_IDLE = 30  # 预热连接最长空闲时间（秒），超过后主动替换为新连接
+
 
 # ==================== Doubao-Seed-1.6 对话模型配置 ====================
 # 对话模型接口地址
@@ -57,6 +71,72 @@ CHAT_TEMPERATURE = 0.2  # 随机性 (0-1)，降低以加速生成
 CHAT_STREAM = True  # 开启流式返回（关键优化项）
 CHAT_THINKING = "disabled"  # 关闭深度思考模式，直接返回结果（提速核心）
 
+# 快慢路由（本地判断简单闲聊走快速档，需要推理/生成的问题走上面的完整档，见 chat_router.py）
+CHAT_ROUTER_ENABLED = True
+CHAT_FAST_MODEL_NAME = "doubao-seed-1-6-flash-250828"  # 快速档模型
+CHAT_FAST_MAX_TOKENS = 128  # 快速档最大生成 tokens 数
+CHAT_FAST_THINKING = "disabled"  # 快速档关闭深度思考
+CHAT_ROUTER_MAX_FAST_CHARS = 30  # 超过这个字数直接走完整档
+CHAT_ROUTER_THRESHOLD = 0.3  # 复杂度打分阈值，低于阈值走快速档
+
+# 对话接口长连接（进程内共用连接池，启动时预热，省去每轮对话的 TCP/TLS 握手，见 chat_http_client.py）
+CHAT_HTTP_POOL_SIZE = 2  # 连接池大小（主对话 + 推测式对话并发）
+CHAT_HTTP_KEEPALIVE_INTERVAL = 20  # 空闲多久（秒）后发送一次保活请求，0 表示不保活
+
+# 对冲请求（超过预算时间还没收到首片段时再发一个相同的请求，先到先用，见 chat_hedge.py）
+CHAT_HEDGE_ENABLED = False  # 是否启用（会增加调用次数和费用）
+CHAT_HEDGE_PERCENTILE = 95  # 预算时间取最近首片段延迟的第几百分位
+CHAT_HEDGE_DEFAULT_DELAY_MS = 1500  # 样本不足时的预算时间（毫秒）
+CHAT_HEDGE_MIN_DELAY_MS = 800  # 预算时间下限（毫秒）
+CHAT_HEDGE_MAX_DELAY_MS = 3000  # 预算时间上限（毫秒）
+CHAT_HEDGE_MAX_PER_MINUTE = 3  # 每分钟最多对冲次数
+CHAT_HEDGE_MAX_RATIO = 0.1  # 对冲次数占总请求数的最大比例
+
+# 推测式对话（识别中间结果稳定一段时间后提前调用对话模型，最终结果一致则直接采用）
+SPECULATIVE_CHAT_ENABLED = True
+SPECULATIVE_STABLE_MS = 300      # 中间结果保持不变多久（毫秒）后发起推测请求
+SPECULATIVE_MAX_PER_TURN = 3     # 每轮最多发起的推测请求数（控制调用成本）
+
+# 本地答案缓存（相同或相近的问题直接播放上次的回复和合成好的音频，跳过对话模型和语音合成，见 answer_cache.py）
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_ENTRIES = 100  # 最多缓存的问答条数（超过时淘汰最久未使用的）
+ANSWER_CACHE_TTL_HOURS = 24  # 缓存有效期（小时）
+ANSWER_CACHE_SIMILARITY = 0.85  # 问题向量余弦相似度阈值，达到才进一步逐字比对
+# 相近问题只允许在这些语气词、客套词上不同（数字、人名地名、目标语言等任何实词不同都不算命中）
+ANSWER_CACHE_IGNORABLE_CHARS = "呀啊吧呢嘛哦哇啦呗么哈嗯呃诶请"
+ANSWER_CACHE_MAX_CHARS = 30  # 超过这个字数的问题不缓存
+ANSWER_CACHE_MAX_AUDIO_SECONDS = 20  # 超过这个时长的回复不缓存音频
+# 时效性问题和依赖上下文的问题不缓存（缓存键不含对话历史，只缓存不看上下文也能回答的问题）
+ANSWER_CACHE_EXCLUDE_KEYWORDS = [
+    # 日期、时间、天气等
+    "今天", "明天", "昨天", "后天", "现在", "几号", "几点", "日期", "时间", "星期", "礼拜", "周几",
+    "天气", "温度", "下雨", "新闻", "最近", "刚才", "刚刚", "上次", "记得", "看到",
+    # 接着上文追问（"再见"可以缓存，不用单独的"再"）
+    "然后", "接着", "继续", "后来", "还有呢", "再讲", "再说", "再来", "再给", "再一",
+    # 指代上文的代词
+    "他", "她", "它", "这", "那", "上面", "前面"
+]
+# 整句只是追问、没有具体内容的问题不缓存（归一化后与这些完全相同，如"为什么呀"）
+ANSWER_CACHE_FOLLOWUP_QUESTIONS = [
+    "为什么", "为啥", "什么意思", "啥意思", "是吗", "真的吗", "对吗", "怎么说", "怎么了", "你呢", "然后呢"
+]
+
+# 对话上下文预算（按优先级装入系统提示词、记忆、历史摘要、最近对话，见 context_builder.py）
+CONTEXT_TOKEN_BUDGET = 1200  # 整个请求（不含回复）的 token 上限，提示词越长首字越慢
+CONTEXT_MEMORY_TOKENS = 300  # 记忆上下文的 token 上限（按相关度截掉多余的记忆）
+CONTEXT_HISTORY_TOKENS = 800  # 保留在历史中的对话 token 上限，超出的早期对话移入滚动摘要
+CONTEXT_SUMMARY_ENABLED = True  # 是否在后台把移出的对话合并成摘要（使用快速档模型）
+CONTEXT_SUMMARY_MAX_TOKENS = 150  # 摘要长度上限（tokens）
+CONTEXT_SUMMARY_PROMPT = """请把下面的对话合并进已有的对话摘要，输出新的摘要。
+
+已有摘要：
+{synopsis}
+
+新增对话：
+{dialogue}
+
+要求：保留话题、用户提到的事实和偏好、尚未完成的约定；省略寒暄；不超过 {max_tokens} 字；只输出摘要本身。"""
+
 
 # ==================== Base64图文分析配置 ====================
 # 图文分析使用同一个模型（Doubao-Seed-1.6），通过Base64编码+提示词实现
@@ -173,6 +253,77 @@ TTS_SPEECH_RATE = 0
 # 音量 (loudness_rate) 取值范围[-50,100]，100代表2.0倍音量，-50代表0.5倍音量，0为默认
 TTS_LOUDNESS_RATE = 0
 
+# 流式播放（StreamingTTSWorker 请求 PCM，写入常开的连续输出流，句与句之间没有解码和轮询间隙，见 pcm_player.py）
+TTS_STREAM_FORMAT = "pcm"  # 流式合成的音频格式（输出流只接受 16-bit PCM）
+TTS_PLAYBACK_FRAME_MS = 20  # 输出回调每次取的音频时长（毫秒），越小出声越早、回调越频繁
+TTS_PLAYBACK_BUFFER_SECONDS = 30  # 待播放缓冲区容量（秒），写满时合成线程等待播放
+TTS_JITTER_BUFFER_MS = 60  # 抖动缓冲（毫秒）：收到第一帧后攒够这么多音频才开始出声，避免网络抖动造成断续
+# 合成窗口：同一会话中已发送、还没合成完的句子数上限（服务端每合成完一句再发下一句）
+# 播放中的句子和下一句始终在合成，出声不受影响；被打断时还没发送的句子不会被合成和计费
+TTS_MAX_INFLIGHT_SENTENCES = 2
+TTS_INFLIGHT_WAIT_SECONDS = 5  # 等不到服务端句子结束事件时，最多等这么久就直接发送下一句
+# 合成文本切分（text_segmenter.py）：第一段尽早切出，后续分段逐渐变长
+TTS_SEGMENT_FIRST_MIN_CHARS = 2   # 第一段遇到逗号时的最小字数
+TTS_SEGMENT_FIRST_MAX_CHARS = 8   # 第一段一直没有标点时，攒够这么多字就在词边界切分
+TTS_SEGMENT_FIRST_WAIT_MS = 400   # 模型出字快时第一段最多多等这么久的文本（按实测到达速度换算成字数）
+TTS_SEGMENT_MIN_CHARS = 10        # 第二段遇到逗号时的最小字数，之后逐段递增
+TTS_SEGMENT_GROWTH = 1.5          # 逐段递增倍数
+TTS_SEGMENT_MAX_CHARS = 60        # 任一段没有标点时强制切分的字数
+TTS_SPEECH_CHARS_PER_SECOND = 4.5  # 播报速度（字/秒），文本到达比这慢时后续分段不再变长
+
+# 合成音频磁盘缓存（固定提示语、注册引导、错误提示等短句合成一次后缓存，再次播报直接读文件，不再请求合成接口）
+# 缓存键是文本、音色、格式、采样率、语速、音量的哈希，任一参数变化都会重新合成
+TTS_CACHE_ENABLED = True
+TTS_CACHE_DIR = os.path.join(DATA_DIR, "tts_cache")  # 缓存文件目录
+TTS_CACHE_MAX_MB = 50  # 缓存目录大小上限（MB），超过时淘汰最久未使用的文件
+TTS_CACHE_MAX_CHARS = 60  # 超过这个字数的文本不缓存（对话回复很少重复）
+
+# 本地拼接播报（人脸、声纹、本地识别等模板回复）
+# 固定片段启动时预合成，名字在注册时合成，播报时把各片段的 PCM 裁掉首尾静音后交叉淡化拼接，不请求合成接口
+# 片段音频存放在合成音频缓存（TTS_CACHE_DIR）中；缺少片段时本次整句在线合成，同时后台补合成缺少的片段
+PHRASE_BANK_ENABLED = True
+PHRASE_BANK_CROSSFADE_MS = 15  # 相邻片段交叉淡化时长（毫秒）
+PHRASE_BANK_SILENCE_LEVEL = 300  # 裁剪首尾静音的幅度阈值（16-bit 采样绝对值）
+PHRASE_BANK_PAUSE_MS = {  # 片段末尾标点对应的停顿（毫秒）
+    "，": 150, ",": 150, "、": 120,
+    "：": 200, ":": 200, "；": 250, ";": 250,
+    "。": 350, "！": 350, "？": 350, "!": 350, "?": 350,
+}
+# 启动时预合成的片段（模板回复的固定部分，以及整句播报的固定提示语）
+PHRASE_BANK_FRAGMENTS = [
+    # 声纹识别
+    "这是", "的声音", "，相似度", "我不认识这个人的声音", "我不认识这个人", "，最高相似度只有",
+    "好的，请让他说几句话，我来听听是谁",
+    "没有录到声音，请让他再说一次",
+    "没有提取到有效声纹，可能是声音太短或太小，请让他再说长一点",
+    "声纹识别出现问题，请重试",
+    # 人脸注册 / 识别
+    "好的，请问这位叫什么名字？", "好的，我已经记住", "了",
+    "未检测到人脸，请确保脸部清晰可见", "没有听清名字，请再说一次",
+    "我还没有记住任何人，需要先让我记住一些人", "照片中是",
+    # 本地识别（看）
+    "我看到了：", "人物：", "物体：", "没有识别到明显的人脸或物体",
+    "我看到一个人，但我不认识。请问他是谁？", "我看到", "但我都不认识。请问他们是谁？",
+    # 声纹注册
+    "好的，", "，我记住你了！", "对了，我还不知道你的名字，请问怎么称呼你？",
+    "抱歉，我没有听清你的名字，下次再告诉我吧。",
+]
+
+# 思考垫音：识别完成后预计要等较久才能出声时，先从本地 PCM 播一句简短的应答（"嗯"、"让我想想"）
+# 第一帧真正的合成音频写入输出流时，垫音剩余部分淡出截断；短语音频由本地拼接播报（PHRASE_BANK）预合成，
+# 还没合成好时播放本地生成的提示音
+FILLER_ENABLED = True
+FILLER_MIN_EXPECTED_MS = 700  # 预计静默时长（首字延迟 + 首句合成）低于这个值时不播垫音
+FILLER_LONG_EXPECTED_MS = 1800  # 预计静默时长超过这个值时用较长的垫音
+FILLER_DEFAULT_FIRST_TOKEN_MS = 900  # 还没有首字延迟统计时的默认估计
+FILLER_TTS_OVERHEAD_MS = 300  # 首字到首句音频的合成耗时估计
+FILLER_FADE_MS = 30  # 截断垫音时的淡出时长（毫秒）
+FILLER_PHRASES = {  # 垫音短语（同类多句轮流使用）
+    "chat": ["嗯", "嗯嗯"],              # 闲聊、陈述
+    "question": ["嗯，我想想", "我想一下"],  # 提问
+    "long": ["嗯，让我好好想一想"],       # 预计等待较久（完整档、长问题）
+}
+
 
 # ==================== 界面配置 ====================
 # 窗口标题
@@ -210,6 +361,17 @@ MEM0_SEARCH_TOP_K = 5
 # 记忆搜索相似度阈值（0-1，低于此值的记忆不使用）
 MEM0_SIMILARITY_THRESHOLD = 0.5
 
+# 记忆预取（用识别中间结果在后台提前搜索记忆，识别完成后最多再等 MEM0_DEADLINE_MS，见 memory_prefetch.py）
+MEM0_DEADLINE_MS = 150  # 识别完成后等待记忆的截止时间（毫秒），超时不带记忆继续对话
+MEM0_PREFETCH_MIN_COVERAGE = 0.6  # 预取查询是最终文本的前缀且至少占这么多比例时直接复用
+MEM0_PREFETCH_WORKERS = 2  # 后台搜索线程数
+
+# 本地记忆镜像（每个用户的记忆连同向量存一份在本地，检索不走网络，见 memory_mirror.py）
+MEM0_MIRROR_ENABLED = True
+MEM0_MIRROR_DIR = os.path.join(DATA_DIR, "memory_mirror")  # 镜像文件目录
+MEM0_MIRROR_SYNC_INTERVAL = 300  # 距上次同步超过多少秒时在后台重新同步
+MEM0_MIRROR_MIN_SCORE = 0.2  # 本地检索的最低余弦相似度（字符二元组向量，尺度与服务端分数不同）
+
 # 记忆注入到对话的提示词模板
 # {memories}: 搜索到的相关记忆，每条一行
 # {user_name}: 当前用户名（如已识别）
@@ -229,9 +391,28 @@ MEM0_EXTRACTION_PROMPT = """请从以下对话中提取需要长期记忆的关
 3. 重要事实（如：生日、职业、住址等）
 4. 用户明确要求记住的内容
 
-对话内容：
-用户：{user_message}
-助手：{assistant_message}
+对话内容（可能包含多轮）：
+{dialogue}
 
 请以简洁的陈述句形式输出需要记忆的内容，每条一行。如果没有需要记忆的内容，输出"无"。
 只输出提取的信息，不要有任何解释。"""
+
+# 后台记忆写入（每轮对话只追加到磁盘队列，后台攒几轮合并提取和存储，失败退避重试，见 memory_writer.py）
+MEM0_WRITER_QUEUE_PATH = os.path.join(DATA_DIR, "memory_queue.jsonl")  # 磁盘队列文件
+MEM0_WRITER_BATCH_TURNS = 3  # 攒够几轮对话合并提取一次
+MEM0_WRITER_MAX_DELAY = 60  # 最早一轮对话最多等待多少秒（不足几轮也写入）
+MEM0_WRITER_RETRY_BASE = 2  # 失败重试初始间隔（秒），每次失败翻倍
+MEM0_WRITER_RETRY_MAX = 120  # 重试间隔上限（秒）
+
+# 记忆迁移（临时用户注册后迁移到正式用户：分批并发写入、并发删除，中断后可继续，见 memory_migration.py）
+MEM0_MIGRATION_JOURNAL_PATH = os.path.join(DATA_DIR, "memory_migrations.json")  # 迁移日志文件
+MEM0_MIGRATION_BATCH_SIZE = 10  # 每次 add_memory 合并的记忆条数
+MEM0_MIGRATION_WORKERS = 4  # 并发请求数上限
+
+# ==================== 熔断配置 ====================
+# Mem0 和对话接口各一个熔断器：连续失败后熔断，请求直接失败；后台定期健康探测，恢复后自动闭合（见 circuit_breaker.py）
+CIRCUIT_BREAKER_ENABLED = True
+CIRCUIT_FAILURE_THRESHOLD = 2  # 连续失败多少次后熔断（超时、连接失败、5xx）
+CIRCUIT_RESET_TIMEOUT = 30  # 熔断多久（秒）后放行一个试探请求
+CIRCUIT_PROBE_INTERVAL = 5  # 熔断期间健康探测间隔（秒）
+CIRCUIT_PROBE_TIMEOUT = 2  # 健康探测超时（秒）
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+对话上下文构建
+
+功能：
+1. 本地估算 token 数（带缓存），每条消息只计算一次，历史变化时增量累加
+2. 按优先级把系统提示词、当前问题、记忆、历史摘要、最近对话装进固定的 token 预算
+3. 历史超出预算时，最早的几轮从历史中移出，后台调用快速档模型合并进滚动摘要
+4. 记忆条数按单独的记忆预算截断（记忆按相关度排序，截掉最不相关的）
+
+优先级（从高到低）：
+- 系统提示词、当前问题：必带
+- 记忆：不超过 CONTEXT_MEMORY_TOKENS
+- 历史摘要：预算内才带
+- 最近对话：从新到旧按整轮装入，装不下为止
+
+说明：
+- 首 token 延迟随提示词长度增长，限制总长度能让首字时间稳定
+- 豆包分词器不在本地，这里按字符类别估算：汉字约 1 token，英文/数字每 4 个字符约 1 token，
+  标点 1 token，每条消息另加固定开销；估算偏保守（宁可多算）
+- 摘要在后台线程生成，当轮不等待；生成完成前被移出的对话暂时不在上下文中
+"""
+
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from config import (
+    CONTEXT_TOKEN_BUDGET, CONTEXT_MEMORY_TOKENS, CONTEXT_HISTORY_TOKENS,
+    CONTEXT_SUMMARY_ENABLED, CONTEXT_SUMMARY_MAX_TOKENS, CONTEXT_SUMMARY_PROMPT,
+    CHAT_API_URL, CHAT_API_KEY, CHAT_FAST_MODEL_NAME
+)
+from chat_http_client import get_chat_http_client
+
+
+# 每条消息的固定开销（角色、分隔符）
+MESSAGE_OVERHEAD = 4
+
+# 汉字（含日韩文字和全角字符）、英文数字串、其余非空白字符
+_TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]|[A-Za-z0-9]+|\S')
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """
+    估算文本的 token 数（结果按文本缓存）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text or ""):
+        tokens += (len(piece) + 3) // 4 if piece[0].isascii() and piece[0].isalnum() else 1
+    return tokens
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """单条消息的 token 数（含固定开销）"""
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+class ContextBuilder:
+    """
+    对话上下文构建器
+
+    使用示例:
+        builder = get_context_builder()
+        memories = builder.fit_memories(memory_texts)          # 截断记忆
+        messages = builder.build(user_input, history, memory_context)
+        history = builder.compact(history)                     # 每轮结束后压缩历史
+    """
+
+    # 摘要请求超时（秒）
+    SUMMARY_TIMEOUT = 15
+
+    def __init__(self, budget: int = None, memory_tokens: int = None,
+                 history_tokens: int = None, summary_enabled: bool = None):
+        """
+        初始化构建器
+
+        Args:
+            budget: 整个请求（不含回复）的 token 预算
+            memory_tokens: 记忆上下文的 token 上限
+            history_tokens: 保留在历史中的对话 token 上限，超出部分移入摘要
+            summary_enabled: 是否生成滚动摘要（关闭时移出的对话直接丢弃）
+        """
+        self.budget = budget or CONTEXT_TOKEN_BUDGET
+        self.memory_tokens = memory_tokens or CONTEXT_MEMORY_TOKENS
+        self.history_tokens = history_tokens or CONTEXT_HISTORY_TOKENS
+        self.summary_enabled = CONTEXT_SUMMARY_ENABLED if summary_enabled is None else summary_enabled
+
+        self.synopsis = ""  # 被移出历史的早期对话的滚动摘要
+        self._pending: List[Dict[str, str]] = []  # 已移出历史、尚未合并进摘要的消息
+        self._summarizing = False
+        self._generation = 0  # reset() 后丢弃进行中的摘要结果
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+
+        # 统计信息
+        self.builds = 0      # 构建次数
+        self.dropped = 0     # 因预算不足没有带上的历史消息数
+        self.summaries = 0   # 生成摘要次数
+
+    # ==================== 记忆 ====================
+
+    def fit_memories(self, memories: List[str]) -> List[str]:
+        """
+        按记忆预算截断记忆（调用方按相关度降序传入）
+
+        Args:
+            memories: 记忆文本列表
+
+        Returns:
+            预算内的记忆
+        """
+        kept, used = [], 0
+        for memory in memories:
+            tokens = count_tokens(memory) + 2
+            if used + tokens > self.memory_tokens:
+                break
+            kept.append(memory)
+            used += tokens
+        if len(kept) < len(memories):
+            print(f"[Context] 记忆超出预算，保留 {len(kept)}/{len(memories)} 条（{used} tokens）")
+        return kept
+
+    # ==================== 构建 ====================
+
+    def build(self, user_input: str, history: List[Dict[str, str]],
+              memory_context: Optional[str] = None,
+              system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        按优先级在预算内组装消息列表
+
+        Args:
+            user_input: 当前用户输入
+            history: 对话历史（按时间顺序）
+            memory_context: 记忆上下文（已按记忆预算截断）
+            system_prompt: 系统提示词
+
+        Returns:
+            messages 列表
+        """
+        head: List[Dict[str, str]] = []
+        if system_prompt:
+            head.append({"role": "system", "content": system_prompt})
+        if memory_context:
+            head.append({"role": "system", "content": memory_context})
+        current = {"role": "user", "content": user_input}
+
+        used = sum(message_tokens(m) for m in head) + message_tokens(current)
+        with_synopsis = False
+        if self.synopsis:
+            synopsis_message = {"role": "system", "content": f"之前的对话摘要：{self.synopsis}"}
+            tokens = message_tokens(synopsis_message)
+            if used + tokens <= self.budget:
+                head.append(synopsis_message)
+                used += tokens
+                with_synopsis = True
+
+        # 从新到旧按整轮（用户 + 助手）装入最近对话
+        recent: List[Dict[str, str]] = []
+        index = len(history)
+        while index > 0:
+            start = index - 2 if index >= 2 and history[index - 2]["role"] == "user" else index - 1
+            turn = history[start:index]
+            tokens = sum(message_tokens(m) for m in turn)
+            if used + tokens > self.budget:
+                break
+            recent[:0] = turn
+            used += tokens
+            index = start
+
+        self.builds += 1
+        self.dropped += index
+        print(f"[Context] 上下文 {used}/{self.budget} tokens（历史 {len(recent)}/{len(history)} 条"
+              f"{'，含摘要' if with_synopsis else ''}）")
+        return head + recent + [current]
+
+    # ==================== 历史压缩 ====================
+
+    def compact(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        超出历史预算时把最早的几轮移出历史，后台合并进滚动摘要
+
+        Args:
+            history: 对话历史（按时间顺序）
+
+        Returns:
+            压缩后的历史（新列表）
+        """
+        total = sum(message_tokens(m) for m in history)
+        cut = 0
+        # 按整轮移出，至少保留最近一轮
+        while total > self.history_tokens and len(history) - cut > 2:
+            step = 2 if history[cut]["role"] == "user" and history[cut + 1]["role"] == "assistant" else 1
+            total -= sum(message_tokens(m) for m in history[cut:cut + step])
+            cut += step
+        if not cut:
+            return history
+
+        removed, kept = history[:cut], history[cut:]
+        if self.summary_enabled:
+            with self._lock:
+                self._pending.extend(removed)
+                if not self._summarizing:
+                    self._summarizing = True
+                    self.executor.submit(self._summarize)
+        return kept
+
+    def _summarize(self):
+        """把已移出历史的消息合并进滚动摘要（后台线程）"""
+        try:
+            while True:
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                    generation = self._generation
+                    if not pending:
+                        return
+                synopsis = self._request_summary(self.synopsis, pending)
+                with self._lock:
+                    if generation != self._generation:
+                        continue
+                    if synopsis is None:
+                        # 失败时放回，下次压缩时再试
+                        self._pending[:0] = pending
+                        return
+                    self.synopsis = synopsis
+                self.summaries += 1
+                print(f"[Context] 更新对话摘要（{count_tokens(synopsis)} tokens）: {synopsis[:40]}...")
+        finally:
+            with self._lock:
+                self._summarizing = False
+
+    def _request_summary(self, synopsis: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """调用快速档模型生成新的摘要，失败返回 None"""
+        dialogue = "\n".join(
+            f"{'用户' if m['role'] == 'user' else '助手'}：{m['content']}" for m in messages
+        )
+        data = {
+            "model": CHAT_FAST_MODEL_NAME,
+            "messages": [{"role": "user", "content": CONTEXT_SUMMARY_PROMPT.format(
+                synopsis=synopsis or "无", dialogue=dialogue, max_tokens=CONTEXT_SUMMARY_MAX_TOKENS
+            )}],
+            "max_completion_tokens": CONTEXT_SUMMARY_MAX_TOKENS * 2,
+            "temperature": 0.1,
+            "stream": False,
+            "thinking": {"type": "disabled"}
+        }
+        headers = {
+            "Authorization": f"Bearer {CHAT_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        try:
+            response = get_chat_http_client().post(
+                CHAT_API_URL,
+                headers=headers,
+                data=json.dumps(data),
+                timeout=self.SUMMARY_TIMEOUT
+            )
+            if response.status_code != 200:
+                print(f"[Context] 生成对话摘要失败: HTTP {response.status_code}")
+                return None
+            result = response.json()
+            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+            return content.strip() or None
+        except Exception as e:
+            print(f"[Context] 生成对话摘要失败: {e}")
+            return None
+
+    def reset(self):
+        """清空摘要（切换用户或清空对话时调用）"""
+        with self._lock:
+            self.synopsis = ""
+            self._pending = []
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """构建统计"""
+        return {
+            "builds": self.builds,
+            "dropped": self.dropped,
+            "summaries": self.summaries,
+            "synopsis_tokens": count_tokens(self.synopsis)
+        }
+
+    def shutdown(self):
+        """停止后台摘要线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局单例
+_context_builder: Optional[ContextBuilder] = None
+
+
+def get_context_builder() -> ContextBuilder:
+    """
+    获取上下文构建器单例
+
+    Returns:
+        ContextBuilder 实例
+    """
+    global _context_builder
+    if _context_builder is None:
+        _context_builder = ContextBuilder()
+    return _context_builder
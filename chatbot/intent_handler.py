@@ -207,6 +207,26 @@ class IntentHandler:
                 return keyword
         return None
 
+    def match_intent(self, text: str) -> IntentType:
+        """
+        仅按关键词判断意图类型，不执行拍照、识别等动作
+
+        用于识别过程中对中间结果做预判（如推测式提前调用对话模型）
+
+        Args:
+            text: 待判断文本
+
+        Returns:
+            匹配到的意图类型，未匹配返回 IntentType.DEFAULT
+        """
+        if not text or not text.strip():
+            return IntentType.DEFAULT
+
+        for rule in self.rules:
+            if self._match_keywords(text, rule.keywords):
+                return rule.intent_type
+        return IntentType.DEFAULT
+
     def process(self, text: str) -> IntentResult:
         """
         处理用户输入，判断意图
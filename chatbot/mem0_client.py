@@ -16,8 +16,10 @@ from config import (
     MEM0_BASE_URL,
     MEM0_API_TIMEOUT,
     MEM0_ENABLED,
-    MEM0_SEARCH_TOP_K
+    MEM0_SEARCH_TOP_K,
+    CIRCUIT_PROBE_TIMEOUT
 )
+from circuit_breaker import get_circuit_breaker
 
 
 @dataclass
@@ -62,6 +64,8 @@ class Mem0Client:
         self.base_url = (base_url or MEM0_BASE_URL).rstrip('/')
         self.timeout = timeout or MEM0_API_TIMEOUT
         self.enabled = MEM0_ENABLED
+        # 服务不可用时熔断，请求直接失败，不再每次等满超时
+        self.breaker = get_circuit_breaker("Mem0", probe=self.probe)
 
     def _request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
         """
@@ -78,6 +82,8 @@ class Mem0Client:
         if not self.enabled:
             print("[Mem0] 服务未启用")
             return None
+        if not self.breaker.allow():
+            return None
 
         url = f"{self.base_url}{endpoint}"
         kwargs.setdefault('timeout', self.timeout)
@@ -85,12 +91,18 @@ class Mem0Client:
 
         try:
             response = requests.request(method, url, **kwargs)
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
             response.raise_for_status()
             return response.json() if response.text else {}
         except requests.exceptions.Timeout:
+            self.breaker.record_failure()
             print(f"[Mem0] 请求超时: {endpoint}")
             return None
         except requests.exceptions.ConnectionError:
+            self.breaker.record_failure()
             print(f"[Mem0] 连接失败: {self.base_url}")
             return None
         except requests.exceptions.HTTPError as e:
@@ -110,11 +122,26 @@ class Mem0Client:
         result = self._request('GET', '/health')
         return result is not None
 
+    def probe(self) -> bool:
+        """
+        熔断期间的健康探测（不经过熔断器，使用较短的超时）
+
+        Returns:
+            服务是否可用
+        """
+        try:
+            response = requests.get(f"{self.base_url}/health", timeout=CIRCUIT_PROBE_TIMEOUT)
+            response.close()
+            return response.status_code < 500
+        except requests.exceptions.RequestException:
+            return False
+
     def add_memory(
         self,
         user_id: str,
         messages: List[Dict[str, str]],
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        infer: bool = True
     ) -> Optional[Dict]:
         """
         添加记忆
@@ -123,6 +150,7 @@ class Mem0Client:
             user_id: 用户 ID
             messages: 对话消息列表，格式: [{"role": "user/assistant", "content": "..."}]
             metadata: 可选的元数据
+            infer: 是否由 Mem0 的模型提取、合并记忆；False 时每条消息原样存为一条记忆
 
         Returns:
             添加结果
@@ -133,6 +161,8 @@ class Mem0Client:
         }
         if metadata:
             payload["metadata"] = metadata
+        if not infer:
+            payload["infer"] = False
 
         result = self._request('POST', '/api/v1/memories/add', json=payload)
         if result:
@@ -259,7 +289,8 @@ class Mem0Client:
         """
         迁移用户记忆（用于临时用户确认身份后）
 
-        注意：Mem0 API 可能不直接支持迁移，这里通过删除+重新添加实现
+        注意：Mem0 API 不直接支持迁移，这里通过重新添加+删除实现；
+        分批并发写入、并发删除，中断后重新调用会继续（见 memory_migration.py）
 
         Args:
             from_user_id: 原用户 ID
@@ -268,25 +299,8 @@ class Mem0Client:
         Returns:
             迁移的记忆数量
         """
-        # 获取原用户的所有记忆
-        memories = self.get_user_memories(from_user_id)
-        if not memories:
-            return 0
-
-        migrated = 0
-        for mem in memories:
-            # 重新添加到新用户
-            result = self.add_memory(
-                to_user_id,
-                [{"role": "system", "content": mem.memory}]
-            )
-            if result:
-                # 删除原记忆
-                self.delete_memory(mem.id)
-                migrated += 1
-
-        print(f"[Mem0] 迁移记忆: {from_user_id} -> {to_user_id}, 共 {migrated} 条")
-        return migrated
+        from memory_migration import MemoryMigrator
+        return MemoryMigrator(client=self).migrate(from_user_id, to_user_id)
 
 
 # 全局单例
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+本地记忆镜像
+
+功能：
+1. 每个用户的全部记忆在本地保存一份（文本 + 向量），存为一个 .npz 文件
+2. 加载后向量组成 NumPy 矩阵，暴力余弦 top-k 检索，几百条记忆耗时不到 1ms
+3. 后台线程通过 get_user_memories 增量同步：只为新增或修改的记忆计算向量，删除的记忆同步删除
+4. 镜像还没建立（冷启动）时返回 None，由调用方退回远程搜索；网络不稳定时继续使用已有镜像
+
+说明：
+- 家庭场景每个用户最多几百条记忆，全量拉取一次的数据量很小
+- 向量使用与 chat_router.py 相同的字符二元组哈希向量，检索时按该用户记忆的 IDF 加权
+  （"用户"、"什么" 这类几乎每条都有的二元组权重接近 0）
+- 打分尺度与 Mem0 服务端不同，所以使用单独的相似度阈值 MEM0_MIRROR_MIN_SCORE
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import (
+    MEM0_MIRROR_ENABLED, MEM0_MIRROR_DIR, MEM0_MIRROR_SYNC_INTERVAL,
+    MEM0_MIRROR_MIN_SCORE, MEM0_SEARCH_TOP_K
+)
+from mem0_client import Mem0Client, MemoryItem, get_mem0_client
+from chat_router import get_chat_router
+
+
+class _UserMirror:
+    """单个用户的记忆镜像"""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.versions: List[str] = []  # updated_at（没有时用记忆文本），用于判断是否修改过
+        self.matrix = np.zeros((0, get_chat_router().EMBED_DIM), dtype=np.float32)  # 原始向量（落盘）
+        self.idf = np.ones(get_chat_router().EMBED_DIM, dtype=np.float32)  # 各维 IDF 权重
+        self.index = self.matrix  # IDF 加权并归一化后的检索矩阵
+        self.synced_at = 0.0  # 最近一次成功同步的时间，0 表示从未同步
+        self.syncing = False
+        self.stale = False  # 本地有新写入，下次检索时立即同步
+
+    @property
+    def warm(self) -> bool:
+        """是否可用于本地检索"""
+        return self.synced_at > 0
+
+    def reindex(self):
+        """按当前记忆重新计算 IDF 权重和检索矩阵"""
+        count = len(self.matrix)
+        df = np.count_nonzero(self.matrix, axis=0)
+        self.idf = np.log((count + 1) / (df + 1)).astype(np.float32) + 0.1
+        weighted = self.matrix * self.idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.index = weighted / norms
+
+
+class MemoryMirror:
+    """
+    本地记忆镜像
+
+    使用示例:
+        mirror = get_memory_mirror()
+        memories = mirror.search(user_id, "我喜欢吃什么")
+        if memories is None:
+            memories = mem0_client.search_memory(user_id, "我喜欢吃什么")  # 镜像未就绪
+    """
+
+    def __init__(self, client: Optional[Mem0Client] = None, enabled: bool = None,
+                 directory: str = None, sync_interval: float = None, min_score: float = None):
+        """
+        初始化镜像
+
+        Args:
+            client: Mem0 客户端，默认使用全局单例
+            enabled: 是否启用本地镜像
+            directory: 镜像文件目录
+            sync_interval: 同步间隔（秒），检索时距上次同步超过该值就在后台同步
+            min_score: 本地检索的最低余弦相似度
+        """
+        self.client = client or get_mem0_client()
+        self.enabled = MEM0_MIRROR_ENABLED if enabled is None else enabled
+        self.directory = directory or MEM0_MIRROR_DIR
+        self.sync_interval = MEM0_MIRROR_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.min_score = MEM0_MIRROR_MIN_SCORE if min_score is None else min_score
+
+        self._users: Dict[str, _UserMirror] = {}
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mem0-mirror")
+
+        # 统计信息
+        self.local_hits = 0   # 本地检索次数
+        self.cold_misses = 0  # 镜像未就绪、退回远程搜索的次数
+        self.syncs = 0        # 成功同步次数
+        self.sync_errors = 0  # 同步失败次数
+
+    # ==================== 存储 ====================
+
+    def _path(self, user_id: str) -> str:
+        """用户镜像文件路径（用户 ID 可能是中文名，文件名取哈希）"""
+        digest = hashlib.md5(user_id.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}.npz")
+
+    def _load(self, mirror: _UserMirror):
+        """从磁盘加载镜像（文件不存在或损坏时保持为空）"""
+        path = self._path(mirror.user_id)
+        if not os.path.exists(path):
+            return
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["user_id"]) != mirror.user_id:
+                    return
+                mirror.ids = [str(x) for x in data["ids"]]
+                mirror.texts = [str(x) for x in data["texts"]]
+                mirror.versions = [str(x) for x in data["versions"]]
+                mirror.matrix = data["matrix"].astype(np.float32)
+                mirror.synced_at = float(data["synced_at"])
+            mirror.reindex()
+            print(f"[MemoryMirror] 加载镜像: user={mirror.user_id}, {len(mirror.ids)} 条")
+        except Exception as e:
+            print(f"[MemoryMirror] 加载镜像失败: {e}")
+
+    def _save(self, mirror: _UserMirror):
+        """写入磁盘（先写临时文件再替换，避免写到一半时断电）"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(mirror.user_id)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            user_id=np.array(mirror.user_id),
+            ids=np.array(mirror.ids, dtype=str),
+            texts=np.array(mirror.texts, dtype=str),
+            versions=np.array(mirror.versions, dtype=str),
+            matrix=mirror.matrix,
+            synced_at=np.array(mirror.synced_at)
+        )
+        os.replace(tmp_path, path)
+
+    def _get(self, user_id: str) -> _UserMirror:
+        """取用户镜像，第一次访问时从磁盘加载"""
+        with self._lock:
+            mirror = self._users.get(user_id)
+            if mirror is None:
+                mirror = _UserMirror(user_id)
+                self._load(mirror)
+                self._users[user_id] = mirror
+            return mirror
+
+    # ==================== 同步 ====================
+
+    def ensure_fresh(self, user_id: Optional[str]):
+        """
+        镜像过期或有新写入时在后台同步（不阻塞）
+
+        Args:
+            user_id: 用户 ID
+        """
+        if not self.enabled or not user_id:
+            return
+        mirror = self._get(user_id)
+        with self._lock:
+            due = mirror.stale or time.time() - mirror.synced_at >= self.sync_interval
+            if mirror.syncing or not due:
+                return
+            mirror.syncing = True
+        self.executor.submit(self._sync, mirror)
+
+    def mark_stale(self, user_id: Optional[str]):
+        """
+        本地写入了新记忆，下次检索时立即同步
+
+        Args:
+            user_id: 用户 ID
+        """
+        if self.enabled and user_id:
+            self._get(user_id).stale = True
+
+    def _sync(self, mirror: _UserMirror):
+        """全量拉取记忆列表，只为新增或修改的记忆计算向量"""
+        try:
+            start = time.time()
+            remote = self.client.get_user_memories(mirror.user_id)
+            # get_user_memories 失败时也返回空列表，不能据此清空镜像或标记为已就绪
+            if not remote and not self.client.health_check():
+                raise ConnectionError("Mem0 服务不可用")
+
+            old = {mid: i for i, mid in enumerate(mirror.ids)}
+            router = get_chat_router()
+            ids, texts, versions, rows = [], [], [], []
+            added = 0
+            for item in remote:
+                if not item.id or not item.memory:
+                    continue
+                version = item.updated_at or item.memory
+                index = old.get(item.id)
+                if index is not None and mirror.versions[index] == version:
+                    rows.append(mirror.matrix[index])
+                else:
+                    rows.append(router.embed(item.memory))
+                    added += 1
+                ids.append(item.id)
+                texts.append(item.memory)
+                versions.append(version)
+            removed = len(set(old) - set(ids))
+
+            matrix = (np.stack(rows).astype(np.float32) if rows
+                      else np.zeros((0, router.EMBED_DIM), dtype=np.float32))
+            with self._lock:
+                mirror.ids, mirror.texts, mirror.versions, mirror.matrix = ids, texts, versions, matrix
+                mirror.reindex()
+                mirror.synced_at = time.time()
+                mirror.stale = False
+            if added or removed or not os.path.exists(self._path(mirror.user_id)):
+                self._save(mirror)
+            self.syncs += 1
+            print(f"[MemoryMirror] 同步完成: user={mirror.user_id}, 共 {len(ids)} 条"
+                  f"（新增/修改 {added}，删除 {removed}），耗时 {(time.time() - start) * 1000:.0f}ms")
+        except Exception as e:
+            self.sync_errors += 1
+            print(f"[MemoryMirror] 同步失败，继续使用已有镜像: {e}")
+        finally:
+            mirror.syncing = False
+
+    # ==================== 检索 ====================
+
+    def search(self, user_id: Optional[str], query: str, top_k: int = None) -> Optional[List[MemoryItem]]:
+        """
+        本地余弦 top-k 检索
+
+        Args:
+            user_id: 用户 ID
+            query: 查询文本
+            top_k: 返回条数
+
+        Returns:
+            相似度不低于 min_score 的记忆（按相似度降序）；镜像未就绪返回 None
+        """
+        if not self.enabled or not user_id:
+            return None
+        self.ensure_fresh(user_id)
+        mirror = self._get(user_id)
+
+        with self._lock:
+            if not mirror.warm:
+                self.cold_misses += 1
+                return None
+            ids, texts, index, idf = mirror.ids, mirror.texts, mirror.index, mirror.idf
+        self.local_hits += 1
+        if not ids:
+            return []
+
+        vector = get_chat_router().embed(query) * idf
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return []
+        scores = index @ (vector / norm)
+        k = min(top_k or MEM0_SEARCH_TOP_K, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            MemoryItem(id=ids[i], memory=texts[i], user_id=user_id, score=float(scores[i]))
+            for i in top if scores[i] >= self.min_score
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """镜像统计"""
+        return {
+            "users": len(self._users),
+            "local_hits": self.local_hits,
+            "cold_misses": self.cold_misses,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors
+        }
+
+    def shutdown(self):
+        """停止后台同步线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局单例
+_memory_mirror: Optional[MemoryMirror] = None
+
+
+def get_memory_mirror() -> MemoryMirror:
+    """
+    获取本地记忆镜像单例
+
+    Returns:
+        MemoryMirror 实例
+    """
+    global _memory_mirror
+    if _memory_mirror is None:
+        _memory_mirror = MemoryMirror()
+    return _memory_mirror
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+记忆预取
+
+功能：
+1. 知道当前用户后，用识别中间结果在后台线程提前搜索记忆，与语音识别并行
+2. 识别完成后最多再等一个截止时间（默认识别完成后 150ms），到时没有结果就不带记忆继续对话
+3. 超过截止时间才返回的结果直接丢弃并计数，慢的 Mem0 服务不会拖慢回复，也不会卡住界面
+
+检索来源：
+- 优先使用本地记忆镜像（memory_mirror.py），镜像未就绪时退回 Mem0 远程搜索
+- 返回的记忆已按各自来源的相似度阈值过滤
+
+复用规则：
+- 同一用户的预取查询是最终文本的前缀，且覆盖最终文本的大部分时直接复用（意思基本不变）
+- 否则用最终文本重新搜索
+- 每个用户同时只有一个预取请求，进行中再来的新查询先记下，完成后只补发最新的那个
+- 预取结果只在本轮使用：最终文本取走后清掉，下一轮问同样的问题会重新搜索（期间可能写入了新记忆）
+"""
+
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    MEM0_DEADLINE_MS, MEM0_PREFETCH_MIN_COVERAGE, MEM0_PREFETCH_WORKERS, MEM0_SIMILARITY_THRESHOLD
+)
+from mem0_client import Mem0Client, MemoryItem, get_mem0_client
+from memory_mirror import MemoryMirror, get_memory_mirror
+
+
+class MemoryPrefetcher:
+    """
+    记忆预取器
+
+    使用示例:
+        prefetcher = get_memory_prefetcher()
+        prefetcher.prefetch(user_id, partial_text)        # 识别中间结果更新时
+        memories = prefetcher.get(user_id, final_text, asr_end + 0.15)  # 识别完成后
+        # 或者在主线程只取 Future，交给对话线程等待（不阻塞界面）
+        future = prefetcher.request(user_id, final_text)
+        memories = prefetcher.wait(future, asr_end + 0.15)
+        if memories is None:
+            ...  # 超过截止时间，不带记忆继续
+    """
+
+    def __init__(self, client: Optional[Mem0Client] = None, mirror: Optional[MemoryMirror] = None,
+                 deadline_ms: float = None, min_coverage: float = None, workers: int = None):
+        """
+        初始化预取器
+
+        Args:
+            client: Mem0 客户端，默认使用全局单例
+            mirror: 本地记忆镜像，默认使用全局单例
+            deadline_ms: 默认截止时间（毫秒，相对调用 get 的时刻）
+            min_coverage: 复用预取结果时预取查询至少占最终文本的比例
+            workers: 后台搜索线程数
+        """
+        self.client = client or get_mem0_client()
+        self.mirror = mirror or get_memory_mirror()
+        self.deadline = (MEM0_DEADLINE_MS if deadline_ms is None else deadline_ms) / 1000
+        self.min_coverage = MEM0_PREFETCH_MIN_COVERAGE if min_coverage is None else min_coverage
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or MEM0_PREFETCH_WORKERS,
+            thread_name_prefix="mem0-prefetch"
+        )
+
+        # 可重入：结果已就绪时 add_done_callback 会在持锁的当前线程里直接回调
+        self._lock = threading.RLock()
+        # 用户 -> 最近一次预取的 (查询, Future)
+        self._latest: Dict[str, Tuple[str, Future]] = {}
+        # 用户 -> 预取进行中时到来的最新查询
+        self._pending: Dict[str, str] = {}
+
+        # 统计信息
+        self.searches = 0   # 发出的搜索请求数
+        self.reused = 0     # 直接复用预取结果的次数
+        self.on_time = 0    # 截止时间内拿到结果的次数
+        self.late = 0       # 超过截止时间被丢弃的次数
+        self.errors = 0     # 搜索异常次数
+
+    # ==================== 预取 ====================
+
+    def prefetch(self, user_id: Optional[str], query: str):
+        """
+        用识别中间结果提前搜索记忆（不阻塞）
+
+        Args:
+            user_id: 当前用户 ID
+            query: 识别中间结果
+        """
+        query = (query or "").strip()
+        if not user_id or not query or not self.client.enabled:
+            return
+        with self._lock:
+            latest = self._latest.get(user_id)
+            if latest and latest[0] == query:
+                return
+            if latest and not latest[1].done():
+                self._pending[user_id] = query
+                return
+            self._submit(user_id, query)
+
+    def _submit(self, user_id: str, query: str) -> Future:
+        """提交一次搜索（调用方持有锁）"""
+        self.searches += 1
+        future = self.executor.submit(self._search, user_id, query)
+        self._latest[user_id] = (query, future)
+        future.add_done_callback(lambda _: self._on_done(user_id))
+        return future
+
+    def _search(self, user_id: str, query: str) -> List[MemoryItem]:
+        """本地镜像优先，未就绪时远程搜索"""
+        try:
+            memories = self.mirror.search(user_id, query)
+            if memories is not None:
+                return memories
+            memories = self.client.search_memory(user_id, query)
+            return [m for m in memories if m.score is None or m.score >= MEM0_SIMILARITY_THRESHOLD]
+        except Exception as e:
+            self.errors += 1
+            print(f"[MemoryPrefetch] 搜索异常: {e}")
+            return []
+
+    def _on_done(self, user_id: str):
+        """预取完成后补发进行中到来的最新查询"""
+        with self._lock:
+            query = self._pending.pop(user_id, None)
+            latest = self._latest.get(user_id)
+            if query and not (latest and latest[0] == query):
+                self._submit(user_id, query)
+
+    # ==================== 取结果 ====================
+
+    def _covers(self, prefetched: str, query: str) -> bool:
+        """预取查询能否代表最终文本"""
+        return (query.startswith(prefetched)
+                and len(prefetched) >= len(query) * self.min_coverage)
+
+    def request(self, user_id: Optional[str], query: str, keep: bool = False) -> Optional[Future]:
+        """
+        取得与最终文本相关的记忆搜索（复用预取或重新提交，不阻塞）
+
+        Args:
+            user_id: 当前用户 ID
+            query: 最终识别文本
+            keep: 本轮之后还会再取一次（推测请求用中间结果取时），不清掉预取结果
+
+        Returns:
+            搜索的 Future；未启用、无用户或空文本时返回 None
+        """
+        query = (query or "").strip()
+        if not user_id or not query or not self.client.enabled:
+            return None
+
+        with self._lock:
+            latest = self._latest.get(user_id)
+            if latest and self._covers(latest[0], query):
+                self.reused += 1
+                future = latest[1]
+            else:
+                self._pending.pop(user_id, None)
+                future = self._submit(user_id, query)
+            if not keep:
+                # 本轮已取走，下一轮相同的问题不再复用这次的结果
+                self._latest.pop(user_id, None)
+                self._pending.pop(user_id, None)
+            return future
+
+    def wait(self, future: Future, deadline: Optional[float] = None) -> Optional[List[MemoryItem]]:
+        """
+        等待 request() 返回的搜索，最多等到截止时刻
+
+        Args:
+            future: request() 返回的 Future
+            deadline: 截止时刻（time.time() 时间戳），默认为当前时刻加默认截止时间
+
+        Returns:
+            记忆列表；超过截止时间返回 None（结果到达后丢弃）
+        """
+        if deadline is None:
+            deadline = time.time() + self.deadline
+        try:
+            memories = future.result(timeout=max(0.0, deadline - time.time()))
+        except CancelledError:
+            return None
+        except FutureTimeout:
+            # 超时：结果到达后直接丢弃
+            self.late += 1
+            print(f"[MemoryPrefetch] 超过截止时间，不带记忆继续（累计超时 {self.late} 次）")
+            return None
+
+        self.on_time += 1
+        return memories
+
+    def get(self, user_id: Optional[str], query: str,
+            deadline: Optional[float] = None) -> Optional[List[MemoryItem]]:
+        """
+        在截止时间之前取回与最终文本相关的记忆（阻塞调用线程，界面线程请用 request() + wait()）
+
+        Args:
+            user_id: 当前用户 ID
+            query: 最终识别文本
+            deadline: 截止时刻（time.time() 时间戳），默认为当前时刻加默认截止时间
+
+        Returns:
+            记忆列表；超过截止时间返回 None（结果到达后丢弃）
+        """
+        future = self.request(user_id, query)
+        if future is None:
+            return []
+        return self.wait(future, deadline)
+
+    def stats(self) -> Dict[str, int]:
+        """预取统计"""
+        return {
+            "searches": self.searches,
+            "reused": self.reused,
+            "on_time": self.on_time,
+            "late": self.late,
+            "errors": self.errors
+        }
+
+    def shutdown(self):
+        """停止后台线程（不等待进行中的请求）"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局单例
+_memory_prefetcher: Optional[MemoryPrefetcher] = None
+
+
+def get_memory_prefetcher() -> MemoryPrefetcher:
+    """
+    获取记忆预取器单例
+
+    Returns:
+        MemoryPrefetcher 实例
+    """
+    global _memory_prefetcher
+    if _memory_prefetcher is None:
+        _memory_prefetcher = MemoryPrefetcher()
+    return _memory_prefetcher
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+后台记忆写入队列
+
+功能：
+1. 每轮对话结束只把 (用户, 问, 答) 追加到磁盘队列文件，不在回复路径上做任何网络请求
+2. 单个后台线程攒够几轮（或最早一轮等待超时）后，合并成一次关键信息提取和一次 add_memory
+3. 提取或存储失败时保留队列，按指数退避重试；程序重启后从队列文件继续
+4. 统计队列深度、最早一轮的等待时间（延迟）、批次数、重试次数
+
+说明：
+- 原来每轮对话各开一个线程，先调一次对话模型提取关键信息，再调一次 add_memory；
+  合并后每 N 轮只有一次提取调用
+- 同一批只包含同一个用户的对话
+- 提取结果在存储成功前保存在内存里，Mem0 暂时不可用时重试存储不会重复提取
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from config import (
+    CHAT_API_KEY, CHAT_API_URL, CHAT_MODEL_NAME,
+    MEM0_EXTRACTION_PROMPT, MEM0_WRITER_QUEUE_PATH, MEM0_WRITER_BATCH_TURNS,
+    MEM0_WRITER_MAX_DELAY, MEM0_WRITER_RETRY_BASE, MEM0_WRITER_RETRY_MAX
+)
+from chat_http_client import get_chat_http_client
+from mem0_client import Mem0Client, get_mem0_client
+from memory_mirror import get_memory_mirror
+
+
+class MemoryWriter:
+    """
+    后台记忆写入器
+
+    使用示例:
+        writer = get_memory_writer()
+        writer.start()
+        writer.enqueue(user_id, user_message, assistant_message)
+        ...
+        print(writer.stats())  # {"depth": 2, "lag": 12.5, ...}
+        writer.stop()
+    """
+
+    # 提取请求超时（秒）
+    EXTRACT_TIMEOUT = 10
+
+    def __init__(self, client: Optional[Mem0Client] = None, queue_path: str = None,
+                 batch_turns: int = None, max_delay: float = None,
+                 retry_base: float = None, retry_max: float = None):
+        """
+        初始化写入器
+
+        Args:
+            client: Mem0 客户端，默认使用全局单例
+            queue_path: 磁盘队列文件路径
+            batch_turns: 攒够多少轮对话合并写入一次
+            max_delay: 最早一轮对话最多等待多少秒就写入（不足 batch_turns 轮也写）
+            retry_base: 失败重试的初始间隔（秒），每次失败翻倍
+            retry_max: 重试间隔上限（秒）
+        """
+        self.client = client or get_mem0_client()
+        self.queue_path = queue_path or MEM0_WRITER_QUEUE_PATH
+        self.batch_turns = batch_turns or MEM0_WRITER_BATCH_TURNS
+        self.max_delay = MEM0_WRITER_MAX_DELAY if max_delay is None else max_delay
+        self.retry_base = retry_base or MEM0_WRITER_RETRY_BASE
+        self.retry_max = retry_max or MEM0_WRITER_RETRY_MAX
+
+        # 进度回调 (阶段, 描述)，阶段为 "extract" 或 "store"，在后台线程中调用
+        self.on_progress: Optional[Callable[[str, str], None]] = None
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._flush_requested = False
+
+        self._records: List[Dict] = self._load()
+        # 批次（首条记录 ID）-> 已提取的关键信息，存储成功后删除
+        self._extracted: Dict[str, str] = {}
+        self._failures = 0
+        self._retry_at = 0.0
+
+        # 统计信息
+        self.enqueued = 0      # 入队的对话轮数
+        self.batches = 0       # 完成的批次数
+        self.extractions = 0   # 关键信息提取调用次数
+        self.stored = 0        # 成功调用 add_memory 的次数
+        self.skipped = 0       # 没有需要记忆的内容而丢弃的批次数
+        self.retries = 0       # 失败重试次数
+
+    # ==================== 磁盘队列 ====================
+
+    def _load(self) -> List[Dict]:
+        """读取上次未写完的队列（跳过损坏的行）"""
+        if not os.path.exists(self.queue_path):
+            return []
+        records = []
+        try:
+            with open(self.queue_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except OSError as e:
+            print(f"[MemoryWriter] 读取队列失败: {e}")
+        if records:
+            print(f"[MemoryWriter] 恢复未写入的对话 {len(records)} 轮")
+        return records
+
+    def _append(self, record: Dict):
+        """追加一条记录（调用方持有锁）"""
+        os.makedirs(os.path.dirname(self.queue_path) or ".", exist_ok=True)
+        with open(self.queue_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _rewrite(self):
+        """用内存中的剩余记录重写队列文件（调用方持有锁）"""
+        tmp_path = self.queue_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self._records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.queue_path)
+
+    # ==================== 入队 ====================
+
+    def enqueue(self, user_id: Optional[str], user_message: str, assistant_message: str):
+        """
+        记录一轮对话（只写本地文件，立即返回）
+
+        Args:
+            user_id: 用户 ID
+            user_message: 用户消息
+            assistant_message: 助手回复
+        """
+        if not user_id or not user_message or not self.client.enabled:
+            return
+        record = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "user": user_message,
+            "assistant": assistant_message,
+            "time": time.time()
+        }
+        with self._lock:
+            self._records.append(record)
+            try:
+                self._append(record)
+            except OSError as e:
+                print(f"[MemoryWriter] 写入队列文件失败（仅保存在内存中）: {e}")
+            self.enqueued += 1
+        self._wakeup.set()
+
+    def reassign(self, from_user_id: str, to_user_id: str) -> int:
+        """
+        把队列中某个用户的对话改记到另一个用户（临时用户确认身份后）
+
+        Returns:
+            改记的轮数
+        """
+        with self._lock:
+            count = 0
+            for record in self._records:
+                if record["user_id"] == from_user_id:
+                    record["user_id"] = to_user_id
+                    count += 1
+            if count:
+                try:
+                    self._rewrite()
+                except OSError as e:
+                    print(f"[MemoryWriter] 更新队列文件失败: {e}")
+        return count
+
+    def flush(self):
+        """不再等待攒批，尽快写入全部待写对话"""
+        self._flush_requested = True
+        self._wakeup.set()
+
+    # ==================== 后台线程 ====================
+
+    def start(self):
+        """启动后台写入线程（已启动时直接返回）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="mem0-writer")
+        self._thread.start()
+        if self._records:
+            self._wakeup.set()
+
+    def stop(self):
+        """停止后台线程（未写完的对话保留在队列文件中，下次启动继续）"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            if self._stop_event.is_set() or time.time() < self._retry_at:
+                continue
+
+            batch = self._next_batch()
+            if not batch:
+                continue
+            if self._write(batch):
+                self._failures = 0
+                self._retry_at = 0.0
+                with self._lock:
+                    done = {record["id"] for record in batch}
+                    self._records = [r for r in self._records if r["id"] not in done]
+                    try:
+                        self._rewrite()
+                    except OSError as e:
+                        print(f"[MemoryWriter] 更新队列文件失败: {e}")
+                    if not self._records:
+                        self._flush_requested = False
+                # 可能还有下一批已经就绪
+                self._wakeup.set()
+            else:
+                self._failures += 1
+                self.retries += 1
+                delay = min(self.retry_max, self.retry_base * 2 ** (self._failures - 1))
+                self._retry_at = time.time() + delay
+                print(f"[MemoryWriter] 写入失败，{delay:.1f}s 后重试（队列 {self.depth} 轮）")
+
+    def _next_batch(self) -> List[Dict]:
+        """取最早待写用户的一批对话，未到攒批条件时返回空列表"""
+        with self._lock:
+            if not self._records:
+                return []
+            user_id = self._records[0]["user_id"]
+            turns = [r for r in self._records if r["user_id"] == user_id][:self.batch_turns]
+            ready = (len(turns) >= self.batch_turns
+                     or time.time() - turns[0]["time"] >= self.max_delay
+                     or self._flush_requested)
+            return turns if ready else []
+
+    def _write(self, batch: List[Dict]) -> bool:
+        """提取并存储一批对话，成功（含无需记忆）返回 True"""
+        user_id = batch[0]["user_id"]
+        key = batch[0]["id"]
+
+        key_info = self._extracted.get(key)
+        if key_info is None:
+            start = time.time()
+            key_info = self._extract_key_info(batch)
+            self.extractions += 1
+            if key_info is None:
+                return False
+            extract_ms = (time.time() - start) * 1000
+            print(f"[计时] 信息提取: {extract_ms:.0f}ms（{len(batch)} 轮）")
+            self._notify("extract", f"信息提取: {extract_ms:.0f}ms ({len(batch)}轮)")
+            self._extracted[key] = key_info
+
+        if not key_info.strip() or key_info.strip() == "无":
+            self._extracted.pop(key, None)
+            self.batches += 1
+            self.skipped += 1
+            print(f"[MemoryWriter] {len(batch)} 轮对话中无需记忆的关键信息")
+            self._notify("store", "记忆存储: 跳过")
+            return True
+
+        messages = []
+        for record in batch:
+            messages.append({"role": "user", "content": record["user"]})
+            messages.append({"role": "assistant", "content": record["assistant"]})
+        messages.append({"role": "system", "content": f"提取的关键信息：{key_info}"})
+
+        start = time.time()
+        if self.client.add_memory(user_id, messages) is None:
+            return False
+        store_ms = (time.time() - start) * 1000
+        self._extracted.pop(key, None)
+        self.batches += 1
+        self.stored += 1
+        print(f"[计时] 记忆存储: {store_ms:.0f}ms")
+        print(f"[MemoryWriter] 已存储记忆（{len(batch)} 轮）: {key_info[:50]}...")
+        self._notify("store", f"记忆存储: {store_ms:.0f}ms ({len(batch)}轮)")
+        # 本地记忆镜像下次检索时重新同步
+        get_memory_mirror().mark_stale(user_id)
+        return True
+
+    def _extract_key_info(self, batch: List[Dict]) -> Optional[str]:
+        """
+        一次对话模型调用提取整批对话的关键信息
+
+        Returns:
+            提取的关键信息（没有时为"无"），请求失败返回 None
+        """
+        dialogue = "\n".join(
+            f"用户：{record['user']}\n助手：{record['assistant']}" for record in batch
+        )
+        data = {
+            "model": CHAT_MODEL_NAME,
+            "messages": [{"role": "user", "content": MEM0_EXTRACTION_PROMPT.format(dialogue=dialogue)}],
+            "max_completion_tokens": 100 + 50 * (len(batch) - 1),
+            "temperature": 0.1,
+            "stream": False
+        }
+        headers = {
+            "Authorization": f"Bearer {CHAT_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        try:
+            response = get_chat_http_client().post(
+                CHAT_API_URL,
+                headers=headers,
+                data=json.dumps(data),
+                timeout=self.EXTRACT_TIMEOUT
+            )
+            if response.status_code != 200:
+                print(f"[MemoryWriter] 提取关键信息失败: HTTP {response.status_code}")
+                return None
+            result = response.json()
+            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+            return content.strip()
+        except Exception as e:
+            print(f"[MemoryWriter] 提取关键信息失败: {e}")
+            return None
+
+    def _notify(self, stage: str, text: str):
+        if self.on_progress:
+            try:
+                self.on_progress(stage, text)
+            except Exception:
+                pass
+
+    # ==================== 指标 ====================
+
+    @property
+    def depth(self) -> int:
+        """待写入的对话轮数"""
+        return len(self._records)
+
+    @property
+    def lag(self) -> float:
+        """最早一轮待写对话已等待的时间（秒）"""
+        with self._lock:
+            return time.time() - self._records[0]["time"] if self._records else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """队列指标"""
+        return {
+            "depth": self.depth,
+            "lag": round(self.lag, 1),
+            "enqueued": self.enqueued,
+            "batches": self.batches,
+            "extractions": self.extractions,
+            "stored": self.stored,
+            "skipped": self.skipped,
+            "retries": self.retries
+        }
+
+
+# 全局单例
+_memory_writer: Optional[MemoryWriter] = None
+
+
+def get_memory_writer() -> MemoryWriter:
+    """
+    获取记忆写入器单例
+
+    Returns:
+        MemoryWriter 实例
+    """
+    global _memory_writer
+    if _memory_writer is None:
+        _memory_writer = MemoryWriter()
+    return _memory_writer
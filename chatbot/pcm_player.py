@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+连续 PCM 播放模块
+
+功能：
+1. 进程内常开一条 PyAudio 输出流（回调模式），从环形缓冲区取帧播放，没有数据时输出静音
+2. 写入方只管往缓冲区追加 PCM，句与句之间没有解码器启动和 get_busy() 轮询造成的停顿
+3. 采样位置用单调递增的绝对计数表示：position 是已写入位置，samples_played 是扣除声卡输出延迟后
+   已经真正出声的位置，可用于打断时计算已播放时长、口型同步
+4. flush() 丢弃尚未播放的数据（打断），wait_played() 等待某个位置之前的音频全部播完
+
+说明：
+- 缓冲区满时 write() 阻塞等待播放腾出空间，不会覆盖未播放的数据
+- 输出回调运行在 PortAudio 线程，只做一次区间视图读取和一次 tobytes()
+"""
+
+import threading
+import time
+from typing import Optional, Union
+
+import pyaudio
+
+from config import TTS_SAMPLE_RATE, TTS_PLAYBACK_FRAME_MS, TTS_PLAYBACK_BUFFER_SECONDS
+from audio_ring import AudioRingBuffer
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class PCMPlayer:
+    """
+    连续 PCM 输出流（16-bit 单声道）
+
+    使用示例:
+        player = get_pcm_player()
+        player.open()
+        end = player.write(pcm_chunk)
+        player.wait_played(end)
+    """
+
+    def __init__(self, sample_rate: int = None, frame_ms: int = None,
+                 buffer_seconds: float = None):
+        """
+        初始化播放器
+
+        Args:
+            sample_rate: 采样率
+            frame_ms: 输出回调每次取的音频时长（毫秒）
+            buffer_seconds: 待播放缓冲区容量（秒）
+        """
+        self.sample_rate = sample_rate or TTS_SAMPLE_RATE
+        self.frame_samples = max(1, self.sample_rate * (frame_ms or TTS_PLAYBACK_FRAME_MS) // 1000)
+        self.ring = AudioRingBuffer.for_duration(
+            buffer_seconds or TTS_PLAYBACK_BUFFER_SECONDS, self.sample_rate
+        )
+        self.p: Optional[pyaudio.PyAudio] = None
+        self.stream = None
+        self._cursor = 0            # 已交给声卡的绝对位置
+        self._latency_samples = 0   # 声卡输出延迟（采样数）
+        self._cond = threading.Condition()
+        self._closed = True
+
+        # 统计信息
+        self.underruns = 0  # 播放中途缓冲区读空的次数
+
+    # ==================== 生命周期 ====================
+
+    def open(self) -> bool:
+        """
+        打开输出流（已打开时直接返回）
+
+        Returns:
+            bool: 输出设备是否可用
+        """
+        if self.stream is not None:
+            return True
+        try:
+            self.p = pyaudio.PyAudio()
+            self.stream = self.p.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.sample_rate,
+                output=True,
+                frames_per_buffer=self.frame_samples,
+                stream_callback=self._on_output
+            )
+            self._latency_samples = int(self.stream.get_output_latency() * self.sample_rate)
+            self._closed = False
+            print(f"[PCMPlayer] 输出流已打开: {self.sample_rate}Hz，"
+                  f"每帧 {self.frame_samples} 采样，输出延迟 {self.latency * 1000:.0f}ms")
+            return True
+        except Exception as e:
+            print(f"[PCMPlayer] 输出流打开失败: {e}")
+            self.close()
+            return False
+
+    def close(self):
+        """关闭输出流，唤醒所有等待中的写入方"""
+        with self._cond:
+            self._closed = True
+            self._cursor = self.ring.position
+            self._cond.notify_all()
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+        if self.p:
+            try:
+                self.p.terminate()
+            except Exception:
+                pass
+            self.p = None
+
+    # ==================== 输出回调 ====================
+
+    def _on_output(self, in_data, frame_count, time_info, status):
+        """PyAudio 输出回调（PortAudio 线程）"""
+        return (self._render(frame_count), pyaudio.paContinue)
+
+    def _render(self, frame_count: int) -> bytes:
+        """
+        取出下一帧待播放数据，不足部分补静音
+
+        Args:
+            frame_count: 需要的采样数
+
+        Returns:
+            16-bit PCM 数据
+        """
+        start = self._cursor
+        samples, cursor = self.ring.read_since(start, frame_count)
+        data = samples.tobytes()
+
+        with self._cond:
+            # 读取期间被 flush() 跳过的数据不再推进游标
+            if self._cursor == start:
+                self._cursor = cursor
+            self._cond.notify_all()
+
+        missing = frame_count - len(samples)
+        if missing:
+            if len(samples):
+                self.underruns += 1
+            data += bytes(missing * 2)
+        return data
+
+    # ==================== 写入与时钟 ====================
+
+    @property
+    def position(self) -> int:
+        """已写入的采样总数（绝对位置）"""
+        return self.ring.position
+
+    @property
+    def pending_samples(self) -> int:
+        """已写入但尚未交给声卡的采样数"""
+        return self.ring.position - self._cursor
+
+    @property
+    def latency(self) -> float:
+        """声卡输出延迟（秒）"""
+        return self._latency_samples / self.sample_rate
+
+    @property
+    def samples_played(self) -> int:
+        """已经出声的绝对采样位置（扣除声卡输出延迟）"""
+        return max(0, self._cursor - self._latency_samples)
+
+    def write(self, pcm: BytesLike) -> int:
+        """
+        追加 16-bit PCM 数据，缓冲区满时阻塞等待播放腾出空间
+
+        Args:
+            pcm: 16-bit 小端 PCM 数据
+
+        Returns:
+            写入后的绝对位置（可交给 wait_played() 等待播放完成）
+        """
+        if not self.open():
+            return self.ring.position
+
+        view = memoryview(pcm).cast("B")
+        # 每次最多写半个缓冲区，避免一次写入就要求整个缓冲区为空
+        step = (self.ring.capacity // 2) * 2
+        for offset in range(0, len(view), step):
+            piece = view[offset:offset + step]
+            need = len(piece) // 2
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self.ring.position + need - self._cursor <= self.ring.capacity
+                )
+                if self._closed:
+                    break
+            self.ring.write(piece)
+        return self.ring.position
+
+    def flush(self) -> int:
+        """
+        丢弃尚未播放的数据（打断），等待中的 wait_played() 随即返回
+
+        Returns:
+            丢弃的采样数（已交给声卡的部分不算）
+        """
+        with self._cond:
+            discarded = max(0, self.ring.position - self._cursor)
+            self._cursor = self.ring.position
+            self._cond.notify_all()
+        return discarded
+
+    def wait_played(self, position: int, timeout: Optional[float] = None) -> bool:
+        """
+        等待 position 之前的音频全部出声
+
+        Args:
+            position: 绝对采样位置（write() 的返回值）
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            bool: 是否在超时前播放完成（被 flush() 或 close() 提前结束也返回 True）
+        """
+        with self._cond:
+            done = self._cond.wait_for(
+                lambda: self._closed or self._cursor >= position, timeout
+            )
+        if done and not self._closed:
+            # 最后一帧交给声卡后还要经过输出延迟才真正播完
+            remaining = (position - self.samples_played) / self.sample_rate
+            if remaining > 0:
+                time.sleep(remaining)
+        return done
+
+
+# 全局单例
+_pcm_player: Optional[PCMPlayer] = None
+
+
+def get_pcm_player() -> PCMPlayer:
+    """
+    获取 PCM 播放器单例
+
+    Returns:
+        PCMPlayer 实例
+    """
+    global _pcm_player
+    if _pcm_player is None:
+        _pcm_player = PCMPlayer()
+    return _pcm_player
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+本地拼接播报（短语库）
+
+功能：
+1. 启动时在后台预合成模板回复的固定片段（"这是"、"的声音"、"我看到了："等）和固定提示语
+2. 人脸、声纹注册时合成一次名字，之后识别结果里的名字直接取本地音频
+3. 播报模板回复时，把各片段的 PCM 裁掉首尾静音、按末尾标点补停顿，相邻片段交叉淡化拼接，
+   整句在本地生成，不经过合成接口
+4. 缺少片段时返回 None（本次整句在线合成），同时后台补合成缺少的片段，下次即可本地播报
+
+说明：
+- 片段音频存放在合成音频缓存（tts_cache.py）中，与整句播报的缓存共用同一个目录和容量上限；
+  内存里另外保留裁剪好的片段，拼接时不再读文件
+- 只含标点和空白的片段（如 ", "、"; "）不合成，直接生成对应时长的静音
+- 拼接的音频是 16-bit 单声道 PCM（TTS_STREAM_FORMAT），交给 StreamingTTSWorker 的 cached_audio 直接播放
+"""
+
+import asyncio
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import websockets
+
+from config import (
+    TTS_APPID, TTS_ACCESS_TOKEN, TTS_WS_URL, TTS_RESOURCE_ID,
+    TTS_SPEAKER, TTS_SAMPLE_RATE, TTS_SPEECH_RATE, TTS_LOUDNESS_RATE, TTS_STREAM_FORMAT,
+    PHRASE_BANK_ENABLED, PHRASE_BANK_CROSSFADE_MS, PHRASE_BANK_SILENCE_LEVEL,
+    PHRASE_BANK_PAUSE_MS, PHRASE_BANK_FRAGMENTS
+)
+from tts_cache import get_tts_cache
+from volc_protocol import (
+    build_event_request, parse_tts_response,
+    EVENT_START_CONNECTION, EVENT_FINISH_CONNECTION, EVENT_CONNECTION_STARTED,
+    EVENT_START_SESSION, EVENT_FINISH_SESSION, EVENT_SESSION_STARTED,
+    EVENT_SESSION_FINISHED, EVENT_SESSION_CANCELED, EVENT_SESSION_FAILED, EVENT_TASK_REQUEST
+)
+
+
+class PhraseBank:
+    """
+    本地拼接播报
+
+    使用示例:
+        bank = get_phrase_bank()
+        bank.warm_up(registered_names)                    # 启动时后台预合成
+        audio = bank.compose(["这是", "小明", "的声音"])   # 片段齐全时返回拼接好的 PCM
+        if audio is None:
+            ...  # 本次整句在线合成（缺少的片段已在后台补合成）
+    """
+
+    # 不含有效字符的片段只生成静音
+    _WORD_PATTERN = re.compile(r'[\u4e00-\u9fa5a-zA-Z0-9]')
+
+    # 每个片段的合成超时（秒）
+    SYNTH_TIMEOUT = 10
+
+    def __init__(self, sample_rate: int = None, crossfade_ms: int = None,
+                 silence_level: int = None, enabled: bool = None):
+        """
+        初始化短语库
+
+        Args:
+            sample_rate: 采样率（与 PCM 输出流一致）
+            crossfade_ms: 相邻片段交叉淡化时长（毫秒）
+            silence_level: 裁剪首尾静音的幅度阈值
+            enabled: 是否启用本地拼接
+        """
+        self.sample_rate = sample_rate or TTS_SAMPLE_RATE
+        self.crossfade = self.sample_rate * (crossfade_ms or PHRASE_BANK_CROSSFADE_MS) // 1000
+        self.silence_level = silence_level or PHRASE_BANK_SILENCE_LEVEL
+        self.enabled = PHRASE_BANK_ENABLED if enabled is None else enabled
+
+        self.tts_cache = get_tts_cache()
+        self._segments: Dict[str, np.ndarray] = {}  # 片段文本 -> 裁剪好的 int16 采样
+        self._learning: set = set()  # 已提交后台合成、尚未完成的片段
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phrase-bank")
+
+        # 统计信息
+        self.composed = 0     # 本地拼接成功次数
+        self.misses = 0       # 缺少片段、改为在线合成的次数
+        self.synthesized = 0  # 后台合成的片段数
+
+    # ==================== 片段 ====================
+
+    def _is_pause(self, fragment: str) -> bool:
+        """只含标点和空白的片段"""
+        return not self._WORD_PATTERN.search(fragment)
+
+    def _pause(self, fragment: str) -> np.ndarray:
+        """片段末尾标点对应的静音"""
+        stripped = fragment.rstrip()
+        ms = PHRASE_BANK_PAUSE_MS.get(stripped[-1], 0) if stripped else 0
+        return np.zeros(self.sample_rate * ms // 1000, dtype=np.int16)
+
+    def _trim(self, audio: bytes) -> np.ndarray:
+        """裁掉首尾静音（保留少量余量，避免切掉字头字尾）"""
+        samples = np.frombuffer(audio[:len(audio) // 2 * 2], dtype=np.int16)
+        voiced = np.flatnonzero(np.abs(samples.astype(np.int32)) > self.silence_level)
+        if voiced.size == 0:
+            return samples[:0]
+        margin = self.crossfade
+        return samples[max(0, voiced[0] - margin):voiced[-1] + 1 + margin]
+
+    def _segment(self, fragment: str) -> Optional[np.ndarray]:
+        """取片段的裁剪音频（内存没有时从合成缓存读取），缺少时返回 None"""
+        segment = self._segments.get(fragment)
+        if segment is not None:
+            return segment
+        audio = self.tts_cache.get(fragment, TTS_STREAM_FORMAT, self.sample_rate)
+        if audio is None:
+            return None
+        segment = self._trim(audio)
+        with self._lock:
+            self._segments[fragment] = segment
+        return segment
+
+    def has(self, fragment: str) -> bool:
+        """片段是否已有本地音频"""
+        return self._is_pause(fragment) or self._segment(fragment.strip()) is not None
+
+    # ==================== 拼接 ====================
+
+    def compose(self, fragments: List[str]) -> Optional[bytes]:
+        """
+        拼接模板回复
+
+        Args:
+            fragments: 按顺序的文本片段，拼起来就是完整回复
+
+        Returns:
+            拼接好的 16-bit PCM，缺少片段时返回 None（并在后台补合成）
+        """
+        if not self.enabled or not fragments:
+            return None
+
+        pieces: List[np.ndarray] = []
+        missing: List[str] = []
+        for fragment in fragments:
+            if self._is_pause(fragment):
+                pieces.append(self._pause(fragment))
+                continue
+            segment = self._segment(fragment.strip())
+            if segment is None:
+                missing.append(fragment.strip())
+                continue
+            pieces.append(segment)
+            pieces.append(self._pause(fragment))
+
+        if missing:
+            self.misses += 1
+            self.learn(missing)
+            return None
+
+        self.composed += 1
+        return self._splice(pieces).tobytes()
+
+    def _splice(self, pieces: List[np.ndarray]) -> np.ndarray:
+        """顺序拼接，两段发声的片段直接相邻时做线性交叉淡化"""
+        output = np.zeros(sum(len(p) for p in pieces), dtype=np.float32)
+        position = 0
+        previous_voiced = False
+        for piece in pieces:
+            if len(piece) == 0:
+                continue
+            voiced = bool(piece.any())
+            overlap = min(self.crossfade, position, len(piece)) if voiced and previous_voiced else 0
+            samples = piece.astype(np.float32)
+            if overlap:
+                position -= overlap
+                ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+                output[position:position + overlap] *= 1.0 - ramp
+                samples[:overlap] *= ramp
+                output[position:position + overlap] += samples[:overlap]
+                samples = samples[overlap:]
+                position += overlap
+            output[position:position + len(samples)] = samples
+            position += len(samples)
+            previous_voiced = voiced
+        return np.clip(output[:position], -32768, 32767).astype(np.int16)
+
+    # ==================== 后台合成 ====================
+
+    def warm_up(self, extra: Iterable[str] = ()):
+        """
+        启动时后台预合成固定片段和已注册的名字（合成缓存里已有的跳过）
+
+        Args:
+            extra: 额外的片段（已注册的人名等）
+        """
+        if self.enabled:
+            self.learn(list(PHRASE_BANK_FRAGMENTS) + [name for name in extra if name])
+
+    def learn(self, fragments: Iterable[str]):
+        """后台合成还没有本地音频的片段（注册新名字时调用）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            todo = []
+            for fragment in fragments:
+                fragment = fragment.strip()
+                if fragment and fragment not in self._learning and fragment not in todo:
+                    todo.append(fragment)
+            self._learning.update(todo)
+        if todo:
+            self.executor.submit(self._learn, todo)
+
+    def _learn(self, fragments: List[str]):
+        """合成缺少的片段并写入合成缓存（后台线程）"""
+        try:
+            missing = [f for f in fragments if not self.has(f)]
+            if not missing:
+                return
+            results = asyncio.run(self._synthesize(missing))
+            for fragment, audio in results.items():
+                self.tts_cache.put(fragment, TTS_STREAM_FORMAT, self.sample_rate, audio)
+                with self._lock:
+                    self._segments[fragment] = self._trim(audio)
+                self.synthesized += 1
+            print(f"[PhraseBank] 合成片段 {len(results)}/{len(missing)} 个")
+        except Exception as e:
+            print(f"[PhraseBank] 合成片段失败: {e}")
+        finally:
+            with self._lock:
+                self._learning.difference_update(fragments)
+
+    async def _synthesize(self, fragments: List[str]) -> Dict[str, bytes]:
+        """
+        一条连接依次合成多个片段（每个片段一个会话，会话不能并行）
+
+        Returns:
+            片段文本 -> 完整 PCM，失败的片段不在结果中
+        """
+        headers = {
+            "X-Api-App-Key": TTS_APPID,
+            "X-Api-Access-Key": TTS_ACCESS_TOKEN,
+            "X-Api-Resource-Id": TTS_RESOURCE_ID,
+            "X-Api-Connect-Id": str(uuid.uuid4())
+        }
+        results: Dict[str, bytes] = {}
+        async with websockets.connect(TTS_WS_URL, additional_headers=headers,
+                                      ping_interval=20, ping_timeout=10) as websocket:
+            await websocket.send(build_event_request(EVENT_START_CONNECTION))
+            res = parse_tts_response(await asyncio.wait_for(websocket.recv(), timeout=10))
+            if res.get("error") or res.get("event") != EVENT_CONNECTION_STARTED:
+                print(f"[PhraseBank] 建立连接失败: {res}")
+                return results
+
+            for fragment in fragments:
+                audio = await asyncio.wait_for(
+                    self._synthesize_one(websocket, fragment), timeout=self.SYNTH_TIMEOUT
+                )
+                if audio:
+                    results[fragment] = audio
+
+            try:
+                await websocket.send(build_event_request(EVENT_FINISH_CONNECTION))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+        return results
+
+    async def _synthesize_one(self, websocket, fragment: str) -> Optional[bytes]:
+        """在已建立的连接上用一个会话合成一个片段"""
+        session_id = str(uuid.uuid4())
+        session_params = {
+            "user": {"uid": str(uuid.uuid4())[:16]},
+            "event": EVENT_START_SESSION,
+            "namespace": "BidirectionalTTS",
+            "req_params": {
+                "text": "",
+                "speaker": TTS_SPEAKER,
+                "audio_params": {
+                    "format": TTS_STREAM_FORMAT,
+                    "sample_rate": self.sample_rate,
+                    "speech_rate": TTS_SPEECH_RATE,
+                    "loudness_rate": TTS_LOUDNESS_RATE
+                }
+            }
+        }
+        await websocket.send(build_event_request(EVENT_START_SESSION, session_id, session_params))
+        res = parse_tts_response(await websocket.recv())
+        if res.get("error") or res.get("event") != EVENT_SESSION_STARTED:
+            print(f"[PhraseBank] 建立会话失败: {res}")
+            return None
+
+        task_params = {"event": EVENT_TASK_REQUEST, "req_params": {"text": fragment}}
+        await websocket.send(build_event_request(EVENT_TASK_REQUEST, session_id, task_params))
+        await websocket.send(build_event_request(EVENT_FINISH_SESSION, session_id))
+
+        audio = bytearray()
+        while True:
+            res = parse_tts_response(await websocket.recv())
+            if res.get("error"):
+                print(f"[PhraseBank] 合成错误: {res}")
+                return None
+            if res.get("audio"):
+                audio += res["audio"]
+            elif res.get("event") == EVENT_SESSION_FINISHED:
+                return bytes(audio) or None
+            elif res.get("event") in (EVENT_SESSION_CANCELED, EVENT_SESSION_FAILED):
+                print(f"[PhraseBank] 会话失败: {res.get('payload')}")
+                return None
+
+    def stats(self) -> Dict[str, int]:
+        """拼接统计"""
+        return {
+            "segments": len(self._segments),
+            "composed": self.composed,
+            "misses": self.misses,
+            "synthesized": self.synthesized
+        }
+
+    def shutdown(self):
+        """停止后台合成线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局单例
+_phrase_bank: Optional[PhraseBank] = None
+
+
+def get_phrase_bank() -> PhraseBank:
+    """
+    获取短语库单例
+
+    Returns:
+        PhraseBank 实例
+    """
+    global _phrase_bank
+    if _phrase_bank is None:
+        _phrase_bank = PhraseBank()
+    return _phrase_bank
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地答案缓存测试
+验证命中、未命中、不缓存的问题和有效期（answer_cache.py）
+
+运行（与语音助手相同，需要 api_secrets.py）：
+    python test_answer_cache.py
+    或 python -m pytest test_answer_cache.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from answer_cache import AnswerCache
+
+
+def make_cache(**params):
+    """启用状态的空缓存"""
+    return AnswerCache(enabled=True, **params)
+
+
+# ==================== 命中 ====================
+
+def test_hit_same_question():
+    """相同问题命中"""
+    cache = make_cache()
+    cache.put("u1", "你叫什么名字", "我叫小元。")
+    entry = cache.lookup("u1", "你叫什么名字")
+    assert entry is not None and entry.reply == "我叫小元。"
+
+
+def test_hit_particles_and_punctuation():
+    """只差语气词、标点的问题命中"""
+    cache = make_cache()
+    cache.put("u1", "你叫什么名字", "我叫小元。")
+    assert cache.lookup("u1", "你叫什么名字呀？") is not None
+
+
+# ==================== 未命中 ====================
+
+def test_miss_other_user():
+    """不同用户的缓存互不命中"""
+    cache = make_cache()
+    cache.put("u1", "你叫什么名字", "我叫小元。")
+    assert cache.lookup("u2", "你叫什么名字") is None
+    assert cache.lookup(None, "你叫什么名字") is None
+
+
+def test_miss_different_content_word():
+    """只差一个实词的问题不命中"""
+    cache = make_cache()
+    cache.put("u1", "中国的首都是哪里", "北京。")
+    assert cache.lookup("u1", "美国的首都是哪里") is None
+
+
+def test_miss_different_number():
+    """数字不同的问题不命中"""
+    cache = make_cache()
+    cache.put("u1", "一加四百五十六等于几", "四百五十七。")
+    assert cache.lookup("u1", "一加四百五十七等于几") is None
+
+
+# ==================== 不缓存的问题 ====================
+
+def test_exclude_time_sensitive():
+    """时效性问题不缓存"""
+    cache = make_cache()
+    for question in ("今天星期几", "现在几点了", "明天天气怎么样"):
+        assert not cache.is_cacheable(question), question
+
+
+def test_exclude_followups():
+    """依赖上下文的追问不缓存"""
+    cache = make_cache()
+    for question in ("为什么", "为什么呀", "然后呢", "继续", "再讲一个", "他是谁",
+                     "什么意思", "是吗", "那你呢"):
+        assert not cache.is_cacheable(question), question
+
+
+def test_followup_not_replayed():
+    """追问不写入缓存，之后的同样追问不会播放无关的回复"""
+    cache = make_cache()
+    cache.put("u1", "为什么", "因为空气散射蓝光，所以天空是蓝色的。")
+    assert len(cache) == 0
+    assert cache.lookup("u1", "为什么呀") is None
+
+
+def test_self_contained_cacheable():
+    """不依赖上下文的问题可以缓存"""
+    cache = make_cache()
+    for question in ("你叫什么名字", "为什么天空是蓝色的", "再见"):
+        assert cache.is_cacheable(question), question
+
+
+def test_exclude_long_question():
+    """超过字数上限的问题不缓存"""
+    cache = make_cache(max_chars=5)
+    assert not cache.is_cacheable("你叫什么名字")
+
+
+# ==================== 有效期 ====================
+
+def test_ttl_expired():
+    """超过有效期的条目不再命中并被淘汰"""
+    cache = make_cache(ttl_hours=1)
+    cache.put("u1", "你叫什么名字", "我叫小元。")
+    assert cache.lookup("u1", "你叫什么名字") is not None
+    for entry in cache._entries.values():
+        entry.created -= 3601
+    assert cache.lookup("u1", "你叫什么名字") is None
+    assert len(cache) == 0
+    assert cache.evictions == 1
+
+
+def main():
+    """主函数"""
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  [OK] {name}")
+        except AssertionError as e:
+            print(f"  [FAIL] {name}: {e}")
+            failed += 1
+    print(f"\n答案缓存测试: {len(tests) - failed} 通过, {failed} 失败")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
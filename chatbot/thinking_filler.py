@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+思考垫音
+
+功能：
+1. 识别完成后，按对话路由的首字延迟统计估计本轮的静默时长，预计较长时立即从本地 PCM 播一句简短应答
+2. 按意图和预计时长选择垫音：闲聊 "嗯"、提问 "我想一下"、预计很久 "让我好好想一想"；同类轮流使用
+3. 第一帧真正的合成音频写入输出流前截断垫音：按输出流的播放位置算出垫音播到哪里，
+   丢弃未交给声卡的部分，补一小段淡出，避免硬切造成的爆音
+4. 可随时取消（打断、新一轮录音、对话失败）
+5. 统计触发次数、跳过次数、被截断/完整播完的次数和垫音覆盖的静默时长
+
+说明：
+- 垫音短语由本地拼接播报（phrase_bank.py）启动时预合成，还没合成好时播放本地生成的两声提示音
+- 垫音写入常开的 PCM 输出流（pcm_player.py），与合成音频共用同一个时钟
+"""
+
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    FILLER_ENABLED, FILLER_MIN_EXPECTED_MS, FILLER_LONG_EXPECTED_MS,
+    FILLER_DEFAULT_FIRST_TOKEN_MS, FILLER_TTS_OVERHEAD_MS, FILLER_FADE_MS, FILLER_PHRASES
+)
+from chat_router import get_chat_router
+from pcm_player import PCMPlayer, get_pcm_player
+from phrase_bank import get_phrase_bank
+
+
+class ThinkingFiller:
+    """
+    思考垫音
+
+    使用示例:
+        filler = get_thinking_filler()
+        filler.start(user_input)   # 识别完成、发起对话请求前
+        ...
+        filler.cut()               # 第一帧合成音频写入输出流前（StreamingTTSWorker 自动调用）
+        filler.cancel()            # 打断
+    """
+
+    # 提问句特征
+    _QUESTION_PATTERN = re.compile(r'[吗呢？?]\s*$|什么|怎么|为什么|为啥|哪|几|多少|谁|是不是|能不能|可不可以|有没有')
+
+    def __init__(self, player: Optional[PCMPlayer] = None, enabled: bool = None):
+        """
+        初始化垫音
+
+        Args:
+            player: PCM 输出流，默认使用全局单例
+            enabled: 是否启用
+        """
+        self.player = player or get_pcm_player()
+        self.enabled = FILLER_ENABLED if enabled is None else enabled
+        self.phrase_bank = get_phrase_bank()
+        self.fade_samples = self.player.sample_rate * FILLER_FADE_MS // 1000
+
+        self._lock = threading.Lock()
+        self._audio: Optional[np.ndarray] = None  # 正在播放的垫音
+        self._fired_at = 0.0
+        self._speech_started = False  # 本轮合成音频已开始写入（之后不再播垫音）
+        self._turns: Dict[str, int] = {kind: 0 for kind in FILLER_PHRASES}  # 各类垫音轮换位置
+        self._chime: Optional[bytes] = None
+
+        # 统计信息
+        self.fired = 0       # 播放垫音次数
+        self.skipped = 0     # 预计静默较短、不播垫音的次数
+        self.cut_short = 0   # 合成音频到达时垫音还没播完（被截断）
+        self.completed = 0   # 合成音频到达前垫音已播完
+        self.cancelled = 0   # 被打断或对话失败取消
+        self._covered: List[float] = []  # 每次垫音覆盖的静默时长（秒）
+        self._gaps: List[float] = []     # 每次从触发到合成音频到达的总时长（秒）
+
+    # ==================== 选择 ====================
+
+    def prepare(self):
+        """启动时后台预合成所有垫音短语"""
+        if self.enabled:
+            self.phrase_bank.learn([p for phrases in FILLER_PHRASES.values() for p in phrases])
+
+    def expected_silence(self, text: str) -> float:
+        """
+        估计本轮从识别完成到第一帧合成音频的静默时长
+
+        Returns:
+            秒
+        """
+        first_token = get_chat_router().expected_first_token(text)
+        if first_token is None:
+            first_token = FILLER_DEFAULT_FIRST_TOKEN_MS / 1000
+        return first_token + FILLER_TTS_OVERHEAD_MS / 1000
+
+    def select(self, text: str, expected: float) -> Tuple[str, str]:
+        """
+        按预计时长和意图选择垫音
+
+        Returns:
+            (类别, 短语)
+        """
+        if expected * 1000 >= FILLER_LONG_EXPECTED_MS:
+            kind = "long"
+        elif self._QUESTION_PATTERN.search(text):
+            kind = "question"
+        else:
+            kind = "chat"
+        phrases = FILLER_PHRASES[kind]
+        phrase = phrases[self._turns[kind] % len(phrases)]
+        self._turns[kind] += 1
+        return kind, phrase
+
+    def _chime_audio(self) -> bytes:
+        """本地生成的提示音（两声短促的柔和正弦音）"""
+        if self._chime is None:
+            rate = self.player.sample_rate
+            notes = []
+            for frequency in (660.0, 880.0):
+                t = np.arange(int(rate * 0.09)) / rate
+                envelope = np.sin(np.pi * t / t[-1]) ** 2
+                notes.append(np.sin(2 * np.pi * frequency * t) * envelope * 3000)
+                notes.append(np.zeros(int(rate * 0.04)))
+            self._chime = np.concatenate(notes).astype(np.int16).tobytes()
+        return self._chime
+
+    # ==================== 播放与截断 ====================
+
+    def start(self, text: str, elapsed: float = 0.0) -> bool:
+        """
+        识别完成后按需播放垫音
+
+        Args:
+            text: 用户输入
+            elapsed: 对话请求已经提前发出的时间（秒，推测请求命中时）
+
+        Returns:
+            是否播放了垫音
+        """
+        if not self.enabled:
+            return False
+        expected = self.expected_silence(text) - elapsed
+        if expected * 1000 < FILLER_MIN_EXPECTED_MS:
+            self.skipped += 1
+            return False
+
+        kind, phrase = self.select(text, expected)
+        audio = self.phrase_bank.compose([phrase])
+        if audio is None:
+            phrase = "提示音"
+            audio = self._chime_audio()
+
+        with self._lock:
+            if self._speech_started:
+                # 推测请求等提前发出的回复已经出声
+                return False
+            self._discard_locked()
+            if not self.player.open():
+                return False
+            self.player.write(audio)
+            self._audio = np.frombuffer(audio, dtype=np.int16)
+            self._fired_at = time.time()
+            self.fired += 1
+        print(f"[Filler] 预计静默 {expected * 1000:.0f}ms，播放垫音（{kind}）: {phrase}")
+        return True
+
+    def cut(self):
+        """第一帧合成音频写入输出流前调用：截断未播完的垫音并记录覆盖时长"""
+        self._speech_started = True
+        if self._audio is None:
+            return
+        with self._lock:
+            if self._audio is None:
+                return
+            gap = time.time() - self._fired_at
+            covered, truncated = self._discard_locked()
+            if truncated:
+                self.cut_short += 1
+            else:
+                self.completed += 1
+            self._covered.append(covered)
+            self._gaps.append(gap)
+        print(f"[Filler] 合成音频就绪（触发后 {gap * 1000:.0f}ms），垫音覆盖 {covered * 1000:.0f}ms")
+
+    def cancel(self):
+        """取消垫音（打断、新一轮录音、对话失败），新一轮开始时也用来复位"""
+        self._speech_started = False
+        if self._audio is None:
+            return
+        with self._lock:
+            if self._audio is not None:
+                self._discard_locked()
+                self.cancelled += 1
+
+    def _discard_locked(self) -> Tuple[float, bool]:
+        """
+        丢弃垫音中还没交给声卡的部分并淡出（调用方持有锁）
+
+        Returns:
+            (垫音实际出声的时长（秒）, 是否被截断)
+        """
+        audio, self._audio = self._audio, None
+        if audio is None:
+            return 0.0, False
+        # 输出流游标之前的数据已交给声卡，一定会播出；之后的部分丢弃
+        discarded = min(self.player.flush(), len(audio))
+        if discarded:
+            # 从截断处取一小段淡出，接在已交给声卡的数据后面
+            offset = len(audio) - discarded
+            tail = audio[offset:offset + self.fade_samples].astype(np.float32)
+            tail *= np.linspace(1.0, 0.0, len(tail), dtype=np.float32)
+            self.player.write(tail.astype(np.int16).tobytes())
+        return (len(audio) - discarded) / self.player.sample_rate, discarded > 0
+
+    def stats(self) -> Dict[str, float]:
+        """垫音统计"""
+        result = {
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "cut": self.cut_short,
+            "completed": self.completed,
+            "cancelled": self.cancelled
+        }
+        if self._covered:
+            result["covered_ms_avg"] = round(float(np.mean(self._covered)) * 1000)
+            result["gap_ms_avg"] = round(float(np.mean(self._gaps)) * 1000)
+        return result
+
+
+# 全局单例
+_thinking_filler: Optional[ThinkingFiller] = None
+
+
+def get_thinking_filler() -> ThinkingFiller:
+    """
+    获取思考垫音单例
+
+    Returns:
+        ThinkingFiller 实例
+    """
+    global _thinking_filler
+    if _thinking_filler is None:
+        _thinking_filler = ThinkingFiller()
+    return _thinking_filler
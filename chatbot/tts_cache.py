@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+合成音频磁盘缓存
+
+功能：
+1. 固定提示语（注册引导、错误提示、"没有录到声音"等）合成一次后保存到磁盘，再次播报直接读文件
+2. 缓存键是文本、音色、格式、采样率、语速、音量拼接后的哈希，任一参数变化都不会命中旧音频
+3. 目录大小有上限，超过时淘汰最久未使用的文件（LRU）
+4. 统计命中率
+
+存储方式：
+- 每条缓存一个文件：<哈希>.<格式>，写入时先写临时文件再替换，不会读到写了一半的文件
+- 不单独保存索引：启动时扫描目录，按修改时间恢复使用顺序；命中时更新文件修改时间，重启后顺序不丢
+
+说明：
+- 命中时只读一个本地小文件（几十 KB，亚毫秒级），不建立合成连接，也不产生合成计费
+- 只缓存短文本（TTS_CACHE_MAX_CHARS），对话回复很少逐字重复，由答案缓存（answer_cache.py）负责
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config import (
+    TTS_CACHE_ENABLED, TTS_CACHE_DIR, TTS_CACHE_MAX_MB, TTS_CACHE_MAX_CHARS,
+    TTS_SPEAKER, TTS_SPEECH_RATE, TTS_LOUDNESS_RATE
+)
+
+
+class TTSCache:
+    """
+    合成音频磁盘缓存
+
+    使用示例:
+        cache = get_tts_cache()
+        audio = cache.get(text, "pcm", 24000)
+        if audio is None:
+            audio = synthesize(text)
+            cache.put(text, "pcm", 24000, audio)
+    """
+
+    def __init__(self, directory: str = None, max_mb: float = None,
+                 max_chars: int = None, enabled: bool = None):
+        """
+        初始化缓存
+
+        Args:
+            directory: 缓存文件目录
+            max_mb: 目录大小上限（MB）
+            max_chars: 超过这个字数的文本不缓存
+            enabled: 是否启用缓存
+        """
+        self.directory = directory or TTS_CACHE_DIR
+        self.max_bytes = int((max_mb or TTS_CACHE_MAX_MB) * 1024 * 1024)
+        self.max_chars = max_chars or TTS_CACHE_MAX_CHARS
+        self.enabled = TTS_CACHE_ENABLED if enabled is None else enabled
+
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # 文件名 -> 字节数，按使用顺序（最久未使用在前）
+        self._total = 0
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.lookups = 0    # 查询次数
+        self.hits = 0       # 命中次数
+        self.evictions = 0  # 淘汰文件数
+
+        if self.enabled:
+            self._load_index()
+
+    # ==================== 索引 ====================
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间恢复使用顺序"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        # 上次退出时没写完的临时文件
+                        os.remove(entry.path)
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except OSError as e:
+            print(f"[TTSCache] 读取缓存目录失败，禁用缓存: {e}")
+            self.enabled = False
+            return
+
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total += size
+        if entries:
+            print(f"[TTSCache] 加载 {len(self._index)} 条缓存音频（{self._total / 1024 / 1024:.1f}MB）")
+        self._evict()
+
+    @staticmethod
+    def key(text: str, audio_format: str, sample_rate: int, speaker: str = None,
+            speech_rate: int = None, loudness_rate: int = None) -> str:
+        """
+        计算缓存文件名
+
+        Args:
+            text: 合成文本
+            audio_format: 音频格式（mp3 / pcm ...）
+            sample_rate: 采样率
+            speaker: 音色，默认 TTS_SPEAKER
+            speech_rate: 语速，默认 TTS_SPEECH_RATE
+            loudness_rate: 音量，默认 TTS_LOUDNESS_RATE
+
+        Returns:
+            <哈希>.<格式>
+        """
+        parts = [
+            text.strip(),
+            speaker or TTS_SPEAKER,
+            audio_format,
+            str(sample_rate),
+            str(TTS_SPEECH_RATE if speech_rate is None else speech_rate),
+            str(TTS_LOUDNESS_RATE if loudness_rate is None else loudness_rate)
+        ]
+        digest = hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+        return f"{digest}.{audio_format}"
+
+    def is_cacheable(self, text: str) -> bool:
+        """文本是否适合缓存（非空且不超过字数上限）"""
+        text = text.strip()
+        return self.enabled and 0 < len(text) <= self.max_chars
+
+    # ==================== 读写 ====================
+
+    def get(self, text: str, audio_format: str, sample_rate: int, **params) -> Optional[bytes]:
+        """
+        查询缓存
+
+        Args:
+            text: 合成文本
+            audio_format: 音频格式
+            sample_rate: 采样率
+            **params: speaker / speech_rate / loudness_rate（默认取配置）
+
+        Returns:
+            缓存的音频，未命中返回 None
+        """
+        if not self.is_cacheable(text):
+            return None
+        name = self.key(text, audio_format, sample_rate, **params)
+        path = os.path.join(self.directory, name)
+
+        with self._lock:
+            self.lookups += 1
+            if name not in self._index:
+                return None
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)  # 记录使用时间，重启后仍能恢复 LRU 顺序
+            except OSError:
+                # 文件被外部删除
+                self._total -= self._index.pop(name)
+                return None
+            self._index.move_to_end(name)
+            self.hits += 1
+        print(f"[TTSCache] 命中合成缓存: {text.strip()[:20]}（{len(audio) / 1024:.0f}KB）")
+        return audio
+
+    def put(self, text: str, audio_format: str, sample_rate: int, audio: bytes, **params) -> bool:
+        """
+        写入缓存（超过目录大小上限时淘汰最久未使用的文件）
+
+        Args:
+            text: 合成文本
+            audio_format: 音频格式
+            sample_rate: 采样率
+            audio: 完整的合成音频
+            **params: speaker / speech_rate / loudness_rate（默认取配置）
+
+        Returns:
+            是否写入
+        """
+        if not audio or not self.is_cacheable(text) or len(audio) > self.max_bytes:
+            return False
+        name = self.key(text, audio_format, sample_rate, **params)
+        path = os.path.join(self.directory, name)
+
+        with self._lock:
+            try:
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[TTSCache] 写入缓存失败: {e}")
+                return False
+            self._total += len(audio) - self._index.pop(name, 0)
+            self._index[name] = len(audio)
+            self._evict()
+        print(f"[TTSCache] 缓存合成音频: {text.strip()[:20]}（{len(audio) / 1024:.0f}KB）")
+        return True
+
+    def _evict(self):
+        """淘汰最久未使用的文件，直到目录大小不超过上限（调用方持有锁或在初始化中）"""
+        while self._total > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空缓存（更换音色或合成参数后可调用，释放旧文件）"""
+        with self._lock:
+            for name in list(self._index):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._total = 0
+
+    def stats(self) -> Dict[str, float]:
+        """缓存统计"""
+        return {
+            "entries": len(self._index),
+            "size_mb": round(self._total / 1024 / 1024, 2),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+# 全局单例
+_tts_cache: Optional[TTSCache] = None
+
+
+def get_tts_cache() -> TTSCache:
+    """
+    获取合成音频缓存单例
+
+    Returns:
+        TTSCache 实例
+    """
+    global _tts_cache
+    if _tts_cache is None:
+        _tts_cache = TTSCache()
+    return _tts_cache
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+语音活动检测（VAD）模块
+
+功能：
+1. 使用 NumPy 向量化计算每帧音频的峰值、RMS、过零率
+2. 自适应噪声基底：拖尾之外的静音帧缓慢更新背景噪声估计，阈值随环境噪声浮动；说话时不会抬高阈值
+3. 拖尾平滑（hangover）：语音结束后保持若干毫秒的"有声"状态，避免句间停顿被误判为结束
+4. 按音频时长（而不是墙钟时间）累计尾部静音，供录音自动结束判断
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from config import (
+    AUDIO_RATE,
+    VAD_MIN_RMS, VAD_NOISE_RATIO, VAD_HANGOVER, VAD_MIN_SPEECH
+)
+
+
+@dataclass
+class FrameFeatures:
+    """单帧音频特征"""
+    peak: int = 0       # 峰值振幅
+    rms: float = 0.0    # 均方根能量
+    zcr: float = 0.0    # 过零率（0-1）
+
+
+def frame_features(audio_data: bytes) -> FrameFeatures:
+    """
+    计算 16-bit PCM 音频帧特征
+
+    Args:
+        audio_data: 16-bit 小端 PCM 数据
+
+    Returns:
+        FrameFeatures 对象
+    """
+    sample_count = len(audio_data) // 2
+    if sample_count == 0:
+        return FrameFeatures()
+
+    # 零拷贝视图，奇数字节时截掉最后一个字节
+    samples = np.frombuffer(audio_data, dtype=np.int16, count=sample_count)
+
+    # 用 int 比较避免 abs(-32768) 在 int16 下溢出
+    peak = max(int(samples.max()), -int(samples.min()))
+
+    floats = samples.astype(np.float32)
+    rms = float(np.sqrt(np.dot(floats, floats) / sample_count))
+
+    if sample_count > 1:
+        signs = np.signbit(samples)
+        zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / (sample_count - 1)
+    else:
+        zcr = 0.0
+
+    return FrameFeatures(peak=peak, rms=rms, zcr=zcr)
+
+
+class VoiceActivityDetector:
+    """
+    自适应语音活动检测器
+
+    使用示例:
+        vad = VoiceActivityDetector()
+        for chunk in chunks:
+            vad.process(chunk)
+            if vad.has_speech and vad.trailing_silence >= SILENCE_TIMEOUT:
+                break  # 用户说完了
+    """
+
+    # 过零率高于此值且能量接近阈值时视为清辅音（s/sh/f 等能量弱但过零率高）
+    FRICATIVE_ZCR = 0.25
+    FRICATIVE_RATIO = 0.6
+    # 连续"语音"超过此时长（秒）仍无一帧低于阈值且能量起伏很小，视为稳定噪声（风扇、空调），用期间最小 RMS 重估噪声基底
+    STATIONARY_RESET = 5.0
+    # 稳定噪声判定：期间最大 RMS 不超过最小 RMS 的这个倍数（说话时能量起伏远大于此）
+    STATIONARY_SPREAD = 2.0
+    # 噪声基底上升时的平滑系数（每帧向当前 RMS 靠拢的比例，取小值避免被轻声字尾逐帧抬高）
+    NOISE_ALPHA = 0.02
+    # 只有 RMS 低于噪声基底这个倍数的静音帧才用来抬高基底（接近阈值的帧可能是轻声语音）
+    NOISE_ADAPT_RATIO = 1.5
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_RATE,
+        min_threshold: float = VAD_MIN_RMS,
+        noise_ratio: float = VAD_NOISE_RATIO,
+        hangover: float = VAD_HANGOVER,
+        min_speech: float = VAD_MIN_SPEECH
+    ):
+        """
+        初始化检测器
+
+        Args:
+            sample_rate: 采样率
+            min_threshold: RMS 阈值下限（安静环境下的判定阈值）
+            noise_ratio: 语音判定阈值 = 噪声基底 × noise_ratio
+            hangover: 拖尾时长（秒），语音帧之后保持有声状态的时间
+            min_speech: 连续语音超过此时长（秒）才认为用户开始说话
+        """
+        self.sample_rate = sample_rate
+        self.min_threshold = min_threshold
+        self.noise_ratio = noise_ratio
+        self.hangover = hangover
+        self.min_speech = min_speech
+        self.reset()
+
+    def reset(self):
+        """重置状态（每次录音开始时调用）"""
+        self.noise_floor: Optional[float] = None
+        self.features = FrameFeatures()
+        self.is_speech = False          # 平滑后的有声状态
+        self.has_speech = False         # 本次录音是否检测到过有效语音
+        self.trailing_silence = 0.0     # 平滑后的尾部静音时长（秒）
+        self._speech_run = 0.0          # 当前连续语音时长
+        self._run_min_rms = 0.0         # 当前连续语音中的最小 RMS
+        self._run_max_rms = 0.0         # 当前连续语音中的最大 RMS
+        self._hangover_left = 0.0       # 剩余拖尾时长
+
+    @property
+    def threshold(self) -> float:
+        """当前语音判定阈值"""
+        if self.noise_floor is None:
+            return self.min_threshold
+        return max(self.min_threshold, self.noise_floor * self.noise_ratio)
+
+    def process(self, audio_data: bytes) -> bool:
+        """
+        处理一帧音频
+
+        Args:
+            audio_data: 16-bit PCM 数据
+
+        Returns:
+            平滑后的有声状态
+        """
+        features = frame_features(audio_data)
+        self.features = features
+        duration = (len(audio_data) // 2) / self.sample_rate
+        if duration <= 0:
+            return self.is_speech
+
+        threshold = self.threshold
+        raw_speech = features.rms > threshold or (
+            features.rms > threshold * self.FRICATIVE_RATIO
+            and features.zcr >= self.FRICATIVE_ZCR
+        )
+
+        if raw_speech:
+            if self._speech_run == 0:
+                self._run_min_rms = self._run_max_rms = features.rms
+            else:
+                self._run_min_rms = min(self._run_min_rms, features.rms)
+                self._run_max_rms = max(self._run_max_rms, features.rms)
+            self._speech_run += duration
+            if self._speech_run >= self.STATIONARY_RESET:
+                # 能量起伏小才是稳定噪声；持续说话时能量起伏大，不重估，避免说话中途抬高阈值
+                if self._run_max_rms <= self._run_min_rms * self.STATIONARY_SPREAD:
+                    self.noise_floor = self._run_min_rms
+                self._speech_run = 0.0
+            self._hangover_left = self.hangover
+            if self._speech_run >= self.min_speech:
+                self.has_speech = True
+            self.is_speech = True
+            self.trailing_silence = 0.0
+        else:
+            self._speech_run = 0.0
+            if self._hangover_left > 0:
+                # 拖尾期间可能是轻声的字尾，不用来估计噪声
+                self._hangover_left -= duration
+                self.is_speech = True
+            else:
+                self._update_noise_floor(features.rms)
+                self.is_speech = False
+                self.trailing_silence += duration
+
+        return self.is_speech
+
+    def _update_noise_floor(self, rms: float):
+        """
+        用拖尾之外的静音帧更新噪声基底
+
+        噪声变小时立即跟随；变大时只接受明显低于阈值的帧（低于噪声基底的 NOISE_ADAPT_RATIO 倍），
+        并缓慢跟随，接近阈值的轻声语音不会把基底逐帧抬高
+        """
+        if self.noise_floor is None or rms < self.noise_floor:
+            self.noise_floor = rms
+            return
+        # 基底很低（接近数字静音）时按阈值下限对应的基底判断，否则基底永远抬不起来
+        reference = max(self.noise_floor, self.min_threshold / self.noise_ratio)
+        if rms < reference * self.NOISE_ADAPT_RATIO:
+            self.noise_floor += self.NOISE_ALPHA * (rms - self.noise_floor)
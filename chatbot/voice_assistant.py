@@ -20,10 +20,11 @@ import threading
 import queue
 import tempfile
 import uuid
-import struct
-import gzip
 import time
-from typing import Optional, List, Dict
+import re
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, List, Dict, Tuple
 
 # PyQt6 图形界面
 from PyQt6.QtWidgets import (
@@ -46,10 +47,12 @@ from config import (
     # 语音识别配置
     ASR_APPID, ASR_ACCESS_TOKEN, ASR_WS_URL, ASR_RESOURCE_ID,
     AUDIO_FORMAT, AUDIO_CHANNELS, AUDIO_RATE, AUDIO_CHUNK,
-    SILENCE_THRESHOLD, SILENCE_TIMEOUT, FINAL_WAIT_TIMEOUT,
+    AUDIO_RING_SECONDS, AUDIO_PREROLL_MS,
+    SILENCE_TIMEOUT, FINAL_WAIT_TIMEOUT,
     # 对话模型配置
     CHAT_API_KEY, CHAT_API_URL, CHAT_MODEL_NAME,
     CHAT_MAX_TOKENS, CHAT_TEMPERATURE, CHAT_STREAM, CHAT_THINKING,
+    SPECULATIVE_CHAT_ENABLED, SPECULATIVE_STABLE_MS, SPECULATIVE_MAX_PER_TURN,
     # Base64图文分析配置
     IMAGE_ANALYSIS_STREAM, IMAGE_ANALYSIS_MAX_TOKENS, IMAGE_ANALYSIS_TEMPERATURE,
     IMAGE_MAX_WIDTH, IMAGE_MAX_HEIGHT, IMAGE_QUALITY,
@@ -64,6 +67,7 @@ from config import (
     # 语音合成配置
     TTS_APPID, TTS_ACCESS_TOKEN, TTS_WS_URL, TTS_RESOURCE_ID,
     TTS_SPEAKER, TTS_FORMAT, TTS_SAMPLE_RATE, TTS_SPEECH_RATE, TTS_LOUDNESS_RATE,
+    TTS_STREAM_FORMAT, TTS_JITTER_BUFFER_MS, TTS_MAX_INFLIGHT_SENTENCES, TTS_INFLIGHT_WAIT_SECONDS,
     # 界面配置
     WINDOW_TITLE, WINDOW_WIDTH, WINDOW_HEIGHT, TEMP_AUDIO_PATH,
     # 网络配置
@@ -83,11 +87,59 @@ from object_detection_utils import ObjectDetector, check_yolo_available
 # 导入声纹识别模块
 from speaker_recognition_utils import SpeakerRecognitionManager, check_resemblyzer_available
 
+# 导入 ASR 连接池模块
+from asr_connection_pool import get_asr_connection_pool
+
+# 导入对话接口长连接模块
+from chat_http_client import ChatHTTPClient, get_chat_http_client
+
+# 导入对冲请求模块
+from chat_hedge import get_chat_hedger
+
+# 导入对话快慢路由模块
+from chat_router import get_chat_router
+from context_builder import get_context_builder
+
+# 导入本地答案缓存模块
+from answer_cache import get_answer_cache
+
+# 导入语音活动检测模块
+from vad import VoiceActivityDetector
+
+# 导入录音环形缓冲区模块
+from audio_ring import AudioRingBuffer, as_bytes_view
+
+# 导入连续 PCM 播放模块
+from pcm_player import PCMPlayer, get_pcm_player
+from text_segmenter import TextSegmenter
+
+# 导入合成音频磁盘缓存模块
+from tts_cache import get_tts_cache
+from phrase_bank import get_phrase_bank
+
+# 导入思考垫音模块
+from thinking_filler import get_thinking_filler
+
+# 导入豆包语音二进制协议编解码模块
+from volc_protocol import (
+    AudioFrameEncoder, build_full_client_request, build_audio_request,
+    build_event_request, parse_asr_response, parse_tts_response, is_last_package,
+    EVENT_START_CONNECTION, EVENT_FINISH_CONNECTION, EVENT_CONNECTION_STARTED,
+    EVENT_START_SESSION, EVENT_CANCEL_SESSION, EVENT_FINISH_SESSION,
+    EVENT_SESSION_STARTED, EVENT_SESSION_CANCELED, EVENT_SESSION_FINISHED, EVENT_SESSION_FAILED,
+    EVENT_TASK_REQUEST, EVENT_TTS_SENTENCE_START, EVENT_TTS_SENTENCE_END
+)
+
 # 导入 Mem0 记忆模块
 from mem0_client import Mem0Client, get_mem0_client
+from memory_prefetch import get_memory_prefetcher
+from memory_writer import get_memory_writer
+from memory_migration import get_memory_migrator
+from memory_mirror import get_memory_mirror
+from circuit_breaker import get_circuit_monitor
 from config import (
-    MEM0_ENABLED, MEM0_CONTEXT_TEMPLATE, MEM0_EXTRACTION_PROMPT,
-    MEM0_SIMILARITY_THRESHOLD
+    MEM0_ENABLED, MEM0_CONTEXT_TEMPLATE,
+    MEM0_DEADLINE_MS
 )
 
 
@@ -106,6 +158,7 @@ class WorkerSignals(QObject):
     chat_chunk = pyqtSignal(str)            # AI 流式回复片段
     chat_reply = pyqtSignal(str)            # AI 回复完成（完整文本）
     chat_error = pyqtSignal(str)            # 对话错误
+    memory_searched = pyqtSignal(str, float)  # 记忆取回结果（界面显示文本，等待毫秒数）
 
     # 语音合成相关信号
     tts_started = pyqtSignal()              # TTS 开始播放
@@ -121,29 +174,39 @@ class WorkerSignals(QObject):
 class AudioRecorder:
     """
     音频录制器
-    负责从麦克风采集 PCM 音频数据，支持缓冲区存储
+
+    PyAudio 回调模式把麦克风数据写入固定容量的环形缓冲区，读取方按游标取零拷贝视图。
+    AUDIO_PREROLL_MS 大于 0 时麦克风常开，start() 从按下按钮前 AUDIO_PREROLL_MS 的位置开始读，
+    建连期间的音频也留在缓冲区里，连接建立后一次性补发。
     """
 
     def __init__(self):
         self.p: Optional[pyaudio.PyAudio] = None
         self.stream = None
         self.is_recording = False
-        self.audio_queue = queue.Queue()
-        self.audio_buffer: List[bytes] = []  # 音频缓冲区，用于存储连接建立前的音频
+        self.always_on = AUDIO_PREROLL_MS > 0
+        self.ring = AudioRingBuffer.for_duration(
+            AUDIO_RING_SECONDS + AUDIO_PREROLL_MS / 1000, AUDIO_RATE
+        )
+        self._data_ready = threading.Condition()
+        self._cursor = 0          # 读取游标（绝对采样位置）
+        self.session = 0          # 录音序号，旧识别线程收尾时不会停掉新一轮录音
+        self.session_start = 0    # 本次录音起点（含 pre-roll）
 
-    def start(self, device_index: int = None) -> bool:
+    def open(self, device_index: int = None) -> bool:
         """
-        开始录音
+        打开麦克风，开始向环形缓冲区采集音频（已打开时直接返回）
 
         Args:
             device_index: 指定的音频输入设备索引，None 表示使用默认设备
 
         Returns:
-            bool: 是否成功开始录音
+            bool: 麦克风是否可用
         """
+        if self.stream is not None:
+            return True
         try:
             self.p = pyaudio.PyAudio()
-            self.audio_buffer = []  # 清空缓冲区
 
             # 获取默认设备信息
             if device_index is None:
@@ -156,60 +219,85 @@ class AudioRecorder:
                 rate=AUDIO_RATE,             # 16kHz 采样率
                 input=True,                  # 输入模式
                 input_device_index=device_index,  # 指定输入设备
-                frames_per_buffer=AUDIO_CHUNK  # 每帧 320 样本 (20ms)
+                frames_per_buffer=AUDIO_CHUNK,  # 每帧 3200 样本 (200ms)
+                stream_callback=self._on_audio
             )
-            self.is_recording = True
             return True
         except Exception as e:
-            print(f"[AudioRecorder] 录音启动失败: {e}")
+            print(f"[AudioRecorder] 麦克风打开失败: {e}")
             import traceback
             traceback.print_exc()
             self.cleanup()
             return False
 
-    def read_chunk(self) -> Optional[bytes]:
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PyAudio 采集回调（音频线程）"""
+        self.ring.write(in_data)
+        with self._data_ready:
+            self._data_ready.notify_all()
+        return (None, pyaudio.paContinue)
+
+    def start(self, device_index: int = None) -> bool:
         """
-        读取一帧音频数据
+        开始录音
+
+        Args:
+            device_index: 指定的音频输入设备索引，None 表示使用默认设备
 
         Returns:
-            bytes: 音频数据，如果未在录音则返回 None
+            bool: 是否成功开始录音
         """
-        if not self.is_recording or self.stream is None:
-            return None
-        try:
-            data = self.stream.read(AUDIO_CHUNK, exception_on_overflow=False)
-            return data
-        except Exception as e:
-            print(f"[AudioRecorder] 读取音频失败: {e}")
-            return None
+        if not self.open(device_index):
+            return False
+
+        preroll = self.ring.samples_for(AUDIO_PREROLL_MS / 1000) if self.always_on else 0
+        self.session += 1
+        self.session_start = max(self.ring.position - preroll, self.ring.oldest)
+        self._cursor = self.session_start
+        self.is_recording = True
+        return True
+
+    @property
+    def pending_samples(self) -> int:
+        """已采集但尚未读取的采样数"""
+        return self.ring.position - max(self._cursor, self.ring.oldest)
 
-    def read_chunk_to_buffer(self) -> Optional[bytes]:
+    def read_chunk(self, timeout: float = 1.0) -> Optional[memoryview]:
         """
-        读取一帧音频数据并存入缓冲区
+        读取一帧音频数据（积压时立即返回，否则等待下一帧采集完成）
+
+        Args:
+            timeout: 最长等待时间（秒）
 
         Returns:
-            bytes: 音频数据，如果未在录音则返回 None
+            memoryview: 指向环形缓冲区的 PCM 字节视图，未在录音或超时返回 None
         """
-        data = self.read_chunk()
-        if data:
-            self.audio_buffer.append(data)
-        return data
+        with self._data_ready:
+            self._data_ready.wait_for(
+                lambda: not self.is_recording or self.pending_samples >= AUDIO_CHUNK,
+                timeout
+            )
+        if not self.is_recording:
+            return None
+        samples, self._cursor = self.ring.read_since(self._cursor, AUDIO_CHUNK)
+        if len(samples) == 0:
+            return None
+        return as_bytes_view(samples)
 
-    def get_buffered_audio(self) -> List[bytes]:
+    def stop(self, session: Optional[int] = None):
         """
-        获取并清空缓冲区中的音频数据
+        停止录音（常开模式下麦克风继续采集 pre-roll）
 
-        Returns:
-            List[bytes]: 缓冲区中的音频帧列表
+        Args:
+            session: 要停止的录音序号，与当前录音不一致时忽略，None 表示无条件停止
         """
-        buffered = self.audio_buffer
-        self.audio_buffer = []
-        return buffered
-
-    def stop(self):
-        """停止录音"""
+        if session is not None and session != self.session:
+            return
         self.is_recording = False
-        self.cleanup()
+        with self._data_ready:
+            self._data_ready.notify_all()
+        if not self.always_on:
+            self.cleanup()
 
     def cleanup(self):
         """清理资源"""
@@ -236,224 +324,64 @@ class ASRWorker(QThread):
     1. 录制音频
     2. 通过 WebSocket 发送音频帧
     3. 接收并处理识别结果
+
+    WebSocket 连接从 ASR 连接池中获取（已预热），识别协程运行在连接池的事件循环上
+    录音器由主窗口持有（常开麦克风，保留 pre-roll），声纹识别直接取录音器环形缓冲区中的本次录音
     """
 
-    def __init__(self, signals: WorkerSignals):
+    def __init__(self, signals: WorkerSignals, recorder: Optional[AudioRecorder] = None):
         super().__init__()
         self.signals = signals
-        self.recorder = AudioRecorder()
+        self.recorder = recorder or AudioRecorder()
+        self.connection_pool = get_asr_connection_pool()
         self.is_running = False
         self.final_text = ""
-        self.audio_chunks: List[bytes] = []  # 缓存原始音频用于声纹识别
+        self._session = 0
+        self._audio_start = 0     # 本次录音在环形缓冲区中的区间（用于声纹识别）
+        self._audio_end = 0
 
     def run(self):
         """线程主函数"""
         self.is_running = True
         self.final_text = ""
-        self.audio_chunks = []  # 清空音频缓存
-        self.ws_ready = False  # WebSocket 连接是否就绪
 
         # 先启动录音，不等待连接
         if not self.recorder.start():
             self.signals.asr_error.emit("麦克风启动失败，请检查设备连接")
             return
+        self._session = self.recorder.session
+        self._audio_start = self._audio_end = self.recorder.session_start
 
         self.signals.recording_started.emit()
 
-        # 启动后台线程持续采集音频到缓冲区（在连接建立前）
-        def buffer_audio():
-            while self.is_running and not self.ws_ready:
-                self.recorder.read_chunk_to_buffer()
-                time.sleep(0.01)  # 避免CPU占用过高
-
-        buffer_thread = threading.Thread(target=buffer_audio, daemon=True)
-        buffer_thread.start()
-
-        # 运行异步事件循环
+        # 在连接池事件循环上运行识别协程
         try:
-            asyncio.run(self._stream_asr())
+            self.connection_pool.run(self._stream_asr())
         except Exception as e:
             self.signals.asr_error.emit(f"语音识别异常: {str(e)}")
         finally:
-            self.recorder.stop()
+            self.recorder.stop(self._session)
             self.signals.recording_stopped.emit()
 
-    def _build_header(self, message_type: int, message_type_flags: int,
-                       serialization: int, compression: int) -> bytes:
-        """
-        构建 ASR 二进制协议 header（4字节）
-
-        Args:
-            message_type: 消息类型 (4 bits)
-            message_type_flags: 消息类型标志 (4 bits)
-            serialization: 序列化方法 (4 bits)
-            compression: 压缩方法 (4 bits)
-
-        Returns:
-            4字节 header
-        """
-        # Byte 0: Protocol version (0b0001) + Header size (0b0001)
-        byte0 = 0x11
-        # Byte 1: Message type + Message type specific flags
-        byte1 = (message_type << 4) | message_type_flags
-        # Byte 2: Serialization method + Compression
-        byte2 = (serialization << 4) | compression
-        # Byte 3: Reserved
-        byte3 = 0x00
-        return bytes([byte0, byte1, byte2, byte3])
-
-    def _build_full_client_request(self, payload: dict, use_gzip: bool = True) -> bytes:
-        """
-        构建 full client request 二进制包
-
-        Args:
-            payload: JSON 请求参数
-            use_gzip: 是否使用 gzip 压缩
-
-        Returns:
-            完整的二进制请求包
-        """
-        payload_bytes = json.dumps(payload).encode('utf-8')
-        if use_gzip:
-            payload_bytes = gzip.compress(payload_bytes)
-
-        # message_type=0b0001 (Full client request)
-        # message_type_flags=0b0000 (无 sequence number)
-        # serialization=0b0001 (JSON)
-        # compression=0b0001 (Gzip) 或 0b0000 (无压缩)
-        compression = 0b0001 if use_gzip else 0b0000
-        header = self._build_header(0b0001, 0b0000, 0b0001, compression)
-
-        # Payload size (4 bytes, big-endian)
-        payload_size = struct.pack('>I', len(payload_bytes))
-
-        return header + payload_size + payload_bytes
-
-    def _build_audio_request(self, audio_data: bytes, is_last: bool = False,
-                             use_gzip: bool = True) -> bytes:
-        """
-        构建 audio only request 二进制包
-
-        Args:
-            audio_data: 音频数据
-            is_last: 是否为最后一包
-            use_gzip: 是否使用 gzip 压缩
-
-        Returns:
-            完整的二进制请求包
-        """
-        if use_gzip and audio_data:
-            payload_bytes = gzip.compress(audio_data)
-        else:
-            payload_bytes = audio_data
-
-        # message_type=0b0010 (Audio only request)
-        # message_type_flags: 0b0000 (正常包) 或 0b0010 (最后一包)
-        message_type_flags = 0b0010 if is_last else 0b0000
-        # serialization=0b0000 (Raw)
-        # compression=0b0001 (Gzip) 或 0b0000 (无压缩)
-        compression = 0b0001 if use_gzip and audio_data else 0b0000
-        header = self._build_header(0b0010, message_type_flags, 0b0000, compression)
-
-        # Payload size (4 bytes, big-endian)
-        payload_size = struct.pack('>I', len(payload_bytes))
-
-        return header + payload_size + payload_bytes
-
-    def _parse_response(self, data: bytes) -> Optional[dict]:
-        """
-        解析 ASR 二进制响应
-
-        Args:
-            data: 二进制响应数据
-
-        Returns:
-            解析后的 JSON 对象，失败返回 None
-        """
-        if len(data) < 4:
-            return None
-
-        # 解析 header
-        header = data[:4]
-        message_type = (header[1] >> 4) & 0x0F
-        message_type_flags = header[1] & 0x0F
-        serialization = (header[2] >> 4) & 0x0F
-        compression = header[2] & 0x0F
-
-        offset = 4
-
-        # 检查是否有 sequence number
-        if message_type_flags in (0b0001, 0b0011):
-            offset += 4  # 跳过 sequence number
-
-        # 检查消息类型
-        if message_type == 0b1111:
-            # 错误消息
-            if len(data) < offset + 8:
-                return {"error": True, "code": -1, "message": "Invalid error frame"}
-            error_code = struct.unpack('>I', data[offset:offset+4])[0]
-            error_size = struct.unpack('>I', data[offset+4:offset+8])[0]
-            error_msg = data[offset+8:offset+8+error_size].decode('utf-8', errors='ignore')
-            return {"error": True, "code": error_code, "message": error_msg}
-
-        if message_type != 0b1001:
-            # 非 full server response
-            return None
-
-        # 解析 payload
-        if len(data) < offset + 4:
-            return None
-
-        payload_size = struct.unpack('>I', data[offset:offset+4])[0]
-        offset += 4
-
-        if len(data) < offset + payload_size:
-            return None
-
-        payload_bytes = data[offset:offset+payload_size]
-
-        # 解压缩
-        if compression == 0b0001:
-            try:
-                payload_bytes = gzip.decompress(payload_bytes)
-            except:
-                pass
-
-        # 解析 JSON
-        if serialization == 0b0001:
-            try:
-                return json.loads(payload_bytes.decode('utf-8'))
-            except:
-                return None
-
-        return None
-
     async def _stream_asr(self):
         """
         流式语音识别主逻辑
 
         流程：
-        1. 建立 WebSocket 连接（使用正确的 HTTP Header 鉴权）
+        1. 从连接池取出预热连接（没有则现场建连，建连期间录音继续写入环形缓冲区）
         2. 发送初始化参数（二进制协议）
-        3. 发送缓冲区中的音频（在连接建立前已录制的）
+        3. 补发缓冲区中积压的音频（pre-roll + 建连期间录制的）
         4. 并行发送音频帧和接收识别结果
         """
         try:
-            # 构造正确的请求头（根据完整文档）
-            connect_id = str(uuid.uuid4())
-            headers = {
-                "X-Api-App-Key": ASR_APPID,
-                "X-Api-Access-Key": ASR_ACCESS_TOKEN,
-                "X-Api-Resource-Id": ASR_RESOURCE_ID,
-                "X-Api-Connect-Id": connect_id
-            }
+            websocket = self.connection_pool.acquire_nowait()
+            if websocket is not None:
+                print("[ASR] 使用预热连接")
+            else:
+                print("[ASR] 无可用预热连接，现场建立连接")
+                websocket = await self.connection_pool.connect()
 
-            async with websockets.connect(
-                ASR_WS_URL,
-                additional_headers=headers,
-                ping_interval=20,
-                ping_timeout=10
-            ) as websocket:
+            async with websocket:
 
                 # 构造初始化参数
                 init_params = {
@@ -480,12 +408,9 @@ class ASRWorker(QThread):
                 }
 
                 # 发送 full client request（二进制协议）
-                request_packet = self._build_full_client_request(init_params)
+                request_packet = build_full_client_request(init_params)
                 await websocket.send(request_packet)
 
-                # 标记连接就绪，停止缓冲线程
-                self.ws_ready = True
-
                 # 并行任务：发送音频 + 接收结果
                 send_task = asyncio.create_task(self._send_audio(websocket))
                 recv_task = asyncio.create_task(self._recv_result(websocket))
@@ -499,8 +424,9 @@ class ASRWorker(QThread):
             self.signals.asr_error.emit(f"语音识别连接失败: {str(e)}")
         finally:
             # 发送原始音频数据信号（用于声纹识别）
-            if self.audio_chunks:
-                all_audio = b''.join(self.audio_chunks)
+            session_audio = self.recorder.ring.view(self._audio_start, self._audio_end)
+            if len(session_audio):
+                all_audio = session_audio.tobytes()
                 self.signals.asr_audio_data.emit(all_audio)
                 print(f"[ASR] 发送音频数据用于声纹识别: {len(all_audio)} 字节")
 
@@ -514,68 +440,46 @@ class ASRWorker(QThread):
         Args:
             websocket: WebSocket 连接对象
         """
-        import array
-
+        loop = asyncio.get_running_loop()
         frame_count = 0
         max_amplitude = 0
 
-        # 静音检测相关
-        last_voice_time = time.time()  # 最后检测到声音的时间
-        has_detected_voice = False  # 是否已检测到过声音
+        # 静音检测（自适应噪声基底 + 拖尾平滑，按音频时长累计静音）
+        vad = VoiceActivityDetector()
 
-        try:
-            # 先发送缓冲区中的音频（在连接建立前已录制的）
-            buffered_frames = self.recorder.get_buffered_audio()
-            if buffered_frames:
-                print(f"[ASR] 发送缓冲区中的 {len(buffered_frames)} 帧音频")
-                for audio_data in buffered_frames:
-                    self.audio_chunks.append(audio_data)  # 缓存音频用于声纹识别
-                    audio_packet = self._build_audio_request(audio_data, is_last=False, use_gzip=False)
-                    await websocket.send(audio_packet)
-                    frame_count += 1
+        # 复用同一块缓冲区编码音频帧（每帧 send 完成后才编码下一帧）
+        encoder = AudioFrameEncoder(AUDIO_CHUNK * 2)
 
-                    # 检测缓冲区音频中是否有声音
-                    samples = array.array('h', audio_data)
-                    frame_max = max(abs(s) for s in samples) if samples else 0
-                    max_amplitude = max(max_amplitude, frame_max)
-                    if frame_max > SILENCE_THRESHOLD:
-                        last_voice_time = time.time()
-                        has_detected_voice = True
+        try:
+            # 积压的音频（pre-roll + 建连期间录制的）由 read_chunk 立即返回，随后转为实时发送
+            backlog = self.recorder.pending_samples
+            if backlog:
+                print(f"[ASR] 补发缓冲区中 {backlog / AUDIO_RATE * 1000:.0f}ms 音频")
 
-            # 继续发送实时录制的音频
             while self.is_running:
-                audio_data = self.recorder.read_chunk()
+                # 录音读取是阻塞调用，放到线程池执行，保证接收任务和连接池补充任务不被卡住
+                audio_data = await loop.run_in_executor(None, self.recorder.read_chunk)
                 if audio_data:
-                    self.audio_chunks.append(audio_data)  # 缓存音频用于声纹识别
-
-                    # 计算音频振幅（检测是否有有效声音）
-                    samples = array.array('h', audio_data)
-                    frame_max = max(abs(s) for s in samples) if samples else 0
-                    max_amplitude = max(max_amplitude, frame_max)
-
-                    # 静音检测：检查是否有声音
-                    if frame_max > SILENCE_THRESHOLD:
-                        last_voice_time = time.time()
-                        has_detected_voice = True
-
-                    # 静音超时检测：只有在检测到声音后才开始计时
-                    if has_detected_voice:
-                        silence_duration = time.time() - last_voice_time
-                        if silence_duration >= SILENCE_TIMEOUT:
-                            print(f"[ASR] 静音 {SILENCE_TIMEOUT}秒，自动结束")
-                            self.is_running = False
-                            break
+                    self._audio_end += len(audio_data) // 2
+
+                    # 语音活动检测
+                    vad.process(audio_data)
+                    max_amplitude = max(max_amplitude, vad.features.peak)
+
+                    # 静音超时检测：只有在检测到有效语音后才开始计时
+                    if vad.has_speech and vad.trailing_silence >= SILENCE_TIMEOUT:
+                        print(f"[ASR] 静音 {SILENCE_TIMEOUT}秒，自动结束（噪声基底 {vad.noise_floor or 0:.0f}，阈值 {vad.threshold:.0f}）")
+                        self.is_running = False
+                        break
 
                     # 构建音频请求包
-                    audio_packet = self._build_audio_request(audio_data, is_last=False, use_gzip=False)
-                    await websocket.send(audio_packet)
+                    await websocket.send(encoder.encode(audio_data))
                     frame_count += 1
                 else:
                     await asyncio.sleep(0.01)
 
             # 发送结束帧
-            end_packet = self._build_audio_request(b"", is_last=True, use_gzip=False)
-            await websocket.send(end_packet)
+            await websocket.send(build_audio_request(b"", is_last=True))
             print(f"[ASR] 共发送 {frame_count} 帧，最大振幅 {max_amplitude}")
 
         except Exception as e:
@@ -619,7 +523,7 @@ class ASRWorker(QThread):
 
                 # 处理二进制响应
                 if isinstance(response, bytes):
-                    res = self._parse_response(response)
+                    res = parse_asr_response(response)
                     if res is None:
                         print(f"[ASR] 解析响应失败")
                         continue
@@ -660,11 +564,9 @@ class ASRWorker(QThread):
                         print(f"[ASR] 识别文本: {text}")
 
                     # 检查 message_type_flags 是否为最后一包（通过 header 解析）
-                    if len(response) >= 4:
-                        message_type_flags = response[1] & 0x0F
-                        if message_type_flags in (0b0010, 0b0011):
-                            is_finished = True
-                            print(f"[ASR] 收到最后一包标志")
+                    if is_last_package(response):
+                        is_finished = True
+                        print(f"[ASR] 收到最后一包标志")
 
                     if is_finished:
                         print(f"[ASR] 识别完成: {self.final_text}")
@@ -695,7 +597,7 @@ class ASRWorker(QThread):
     def stop(self):
         """停止识别"""
         self.is_running = False
-        self.recorder.stop()
+        self.recorder.stop(self._session)
 
 
 # ==================== 文本对话模块（支持Base64图文分析） ====================  # MODIFIED
@@ -719,12 +621,17 @@ class ChatWorker(QThread):
         self.is_running = True
         self.use_image_analysis_mode = False     # 强制使用非流式模式
         self.memory_context: Optional[str] = None  # Mem0 记忆上下文
+        self.memory_future: Optional[Future] = None  # 进行中的记忆搜索（在本线程等待，不阻塞界面）
+        self.memory_deadline: Optional[float] = None  # 记忆搜索截止时刻
+        self.allow_hedge = True                  # 首片段超时是否允许发出对冲请求
 
     def set_input(self, text: str, history: List[Dict[str, str]] = None,
                   image_base64: Optional[str] = None,
                   image_path: Optional[str] = None,
                   use_image_analysis_mode: bool = False,
-                  memory_context: Optional[str] = None):
+                  memory_context: Optional[str] = None,
+                  memory_future: Optional[Future] = None,
+                  memory_deadline: Optional[float] = None):
         """
         设置用户输入和对话历史
 
@@ -735,6 +642,8 @@ class ChatWorker(QThread):
             image_path: 临时图片路径（可选，用于清理）
             use_image_analysis_mode: 强制使用非流式图文分析模式（用于提示词中已包含图片的情况）
             memory_context: 记忆上下文（可选，用于注入用户相关信息）
+            memory_future: 进行中的记忆搜索（可选，线程启动后等待结果并构建记忆上下文）
+            memory_deadline: 记忆搜索截止时刻（time.time() 时间戳）
         """
         self.user_input = text
         self.history = history or []
@@ -742,6 +651,8 @@ class ChatWorker(QThread):
         self.image_path = image_path
         self.use_image_analysis_mode = use_image_analysis_mode
         self.memory_context = memory_context
+        self.memory_future = memory_future
+        self.memory_deadline = memory_deadline
 
     def stop(self):
         """停止对话"""
@@ -758,6 +669,12 @@ class ChatWorker(QThread):
         # 发送"正在思考"信号
         self.signals.chat_thinking.emit()
 
+        # 在本线程等待记忆搜索（与合成会话握手并行，界面线程不等待）
+        if self.memory_future is not None:
+            self.memory_context = self._wait_memories()
+            if not self.is_running:
+                return
+
         # 判断是否为图文分析模式
         if self.image_base64 or self.use_image_analysis_mode:
             # 图文分析模式：非流式调用
@@ -776,6 +693,42 @@ class ChatWorker(QThread):
             delete_temp_image(self.image_path)
             self.image_path = None
 
+    def _wait_memories(self) -> Optional[str]:
+        """
+        等待记忆搜索并构建记忆上下文，最多等到截止时刻，超时不带记忆继续
+
+        Returns:
+            记忆上下文字符串，无记忆或超时返回 None
+        """
+        start_time = time.time()
+        try:
+            memories = get_memory_prefetcher().wait(self.memory_future, self.memory_deadline)
+        except Exception as e:
+            print(f"[Mem0] 搜索记忆失败: {e}")
+            self.signals.memory_searched.emit("记忆搜索: 失败", 0.0)
+            return None
+
+        # 记录耗时（对话线程实际等待的时间）
+        wait_ms = (time.time() - start_time) * 1000
+        if memories is None:
+            self.signals.memory_searched.emit(f"记忆搜索: 超时跳过 ({wait_ms:.0f}ms)", wait_ms)
+            return None
+        print(f"[计时] 记忆搜索等待: {wait_ms:.0f}ms")
+
+        # 预取器已按来源（本地镜像 / 远程搜索）的阈值过滤低相似度记忆
+        if not memories:
+            self.signals.memory_searched.emit(f"记忆搜索: {wait_ms:.0f}ms (0条)", wait_ms)
+            return None
+
+        # 构建记忆上下文（超出记忆预算时截掉相关度最低的）
+        memory_texts = get_context_builder().fit_memories([m.memory for m in memories])
+        self.signals.memory_searched.emit(f"记忆搜索: {wait_ms:.0f}ms ({len(memories)}条)", wait_ms)
+        if not memory_texts:
+            return None
+        print(f"[Mem0] 找到 {len(memories)} 条相关记忆")
+        memories_str = "\n".join(f"- {text}" for text in memory_texts)
+        return MEM0_CONTEXT_TEMPLATE.format(memories=memories_str)
+
     def _build_image_analysis_prompt(self, user_question: str, image_base64: str) -> str:  # NEW
         """
         构建图文分析提示词
@@ -831,7 +784,7 @@ class ChatWorker(QThread):
         print(f"[Chat] 发送图文分析请求: model={CHAT_MODEL_NAME}, stream={IMAGE_ANALYSIS_STREAM}")
 
         try:
-            response = requests.post(
+            response = get_chat_http_client().post(
                 CHAT_API_URL,
                 headers=headers,
                 data=json.dumps(data),
@@ -885,87 +838,45 @@ class ChatWorker(QThread):
             "Content-Type": "application/json"
         }
 
-        # 构造请求体（精简历史，只保留最近2轮对话）
-        recent_history = self.history[-4:] if len(self.history) > 4 else self.history
-
-        # 构建消息列表
-        messages = []
-
-        # 如果有记忆上下文，作为系统消息注入
+        # 按 token 预算装入记忆上下文、历史摘要和最近对话
         if self.memory_context:
-            messages.append({"role": "system", "content": self.memory_context})
             print(f"[Chat] 注入记忆上下文: {len(self.memory_context)} 字符")
+        messages = get_context_builder().build(self.user_input, self.history, self.memory_context)
 
-        # 添加历史对话和当前用户输入
-        messages.extend(recent_history)
-        messages.append({"role": "user", "content": self.user_input})
+        # 简单闲聊走快速档（轻量模型、较小的 max_tokens），其余走完整档
+        router = get_chat_router()
+        profile = router.route(self.user_input).profile
 
         data = {
-            "model": CHAT_MODEL_NAME,
+            "model": profile.model,
             "messages": messages,
-            "max_completion_tokens": CHAT_MAX_TOKENS,
-            "temperature": CHAT_TEMPERATURE,
+            "max_completion_tokens": profile.max_tokens,
+            "temperature": profile.temperature,
             "stream": CHAT_STREAM
         }
 
         # 如果配置了 thinking 参数，添加到请求中
-        if CHAT_THINKING:
-            data["thinking"] = {"type": CHAT_THINKING}
-
-        print(f"[Chat] 发送流式请求: model={CHAT_MODEL_NAME}, stream={CHAT_STREAM}")
-
-        # 指数退避重试（处理 429 限流错误）
-        max_retries = MAX_RETRIES
-        base_delay = 1.0  # 初始等待时间（秒）
-        response = None
-
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    CHAT_API_URL,
-                    headers=headers,
-                    data=json.dumps(data),
-                    timeout=REQUEST_TIMEOUT,
-                    stream=True  # 开启流式响应
-                )
-
-                # 处理 429 限流错误
-                if response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)  # 指数退避: 1s, 2s, 4s...
-                        print(f"[Chat] 触发限流 (429)，第 {attempt + 1} 次重试，等待 {delay:.1f}s...")
-                        time.sleep(delay)
-                        continue
-                    else:
-                        print(f"[Chat] 限流重试次数已达上限 ({max_retries})")
-                        return None
-
-                response.raise_for_status()
-                break  # 请求成功，跳出重试循环
-
-            except requests.exceptions.Timeout:
-                print(f"[Chat] 流式请求超时")
-                return None
-            except requests.exceptions.RequestException as e:
-                # 检查是否是 429 错误需要重试
-                if hasattr(e, 'response') and e.response is not None and e.response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)
-                        print(f"[Chat] 触发限流 (429)，第 {attempt + 1} 次重试，等待 {delay:.1f}s...")
-                        time.sleep(delay)
-                        continue
-                print(f"[Chat] 流式请求异常: {e}")
-                return None
-
-        # 请求成功后处理响应
-        if response is None:
+        if profile.thinking:
+            data["thinking"] = {"type": profile.thinking}
+
+        print(f"[Chat] 发送流式请求: model={profile.model}, stream={CHAT_STREAM}")
+        request_start = time.time()
+        first_chunk_time = None
+
+        # 超过预算时间还没收到首片段时发出对冲请求，先到先用
+        stream = get_chat_hedger().open(
+            lambda: self._open_stream(headers, data),
+            lambda: self.is_running,
+            hedge=self.allow_hedge
+        )
+        if stream is None:
             return None
 
         try:
             full_reply = ""
 
             # 逐行解析流式返回
-            for line in response.iter_lines():
+            for line in stream.iter_lines():
                 if not self.is_running:
                     print("[Chat] 流式请求被中断")
                     break
@@ -1001,6 +912,8 @@ class ChatWorker(QThread):
                             delta = choices[0].get("delta", {})
                             chunk = delta.get("content", "")
                             if chunk:
+                                if first_chunk_time is None:
+                                    first_chunk_time = time.time() - request_start
                                 full_reply += chunk
                                 # 发送流式片段信号
                                 self.signals.chat_chunk.emit(chunk)
@@ -1009,6 +922,8 @@ class ChatWorker(QThread):
                         # 非 JSON 行，跳过
                         continue
 
+            if full_reply and self.is_running:
+                router.record(profile.name, first_chunk_time, time.time() - request_start)
             return full_reply if full_reply else None
 
         except Exception as e:
@@ -1016,6 +931,174 @@ class ChatWorker(QThread):
             import traceback
             traceback.print_exc()
             return None
+        finally:
+            # 正常结束时把连接放回连接池，被打断则直接断开
+            ChatHTTPClient.release(stream.response, reuse=self.is_running)
+
+    def _open_stream(self, headers: dict, data: dict) -> Optional[requests.Response]:
+        """
+        发送一次流式请求，429 限流时指数退避重试
+
+        Returns:
+            requests.Response，失败返回 None
+        """
+        # 指数退避重试（处理 429 限流错误）
+        max_retries = MAX_RETRIES
+        base_delay = 1.0  # 初始等待时间（秒）
+        response = None
+
+        for attempt in range(max_retries):
+            try:
+                response = get_chat_http_client().post(
+                    CHAT_API_URL,
+                    headers=headers,
+                    data=json.dumps(data),
+                    timeout=REQUEST_TIMEOUT,
+                    stream=True  # 开启流式响应
+                )
+
+                # 处理 429 限流错误
+                if response.status_code == 429:
+                    ChatHTTPClient.release(response)
+                    if attempt < max_retries - 1:
+                        delay = base_delay * (2 ** attempt)  # 指数退避: 1s, 2s, 4s...
+                        print(f"[Chat] 触发限流 (429)，第 {attempt + 1} 次重试，等待 {delay:.1f}s...")
+                        time.sleep(delay)
+                        continue
+                    else:
+                        print(f"[Chat] 限流重试次数已达上限 ({max_retries})")
+                        return None
+
+                response.raise_for_status()
+                break  # 请求成功，跳出重试循环
+
+            except requests.exceptions.Timeout:
+                print(f"[Chat] 流式请求超时")
+                return None
+            except requests.exceptions.RequestException as e:
+                # 检查是否是 429 错误需要重试
+                if hasattr(e, 'response') and e.response is not None and e.response.status_code == 429:
+                    if attempt < max_retries - 1:
+                        delay = base_delay * (2 ** attempt)
+                        print(f"[Chat] 触发限流 (429)，第 {attempt + 1} 次重试，等待 {delay:.1f}s...")
+                        time.sleep(delay)
+                        continue
+                print(f"[Chat] 流式请求异常: {e}")
+                return None
+
+        return response
+
+
+# ==================== 推测式对话模块 ====================
+class SpeculativeChat(QObject):
+    """
+    推测式对话请求
+
+    识别中间结果稳定后，用中间结果提前调用对话模型：
+    - 提交前：对话输出（思考/片段/完成/错误）缓存在本地，不触发 UI 和 TTS
+    - 提交（commit）：最终识别结果一致，按原顺序转发缓存的输出，之后的输出直接转发
+    - 取消（cancel）：最终识别结果不一致，停止请求并丢弃输出
+
+    提交前不会启动 TTS，因此取消时只需停止对话请求本身。
+    """
+
+    # 比较中间结果与最终结果时忽略的字符（标点、空白）
+    _IGNORED_CHARS = re.compile(r'[\s，。！？、；：,.!?;:…~]')
+
+    def __init__(self, text: str, user_id: Optional[str], main_signals: WorkerSignals):
+        """
+        Args:
+            text: 推测用的识别中间结果
+            user_id: 发起推测时的用户 ID（记忆搜索依赖用户，用户变化则不能采用）
+            main_signals: 主界面信号，提交后向其转发对话输出
+        """
+        super().__init__()
+        self.text = text
+        self.key = self.normalize(text)
+        self.user_id = user_id
+        self.main_signals = main_signals
+        self.start_time = 0.0
+        self.memory_label = "记忆搜索: --"   # 推测时的记忆搜索耗时显示，采用后恢复到界面
+        self.committed = False
+        self.cancelled = False
+        self.failed = False                  # 提交前已出错（采用时改走正常请求）
+        self._replaying = False
+        self._pending: List[Tuple[str, tuple]] = []  # 提交前缓存的 (信号名, 参数)
+
+        # 对话线程使用独立信号，输出先经过本对象中转
+        self.signals = WorkerSignals()
+        self.signals.chat_thinking.connect(self._on_thinking)
+        self.signals.chat_chunk.connect(self._on_chunk)
+        self.signals.chat_reply.connect(self._on_reply)
+        self.signals.chat_error.connect(self._on_error)
+        self.signals.memory_searched.connect(self._on_memory_searched)
+        self.worker = ChatWorker(self.signals)
+        self.worker.allow_hedge = False  # 推测请求本身已是额外开销，不再对冲
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """去掉标点和空白，用于比较中间结果与最终结果"""
+        return cls._IGNORED_CHARS.sub('', text or '')
+
+    def start(self, history: List[Dict[str, str]], memory_future: Optional[Future] = None,
+              memory_deadline: Optional[float] = None):
+        """启动推测请求（记忆搜索在对话线程中等待）"""
+        self.start_time = time.time()
+        self.worker.set_input(self.text, list(history),
+                              memory_future=memory_future, memory_deadline=memory_deadline)
+        self.worker.start()
+
+    def matches(self, text: str, user_id: Optional[str]) -> bool:
+        """最终识别结果和用户是否与推测时一致，且推测请求仍然有效"""
+        return (not self.cancelled and not self.failed
+                and self.user_id == user_id
+                and self.key == self.normalize(text))
+
+    def commit(self):
+        """采用推测请求：按顺序转发缓存的输出，之后的输出直接转发"""
+        self.committed = True
+        # 转发过程中槽函数可能处理事件（processEvents），新到的输出继续排队，保证顺序
+        self._replaying = True
+        while self._pending:
+            name, args = self._pending.pop(0)
+            getattr(self.main_signals, name).emit(*args)
+        self._replaying = False
+
+    def cancel(self):
+        """取消推测请求，丢弃已缓存和后续的输出"""
+        self.cancelled = True
+        self._pending.clear()
+        if self.worker.isRunning():
+            self.worker.stop()
+
+    def _relay(self, name: str, *args):
+        """转发或缓存对话输出"""
+        if self.cancelled:
+            return
+        if self.committed and not self._replaying:
+            getattr(self.main_signals, name).emit(*args)
+        else:
+            self._pending.append((name, args))
+
+    def _on_thinking(self):
+        self._relay("chat_thinking")
+
+    def _on_chunk(self, chunk: str):
+        self._relay("chat_chunk", chunk)
+
+    def _on_reply(self, reply: str):
+        self._relay("chat_reply", reply)
+
+    def _on_memory_searched(self, label: str, wait_ms: float):
+        # 采用前只记下，采用时由主界面恢复；采用后才取回的直接转发
+        self.memory_label = label
+        if self.committed and not self.cancelled:
+            self.main_signals.memory_searched.emit(label, wait_ms)
+
+    def _on_error(self, error: str):
+        if not self.committed:
+            self.failed = True
+        self._relay("chat_error", error)
 
 
 # ==================== 语音合成与播放模块 ====================
@@ -1086,12 +1169,19 @@ class TTSWorker(QThread):
             self.signals.tts_error.emit("合成文本为空")
             return
 
-        # 通过 WebSocket 合成语音
-        try:
-            asyncio.run(self._stream_tts())
-        except Exception as e:
-            self.signals.tts_error.emit(f"语音合成异常: {str(e)}")
-            return
+        # 先查合成缓存，未命中再通过 WebSocket 合成语音
+        tts_cache = get_tts_cache()
+        cached = tts_cache.get(self.text, TTS_FORMAT, TTS_SAMPLE_RATE)
+        if cached:
+            self.audio_data = cached
+        else:
+            try:
+                asyncio.run(self._stream_tts())
+            except Exception as e:
+                self.signals.tts_error.emit(f"语音合成异常: {str(e)}")
+                return
+            if self.audio_data:
+                tts_cache.put(self.text, TTS_FORMAT, TTS_SAMPLE_RATE, self.audio_data)
 
         if self.audio_data:
             # 保存音频文件
@@ -1109,166 +1199,6 @@ class TTSWorker(QThread):
         else:
             self.signals.tts_error.emit("语音合成失败")
 
-    def _build_tts_header(self, message_type: int, message_type_flags: int,
-                          serialization: int, compression: int) -> bytes:
-        """
-        构建 TTS 二进制协议 header（4字节）
-        """
-        byte0 = 0x11  # Protocol version (0b0001) + Header size (0b0001)
-        byte1 = (message_type << 4) | message_type_flags
-        byte2 = (serialization << 4) | compression
-        byte3 = 0x00  # Reserved
-        return bytes([byte0, byte1, byte2, byte3])
-
-    def _build_event_request(self, event: int, session_id: str = "",
-                             payload: dict = None) -> bytes:
-        """
-        构建带事件的请求包
-
-        Args:
-            event: 事件类型
-            session_id: 会话 ID（仅 Session 类事件需要）
-            payload: JSON 负载
-
-        Returns:
-            完整的二进制请求包
-        """
-        # message_type=0b0001 (Full client request)
-        # message_type_flags=0b0100 (with event number)
-        # serialization=0b0001 (JSON)
-        # compression=0b0000 (无压缩)
-        header = self._build_tts_header(0b0001, 0b0100, 0b0001, 0b0000)
-
-        # Event number (4 bytes, big-endian)
-        event_bytes = struct.pack('>I', event)
-
-        result = header + event_bytes
-
-        # Session ID（仅 Session 类事件需要）
-        if event in (self.EVENT_START_SESSION, self.EVENT_FINISH_SESSION,
-                     self.EVENT_CANCEL_SESSION, self.EVENT_TASK_REQUEST):
-            session_id_bytes = session_id.encode('utf-8')
-            session_id_size = struct.pack('>I', len(session_id_bytes))
-            result += session_id_size + session_id_bytes
-
-        # Payload
-        if payload is None:
-            payload = {}
-        payload_bytes = json.dumps(payload).encode('utf-8')
-        payload_size = struct.pack('>I', len(payload_bytes))
-        result += payload_size + payload_bytes
-
-        return result
-
-    def _parse_tts_response(self, data: bytes) -> dict:
-        """
-        解析 TTS 二进制响应
-
-        Args:
-            data: 二进制响应数据
-
-        Returns:
-            解析后的响应对象
-        """
-        if len(data) < 4:
-            return {"error": True, "message": "响应数据过短"}
-
-        # 解析 header
-        header = data[:4]
-        message_type = (header[1] >> 4) & 0x0F
-        message_type_flags = header[1] & 0x0F
-        serialization = (header[2] >> 4) & 0x0F
-        compression = header[2] & 0x0F
-
-        offset = 4
-
-        # 检查错误帧
-        if message_type == 0b1111:
-            if len(data) < offset + 4:
-                return {"error": True, "message": "错误帧格式无效"}
-            error_code = struct.unpack('>I', data[offset:offset+4])[0]
-            offset += 4
-            if len(data) >= offset + 4:
-                payload_size = struct.unpack('>I', data[offset:offset+4])[0]
-                offset += 4
-                if len(data) >= offset + payload_size:
-                    try:
-                        error_payload = json.loads(data[offset:offset+payload_size].decode('utf-8'))
-                        return {"error": True, "code": error_code, "payload": error_payload}
-                    except:
-                        pass
-            return {"error": True, "code": error_code}
-
-        result = {"message_type": message_type, "flags": message_type_flags}
-
-        # 解析事件号（如果有）
-        if message_type_flags == 0b0100:
-            if len(data) < offset + 4:
-                return {"error": True, "message": "缺少事件号"}
-            event = struct.unpack('>I', data[offset:offset+4])[0]
-            result["event"] = event
-            offset += 4
-
-        # 音频响应 (Audio-only response)
-        if message_type == 0b1011:
-            # 解析 session_id
-            if len(data) >= offset + 4:
-                session_id_size = struct.unpack('>I', data[offset:offset+4])[0]
-                offset += 4
-                if len(data) >= offset + session_id_size:
-                    result["session_id"] = data[offset:offset+session_id_size].decode('utf-8')
-                    offset += session_id_size
-
-            # 解析音频数据
-            if len(data) >= offset + 4:
-                audio_size = struct.unpack('>I', data[offset:offset+4])[0]
-                offset += 4
-                if len(data) >= offset + audio_size:
-                    result["audio"] = data[offset:offset+audio_size]
-            return result
-
-        # Full server response
-        if message_type == 0b1001:
-            # Session 类事件需要解析 session_id
-            event = result.get("event", 0)
-            if event in (self.EVENT_SESSION_STARTED, self.EVENT_SESSION_FINISHED,
-                         self.EVENT_SESSION_FAILED, self.EVENT_SESSION_CANCELED,
-                         self.EVENT_TTS_SENTENCE_START, self.EVENT_TTS_SENTENCE_END):
-                if len(data) >= offset + 4:
-                    session_id_size = struct.unpack('>I', data[offset:offset+4])[0]
-                    offset += 4
-                    if len(data) >= offset + session_id_size:
-                        result["session_id"] = data[offset:offset+session_id_size].decode('utf-8')
-                        offset += session_id_size
-
-            # Connection 类事件需要解析 connection_id
-            elif event in (self.EVENT_CONNECTION_STARTED, self.EVENT_CONNECTION_FAILED,
-                           self.EVENT_CONNECTION_FINISHED):
-                if len(data) >= offset + 4:
-                    conn_id_size = struct.unpack('>I', data[offset:offset+4])[0]
-                    offset += 4
-                    if len(data) >= offset + conn_id_size:
-                        result["connection_id"] = data[offset:offset+conn_id_size].decode('utf-8')
-                        offset += conn_id_size
-
-            # 解析 payload
-            if len(data) >= offset + 4:
-                payload_size = struct.unpack('>I', data[offset:offset+4])[0]
-                offset += 4
-                if len(data) >= offset + payload_size:
-                    payload_bytes = data[offset:offset+payload_size]
-                    if compression == 0b0001:
-                        try:
-                            payload_bytes = gzip.decompress(payload_bytes)
-                        except:
-                            pass
-                    try:
-                        result["payload"] = json.loads(payload_bytes.decode('utf-8'))
-                    except:
-                        result["payload"] = {}
-
-        return result
-
     async def _stream_tts(self):
         """
         WebSocket 双向流式 TTS 主逻辑
@@ -1291,12 +1221,12 @@ class TTSWorker(QThread):
             ) as websocket:
 
                 # 1. 发送 StartConnection
-                start_conn_packet = self._build_event_request(self.EVENT_START_CONNECTION)
+                start_conn_packet = build_event_request(self.EVENT_START_CONNECTION)
                 await websocket.send(start_conn_packet)
 
                 # 等待 ConnectionStarted
                 response = await asyncio.wait_for(websocket.recv(), timeout=10)
-                res = self._parse_tts_response(response)
+                res = parse_tts_response(response)
                 if res.get("error") or res.get("event") != self.EVENT_CONNECTION_STARTED:
                     raise Exception(f"连接失败: {res}")
                 print("[TTS] 连接已建立")
@@ -1318,14 +1248,14 @@ class TTSWorker(QThread):
                         }
                     }
                 }
-                start_session_packet = self._build_event_request(
+                start_session_packet = build_event_request(
                     self.EVENT_START_SESSION, self.session_id, session_params
                 )
                 await websocket.send(start_session_packet)
 
                 # 等待 SessionStarted
                 response = await asyncio.wait_for(websocket.recv(), timeout=10)
-                res = self._parse_tts_response(response)
+                res = parse_tts_response(response)
                 if res.get("error") or res.get("event") != self.EVENT_SESSION_STARTED:
                     raise Exception(f"会话启动失败: {res}")
                 print("[TTS] 会话已开始")
@@ -1337,13 +1267,13 @@ class TTSWorker(QThread):
                         "text": self.text
                     }
                 }
-                task_packet = self._build_event_request(
+                task_packet = build_event_request(
                     self.EVENT_TASK_REQUEST, self.session_id, task_params
                 )
                 await websocket.send(task_packet)
 
                 # 4. 发送 FinishSession
-                finish_session_packet = self._build_event_request(
+                finish_session_packet = build_event_request(
                     self.EVENT_FINISH_SESSION, self.session_id
                 )
                 await websocket.send(finish_session_packet)
@@ -1353,7 +1283,7 @@ class TTSWorker(QThread):
                 while True:
                     try:
                         response = await asyncio.wait_for(websocket.recv(), timeout=30)
-                        res = self._parse_tts_response(response)
+                        res = parse_tts_response(response)
 
                         if res.get("error"):
                             print(f"[TTS] 错误: {res}")
@@ -1380,7 +1310,7 @@ class TTSWorker(QThread):
                         break
 
                 # 6. 发送 FinishConnection
-                finish_conn_packet = self._build_event_request(self.EVENT_FINISH_CONNECTION)
+                finish_conn_packet = build_event_request(self.EVENT_FINISH_CONNECTION)
                 await websocket.send(finish_conn_packet)
 
         except websockets.exceptions.ConnectionClosed as e:
@@ -1417,50 +1347,50 @@ class StreamingTTSWorker(QThread):
     流式语音合成工作线程
 
     功能：
-    1. 接收文本片段，按标点切分成句子
-    2. 每个句子立即调用 TTS 合成
-    3. 将合成的音频片段放入队列
-    4. 后台线程按顺序无缝播放队列中的音频
+    1. 线程启动时（AI 开始思考）建立一条双向 TTS 连接和一个会话，与对话模型首字并行握手
+    2. 接收文本片段，由切分器（text_segmenter.py）切分，每段作为一个 TaskRequest 发送到同一会话：
+       第一段在第一个逗号或几个字后就切出，尽早出声；后续分段逐渐变长，保持自然语调
+    3. 服务端按 TaskRequest 顺序返回 PCM 音频，每收到一帧立即放入播放队列，不等整句合成完
+    4. 后台线程攒够一小段抖动缓冲后按顺序写入常开的 PCM 输出流（pcm_player.py），句与句之间无缝衔接
 
-    实现"边生成边播放"，大幅减少等待时间
-    """
+    一轮回复只有一次握手，句与句之间不再重新建连，服务端也能保持跨句的韵律连贯；
+    同一时刻最多 TTS_MAX_INFLIGHT_SENTENCES 句已发送未合成完，其余句子留在文本队列中按顺序等待
 
-    # 句子分隔符（只用句末标点，保持句子完整性和自然语调）
-    SENTENCE_DELIMITERS = ["。", "！", "？", "；", "\n", "!", "?", ";"]
+    传入 cached_audio 时（答案缓存或合成缓存命中）不建立合成会话，直接播放缓存的音频；
+    设置 cache_text 时（固定提示语），完整合成后把音频写入合成缓存
+    """
 
-    # 最大缓冲字数（禁用，设为很大的值）
-    MAX_BUFFER_CHARS = 9999
+    # 文本全部发送后等待剩余音频的超时时间（秒）
+    FINISH_TIMEOUT = 15
 
-    def __init__(self, signals: WorkerSignals):
+    def __init__(self, signals: WorkerSignals, player: Optional[PCMPlayer] = None,
+                 cached_audio: Optional[bytes] = None):
         super().__init__()
         self.signals = signals
-        self.text_buffer = ""  # 文本缓冲区
-        self.audio_queue = queue.Queue()  # 音频片段队列
+        self.player = player or get_pcm_player()
+        self.cached_audio = cached_audio  # 答案缓存命中时的完整 PCM 音频
+        self.cache_text: Optional[str] = None  # 非空时合成完整后以此文本为键写入合成缓存
+        self.recorded = bytearray()  # 本轮合成的全部音频（写入答案缓存用）
+        self.play_start = 0  # 本轮回复在输出流中的起始位置
+        self.segmenter = TextSegmenter()  # 文本切分器（缓冲未切分的文本）
+        self.text_queue: "queue.Queue[Optional[str]]" = queue.Queue()  # 待合成句子，None 表示文本结束
+        self.audio_queue: "queue.Queue[Optional[bytes]]" = queue.Queue()  # 按顺序排列的音频帧，None 表示结束
+        self.jitter_bytes = self.player.sample_rate * 2 * TTS_JITTER_BUFFER_MS // 1000  # 抖动缓冲字节数
         self.chunk_id = 0  # 片段序号
         self.is_running = True
         self.is_finished = False  # 标记文本是否全部接收完毕
         self.first_audio_played = False  # 标记是否已播放第一个音频
         self.play_thread: Optional[threading.Thread] = None
-        self.tts_threads: List[threading.Thread] = []
-
-        # 复用 TTSWorker 的协议常量
-        self.EVENT_START_CONNECTION = 1
-        self.EVENT_FINISH_CONNECTION = 2
-        self.EVENT_CONNECTION_STARTED = 50
-        self.EVENT_START_SESSION = 100
-        self.EVENT_FINISH_SESSION = 102
-        self.EVENT_SESSION_STARTED = 150
-        self.EVENT_SESSION_FINISHED = 152
-        self.EVENT_SESSION_FAILED = 153
-        self.EVENT_TASK_REQUEST = 200
-        self.EVENT_TTS_RESPONSE = 352
-
-        # 连接预热相关
-        self.warmup_done = threading.Event()  # 预热完成信号
+        self.session_failed = False  # 会话建立或合成失败
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # 合成会话的事件循环
+        self._window: Optional[asyncio.Condition] = None  # 合成窗口变化通知（会话协程中创建）
+        self._inflight: "deque[str]" = deque()  # 已发送未合成完的句子（还没合成的部分，只保留文字）
+        self._sentence_text = ""  # 服务端正在合成的句子文本（TTSSentenceStart 携带时）
+        self.window_waits = 0  # 因窗口已满等待服务端合成完上一句的次数
 
     def add_text_chunk(self, chunk: str):
         """
-        接收文本片段，累积到缓冲区并尝试切分句子
+        接收文本片段，交给切分器，切出的分段加入合成队列
 
         Args:
             chunk: 文本片段
@@ -1468,49 +1398,22 @@ class StreamingTTSWorker(QThread):
         if not self.is_running:
             return
 
-        self.text_buffer += chunk
-
-        # 按标点切分，提取完整的句子
-        while True:
-            split_idx = -1
-            for delim in self.SENTENCE_DELIMITERS:
-                idx = self.text_buffer.find(delim)
-                if idx != -1:
-                    if split_idx == -1 or idx < split_idx:
-                        split_idx = idx
-
-            if split_idx == -1:
-                # 没有找到标点，检查是否超过最大缓冲字数
-                if len(self.text_buffer) >= self.MAX_BUFFER_CHARS:
-                    # 强制触发 TTS（按字数切分）
-                    sentence = self.text_buffer[:self.MAX_BUFFER_CHARS].strip()
-                    self.text_buffer = self.text_buffer[self.MAX_BUFFER_CHARS:]
-                    if sentence:
-                        print(f"[StreamingTTS] 字数触发合成: {sentence}")
-                        self._start_tts_synthesis(sentence, self.chunk_id)
-                        self.chunk_id += 1
-                break
-
-            # 提取完整句子（包含分隔符）
-            sentence = self.text_buffer[:split_idx + 1].strip()
-            self.text_buffer = self.text_buffer[split_idx + 1:]
-
-            if sentence:
-                # 启动 TTS 合成线程（非阻塞）
-                self._start_tts_synthesis(sentence, self.chunk_id)
-                self.chunk_id += 1
+        for segment in self.segmenter.feed(chunk):
+            self._queue_sentence(segment)
 
     def finish_text(self):
         """
         标记文本接收完毕，处理剩余缓冲区
         """
+        if self.is_finished:
+            return
         self.is_finished = True
 
         # 处理最后剩余的文本
-        if self.text_buffer.strip():
-            self._start_tts_synthesis(self.text_buffer.strip(), self.chunk_id)
-            self.chunk_id += 1
-            self.text_buffer = ""
+        tail = self.segmenter.flush()
+        if tail:
+            self._queue_sentence(tail)
+        self.text_queue.put(None)
 
     def _is_valid_tts_text(self, text: str) -> bool:
         """
@@ -1523,380 +1426,354 @@ class StreamingTTSWorker(QThread):
 
         Returns:
             bool: 是否有效
-        """
-        import re
-        # 去掉emoji和符号后检查是否还有有效字符
-        # 匹配中文、英文、数字
-        valid_chars = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', text)
-        return len(valid_chars) >= 2  # 至少2个有效字符
-
-    def _start_tts_synthesis(self, text: str, chunk_id: int):
-        """
-        启动 TTS 合成线程
-
-        Args:
-            text: 待合成的文本
-            chunk_id: 片段序号
-        """
-        # 过滤无效文本（纯emoji、纯符号等）
-        if not self._is_valid_tts_text(text):
-            print(f"[StreamingTTS] 跳过无效片段 {chunk_id}: {text}")
-            return
-
-        start_time = time.time()
-        print(f"[StreamingTTS] 开始合成片段 {chunk_id}: \"{text}\" (时间戳: {start_time:.3f})")
-        tts_thread = threading.Thread(
-            target=self._synthesize_chunk,
-            args=(text, chunk_id, start_time),
-            daemon=True
-        )
-        self.tts_threads.append(tts_thread)
-        tts_thread.start()
-
-    def _synthesize_chunk(self, text: str, chunk_id: int, start_time: float = 0):
-        """
-        合成单个文本片段的音频
-
-        Args:
-            text: 待合成文本
-            chunk_id: 片段序号
-            start_time: 开始时间戳（用于计时）
-        """
-        try:
-            # 使用 asyncio 运行异步合成
-            audio_data = asyncio.run(self._tts_async(text))
-            duration = (time.time() - start_time) * 1000 if start_time else 0
-            if audio_data:
-                # 放入队列（带序号保证顺序）
-                self.audio_queue.put((chunk_id, audio_data))
-                print(f"[StreamingTTS] 片段 {chunk_id} 合成完成: {len(audio_data)} 字节, 耗时 {duration:.0f}ms")
-            else:
-                print(f"[StreamingTTS] 片段 {chunk_id} 合成失败, 耗时 {duration:.0f}ms")
-        except Exception as e:
-            print(f"[StreamingTTS] 片段 {chunk_id} 合成异常: {e}")
-
-    async def _tts_async(self, text: str) -> Optional[bytes]:
-        """
-        异步调用 TTS WebSocket API
-
-        Args:
-            text: 待合成文本
-
-        Returns:
-            音频数据，失败返回 None
-        """
-        try:
-            connect_id = str(uuid.uuid4())
-            headers = {
-                "X-Api-App-Key": TTS_APPID,
-                "X-Api-Access-Key": TTS_ACCESS_TOKEN,
-                "X-Api-Resource-Id": TTS_RESOURCE_ID,
-                "X-Api-Connect-Id": connect_id
-            }
-
-            async with websockets.connect(
-                TTS_WS_URL,
-                additional_headers=headers,
-                ping_interval=20,
-                ping_timeout=10
-            ) as websocket:
-
-                # 1. StartConnection
-                start_conn = self._build_event_request(self.EVENT_START_CONNECTION)
-                await websocket.send(start_conn)
-                response = await asyncio.wait_for(websocket.recv(), timeout=10)
-                res = self._parse_tts_response(response)
-                if res.get("error") or res.get("event") != self.EVENT_CONNECTION_STARTED:
-                    return None
-
-                # 2. StartSession
-                session_id = str(uuid.uuid4())
-                session_params = {
-                    "user": {"uid": str(uuid.uuid4())[:16]},
-                    "event": self.EVENT_START_SESSION,
-                    "namespace": "BidirectionalTTS",
-                    "req_params": {
-                        "text": "",
-                        "speaker": TTS_SPEAKER,
-                        "audio_params": {
-                            "format": TTS_FORMAT,
-                            "sample_rate": TTS_SAMPLE_RATE,
-                            "speech_rate": TTS_SPEECH_RATE,
-                            "loudness_rate": TTS_LOUDNESS_RATE
-                        }
-                    }
-                }
-                start_session = self._build_event_request(
-                    self.EVENT_START_SESSION, session_id, session_params
-                )
-                await websocket.send(start_session)
-                response = await asyncio.wait_for(websocket.recv(), timeout=10)
-                res = self._parse_tts_response(response)
-                if res.get("error") or res.get("event") != self.EVENT_SESSION_STARTED:
-                    return None
-
-                # 3. TaskRequest
-                task_params = {
-                    "event": self.EVENT_TASK_REQUEST,
-                    "req_params": {"text": text}
-                }
-                task_packet = self._build_event_request(
-                    self.EVENT_TASK_REQUEST, session_id, task_params
-                )
-                await websocket.send(task_packet)
-
-                # 4. FinishSession
-                finish_session = self._build_event_request(
-                    self.EVENT_FINISH_SESSION, session_id
-                )
-                await websocket.send(finish_session)
-
-                # 5. 接收音频数据
-                audio_data = b""
-                while True:
-                    try:
-                        response = await asyncio.wait_for(websocket.recv(), timeout=15)
-                        res = self._parse_tts_response(response)
-
-                        if res.get("error"):
-                            break
-
-                        if res.get("audio"):
-                            audio_data += res["audio"]
-
-                        if res.get("event") == self.EVENT_SESSION_FINISHED:
-                            break
-
-                        if res.get("event") == self.EVENT_SESSION_FAILED:
-                            break
-
-                    except asyncio.TimeoutError:
-                        break
-
-                # 6. FinishConnection
-                finish_conn = self._build_event_request(self.EVENT_FINISH_CONNECTION)
-                await websocket.send(finish_conn)
+        """
+        import re
+        # 去掉emoji和符号后检查是否还有有效字符
+        # 匹配中文、英文、数字
+        valid_chars = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9]', '', text)
+        return len(valid_chars) >= 2  # 至少2个有效字符
 
-                return audio_data if audio_data else None
+    def _queue_sentence(self, text: str):
+        """
+        把句子加入合成队列（由会话协程按顺序作为 TaskRequest 发送）
 
-        except Exception as e:
-            print(f"[StreamingTTS] TTS 异步调用异常: {e}")
-            return None
+        Args:
+            text: 待合成的文本
+        """
+        # 过滤无效文本（纯emoji、纯符号等）
+        if not self._is_valid_tts_text(text):
+            print(f"[StreamingTTS] 跳过无效片段 {self.chunk_id}: {text}")
+            return
 
-    def _build_event_request(self, event: int, session_id: str = "",
-                             payload: dict = None) -> bytes:
-        """构建 TTS 请求包（复用 TTSWorker 的协议）"""
-        byte0 = 0x11
-        byte1 = (0b0001 << 4) | 0b0100  # Full client request with event
-        byte2 = (0b0001 << 4) | 0b0000  # JSON, no compression
-        byte3 = 0x00
-        header = bytes([byte0, byte1, byte2, byte3])
-
-        event_bytes = struct.pack('>I', event)
-        result = header + event_bytes
-
-        if event in (self.EVENT_START_SESSION, self.EVENT_FINISH_SESSION,
-                     self.EVENT_TASK_REQUEST):
-            session_id_bytes = session_id.encode('utf-8')
-            session_id_size = struct.pack('>I', len(session_id_bytes))
-            result += session_id_size + session_id_bytes
-
-        if payload is None:
-            payload = {}
-        payload_bytes = json.dumps(payload).encode('utf-8')
-        payload_size = struct.pack('>I', len(payload_bytes))
-        result += payload_size + payload_bytes
-
-        return result
-
-    def _parse_tts_response(self, data: bytes) -> dict:
-        """解析 TTS 响应（复用 TTSWorker 的解析逻辑）"""
-        if len(data) < 4:
-            return {"error": True}
-
-        header = data[:4]
-        message_type = (header[1] >> 4) & 0x0F
-        message_type_flags = header[1] & 0x0F
-        compression = header[2] & 0x0F
-
-        offset = 4
-        result = {"message_type": message_type}
-
-        # 错误帧
-        if message_type == 0b1111:
-            if len(data) >= offset + 4:
-                error_code = struct.unpack('>I', data[offset:offset+4])[0]
-                return {"error": True, "code": error_code}
-            return {"error": True}
-
-        # 解析事件号
-        if message_type_flags == 0b0100:
-            if len(data) >= offset + 4:
-                event = struct.unpack('>I', data[offset:offset+4])[0]
-                result["event"] = event
-                offset += 4
-
-        # 音频响应
-        if message_type == 0b1011:
-            if len(data) >= offset + 4:
-                session_id_size = struct.unpack('>I', data[offset:offset+4])[0]
-                offset += 4 + session_id_size
-
-            if len(data) >= offset + 4:
-                audio_size = struct.unpack('>I', data[offset:offset+4])[0]
-                offset += 4
-                if len(data) >= offset + audio_size:
-                    result["audio"] = data[offset:offset+audio_size]
-            return result
-
-        # Full server response
-        if message_type == 0b1001:
-            event = result.get("event", 0)
-            if event in (self.EVENT_SESSION_STARTED, self.EVENT_SESSION_FINISHED,
-                         self.EVENT_SESSION_FAILED):
-                if len(data) >= offset + 4:
-                    session_id_size = struct.unpack('>I', data[offset:offset+4])[0]
-                    offset += 4 + session_id_size
-
-            elif event == self.EVENT_CONNECTION_STARTED:
-                if len(data) >= offset + 4:
-                    conn_id_size = struct.unpack('>I', data[offset:offset+4])[0]
-                    offset += 4 + conn_id_size
-
-        return result
+        print(f"[StreamingTTS] 提交片段 {self.chunk_id}: \"{text}\" (时间戳: {time.time():.3f})")
+        self.text_queue.put(text)
+        self.chunk_id += 1
 
     def run(self):
-        """线程主函数：启动音频播放线程"""
+        """线程主函数：建立合成会话，同时启动音频播放线程"""
         self.is_running = True
         self.first_audio_played = False  # 标记是否已播放第一个音频
 
-        # 启动预热线程（预先建立 TTS 连接，减少首次延迟）
-        warmup_thread = threading.Thread(target=self._warmup_connection, daemon=True)
-        warmup_thread.start()
-
         # 启动播放线程
         self.play_thread = threading.Thread(target=self._play_audio_queue, daemon=True)
         self.play_thread.start()
 
+        try:
+            if self.cached_audio is not None:
+                self.audio_queue.put(self.cached_audio)
+            else:
+                asyncio.run(self._run_session())
+                if self.cache_text and self.recorded_audio:
+                    get_tts_cache().put(self.cache_text, TTS_STREAM_FORMAT, self.player.sample_rate,
+                                        self.recorded_audio)
+        except Exception as e:
+            print(f"[StreamingTTS] 合成会话异常: {e}")
+            self.session_failed = True
+        finally:
+            self.audio_queue.put(None)
+
         # 等待播放完成
         self.play_thread.join()
 
-        if self.is_running:
+        if not self.is_running:
+            return
+        if self.session_failed and not self.first_audio_played:
+            self.signals.tts_error.emit("语音合成失败")
+        else:
             self.signals.tts_finished.emit()
 
-    def _warmup_connection(self):
+    async def _run_session(self):
         """
-        预热 TTS 连接（在后台建立一次连接，预热 DNS/TLS 缓存）
-        这样第一个真实 TTS 请求会更快
-        """
-        try:
-            warmup_start = time.time()
-            print("[StreamingTTS] 开始预热 TTS 连接...")
-            # 合成一个极短的文本来预热连接
-            asyncio.run(self._tts_async("。"))
-            warmup_time = (time.time() - warmup_start) * 1000
-            print(f"[StreamingTTS] TTS 连接预热完成，耗时 {warmup_time:.0f}ms")
-            self.warmup_done.set()
-        except Exception as e:
-            print(f"[StreamingTTS] TTS 预热失败: {e}")
-            self.warmup_done.set()  # 即使失败也标记完成，避免阻塞
+        一轮回复共用一条连接、一个会话
 
-    def _play_audio_queue(self):
-        """消费音频队列，按顺序无缝播放"""
-        import io
+        流程：
+        1. StartConnection / StartSession（与对话模型首字并行）
+        2. 发送协程：每收到一句文本发送一个 TaskRequest，文本结束后发送 FinishSession
+        3. 接收协程：按句切分音频放入播放队列，直到 SessionFinished
+        4. FinishConnection
+        """
+        session_start = time.time()
+        headers = {
+            "X-Api-App-Key": TTS_APPID,
+            "X-Api-Access-Key": TTS_ACCESS_TOKEN,
+            "X-Api-Resource-Id": TTS_RESOURCE_ID,
+            "X-Api-Connect-Id": str(uuid.uuid4())
+        }
 
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print(f"[StreamingTTS] pygame 初始化失败: {e}")
-            return
+        async with websockets.connect(
+            TTS_WS_URL,
+            additional_headers=headers,
+            ping_interval=20,
+            ping_timeout=10
+        ) as websocket:
+
+            # 1. StartConnection
+            await websocket.send(build_event_request(EVENT_START_CONNECTION))
+            res = parse_tts_response(await asyncio.wait_for(websocket.recv(), timeout=10))
+            if res.get("error") or res.get("event") != EVENT_CONNECTION_STARTED:
+                print(f"[StreamingTTS] 建立连接失败: {res}")
+                self.session_failed = True
+                return
 
-        last_chunk_id = -1
-        pending_chunks = {}  # 暂存乱序到达的片段
-        empty_count = 0
-        max_empty_wait = 100  # 最大空等次数（10秒）
+            # 2. StartSession
+            session_id = str(uuid.uuid4())
+            session_params = {
+                "user": {"uid": str(uuid.uuid4())[:16]},
+                "event": EVENT_START_SESSION,
+                "namespace": "BidirectionalTTS",
+                "req_params": {
+                    "text": "",
+                    "speaker": TTS_SPEAKER,
+                    "audio_params": {
+                        "format": TTS_STREAM_FORMAT,
+                        "sample_rate": self.player.sample_rate,
+                        "speech_rate": TTS_SPEECH_RATE,
+                        "loudness_rate": TTS_LOUDNESS_RATE
+                    }
+                }
+            }
+            await websocket.send(build_event_request(EVENT_START_SESSION, session_id, session_params))
+            res = parse_tts_response(await asyncio.wait_for(websocket.recv(), timeout=10))
+            if res.get("error") or res.get("event") != EVENT_SESSION_STARTED:
+                print(f"[StreamingTTS] 建立会话失败: {res}")
+                self.session_failed = True
+                return
+            print(f"[StreamingTTS] 合成会话就绪，耗时 {(time.time() - session_start) * 1000:.0f}ms")
+
+            # 3. 并行发送文本和接收音频（发送受合成窗口限制）
+            self._loop = asyncio.get_running_loop()
+            self._window = asyncio.Condition()
+            self._inflight.clear()
+            finish_sent = asyncio.Event()
+            send_task = asyncio.create_task(self._send_sentences(websocket, session_id, finish_sent))
+            try:
+                await self._receive_audio(websocket, finish_sent)
+            finally:
+                send_task.cancel()
+                try:
+                    await send_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                # 发送协程可能还阻塞在读取文本队列上，放一个结束标记让线程池线程退出
+                self.text_queue.put(None)
 
-        while self.is_running:
+            # 4. FinishConnection
             try:
-                # 非阻塞获取
+                await websocket.send(build_event_request(EVENT_FINISH_CONNECTION))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+    async def _send_sentences(self, websocket, session_id: str, finish_sent: asyncio.Event):
+        """
+        发送协程：按顺序把句子作为 TaskRequest 发送，文本结束发送 FinishSession，被打断发送 CancelSession
+
+        Args:
+            websocket: WebSocket 连接对象
+            session_id: 会话 ID
+            finish_sent: 结束事件发出后置位
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            # 队列读取是阻塞调用，放到线程池执行
+            text = await loop.run_in_executor(None, self.text_queue.get)
+            if text is None or not self.is_running:
+                break
+            # 窗口已满时等服务端合成完一句再发送（被打断时立即唤醒）
+            async with self._window:
+                if len(self._inflight) >= TTS_MAX_INFLIGHT_SENTENCES:
+                    self.window_waits += 1
                 try:
-                    chunk_id, audio_data = self.audio_queue.get(timeout=0.1)
-                    empty_count = 0
-
-                    # 如果是下一个期望的片段，直接播放
-                    if chunk_id == last_chunk_id + 1:
-                        self._play_chunk(audio_data)
-                        last_chunk_id = chunk_id
-
-                        # 检查暂存区是否有后续片段
-                        while last_chunk_id + 1 in pending_chunks:
-                            next_audio = pending_chunks.pop(last_chunk_id + 1)
-                            self._play_chunk(next_audio)
-                            last_chunk_id += 1
-                    else:
-                        # 乱序到达，暂存
-                        pending_chunks[chunk_id] = audio_data
-
-                except queue.Empty:
-                    empty_count += 1
-
-                    # 检查是否所有片段都已处理完毕
-                    if self.is_finished and self.audio_queue.empty() and not pending_chunks:
-                        # 等待所有 TTS 线程完成
-                        all_done = True
-                        for t in self.tts_threads:
-                            if t.is_alive():
-                                all_done = False
-                                break
-
-                        if all_done and self.audio_queue.empty() and not pending_chunks:
-                            print("[StreamingTTS] 所有片段播放完成")
-                            break
+                    await asyncio.wait_for(self._window.wait_for(self._window_open),
+                                           timeout=TTS_INFLIGHT_WAIT_SECONDS)
+                except asyncio.TimeoutError:
+                    # 超时发送的句子同样计入窗口，合成完成时才移出
+                    print("[StreamingTTS] 等待上一句合成完成超时，直接发送下一句")
+                if not self.is_running:
+                    break
+                self._inflight.append(self._sentence_key(text))
+            task_params = {
+                "event": EVENT_TASK_REQUEST,
+                "req_params": {"text": text}
+            }
+            await websocket.send(build_event_request(EVENT_TASK_REQUEST, session_id, task_params))
 
-                    # 超时退出
-                    if empty_count > max_empty_wait and self.is_finished:
-                        print("[StreamingTTS] 等待超时，退出播放")
-                        break
+        event = EVENT_FINISH_SESSION if self.is_running else EVENT_CANCEL_SESSION
+        await websocket.send(build_event_request(event, session_id))
+        finish_sent.set()
 
-            except Exception as e:
-                print(f"[StreamingTTS] 播放队列处理异常: {e}")
+    async def _receive_audio(self, websocket, finish_sent: asyncio.Event):
+        """
+        接收协程：每收到一帧音频立即放入播放队列，首帧出声不再等待整句合成完毕
+
+        Args:
+            websocket: WebSocket 连接对象
+            finish_sent: 结束事件已发出（之后才对剩余音频计超时）
+        """
+        recv = None
+        while True:
+            if recv is None:
+                recv = asyncio.ensure_future(websocket.recv())
+
+            if not finish_sent.is_set():
+                # 文本还在生成时不设超时（句间间隔取决于对话模型）
+                finish_wait = asyncio.ensure_future(finish_sent.wait())
+                await asyncio.wait({recv, finish_wait}, return_when=asyncio.FIRST_COMPLETED)
+                finish_wait.cancel()
+                if not recv.done():
+                    continue
+            else:
+                # 结束事件发出后才对剩余音频计时
+                done, _ = await asyncio.wait({recv}, timeout=self.FINISH_TIMEOUT)
+                if not done:
+                    recv.cancel()
+                    print("[StreamingTTS] 等待剩余音频超时")
+                    self.session_failed = True
+                    break
+
+            message, recv = recv.result(), None
+            res = parse_tts_response(message)
+            if res.get("error"):
+                print(f"[StreamingTTS] 合成错误: {res}")
+                self.session_failed = True
                 break
 
-        try:
-            pygame.mixer.quit()
-        except:
-            pass
+            event = res.get("event")
+            if res.get("audio"):
+                if self.is_running:
+                    self.audio_queue.put(res["audio"])
+                    self.recorded += res["audio"]
+            elif event == EVENT_TTS_SENTENCE_START:
+                self._sentence_text = self._payload_text(res)
+            elif event == EVENT_TTS_SENTENCE_END:
+                # 一句合成完成，从窗口中移出对应的已发送句子
+                async with self._window:
+                    self._sentence_ended(self._payload_text(res) or self._sentence_text)
+                    self._sentence_text = ""
+                    self._window.notify_all()
+            elif event in (EVENT_SESSION_FINISHED, EVENT_SESSION_CANCELED):
+                break
+            elif event == EVENT_SESSION_FAILED:
+                print(f"[StreamingTTS] 会话失败: {res.get('payload')}")
+                self.session_failed = True
+                break
 
-    def _play_chunk(self, audio_data: bytes):
-        """播放单个音频片段"""
-        import io
+    def _window_open(self) -> bool:
+        """合成窗口有空位（或已被打断）"""
+        return not self.is_running or len(self._inflight) < TTS_MAX_INFLIGHT_SENTENCES
 
-        try:
-            # 在播放第一个音频片段时发送 tts_started 信号
-            if not self.first_audio_played:
-                self.first_audio_played = True
-                self.signals.tts_started.emit()
-                print("[StreamingTTS] 开始播放第一个音频片段")
+    @staticmethod
+    def _sentence_key(text: str) -> str:
+        """比对已发送句子和服务端句子用的文本（去掉空白和标点）"""
+        return re.sub(r'[\W_]+', '', text or '')
 
-            audio_file = io.BytesIO(audio_data)
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
+    @staticmethod
+    def _payload_text(res: dict) -> str:
+        """服务端句子事件携带的文本（没有时返回空字符串）"""
+        payload = res.get("payload")
+        if not isinstance(payload, dict):
+            return ""
+        params = payload.get("res_params")
+        text = params.get("text") if isinstance(params, dict) else payload.get("text")
+        return text if isinstance(text, str) else ""
 
-            # 等待播放完成
-            while pygame.mixer.music.get_busy() and self.is_running:
-                pygame.time.Clock().tick(10)
+    def _sentence_ended(self, text: str):
+        """
+        服务端合成完一句：移出最早发送的句子（调用方持有 _window）
 
-        except Exception as e:
-            print(f"[StreamingTTS] 播放片段失败: {e}")
+        服务端把一句拆成几句合成时，结束事件的文本只是这句的开头部分，此时只去掉这部分，
+        整句合成完才移出；不对应任何已发送句子的结束事件直接忽略
+
+        Args:
+            text: 服务端句子文本（未携带时为空，按一个结束事件对应一句处理）
+        """
+        if not self._inflight:
+            return
+        key = self._sentence_key(text)
+        remaining = self._inflight[0]
+        if key and len(key) < len(remaining) and remaining.startswith(key):
+            self._inflight[0] = remaining[len(key):]
+        else:
+            self._inflight.popleft()
+
+    def _wake_window(self):
+        """唤醒等待合成窗口的发送协程（在会话事件循环中调用）"""
+        async def notify():
+            async with self._window:
+                self._window.notify_all()
+        if self._window is not None:
+            asyncio.ensure_future(notify())
+
+    def _play_audio_queue(self):
+        """
+        消费音频队列，按顺序写入输出流，全部写完后等待播放完毕
+
+        输出流里没有待播放数据时（刚开始或网络抖动导致读空），先攒够 jitter_bytes 再写入，
+        避免一帧一帧地写造成断续；文本结束时剩余不足的部分直接写入
+        """
+        if not self.player.open():
+            return
+
+        self.play_start = end = self.player.position
+        pending = bytearray()
+        while self.is_running:
+            # 阻塞等待：结束和打断都会放入 None，不需要轮询
+            audio_data = self.audio_queue.get()
+            if audio_data is None:
+                break
+            pending += audio_data
+            if self.player.pending_samples == 0 and len(pending) < self.jitter_bytes:
+                continue
+            end = self._play_chunk(bytes(pending))
+            pending.clear()
+
+        if self.is_running:
+            if pending:
+                end = self._play_chunk(bytes(pending))
+            self.player.wait_played(end)
+            print(f"[StreamingTTS] 所有音频播放完成（缓冲区欠载 {self.player.underruns} 次，"
+                  f"合成窗口等待 {self.window_waits} 次）")
+
+    def _play_chunk(self, audio_data: bytes) -> int:
+        """
+        把一段音频追加到输出流
+
+        Returns:
+            写入后的输出流位置
+        """
+        # 在写入第一段音频时截断思考垫音并发送 tts_started 信号
+        if not self.first_audio_played:
+            get_thinking_filler().cut()
+            self.first_audio_played = True
+            self.signals.tts_started.emit()
+            print(f"[StreamingTTS] 开始播放第一帧音频 (时间戳: {time.time():.3f})")
+        return self.player.write(audio_data)
+
+    @property
+    def recorded_audio(self) -> Optional[bytes]:
+        """本轮完整合成的音频，被打断、合成失败或来自缓存时返回 None"""
+        if not self.is_running or self.session_failed or self.cached_audio is not None or not self.recorded:
+            return None
+        return bytes(self.recorded)
+
+    @property
+    def played_seconds(self) -> float:
+        """本轮回复已经出声的时长（秒）"""
+        return max(0, self.player.samples_played - self.play_start) / self.player.sample_rate
 
     def stop(self):
-        """停止播放"""
+        """停止播放（丢弃未播放的音频，会话以 CancelSession 结束）"""
+        if self.is_running and self.first_audio_played:
+            print(f"[StreamingTTS] 打断，已播放 {self.played_seconds:.1f}s")
         self.is_running = False
-        try:
-            if pygame.mixer.get_init():
-                pygame.mixer.music.stop()
-        except:
-            pass
+        self.text_queue.put(None)
+        self.audio_queue.put(None)
+        # 发送协程可能正在等合成窗口，唤醒它立即发送 CancelSession
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake_window)
+            except RuntimeError:
+                pass  # 会话已结束，事件循环已关闭
+        self.player.flush()
 
 
 # ==================== 主界面 ====================
@@ -1973,8 +1850,34 @@ class VoiceAssistantWindow(QMainWindow):
         self.waiting_for_other_speaker = False           # 是否在等待他人说话（两轮对话模式）
         self._last_audio_bytes: Optional[bytes] = None   # 最近一次录音的原始音频数据
 
+        # ASR 连接池（启动后在后台预热 WebSocket 连接）
+        self.asr_connection_pool = get_asr_connection_pool()
+        self.asr_connection_pool.start()
+
+        # 对话接口长连接（后台预热 TLS 连接并定期保活）
+        self.chat_http_client = get_chat_http_client()
+        self.chat_http_client.start()
+
+        # 录音器（常开模式下启动即开麦，环形缓冲区保留按下按钮前的 pre-roll）
+        self.audio_recorder = AudioRecorder()
+        if self.audio_recorder.always_on and self.audio_recorder.open():
+            print(f"[录音] 麦克风常开，保留 {AUDIO_PREROLL_MS}ms pre-roll")
+
+        # PCM 输出流（常开，流式合成的音频直接写入，首句不用等声卡打开）
+        self.pcm_player = get_pcm_player()
+        self.pcm_player.open()
+
         # Mem0 记忆服务
         self.mem0_client = get_mem0_client() if MEM0_ENABLED else None
+        self.memory_prefetcher = get_memory_prefetcher() if MEM0_ENABLED else None  # 识别过程中提前搜索记忆
+        self.memory_writer = get_memory_writer() if MEM0_ENABLED else None  # 后台攒批写入记忆
+        if self.memory_writer:
+            self.memory_writer.on_progress = self._on_memory_writer_progress
+            self.memory_writer.start()
+        self.memory_migrator = get_memory_migrator() if MEM0_ENABLED else None  # 临时用户记忆迁移
+        if self.memory_migrator and self.memory_migrator.pending():
+            # 继续上次中断的迁移
+            threading.Thread(target=self.memory_migrator.resume_pending, daemon=True).start()
         self.current_user_id: Optional[str] = None       # 当前用户 ID（用于 Mem0）
         self.temp_user_id: Optional[str] = None          # 临时用户 ID（未注册用户）
 
@@ -1993,9 +1896,42 @@ class VoiceAssistantWindow(QMainWindow):
         self.time_object_detect = 0.0    # 物体检测耗时（毫秒）
         self.is_first_chunk = True       # 是否第一个chunk
 
+        # 推测式对话（识别中间结果稳定后提前请求对话模型）
+        self.speculative_chat: Optional[SpeculativeChat] = None   # 本轮待确认的推测请求
+        self._speculations: List[SpeculativeChat] = []           # 线程可能仍在运行的推测请求（保持引用）
+        self._asr_active = False          # 本轮识别是否仍在进行
+        self.speculative_count = 0        # 本轮已发起的推测请求数
+        self.speculative_hits = 0         # 推测命中次数
+        self.speculative_misses = 0       # 推测未命中次数
+        self.speculative_saved_ms = 0.0   # 命中时累计提前的毫秒数
+        self.speculative_timer = QTimer(self)
+        self.speculative_timer.setSingleShot(True)
+        self.speculative_timer.timeout.connect(self._start_speculative_chat)
+
+        # 本地答案缓存（相同或相近的问题直接播放上次的回复音频）
+        self.answer_cache = get_answer_cache()
+        self.cache_candidate: Optional[Tuple[Optional[str], str]] = None  # 本轮待写入缓存的 (用户, 问题)
+        self.cache_reply: Optional[str] = None  # 本轮待写入缓存的回复
+
+        # 本地拼接播报（模板回复的固定片段和已注册的名字在后台预合成，识别结果不经过合成接口）
+        self.phrase_bank = get_phrase_bank()
+        self.phrase_bank.warm_up(
+            self.face_recognition_manager.list_faces() + self.speaker_recognition_manager.list_speakers()
+        )
+
+        # 思考垫音（预计要等较久才能出声时，先从本地播一句简短应答）
+        self.thinking_filler = get_thinking_filler()
+        self.thinking_filler.prepare()
+
         # 初始化界面
         self._init_ui()
 
+        # 后端服务熔断状态显示在耗时面板
+        self.circuit_monitor = get_circuit_monitor()
+        for breaker in self.circuit_monitor.breakers.values():
+            breaker.add_listener(lambda _: QTimer.singleShot(0, self._update_circuit_label))
+        self._update_circuit_label()
+
     def _init_ui(self):
         """初始化界面"""
         self.setWindowTitle(WINDOW_TITLE)
@@ -2118,6 +2054,11 @@ class VoiceAssistantWindow(QMainWindow):
         self.timing_total.setStyleSheet("color: #e65100; border: none;")
         timing_row1.addWidget(self.timing_total)
 
+        self.timing_speculative = QLabel("推测: --")
+        self.timing_speculative.setFont(QFont("Microsoft YaHei", 9))
+        self.timing_speculative.setStyleSheet("color: #795548; border: none;")
+        timing_row1.addWidget(self.timing_speculative)
+
         timing_row1.addStretch()
         timing_main_layout.addLayout(timing_row1)
 
@@ -2172,6 +2113,12 @@ class VoiceAssistantWindow(QMainWindow):
         self.timing_mem0_store.setStyleSheet("color: #4CAF50; border: none;")
         timing_row3.addWidget(self.timing_mem0_store)
 
+        # 后端服务熔断状态
+        self.timing_circuit = QLabel("服务: --")
+        self.timing_circuit.setFont(QFont("Microsoft YaHei", 9))
+        self.timing_circuit.setStyleSheet("color: #4CAF50; border: none;")
+        timing_row3.addWidget(self.timing_circuit)
+
         timing_row3.addStretch()
         timing_main_layout.addLayout(timing_row3)
 
@@ -2277,6 +2224,7 @@ class VoiceAssistantWindow(QMainWindow):
         self.signals.chat_chunk.connect(self._on_chat_chunk)  # 流式片段
         self.signals.chat_reply.connect(self._on_chat_reply)
         self.signals.chat_error.connect(self._on_chat_error)
+        self.signals.memory_searched.connect(self._on_memory_searched)
 
         # 语音合成信号
         self.signals.tts_started.connect(self._on_tts_started)
@@ -2360,6 +2308,12 @@ class VoiceAssistantWindow(QMainWindow):
         self.is_recording = True
         self.current_asr_text = ""
 
+        # 新一轮识别，丢弃上一轮未确认的推测请求和未播完的垫音
+        self.thinking_filler.cancel()
+        self._asr_active = True
+        self.speculative_count = 0
+        self._cancel_speculative_chat()
+
         # 清空显示
         self.user_text.clear()
         self.ai_text.clear()
@@ -2370,7 +2324,7 @@ class VoiceAssistantWindow(QMainWindow):
         self.status_label.setText("正在录音，请说话...")
 
         # 启动 ASR 工作线程
-        self.asr_worker = ASRWorker(self.signals)
+        self.asr_worker = ASRWorker(self.signals, self.audio_recorder)
         self.asr_worker.start()
 
     def _stop_recording(self):
@@ -2404,8 +2358,109 @@ class VoiceAssistantWindow(QMainWindow):
             # 强制刷新 UI，确保实时显示
             self.user_text.repaint()
             self.status_label.repaint()
+
+            # 中间结果变化，重新计时；稳定 SPECULATIVE_STABLE_MS 后发起推测请求
+            if SPECULATIVE_CHAT_ENABLED and self._asr_active:
+                self.speculative_timer.start(SPECULATIVE_STABLE_MS)
+
+            # 已知当前用户时，用中间结果在后台提前搜索记忆
+            if self.memory_prefetcher and self._asr_active:
+                self.memory_prefetcher.prefetch(self.current_user_id, text)
+
             QApplication.processEvents()
 
+    def _start_speculative_chat(self):
+        """识别中间结果稳定后，用中间结果提前发起对话请求"""
+        text = self.current_asr_text
+        if not self._asr_active or not text.strip():
+            return
+
+        # 已在为相同文本推测
+        if self.speculative_chat and self.speculative_chat.matches(text, self.current_user_id):
+            return
+
+        if self.speculative_count >= SPECULATIVE_MAX_PER_TURN:
+            return
+
+        # 追问模式和特殊意图（拍照、声纹）需要先完成本地处理，不做推测
+        if self.waiting_for_face_name or self.waiting_for_speaker_name or self.waiting_for_other_speaker:
+            return
+        if self.intent_handler.match_intent(text) != IntentType.DEFAULT:
+            return
+
+        # 中间结果已变化，取消旧的推测请求后重新发起
+        self._cancel_speculative_chat()
+        self.speculative_count += 1
+        print(f"[推测] 中间结果稳定 {SPECULATIVE_STABLE_MS}ms，提前请求对话: {text}")
+
+        speculation = SpeculativeChat(text, self.current_user_id, self.signals)
+        memory_future = self._request_memories(text, keep=True)
+        speculation.memory_label = self.timing_mem0_search.text()
+        speculation.start(self.chat_history, memory_future, time.time() + MEM0_DEADLINE_MS / 1000)
+
+        self.speculative_chat = speculation
+        self._speculations = [s for s in self._speculations if s.worker.isRunning()]
+        self._speculations.append(speculation)
+
+    def _commit_speculative_chat(self, final_text: str) -> bool:
+        """
+        最终识别结果与推测请求一致时采用推测请求，否则取消
+
+        Args:
+            final_text: 最终识别结果
+
+        Returns:
+            是否已采用推测请求
+        """
+        speculation = self.speculative_chat
+        if speculation is None:
+            return False
+
+        if not speculation.matches(final_text, self.current_user_id):
+            print(f"[推测] 未命中: 推测「{speculation.text}」，最终「{final_text}」")
+            self._cancel_speculative_chat(record_miss=True)
+            return False
+
+        # 推测请求相对最终结果提前发出的时间
+        saved_ms = (self.time_asr_end - speculation.start_time) * 1000
+        self.speculative_chat = None
+        self._record_speculation(hit=True, saved_ms=saved_ms)
+
+        self.timing_mem0_search.setText(speculation.memory_label)
+        self.chat_worker = speculation.worker
+        speculation.commit()
+        return True
+
+    def _cancel_speculative_chat(self, record_miss: bool = False):
+        """
+        取消本轮待确认的推测请求
+
+        Args:
+            record_miss: 是否计为一次未命中
+        """
+        self.speculative_timer.stop()
+        if self.speculative_chat is None:
+            return
+        self.speculative_chat.cancel()
+        self.speculative_chat = None
+        if record_miss:
+            self._record_speculation(hit=False)
+
+    def _record_speculation(self, hit: bool, saved_ms: float = 0.0):
+        """记录推测命中率和提前的时间"""
+        if hit:
+            self.speculative_hits += 1
+            self.speculative_saved_ms += saved_ms
+            self.timing_speculative.setText(f"推测: 命中 提前{saved_ms:.0f}ms")
+        else:
+            self.speculative_misses += 1
+            self.timing_speculative.setText("推测: 未命中")
+
+        total = self.speculative_hits + self.speculative_misses
+        avg_saved = self.speculative_saved_ms / self.speculative_hits if self.speculative_hits else 0.0
+        result = f"命中，提前 {saved_ms:.0f}ms" if hit else "未命中"
+        print(f"[推测] {result}（命中率 {self.speculative_hits}/{total}，命中平均提前 {avg_saved:.0f}ms）")
+
     def _on_asr_audio_data(self, audio_bytes: bytes):
         """
         处理原始音频数据，提取声纹并匹配
@@ -2459,6 +2514,9 @@ class VoiceAssistantWindow(QMainWindow):
             # 识别到已知说话人
             self.current_speaker_name = name
             self.current_user_id = name  # 使用说话人名字作为 Mem0 user_id
+            # 用户变了，用当前识别文本重新预取记忆
+            if self.memory_prefetcher:
+                self.memory_prefetcher.prefetch(self.current_user_id, self.current_asr_text)
             self.pending_speaker_embedding = None
             self.temp_user_id = None  # 清除临时 ID
             self.timing_voice_match.setText(f"声纹匹配: {self.time_voice_match:.0f}ms ({name})")
@@ -2513,6 +2571,8 @@ class VoiceAssistantWindow(QMainWindow):
         # 记录语音识别完成时间
         self.time_asr_end = time.time()
         self.is_first_chunk = True  # 重置首字标记
+        self._asr_active = False
+        self.speculative_timer.stop()
 
         self.current_asr_text = final_text
         self.user_text.setText(final_text)
@@ -2521,6 +2581,7 @@ class VoiceAssistantWindow(QMainWindow):
         self.timing_asr_chat.setText("ASR→首字: 计时中...")
         self.timing_chat_tts.setText("首字→播放: --")
         self.timing_total.setText("总延时: --")
+        self.timing_speculative.setText("推测: --")
         # 声纹识别耗时已在 _on_asr_audio_data 中更新，此处不重置
         # 图像识别耗时
         self.timing_camera.setText("拍照: --")
@@ -2570,6 +2631,10 @@ class VoiceAssistantWindow(QMainWindow):
                 self.time_object_detect = intent_result.time_object_detect
                 self.timing_object_detect.setText(f"物体: {self.time_object_detect:.0f}ms")
 
+            # 推测请求只对默认意图有效
+            if intent_result.intent_type != IntentType.DEFAULT:
+                self._cancel_speculative_chat(record_miss=True)
+
             # 处理意图结果
             if intent_result.intent_type == IntentType.SPEAKER_IDENTIFY_OTHER:
                 # 声纹识别他人意图（两轮对话模式）
@@ -2584,13 +2649,25 @@ class VoiceAssistantWindow(QMainWindow):
                 # 默认意图（纯文本）
                 self.current_image_path = None
                 self.current_image_base64 = None
-                self._call_chat(final_text)
+                # 答案缓存命中时直接播放；否则推测请求与最终结果一致时直接采用，再否则正常发起请求
+                # 需要等对话模型时，预计静默较长就先播一句垫音
+                speculation = self.speculative_chat
+                if self._answer_from_cache(final_text):
+                    self._cancel_speculative_chat()
+                elif self._commit_speculative_chat(final_text):
+                    self.thinking_filler.start(final_text, elapsed=time.time() - speculation.start_time)
+                else:
+                    self.thinking_filler.start(final_text)
+                    self._call_chat(final_text)
         else:
+            self._cancel_speculative_chat(record_miss=True)
             self.status_label.setText("未识别到有效语音，请重试")
             self._reset_button()
 
     def _on_asr_error(self, error: str):
         """语音识别错误"""
+        self._asr_active = False
+        self._cancel_speculative_chat()
         self.status_label.setText(f"识别错误: {error}")
         self.ai_text.setText(f"语音识别失败: {error}")
         self._reset_button()
@@ -2658,17 +2735,21 @@ class VoiceAssistantWindow(QMainWindow):
         self.waiting_for_face_name = False
         self.pending_face_encoding = None
 
+        fragments = None
         if success:
-            result_msg = f"好的，我已经记住{name}了"
+            fragments = ["好的，我已经记住", name, "了"]
+            result_msg = "".join(fragments)
             self.status_label.setText(f"已注册: {name}")
             print(f"[UI] 人脸注册成功: {name}")
+            # 名字合成一次，之后识别结果直接本地拼接
+            self.phrase_bank.learn([name])
         else:
             result_msg = f"注册失败：{message}"
             self.status_label.setText(result_msg)
             print(f"[UI] 人脸注册失败: {message}")
 
         self.ai_text.setText(result_msg)
-        self._speak_text(result_msg)
+        self._speak_text(result_msg, fragments)
 
     def _handle_speaker_identify_other_result(self, intent_result: IntentResult, original_text: str):
         """
@@ -2709,20 +2790,21 @@ class VoiceAssistantWindow(QMainWindow):
 
         if intent_result.speaker_name:
             # 识别成功
-            result_text = f"这是{intent_result.speaker_name}的声音"
+            fragments = ["这是", intent_result.speaker_name, "的声音"]
             if intent_result.speaker_similarity > 0:
-                result_text += f"，相似度{intent_result.speaker_similarity:.0%}"
+                fragments += ["，相似度", f"{intent_result.speaker_similarity:.0%}"]
             self.status_label.setText(f"识别到: {intent_result.speaker_name}")
         else:
             # 未能识别
-            result_text = "我不认识这个人的声音"
+            fragments = ["我不认识这个人的声音"]
             if intent_result.speaker_similarity > 0:
-                result_text += f"，最高相似度只有{intent_result.speaker_similarity:.0%}"
+                fragments += ["，最高相似度只有", f"{intent_result.speaker_similarity:.0%}"]
             self.status_label.setText("未能识别")
 
+        result_text = "".join(fragments)
         print(f"[UI] 声纹识别结果: {result_text}")
         self.ai_text.setText(result_text)
-        self._speak_text(result_text)
+        self._speak_text(result_text, fragments)
 
     def _identify_other_speaker(self):
         """
@@ -2766,15 +2848,16 @@ class VoiceAssistantWindow(QMainWindow):
             self.timing_voice_extract.setText(f"声纹提取: {identify_time:.0f}ms")
 
             if speaker_name:
-                result_text = f"这是{speaker_name}的声音，相似度{similarity:.0%}"
+                fragments = ["这是", speaker_name, "的声音", "，相似度", f"{similarity:.0%}"]
                 self.status_label.setText(f"识别到: {speaker_name}")
             else:
-                result_text = f"我不认识这个人，最高相似度只有{similarity:.0%}"
+                fragments = ["我不认识这个人", "，最高相似度只有", f"{similarity:.0%}"]
                 self.status_label.setText("未能识别")
 
+            result_text = "".join(fragments)
             print(f"[UI] 声纹识别他人结果: {result_text}")
             self.ai_text.setText(result_text)
-            self._speak_text(result_text)
+            self._speak_text(result_text, fragments)
 
         except Exception as e:
             error_msg = f"声纹识别失败: {str(e)}"
@@ -2798,8 +2881,8 @@ class VoiceAssistantWindow(QMainWindow):
             self._speak_text(intent_result.error_message)
             return
 
-        # 构建识别结果描述
-        descriptions = []
+        # 构建识别结果描述（按片段组织，片段齐全时本地拼接播报）
+        descriptions: List[List[str]] = []
         unknown_count = 0
         recognized_names = []
 
@@ -2812,7 +2895,7 @@ class VoiceAssistantWindow(QMainWindow):
                     recognized_names.append(face.get("name", ""))
 
             if recognized_names:
-                descriptions.append(f"人物：{', '.join(recognized_names)}")
+                descriptions.append(["人物："] + self._join_fragments(recognized_names, ", "))
 
         # 物体检测结果（排除"人"类别，因为已经通过人脸识别处理了）
         if intent_result.object_results:
@@ -2825,18 +2908,18 @@ class VoiceAssistantWindow(QMainWindow):
             object_descs = []
             for name, count in object_counts.items():
                 if count == 1:
-                    object_descs.append(name)
+                    object_descs.append([name])
                 else:
-                    object_descs.append(f"{count}个{name}")
+                    object_descs.append([f"{count}个", name])
 
             if object_descs:
-                descriptions.append(f"物体：{', '.join(object_descs)}")
+                descriptions.append(["物体："] + self._join_fragments(object_descs, ", "))
 
         # 生成回复
         if descriptions:
-            result_text = f"我看到了：{'; '.join(descriptions)}"
+            fragments = ["我看到了："] + self._join_fragments(descriptions, "; ")
         else:
-            result_text = ""
+            fragments = []
 
         # 如果有未知人脸，追问并进入注册流程
         if unknown_count > 0:
@@ -2848,27 +2931,25 @@ class VoiceAssistantWindow(QMainWindow):
                     self.waiting_for_face_name = True
 
                     if unknown_count == 1:
-                        ask_text = "我看到一个人，但我不认识。请问他是谁？"
+                        ask_fragments = ["我看到一个人，但我不认识。请问他是谁？"]
                     else:
-                        ask_text = f"我看到{unknown_count}个人，但我都不认识。请问他们是谁？"
+                        ask_fragments = ["我看到", f"{unknown_count}个人，", "但我都不认识。请问他们是谁？"]
 
-                    if result_text:
-                        result_text = f"{result_text}。{ask_text}"
+                    if fragments:
+                        fragments = fragments + ["。"] + ask_fragments
                     else:
-                        result_text = ask_text
+                        fragments = ask_fragments
 
                     print(f"[UI] 检测到未知人脸，进入注册追问模式")
                     self.status_label.setText("等待用户说人名...")
             else:
                 # 无法提取编码，只报告结果
-                if unknown_count == 1:
-                    descriptions.insert(0, "1个未知人脸")
-                else:
-                    descriptions.insert(0, f"{unknown_count}个未知人脸")
-                result_text = f"我看到了：{'; '.join(descriptions)}"
-        elif not result_text:
-            result_text = "没有识别到明显的人脸或物体"
+                descriptions.insert(0, [f"{unknown_count}个未知人脸"])
+                fragments = ["我看到了："] + self._join_fragments(descriptions, "; ")
+        elif not fragments:
+            fragments = ["没有识别到明显的人脸或物体"]
 
+        result_text = "".join(fragments)
         print(f"[UI] 本地识别结果: {result_text}")
         self.ai_text.setText(result_text)
 
@@ -2877,7 +2958,26 @@ class VoiceAssistantWindow(QMainWindow):
             delete_temp_image(intent_result.image_path)
 
         # 语音播报
-        self._speak_text(result_text)
+        self._speak_text(result_text, fragments)
+
+    @staticmethod
+    def _join_fragments(items: list, separator: str) -> List[str]:
+        """
+        用分隔符连接片段（元素可以是单个片段或片段列表）
+
+        Args:
+            items: 片段或片段列表
+            separator: 分隔符（只含标点，拼接播报时是一段停顿）
+
+        Returns:
+            展开后的片段列表
+        """
+        fragments: List[str] = []
+        for index, item in enumerate(items):
+            if index:
+                fragments.append(separator)
+            fragments.extend(item if isinstance(item, list) else [item])
+        return fragments
 
     def _handle_face_recognize_result(self, intent_result: IntentResult, original_text: str):
         """
@@ -2913,11 +3013,13 @@ class VoiceAssistantWindow(QMainWindow):
                 recognized_names.append(face["name"])
 
         # 构建人脸信息描述（用于提示词）
+        face_fragments = None
         if recognized_names:
             if unknown_count > 0:
                 face_info = f"照片中我认出了{', '.join(recognized_names)}，还有{unknown_count}个我不认识的人"
             else:
-                face_info = f"照片中是{', '.join(recognized_names)}"
+                face_fragments = ["照片中是"] + self._join_fragments(recognized_names, ", ")
+                face_info = "".join(face_fragments)
         else:
             face_info = f"照片中有{unknown_count}个人，但我都不认识"
 
@@ -2946,7 +3048,7 @@ class VoiceAssistantWindow(QMainWindow):
             # 无图片，直接回复识别结果
             self.status_label.setText("识别完成")
             self.ai_text.setText(face_info)
-            self._speak_text(face_info)
+            self._speak_text(face_info, face_fragments)
 
     def _call_chat_with_custom_prompt(self, prompt: str, image_path: Optional[str] = None):
         """
@@ -2966,15 +3068,25 @@ class VoiceAssistantWindow(QMainWindow):
         )
         self.chat_worker.start()
 
-    def _speak_text(self, text: str):
+    def _speak_text(self, text: str, fragments: Optional[List[str]] = None):
         """
         语音播报文本
 
         Args:
             text: 要播报的文本
-        """
-        # 启动流式 TTS（单次播报）
-        self.streaming_tts_worker = StreamingTTSWorker(self.signals)
+            fragments: 模板回复的片段（拼起来等于 text），片段齐全时本地拼接播报
+        """
+        # 启动流式 TTS（单次播报）：
+        # 模板回复的片段齐全时本地拼接；固定提示语命中合成缓存时直接播放，否则合成后写入缓存
+        player = get_pcm_player()
+        cached = self.phrase_bank.compose(fragments) if fragments else None
+        if cached is not None:
+            print(f"[PhraseBank] 本地拼接播报: {text}")
+        elif not fragments:
+            cached = get_tts_cache().get(text, TTS_STREAM_FORMAT, player.sample_rate)
+        self.streaming_tts_worker = StreamingTTSWorker(self.signals, player, cached_audio=cached)
+        if cached is None and not fragments:
+            self.streaming_tts_worker.cache_text = text
         self.streaming_tts_worker.start()
         # 发送文本并结束
         self.signals.chat_chunk.emit(text)
@@ -2982,6 +3094,66 @@ class VoiceAssistantWindow(QMainWindow):
         # 重置按钮
         self._reset_button()
 
+    def _answer_from_cache(self, user_input: str) -> bool:
+        """
+        查询本地答案缓存，命中时跳过对话模型直接播放
+
+        Args:
+            user_input: 用户输入文本
+
+        Returns:
+            是否命中缓存
+        """
+        self.cache_candidate = None
+        self.cache_reply = None
+
+        entry = self.answer_cache.lookup(self.current_user_id, user_input)
+        if entry is None:
+            # 未命中：可缓存的问题在本轮回复播放完后写入缓存
+            if self.answer_cache.is_cacheable(user_input):
+                self.cache_candidate = (self.current_user_id, user_input)
+            return False
+
+        self.time_chat_first = time.time()
+        self.is_first_chunk = False
+        asr_to_chat = (self.time_chat_first - self.time_asr_end) * 1000
+        self.timing_asr_chat.setText(f"ASR→首字: {asr_to_chat:.0f}ms (缓存)")
+        self.timing_mem0_search.setText("记忆搜索: 跳过")
+        self.status_label.setText("命中答案缓存")
+        self.current_ai_text = entry.reply
+        self.ai_text.setText(entry.reply)
+
+        if entry.audio:
+            self.streaming_tts_worker = StreamingTTSWorker(self.signals, cached_audio=entry.audio)
+            self.streaming_tts_worker.start()
+        else:
+            # 只缓存了文本（音频过长或上次未合成完整）：跳过对话模型，仍需合成，合成完成后补写音频
+            self.cache_candidate = (self.current_user_id, user_input)
+            self.cache_reply = entry.reply
+            self.streaming_tts_worker = StreamingTTSWorker(self.signals)
+            self.streaming_tts_worker.start()
+            self.streaming_tts_worker.add_text_chunk(entry.reply)
+            self.streaming_tts_worker.finish_text()
+
+        self.chat_history.append({"role": "user", "content": user_input})
+        self.chat_history.append({"role": "assistant", "content": entry.reply})
+        self.chat_history = get_context_builder().compact(self.chat_history)
+        return True
+
+    def _store_cached_answer(self):
+        """本轮回复完整播放后，把问题、回复和合成的音频写入答案缓存"""
+        candidate, reply = self.cache_candidate, self.cache_reply
+        self.cache_candidate = None
+        self.cache_reply = None
+        if candidate is None or not reply or not self.streaming_tts_worker:
+            return
+        user_id, question = candidate
+        self.answer_cache.put(
+            user_id, question, reply,
+            audio=self.streaming_tts_worker.recorded_audio,
+            sample_rate=self.pcm_player.sample_rate
+        )
+
     def _call_chat(self, user_input: str,
                    image_base64: Optional[str] = None,
                    image_path: Optional[str] = None):  # MODIFIED
@@ -2993,8 +3165,8 @@ class VoiceAssistantWindow(QMainWindow):
             image_base64: 图片的Base64编码（可选，用于图文分析）
             image_path: 临时图片路径（可选，用于清理）
         """
-        # 搜索相关记忆
-        memory_context = self._search_memories(user_input)
+        # 取回识别过程中预取的记忆（对话线程最多等到识别完成后 MEM0_DEADLINE_MS）
+        memory_future = self._request_memories(user_input)
 
         self.chat_worker = ChatWorker(self.signals)
         self.chat_worker.set_input(
@@ -3002,60 +3174,40 @@ class VoiceAssistantWindow(QMainWindow):
             self.chat_history,
             image_base64=image_base64,
             image_path=image_path,
-            memory_context=memory_context
+            memory_future=memory_future,
+            memory_deadline=self.time_asr_end + MEM0_DEADLINE_MS / 1000
         )
         self.chat_worker.start()
 
-    def _search_memories(self, query: str) -> Optional[str]:
+    def _request_memories(self, query: str, keep: bool = False) -> Optional[Future]:
         """
-        搜索相关记忆并构建上下文
+        取得相关记忆的搜索（不阻塞界面线程）
+
+        优先复用识别过程中的预取结果；对话线程最多等到截止时刻，超时不带记忆继续（见 ChatWorker._wait_memories）
 
         Args:
             query: 用户查询文本
+            keep: 推测请求用中间结果取时为 True，保留预取结果给本轮最终文本复用
 
         Returns:
-            记忆上下文字符串，无记忆返回 None
+            记忆搜索的 Future，不搜索时返回 None
         """
-        if not self.mem0_client or not self.current_user_id:
+        if not self.memory_prefetcher or not self.current_user_id:
             self.timing_mem0_search.setText("记忆搜索: 跳过")
             return None
-
         try:
-            # 记录开始时间
-            start_time = time.time()
-
-            # 搜索相关记忆
-            memories = self.mem0_client.search_memory(self.current_user_id, query)
-
-            # 记录耗时
-            self.time_mem0_search = (time.time() - start_time) * 1000
-            self.timing_mem0_search.setText(f"记忆搜索: {self.time_mem0_search:.0f}ms")
-            print(f"[计时] 记忆搜索: {self.time_mem0_search:.0f}ms")
-
-            # 过滤低相似度记忆
-            relevant_memories = [
-                m for m in memories
-                if m.score is None or m.score >= MEM0_SIMILARITY_THRESHOLD
-            ]
-
-            if not relevant_memories:
-                self.timing_mem0_search.setText(f"记忆搜索: {self.time_mem0_search:.0f}ms (0条)")
-                return None
-
-            # 构建记忆上下文
-            memory_texts = [m.memory for m in relevant_memories]
-            memories_str = "\n".join(f"- {text}" for text in memory_texts)
-
-            # 使用模板格式化
-            context = MEM0_CONTEXT_TEMPLATE.format(memories=memories_str)
-            self.timing_mem0_search.setText(f"记忆搜索: {self.time_mem0_search:.0f}ms ({len(relevant_memories)}条)")
-            print(f"[Mem0] 找到 {len(relevant_memories)} 条相关记忆")
-            return context
-
+            future = self.memory_prefetcher.request(self.current_user_id, query, keep=keep)
         except Exception as e:
             print(f"[Mem0] 搜索记忆失败: {e}")
-            self.timing_mem0_search.setText("记忆搜索: 失败")
-            return None
+            future = None
+        if future is None:
+            self.timing_mem0_search.setText("记忆搜索: 跳过")
+        return future
+
+    def _on_memory_searched(self, label: str, wait_ms: float):
+        """对话线程取回记忆后更新界面"""
+        self.time_mem0_search = wait_ms
+        self.timing_mem0_search.setText(label)
 
     def _on_chat_thinking(self):
         """AI 正在思考，同时启动流式 TTS"""
@@ -3105,13 +3257,16 @@ class VoiceAssistantWindow(QMainWindow):
             self.streaming_tts_worker.finish_text()
             print("[UI] 流式 TTS 文本已全部发送")
 
+        # 可缓存的问题记下回复，播放完成后连同音频写入答案缓存
+        if self.cache_candidate and self.cache_candidate[1] == self.current_asr_text:
+            self.cache_reply = reply
+
         # 更新对话历史
         self.chat_history.append({"role": "user", "content": self.current_asr_text})
         self.chat_history.append({"role": "assistant", "content": reply})
 
-        # 限制历史长度（保留最近 10 轮对话）
-        if len(self.chat_history) > 20:
-            self.chat_history = self.chat_history[-20:]
+        # 超出历史预算的早期对话移出，后台合并进滚动摘要
+        self.chat_history = get_context_builder().compact(self.chat_history)
 
         # 异步存储记忆（在后台线程中执行，不阻塞 UI）
         self._store_memory_async(self.current_asr_text, reply)
@@ -3120,128 +3275,45 @@ class VoiceAssistantWindow(QMainWindow):
         """
         异步存储对话记忆
 
-        在后台线程中提取关键信息并存储到 Mem0
+        只把本轮对话追加到后台写入队列，由 MemoryWriter 攒批提取关键信息并存储到 Mem0
 
         Args:
             user_message: 用户消息
             assistant_message: 助手回复
         """
-        if not self.mem0_client or not self.current_user_id:
+        if not self.memory_writer or not self.current_user_id:
             return
 
-        # 保存 window 引用，用于在线程中更新 UI
-        window = self
-
-        def store_task():
-            try:
-                # 提取关键信息（带计时）
-                extract_start = time.time()
-                key_info = window._extract_key_info(user_message, assistant_message)
-                extract_time = (time.time() - extract_start) * 1000
-                window.time_mem0_extract = extract_time
-                print(f"[计时] 信息提取: {extract_time:.0f}ms")
-
-                # 使用 QTimer 在主线程中更新 UI
-                QTimer.singleShot(0, lambda: window.timing_mem0_extract.setText(
-                    f"信息提取: {extract_time:.0f}ms"
-                ))
-
-                if key_info and key_info.strip() and key_info != "无":
-                    # 存储记忆（带计时）
-                    store_start = time.time()
-                    window.mem0_client.add_memory(
-                        window.current_user_id,
-                        [
-                            {"role": "user", "content": user_message},
-                            {"role": "assistant", "content": assistant_message},
-                            {"role": "system", "content": f"提取的关键信息：{key_info}"}
-                        ]
-                    )
-                    store_time = (time.time() - store_start) * 1000
-                    window.time_mem0_store = store_time
-                    print(f"[计时] 记忆存储: {store_time:.0f}ms")
-                    print(f"[Mem0] 已存储记忆: {key_info[:50]}...")
-
-                    # 使用 QTimer 在主线程中更新 UI
-                    QTimer.singleShot(0, lambda: window.timing_mem0_store.setText(
-                        f"记忆存储: {store_time:.0f}ms"
-                    ))
-                else:
-                    print("[Mem0] 对话中无需记忆的关键信息")
-                    QTimer.singleShot(0, lambda: window.timing_mem0_store.setText(
-                        "记忆存储: 跳过"
-                    ))
-
-            except Exception as e:
-                print(f"[Mem0] 存储记忆失败: {e}")
-                QTimer.singleShot(0, lambda: window.timing_mem0_store.setText(
-                    "记忆存储: 失败"
-                ))
-
-        # 在后台线程中执行
-        threading.Thread(target=store_task, daemon=True).start()
-
-    def _extract_key_info(self, user_message: str, assistant_message: str) -> Optional[str]:
-        """
-        使用 AI 提取对话中的关键信息
-
-        Args:
-            user_message: 用户消息
-            assistant_message: 助手回复
-
-        Returns:
-            提取的关键信息字符串，无关键信息返回 None
-        """
-        try:
-            # 构建提取提示词
-            prompt = MEM0_EXTRACTION_PROMPT.format(
-                user_message=user_message,
-                assistant_message=assistant_message
-            )
-
-            # 调用 Chat API 提取关键信息（简短请求）
-            headers = {
-                "Authorization": f"Bearer {CHAT_API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            data = {
-                "model": CHAT_MODEL_NAME,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_completion_tokens": 100,
-                "temperature": 0.1,
-                "stream": False
-            }
-
-            response = requests.post(
-                CHAT_API_URL,
-                headers=headers,
-                data=json.dumps(data),
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                return content.strip()
+        self.memory_writer.enqueue(self.current_user_id, user_message, assistant_message)
+        self.timing_mem0_store.setText(f"记忆存储: 排队 {self.memory_writer.depth}轮")
 
-            return None
+    def _on_memory_writer_progress(self, stage: str, text: str):
+        """后台记忆写入进度（在写入线程中调用，转到主线程更新 UI）"""
+        label = self.timing_mem0_extract if stage == "extract" else self.timing_mem0_store
+        QTimer.singleShot(0, lambda: label.setText(text))
 
-        except Exception as e:
-            print(f"[Mem0] 提取关键信息失败: {e}")
-            return None
+    def _update_circuit_label(self):
+        """刷新耗时面板中的服务熔断状态（熔断时标红）"""
+        breakers = list(self.circuit_monitor.breakers.values())
+        if not breakers:
+            return
+        self.timing_circuit.setText("服务: " + " ".join(f"{b.name}{b.state_name}" for b in breakers))
+        healthy = all(b.state == b.CLOSED for b in breakers)
+        self.timing_circuit.setStyleSheet(f"color: {'#4CAF50' if healthy else '#f44336'}; border: none;")
 
     def _on_chat_error(self, error: str):
         """对话模型错误"""
         self.status_label.setText(f"对话错误: {error}")
         self.ai_text.setText(f"对话失败: {error}")
 
-        # 停止流式 TTS
+        # 停止流式 TTS 和垫音
+        self.thinking_filler.cancel()
         if self.streaming_tts_worker and self.streaming_tts_worker.isRunning():
             self.streaming_tts_worker.stop()
 
         # 清空待注册的声纹，避免 Chat 失败后仍追问名字
         self.pending_speaker_embedding = None
+        self.cache_candidate = None
 
         self._reset_button()
 
@@ -3279,6 +3351,7 @@ class VoiceAssistantWindow(QMainWindow):
     def _on_tts_finished(self):
         """TTS 播放完成"""
         self.is_tts_playing = False
+        self._store_cached_answer()
 
         # 检查是否需要追问说话人名字（有待注册的声纹）
         if self.pending_speaker_embedding is not None and not self.waiting_for_speaker_name:
@@ -3324,20 +3397,23 @@ class VoiceAssistantWindow(QMainWindow):
             if success:
                 print(f"[声纹识别] 声纹注册成功: {name}")
 
-                # 迁移临时用户的记忆到正式用户
-                if self.mem0_client and self.temp_user_id:
-                    migrated = self.mem0_client.migrate_user_memories(
-                        self.temp_user_id, name
-                    )
-                    if migrated > 0:
-                        print(f"[Mem0] 已迁移 {migrated} 条记忆到用户: {name}")
+                # 迁移临时用户的记忆到正式用户（队列中还没写入的对话直接改记到正式用户）
+                if self.memory_writer and self.temp_user_id:
+                    self.memory_writer.reassign(self.temp_user_id, name)
+                if self.memory_migrator and self.temp_user_id:
+                    threading.Thread(
+                        target=self._migrate_memories_async,
+                        args=(self.temp_user_id, name),
+                        daemon=True
+                    ).start()
 
                 # 更新当前用户 ID
                 self.current_user_id = name
                 self.temp_user_id = None
                 self.current_speaker_name = name
 
-                self._speak_text(f"好的，{name}，我记住你了！")
+                self.phrase_bank.learn([name])
+                self._speak_text(f"好的，{name}，我记住你了！", ["好的，", name, "，我记住你了！"])
             else:
                 print(f"[声纹识别] 声纹注册失败: {message}")
                 self._speak_text(f"抱歉，注册失败了：{message}")
@@ -3349,6 +3425,21 @@ class VoiceAssistantWindow(QMainWindow):
         self.waiting_for_speaker_name = False
         self.pending_speaker_embedding = None
 
+    def _migrate_memories_async(self, from_user_id: str, to_user_id: str):
+        """
+        后台迁移临时用户的记忆（不阻塞注册确认语音）
+
+        Args:
+            from_user_id: 临时用户 ID
+            to_user_id: 正式用户 ID
+        """
+        start = time.time()
+        migrated = self.memory_migrator.migrate(from_user_id, to_user_id)
+        if migrated > 0:
+            get_memory_mirror().mark_stale(to_user_id)
+            print(f"[Mem0] 已迁移 {migrated} 条记忆到用户: {to_user_id}，"
+                  f"耗时 {(time.time() - start) * 1000:.0f}ms")
+
     def closeEvent(self, event):
         """窗口关闭事件"""
         # 停止所有工作线程
@@ -3360,6 +3451,12 @@ class VoiceAssistantWindow(QMainWindow):
             self.chat_worker.stop()
             self.chat_worker.wait(1000)
 
+        self._cancel_speculative_chat()
+        for speculation in self._speculations:
+            if speculation.worker.isRunning():
+                speculation.worker.stop()
+                speculation.worker.wait(1000)
+
         if self.tts_worker and self.tts_worker.isRunning():
             self.tts_worker.stop()
             self.tts_worker.wait(1000)
@@ -3368,6 +3465,51 @@ class VoiceAssistantWindow(QMainWindow):
             self.streaming_tts_worker.stop()
             self.streaming_tts_worker.wait(1000)
 
+        # 关闭 ASR 预热连接
+        self.asr_connection_pool.stop()
+
+        # 关闭对话接口长连接
+        self.chat_http_client.stop()
+
+        # 打印快慢路由的延迟统计
+        for route, stats in get_chat_router().stats().items():
+            print(f"[Router] {route}: {stats}")
+
+        # 打印答案缓存命中统计
+        print(f"[AnswerCache] {self.answer_cache.stats()}")
+
+        # 打印合成音频缓存命中统计
+        print(f"[TTSCache] {get_tts_cache().stats()}")
+        print(f"[PhraseBank] {self.phrase_bank.stats()}")
+        print(f"[Filler] {self.thinking_filler.stats()}")
+        self.phrase_bank.shutdown()
+
+        # 停止对话摘要线程
+        print(f"[Context] {get_context_builder().stats()}")
+        get_context_builder().shutdown()
+
+        # 停止记忆预取线程
+        if self.memory_prefetcher:
+            print(f"[MemoryPrefetch] {self.memory_prefetcher.stats()}")
+            print(f"[MemoryMirror] {self.memory_prefetcher.mirror.stats()}")
+            self.memory_prefetcher.shutdown()
+            self.memory_prefetcher.mirror.shutdown()
+
+        # 停止后台记忆写入（未写完的对话保留在队列文件中，下次启动继续）
+        if self.memory_writer:
+            print(f"[MemoryWriter] {self.memory_writer.stats()}")
+            self.memory_writer.stop()
+
+        # 停止熔断健康探测
+        print(f"[Circuit] {self.circuit_monitor.stats()}")
+        self.circuit_monitor.stop()
+
+        # 关闭常开麦克风
+        self.audio_recorder.cleanup()
+
+        # 关闭 PCM 输出流
+        self.pcm_player.close()
+
         # 清理临时音频文件
         if os.path.exists(TEMP_AUDIO_PATH):
             try:
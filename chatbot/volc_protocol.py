@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""
+豆包语音 WebSocket 二进制帧编解码（ASR / TTS 共用）
+
+帧格式：
+    4 字节 header | [4 字节 sequence / event] | [4 字节 id 长度 + id] | 4 字节 payload 长度 | payload
+
+优化点：
+1. header 预先生成模板，不再每帧 bytes([...]) 拼装
+2. 编码时一次分配（或复用）bytearray，用 struct.pack_into 原地写入长度字段，
+   不再产生 header + size + payload 拼接过程中的临时 bytes 对象
+3. 解码时用 memoryview + struct.unpack_from 按偏移读取，音频数据以 memoryview
+   切片返回，不复制
+
+运行本文件可执行编解码微基准测试：python volc_protocol.py
+"""
+
+import gzip
+import json
+import struct
+from typing import Optional, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# ==================== 协议常量 ====================
+# 消息类型
+MSG_FULL_CLIENT_REQUEST = 0b0001
+MSG_AUDIO_ONLY_REQUEST = 0b0010
+MSG_FULL_SERVER_RESPONSE = 0b1001
+MSG_AUDIO_ONLY_RESPONSE = 0b1011
+MSG_ERROR = 0b1111
+
+# 消息类型标志
+FLAG_NONE = 0b0000
+FLAG_POS_SEQUENCE = 0b0001
+FLAG_LAST_PACKAGE = 0b0010
+FLAG_NEG_SEQUENCE = 0b0011
+FLAG_WITH_EVENT = 0b0100
+
+# 序列化 / 压缩方式
+SERIAL_RAW = 0b0000
+SERIAL_JSON = 0b0001
+COMPRESS_NONE = 0b0000
+COMPRESS_GZIP = 0b0001
+
+# TTS 事件
+EVENT_START_CONNECTION = 1
+EVENT_FINISH_CONNECTION = 2
+EVENT_CONNECTION_STARTED = 50
+EVENT_CONNECTION_FAILED = 51
+EVENT_CONNECTION_FINISHED = 52
+EVENT_START_SESSION = 100
+EVENT_CANCEL_SESSION = 101
+EVENT_FINISH_SESSION = 102
+EVENT_SESSION_STARTED = 150
+EVENT_SESSION_CANCELED = 151
+EVENT_SESSION_FINISHED = 152
+EVENT_SESSION_FAILED = 153
+EVENT_TASK_REQUEST = 200
+EVENT_TTS_SENTENCE_START = 350
+EVENT_TTS_SENTENCE_END = 351
+EVENT_TTS_RESPONSE = 352
+
+# 请求中需要携带 session_id 的事件
+_REQUEST_SESSION_EVENTS = frozenset((
+    EVENT_START_SESSION, EVENT_CANCEL_SESSION, EVENT_FINISH_SESSION, EVENT_TASK_REQUEST
+))
+# 响应中携带 session_id 的事件
+_RESPONSE_SESSION_EVENTS = frozenset((
+    EVENT_SESSION_STARTED, EVENT_SESSION_FINISHED, EVENT_SESSION_FAILED,
+    EVENT_SESSION_CANCELED, EVENT_TTS_SENTENCE_START, EVENT_TTS_SENTENCE_END
+))
+# 响应中携带 connection_id 的事件
+_RESPONSE_CONNECTION_EVENTS = frozenset((
+    EVENT_CONNECTION_STARTED, EVENT_CONNECTION_FAILED, EVENT_CONNECTION_FINISHED
+))
+
+_U32 = struct.Struct('>I')
+_HEADER_U32 = struct.Struct('>4sI')  # header + 长度字段，一次写入
+_HEADER_SIZE = 4
+
+
+def _copy_into(frame: bytearray, offset: int, data: BytesLike):
+    """
+    将 data 写入 frame[offset:]
+
+    bytearray 的切片赋值会先复制一份源数据，经 memoryview 写入则直接拷贝到目标缓冲区
+    """
+    with memoryview(frame) as view:
+        view[offset:offset + len(data)] = data
+
+
+def _header(message_type: int, flags: int, serialization: int, compression: int) -> bytes:
+    """生成 4 字节 header（仅用于初始化模板）"""
+    return bytes((0x11, (message_type << 4) | flags, (serialization << 4) | compression, 0x00))
+
+
+# ==================== header 模板 ====================
+HEADER_FULL_CLIENT_JSON = _header(MSG_FULL_CLIENT_REQUEST, FLAG_NONE, SERIAL_JSON, COMPRESS_NONE)
+HEADER_FULL_CLIENT_JSON_GZIP = _header(MSG_FULL_CLIENT_REQUEST, FLAG_NONE, SERIAL_JSON, COMPRESS_GZIP)
+HEADER_AUDIO = _header(MSG_AUDIO_ONLY_REQUEST, FLAG_NONE, SERIAL_RAW, COMPRESS_NONE)
+HEADER_AUDIO_LAST = _header(MSG_AUDIO_ONLY_REQUEST, FLAG_LAST_PACKAGE, SERIAL_RAW, COMPRESS_NONE)
+HEADER_AUDIO_GZIP = _header(MSG_AUDIO_ONLY_REQUEST, FLAG_NONE, SERIAL_RAW, COMPRESS_GZIP)
+HEADER_AUDIO_LAST_GZIP = _header(MSG_AUDIO_ONLY_REQUEST, FLAG_LAST_PACKAGE, SERIAL_RAW, COMPRESS_GZIP)
+HEADER_EVENT_JSON = _header(MSG_FULL_CLIENT_REQUEST, FLAG_WITH_EVENT, SERIAL_JSON, COMPRESS_NONE)
+
+
+# ==================== 编码 ====================
+
+def build_full_client_request(payload: dict, use_gzip: bool = True) -> bytearray:
+    """
+    构建 ASR full client request
+
+    Args:
+        payload: JSON 请求参数
+        use_gzip: 是否使用 gzip 压缩
+
+    Returns:
+        二进制请求包
+    """
+    payload_bytes = json.dumps(payload).encode('utf-8')
+    if use_gzip:
+        payload_bytes = gzip.compress(payload_bytes)
+        header = HEADER_FULL_CLIENT_JSON_GZIP
+    else:
+        header = HEADER_FULL_CLIENT_JSON
+
+    size = len(payload_bytes)
+    frame = bytearray(8 + size)
+    _HEADER_U32.pack_into(frame, 0, header, size)
+    _copy_into(frame, 8, payload_bytes)
+    return frame
+
+
+def build_audio_request(audio_data: BytesLike, is_last: bool = False,
+                        use_gzip: bool = False) -> bytearray:
+    """
+    构建 ASR audio only request（一次性分配，适合偶发调用）
+
+    Args:
+        audio_data: PCM 音频数据
+        is_last: 是否为最后一包
+        use_gzip: 是否使用 gzip 压缩
+
+    Returns:
+        二进制请求包
+    """
+    if use_gzip and audio_data:
+        audio_data = gzip.compress(audio_data)
+        header = HEADER_AUDIO_LAST_GZIP if is_last else HEADER_AUDIO_GZIP
+    else:
+        header = HEADER_AUDIO_LAST if is_last else HEADER_AUDIO
+
+    size = len(audio_data)
+    frame = bytearray(8 + size)
+    _HEADER_U32.pack_into(frame, 0, header, size)
+    _copy_into(frame, 8, audio_data)
+    return frame
+
+
+class AudioFrameEncoder:
+    """
+    ASR 音频帧编码器
+
+    复用同一块 bytearray 编码每一帧，返回指向该缓冲区的 memoryview。
+    返回值只在下一次 encode() 之前有效，调用方必须先 await websocket.send() 再编码下一帧
+    （websockets 在 send() 内部就完成了帧序列化，不会延迟引用缓冲区）。
+    """
+
+    def __init__(self, capacity: int = 6400):
+        """
+        Args:
+            capacity: 初始 payload 容量（字节），不够时自动扩容
+        """
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        """分配缓冲区"""
+        self._capacity = capacity
+        self._buffer = bytearray(8 + capacity)
+        self._view = memoryview(self._buffer)
+        # 最近一次帧长对应的视图，固定帧长时每帧都可复用
+        self._frame_size = -1
+        self._frame_view = self._view
+
+    def encode(self, audio_data: BytesLike, is_last: bool = False) -> memoryview:
+        """
+        编码一帧音频（不压缩）
+
+        Args:
+            audio_data: PCM 音频数据
+            is_last: 是否为最后一包
+
+        Returns:
+            帧数据视图
+        """
+        size = len(audio_data)
+        if size > self._capacity:
+            self._frame_view.release()
+            self._view.release()
+            self._allocate(size)
+
+        _HEADER_U32.pack_into(self._buffer, 0, HEADER_AUDIO_LAST if is_last else HEADER_AUDIO, size)
+        self._view[8:8 + size] = audio_data
+
+        if size != self._frame_size:
+            self._frame_size = size
+            self._frame_view = self._view[:8 + size]
+        return self._frame_view
+
+
+def build_event_request(event: int, session_id: str = "",
+                        payload: Optional[dict] = None) -> bytearray:
+    """
+    构建 TTS 带事件号的请求包
+
+    Args:
+        event: 事件类型
+        session_id: 会话 ID（仅 Session 类事件需要）
+        payload: JSON 负载
+
+    Returns:
+        二进制请求包
+    """
+    payload_bytes = json.dumps(payload or {}).encode('utf-8')
+    payload_size = len(payload_bytes)
+
+    if event in _REQUEST_SESSION_EVENTS:
+        sid = session_id.encode('utf-8')
+        sid_size = len(sid)
+        frame = bytearray(16 + sid_size + payload_size)
+        _HEADER_U32.pack_into(frame, 0, HEADER_EVENT_JSON, event)
+        _U32.pack_into(frame, 8, sid_size)
+        _copy_into(frame, 12, sid)
+        offset = 12 + sid_size
+    else:
+        frame = bytearray(12 + payload_size)
+        _HEADER_U32.pack_into(frame, 0, HEADER_EVENT_JSON, event)
+        offset = 8
+
+    _U32.pack_into(frame, offset, payload_size)
+    _copy_into(frame, offset + 4, payload_bytes)
+    return frame
+
+
+# ==================== 解码 ====================
+
+def is_last_package(data: BytesLike) -> bool:
+    """判断服务端响应是否为最后一包"""
+    return len(data) >= _HEADER_SIZE and (data[1] & 0x0F) in (FLAG_LAST_PACKAGE, FLAG_NEG_SEQUENCE)
+
+
+def _decode_json(payload: memoryview, compression: int):
+    """解压并解析 JSON payload，失败返回 None"""
+    if compression == COMPRESS_GZIP:
+        try:
+            payload = gzip.decompress(payload)
+        except Exception:
+            pass
+    try:
+        return json.loads(bytes(payload).decode('utf-8'))
+    except Exception:
+        return None
+
+
+def parse_asr_response(data: BytesLike) -> Optional[dict]:
+    """
+    解析 ASR 服务端响应
+
+    Args:
+        data: 二进制响应数据
+
+    Returns:
+        响应 JSON；错误帧返回 {"error": True, "code": ..., "message": ...}；无法解析返回 None
+    """
+    size = len(data)
+    if size < _HEADER_SIZE:
+        return None
+
+    view = memoryview(data)
+    message_type = view[1] >> 4
+    flags = view[1] & 0x0F
+    serialization = view[2] >> 4
+    compression = view[2] & 0x0F
+
+    offset = _HEADER_SIZE
+    # 跳过 sequence number
+    if flags in (FLAG_POS_SEQUENCE, FLAG_NEG_SEQUENCE):
+        offset += 4
+
+    if message_type == MSG_ERROR:
+        if size < offset + 8:
+            return {"error": True, "code": -1, "message": "Invalid error frame"}
+        error_code = _U32.unpack_from(view, offset)[0]
+        error_size = _U32.unpack_from(view, offset + 4)[0]
+        error_msg = bytes(view[offset + 8:offset + 8 + error_size]).decode('utf-8', errors='ignore')
+        return {"error": True, "code": error_code, "message": error_msg}
+
+    if message_type != MSG_FULL_SERVER_RESPONSE or size < offset + 4:
+        return None
+
+    payload_size = _U32.unpack_from(view, offset)[0]
+    offset += 4
+    if size < offset + payload_size:
+        return None
+
+    if serialization != SERIAL_JSON:
+        return None
+    return _decode_json(view[offset:offset + payload_size], compression)
+
+
+def parse_tts_response(data: BytesLike) -> dict:
+    """
+    解析 TTS 服务端响应
+
+    Args:
+        data: 二进制响应数据
+
+    Returns:
+        解析结果，可能包含 message_type / flags / event / session_id /
+        connection_id / audio（memoryview，不复制）/ payload / error / code
+    """
+    size = len(data)
+    if size < _HEADER_SIZE:
+        return {"error": True, "message": "响应数据过短"}
+
+    view = memoryview(data)
+    message_type = view[1] >> 4
+    flags = view[1] & 0x0F
+    compression = view[2] & 0x0F
+    offset = _HEADER_SIZE
+
+    # 错误帧
+    if message_type == MSG_ERROR:
+        if size < offset + 4:
+            return {"error": True, "message": "错误帧格式无效"}
+        error_code = _U32.unpack_from(view, offset)[0]
+        offset += 4
+        if size >= offset + 4:
+            payload_size = _U32.unpack_from(view, offset)[0]
+            offset += 4
+            if size >= offset + payload_size:
+                error_payload = _decode_json(view[offset:offset + payload_size], compression)
+                if error_payload is not None:
+                    return {"error": True, "code": error_code, "payload": error_payload}
+        return {"error": True, "code": error_code}
+
+    result = {"message_type": message_type, "flags": flags}
+
+    # 事件号
+    if flags == FLAG_WITH_EVENT:
+        if size < offset + 4:
+            return {"error": True, "message": "缺少事件号"}
+        result["event"] = _U32.unpack_from(view, offset)[0]
+        offset += 4
+
+    # 音频响应：session_id + 音频
+    if message_type == MSG_AUDIO_ONLY_RESPONSE:
+        if size >= offset + 4:
+            sid_size = _U32.unpack_from(view, offset)[0]
+            offset += 4
+            if size >= offset + sid_size:
+                result["session_id"] = bytes(view[offset:offset + sid_size]).decode('utf-8')
+                offset += sid_size
+        if size >= offset + 4:
+            audio_size = _U32.unpack_from(view, offset)[0]
+            offset += 4
+            if size >= offset + audio_size:
+                result["audio"] = view[offset:offset + audio_size]
+        return result
+
+    if message_type != MSG_FULL_SERVER_RESPONSE:
+        return result
+
+    # Session / Connection 类事件携带 id
+    event = result.get("event", 0)
+    if event in _RESPONSE_SESSION_EVENTS or event in _RESPONSE_CONNECTION_EVENTS:
+        if size >= offset + 4:
+            id_size = _U32.unpack_from(view, offset)[0]
+            offset += 4
+            if size >= offset + id_size:
+                key = "session_id" if event in _RESPONSE_SESSION_EVENTS else "connection_id"
+                result[key] = bytes(view[offset:offset + id_size]).decode('utf-8')
+                offset += id_size
+
+    # JSON payload
+    if size >= offset + 4:
+        payload_size = _U32.unpack_from(view, offset)[0]
+        offset += 4
+        if size >= offset + payload_size:
+            payload = _decode_json(view[offset:offset + payload_size], compression)
+            result["payload"] = payload if payload is not None else {}
+
+    return result
+
+
+# ==================== 微基准测试 ====================
+
+if __name__ == "__main__":
+    import timeit
+    import tracemalloc
+
+    audio = bytes(6400)  # 200ms @ 16kHz 16-bit
+    encoder = AudioFrameEncoder()
+
+    def legacy_encode():
+        header = bytes([0x11, (MSG_AUDIO_ONLY_REQUEST << 4) | FLAG_NONE, 0x00, 0x00])
+        return header + struct.pack('>I', len(audio)) + audio
+
+    def legacy_parse(frame: bytes):
+        result = {"message_type": (frame[1] >> 4) & 0x0F, "flags": frame[1] & 0x0F}
+        result["event"] = struct.unpack('>I', frame[4:8])[0]
+        offset = 8
+        sid_size = struct.unpack('>I', frame[offset:offset + 4])[0]
+        offset += 4
+        result["session_id"] = frame[offset:offset + sid_size].decode('utf-8')
+        offset += sid_size
+        audio_size = struct.unpack('>I', frame[offset:offset + 4])[0]
+        offset += 4
+        result["audio"] = frame[offset:offset + audio_size]
+        return result
+
+    sid = b"0123456789abcdef0123456789abcdef"
+    tts_frame = (_header(MSG_AUDIO_ONLY_RESPONSE, FLAG_WITH_EVENT, SERIAL_RAW, COMPRESS_NONE)
+                 + _U32.pack(EVENT_TTS_RESPONSE) + _U32.pack(len(sid)) + sid
+                 + _U32.pack(len(audio)) + audio)
+
+    cases = [
+        ("音频帧编码（旧：拼接）", legacy_encode),
+        ("音频帧编码（新：复用缓冲区）", lambda: encoder.encode(audio)),
+        ("音频帧编码（新：一次分配）", lambda: build_audio_request(audio)),
+        ("TTS 音频帧解析（旧：切片）", lambda: legacy_parse(tts_frame)),
+        ("TTS 音频帧解析（新：memoryview）", lambda: parse_tts_response(tts_frame)),
+    ]
+
+    number = 100000
+    print(f"{'用例':<26}{'耗时':>12}{'单帧峰值分配':>16}")
+    for name, func in cases:
+        elapsed = timeit.timeit(func, number=number)
+
+        # 单帧处理过程中申请的临时内存（GC 压力来源）
+        tracemalloc.start()
+        func()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+        tracemalloc.stop()
+
+        print(f"{name:<26}{elapsed / number * 1e6:9.2f} us{peak - base:13d} B")
@@ -2,13 +2,38 @@
 """AI 服务模块"""
 
 from .asr_client import ASRClient
+from .asr_pool import ASRConnectionPool
+from .volc_protocol import AudioFrameEncoder
 from .chat_client import ChatClient
+from .chat_hedge import ChatHedger
+from .chat_router import ChatRouter
 from .tts_client import TTSClient
+from .tts_cache import TTSCache
+from .text_segmenter import TextSegmenter
+from .thinking_filler import ThinkingFiller
 from .mem0_client import Mem0Client
+from .memory_prefetch import MemoryPrefetcher
+from .memory_writer import MemoryWriter
+from .memory_migration import MemoryMigrator
+from .circuit_breaker import CircuitBreaker, CircuitMonitor
+from .context_builder import ContextBuilder
 
 __all__ = [
     "ASRClient",
+    "ASRConnectionPool",
+    "AudioFrameEncoder",
     "ChatClient",
+    "ChatHedger",
+    "ChatRouter",
     "TTSClient",
+    "TTSCache",
+    "TextSegmenter",
+    "ThinkingFiller",
     "Mem0Client",
+    "MemoryPrefetcher",
+    "MemoryWriter",
+    "MemoryMigrator",
+    "CircuitBreaker",
+    "CircuitMonitor",
+    "ContextBuilder",
 ]
@@ -5,9 +5,6 @@
 """
 
 import asyncio
-import gzip
-import json
-import struct
 import uuid
 from typing import Optional, Callable, AsyncGenerator
 from dataclasses import dataclass
@@ -17,6 +14,11 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import get_logger
+from ai.asr_pool import ASRConnectionPool
+from ai.volc_protocol import (
+    AudioFrameEncoder, build_full_client_request, build_audio_request,
+    parse_asr_response, is_last_package
+)
 
 try:
     import websockets
@@ -36,6 +38,8 @@ class ASRConfig:
     enable_itn: bool = True
     enable_punc: bool = True
     show_utterances: bool = True
+    pool_size: int = 1  # 预热连接数（0 表示关闭预热）
+    pool_max_idle: float = 30.0  # 预热连接最长空闲时间（秒）
 
 
 class ASRClient:
@@ -51,11 +55,22 @@ class ASRClient:
         self._websocket = None
         self._connected = False
 
+        # 预热连接池（由 start_pool 在事件循环中启动）
+        self.pool = ASRConnectionPool(
+            config,
+            size=config.pool_size,
+            max_idle=config.pool_max_idle
+        )
+
         # 回调函数
         self._on_partial_result: Optional[Callable[[str], None]] = None
         self._on_final_result: Optional[Callable[[str], None]] = None
         self._on_error: Optional[Callable[[str], None]] = None
 
+    async def start_pool(self):
+        """启动预热连接池"""
+        await self.pool.start()
+
     def set_callbacks(
         self,
         on_partial: Callable[[str], None] = None,
@@ -67,109 +82,6 @@ class ASRClient:
         self._on_final_result = on_final
         self._on_error = on_error
 
-    def _build_header(
-        self,
-        message_type: int,
-        message_type_flags: int,
-        serialization: int,
-        compression: int
-    ) -> bytes:
-        """构建 ASR 二进制协议 header（4字节）"""
-        byte0 = 0x11  # Protocol version + Header size
-        byte1 = (message_type << 4) | message_type_flags
-        byte2 = (serialization << 4) | compression
-        byte3 = 0x00  # Reserved
-        return bytes([byte0, byte1, byte2, byte3])
-
-    def _build_full_client_request(self, payload: dict, use_gzip: bool = True) -> bytes:
-        """构建 full client request 二进制包"""
-        payload_bytes = json.dumps(payload).encode('utf-8')
-        if use_gzip:
-            payload_bytes = gzip.compress(payload_bytes)
-
-        compression = 0b0001 if use_gzip else 0b0000
-        header = self._build_header(0b0001, 0b0000, 0b0001, compression)
-        payload_size = struct.pack('>I', len(payload_bytes))
-
-        return header + payload_size + payload_bytes
-
-    def _build_audio_request(
-        self,
-        audio_data: bytes,
-        is_last: bool = False,
-        use_gzip: bool = False
-    ) -> bytes:
-        """构建 audio only request 二进制包"""
-        if use_gzip and audio_data:
-            payload_bytes = gzip.compress(audio_data)
-        else:
-            payload_bytes = audio_data
-
-        message_type_flags = 0b0010 if is_last else 0b0000
-        compression = 0b0001 if use_gzip and audio_data else 0b0000
-        header = self._build_header(0b0010, message_type_flags, 0b0000, compression)
-        payload_size = struct.pack('>I', len(payload_bytes))
-
-        return header + payload_size + payload_bytes
-
-    def _parse_response(self, data: bytes) -> Optional[dict]:
-        """解析 ASR 二进制响应"""
-        if len(data) < 4:
-            return None
-
-        header = data[:4]
-        message_type = (header[1] >> 4) & 0x0F
-        message_type_flags = header[1] & 0x0F
-        serialization = (header[2] >> 4) & 0x0F
-        compression = header[2] & 0x0F
-
-        offset = 4
-
-        # 检查是否有 sequence number
-        if message_type_flags in (0b0001, 0b0011):
-            offset += 4
-
-        # 错误消息
-        if message_type == 0b1111:
-            if len(data) < offset + 8:
-                return {"error": True, "code": -1, "message": "Invalid error frame"}
-            error_code = struct.unpack('>I', data[offset:offset+4])[0]
-            error_size = struct.unpack('>I', data[offset+4:offset+8])[0]
-            error_msg = data[offset+8:offset+8+error_size].decode('utf-8', errors='ignore')
-            return {"error": True, "code": error_code, "message": error_msg}
-
-        # 非 full server response
-        if message_type != 0b1001:
-            return None
-
-        # 解析 payload
-        if len(data) < offset + 4:
-            return None
-
-        payload_size = struct.unpack('>I', data[offset:offset+4])[0]
-        offset += 4
-
-        if len(data) < offset + payload_size:
-            return None
-
-        payload_bytes = data[offset:offset+payload_size]
-
-        # 解压缩
-        if compression == 0b0001:
-            try:
-                payload_bytes = gzip.decompress(payload_bytes)
-            except:
-                pass
-
-        # 解析 JSON
-        if serialization == 0b0001:
-            try:
-                return json.loads(payload_bytes.decode('utf-8'))
-            except:
-                return None
-
-        return None
-
     async def recognize_stream(
         self,
         audio_generator: AsyncGenerator[bytes, None]
@@ -188,22 +100,11 @@ class ASRClient:
 
         final_text = ""
 
-        # 构造请求头
-        connect_id = str(uuid.uuid4())
-        headers = {
-            "X-Api-App-Key": self.config.appid,
-            "X-Api-Access-Key": self.config.access_token,
-            "X-Api-Resource-Id": self.config.resource_id,
-            "X-Api-Connect-Id": connect_id
-        }
-
         try:
-            async with websockets.connect(
-                self.config.ws_url,
-                additional_headers=headers,
-                ping_interval=20,
-                ping_timeout=10
-            ) as websocket:
+            # 优先取用预热连接，池未命中时现场建连
+            websocket = await self.pool.acquire()
+
+            async with websocket:
                 self._websocket = websocket
                 self._connected = True
 
@@ -229,7 +130,7 @@ class ASRClient:
                     }
                 }
 
-                request_packet = self._build_full_client_request(init_params)
+                request_packet = build_full_client_request(init_params)
                 await websocket.send(request_packet)
 
                 # 并行发送和接收
@@ -240,12 +141,22 @@ class ASRClient:
                     self._recv_result(websocket)
                 )
 
-                # 等待接收任务完成获取结果
-                results = await asyncio.gather(send_task, recv_task, return_exceptions=True)
-
-                # 获取识别结果
-                if isinstance(results[1], str):
-                    final_text = results[1]
+                try:
+                    # 发送中断时识别结果不完整：取消接收，按失败处理（调用方用完整录音重新识别）
+                    try:
+                        await send_task
+                    except Exception:
+                        recv_task.cancel()
+                        raise
+
+                    # 等待接收任务完成获取结果
+                    result = await recv_task
+                    if isinstance(result, str):
+                        final_text = result
+                finally:
+                    for task in (send_task, recv_task):
+                        if not task.done():
+                            task.cancel()
 
         except websockets.exceptions.ConnectionClosed as e:
             error_msg = f"WebSocket 连接关闭: {e.code}"
@@ -270,23 +181,22 @@ class ASRClient:
     ):
         """发送音频帧"""
         frame_count = 0
+        # 复用同一块缓冲区编码音频帧（每帧 send 完成后才编码下一帧）
+        encoder = AudioFrameEncoder()
 
         try:
             async for audio_data in audio_generator:
                 if audio_data:
-                    audio_packet = self._build_audio_request(
-                        audio_data, is_last=False, use_gzip=False
-                    )
-                    await websocket.send(audio_packet)
+                    await websocket.send(encoder.encode(audio_data))
                     frame_count += 1
 
             # 发送结束帧
-            end_packet = self._build_audio_request(b"", is_last=True, use_gzip=False)
-            await websocket.send(end_packet)
+            await websocket.send(build_audio_request(b"", is_last=True))
             self.logger.debug(f"ASR 发送完成，共 {frame_count} 帧")
 
         except Exception as e:
             self.logger.error(f"ASR 发送音频异常: {e}")
+            raise
 
     async def _recv_result(self, websocket) -> str:
         """接收并处理识别结果"""
@@ -303,7 +213,7 @@ class ASRClient:
                     continue
 
                 if isinstance(response, bytes):
-                    res = self._parse_response(response)
+                    res = parse_asr_response(response)
                     if res is None:
                         continue
 
@@ -335,10 +245,8 @@ class ASRClient:
                             self._on_partial_result(text)
 
                     # 检查是否为最后一包
-                    if len(response) >= 4:
-                        message_type_flags = response[1] & 0x0F
-                        if message_type_flags in (0b0010, 0b0011):
-                            is_finished = True
+                    if is_last_package(response):
+                        is_finished = True
 
                     if is_finished:
                         self.logger.info(f"ASR 识别完成: {final_text}")
@@ -357,6 +265,7 @@ class ASRClient:
 
     async def close(self):
         """关闭连接"""
+        await self.pool.stop()
         if self._websocket:
             try:
                 await self._websocket.close()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+ASR WebSocket 连接池
+预先建立已鉴权的 ASR 连接，识别时直接取用，省去 DNS/TLS/鉴权握手延迟
+"""
+
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Optional, Deque, Tuple
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+def _is_open(websocket) -> bool:
+    """判断连接是否仍处于 OPEN 状态（兼容新旧版 websockets）"""
+    state = getattr(websocket, "state", None)
+    if state is not None:
+        return getattr(state, "name", "") == "OPEN"
+    return bool(getattr(websocket, "open", False))
+
+
+class ASRConnectionPool:
+    """
+    ASR 预热连接池
+
+    豆包流式 ASR 一条连接只承载一次识别会话，因此连接取出后不归还，
+    由后台维护任务补充新连接，保持池中始终有 size 条就绪连接
+    """
+
+    # 两次建连之间的最小间隔（秒）
+    MIN_CONNECT_INTERVAL = 1.0
+    # 建连失败后的最大退避时间（秒）
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, config, size: int = 1, max_idle: float = 30.0):
+        """
+        Args:
+            config: ASRConfig 配置
+            size: 保持的预热连接数
+            max_idle: 预热连接最长空闲时间（秒）
+        """
+        self.logger = get_logger()
+        self.config = config
+        self.size = size
+        self.max_idle = max_idle
+
+        self._idle: Deque[Tuple[object, float]] = deque()
+        self._refill_event: Optional[asyncio.Event] = None
+        self._maintain_task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self):
+        """在当前事件循环上启动后台维护任务"""
+        if self._maintain_task or self.size <= 0:
+            return
+        self._refill_event = asyncio.Event()
+        self._maintain_task = asyncio.create_task(self._maintain())
+        self.logger.info(f"ASR 连接池启动，预热连接数: {self.size}")
+
+    async def stop(self):
+        """停止维护任务并关闭所有空闲连接"""
+        if self._maintain_task:
+            self._maintain_task.cancel()
+            try:
+                await self._maintain_task
+            except asyncio.CancelledError:
+                pass
+            self._maintain_task = None
+
+        while self._idle:
+            websocket, _ = self._idle.popleft()
+            await self._safe_close(websocket)
+
+        self.logger.info(f"ASR 连接池停止（命中 {self.hits} 次，未命中 {self.misses} 次）")
+
+    def is_started(self) -> bool:
+        """连接池是否已启动"""
+        return self._maintain_task is not None
+
+    async def connect(self):
+        """建立一条新的已鉴权 ASR 连接"""
+        if websockets is None:
+            raise ImportError("websockets 未安装，请运行: pip install websockets")
+
+        headers = {
+            "X-Api-App-Key": self.config.appid,
+            "X-Api-Access-Key": self.config.access_token,
+            "X-Api-Resource-Id": self.config.resource_id,
+            "X-Api-Connect-Id": str(uuid.uuid4())
+        }
+        return await websockets.connect(
+            self.config.ws_url,
+            additional_headers=headers,
+            ping_interval=20,
+            ping_timeout=10
+        )
+
+    def acquire_nowait(self):
+        """
+        取出一条预热连接
+
+        Returns:
+            WebSocket 连接对象，没有可用连接时返回 None
+        """
+        now = time.time()
+        websocket = None
+
+        while self._idle:
+            candidate, created_at = self._idle.popleft()
+            if _is_open(candidate) and now - created_at < self.max_idle:
+                websocket = candidate
+                break
+            asyncio.ensure_future(self._safe_close(candidate))
+
+        if websocket is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if self._refill_event:
+            self._refill_event.set()
+
+        return websocket
+
+    async def acquire(self):
+        """取出一条连接，池中没有就绪连接时现场建立"""
+        websocket = self.acquire_nowait()
+        if websocket is None:
+            self.logger.debug("ASR 连接池未命中，现场建立连接")
+            websocket = await self.connect()
+        return websocket
+
+    async def _maintain(self):
+        """后台维护任务：补充连接并替换过期连接"""
+        backoff = self.MIN_CONNECT_INTERVAL
+        last_connect = 0.0
+
+        while True:
+            self._prune()
+
+            if len(self._idle) < self.size:
+                wait = self.MIN_CONNECT_INTERVAL - (time.time() - last_connect)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                last_connect = time.time()
+                try:
+                    start = time.time()
+                    websocket = await self.connect()
+                    self._idle.append((websocket, time.time()))
+                    backoff = self.MIN_CONNECT_INTERVAL
+                    self.logger.debug(f"ASR 预热连接就绪，握手耗时 {(time.time() - start) * 1000:.0f}ms")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.warning(f"ASR 预热连接失败: {e}，{backoff:.0f}s 后重试")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.MAX_BACKOFF)
+                continue
+
+            self._refill_event.clear()
+            try:
+                await asyncio.wait_for(self._refill_event.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune(self):
+        """移除已断开或空闲过久的连接"""
+        now = time.time()
+        alive: Deque[Tuple[object, float]] = deque()
+        for websocket, created_at in self._idle:
+            if _is_open(websocket) and now - created_at < self.max_idle:
+                alive.append((websocket, created_at))
+            else:
+                asyncio.ensure_future(self._safe_close(websocket))
+        self._idle = alive
+
+    @staticmethod
+    async def _safe_close(websocket):
+        """关闭连接，忽略异常"""
+        try:
+            await websocket.close()
+        except Exception:
+            pass
@@ -4,8 +4,10 @@
 Doubao-Seed-1.6 推理模型，HTTP 流式
 """
 
+import asyncio
 import json
 import time
+from urllib.parse import urlsplit
 from typing import Optional, Callable, List, Dict, AsyncGenerator
 from dataclasses import dataclass, field
 
@@ -14,9 +16,14 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import get_logger
+from ai.chat_hedge import ChatHedger
+from ai.chat_router import ChatRouter, ChatProfile
+from ai.circuit_breaker import get_circuit_breaker, get_circuit_monitor
+from ai.context_builder import ContextBuilder
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     requests = None
 
@@ -38,6 +45,28 @@ class ChatConfig:
     thinking: Optional[str] = None  # 思考模式类型
     timeout: int = 60
     max_retries: int = 3
+    pool_size: int = 2  # 长连接池大小
+    keepalive_interval: float = 20.0  # 空闲多久（秒）后发送一次保活请求，0 表示不保活
+    # 对冲请求：超过预算时间还没收到首片段时再发一个相同的请求，先到先用（会增加调用费用）
+    hedge_enabled: bool = False
+    hedge_percentile: float = 95  # 预算时间取最近首片段延迟的第几百分位
+    hedge_default_delay_ms: float = 1500  # 样本不足时的预算时间
+    hedge_min_delay_ms: float = 800
+    hedge_max_delay_ms: float = 3000
+    hedge_max_per_minute: int = 3  # 每分钟最多对冲次数
+    hedge_max_ratio: float = 0.1  # 对冲次数占总请求数的最大比例
+    # 快慢路由：简单闲聊走快速档（轻量模型、关闭深度思考、较小的 max_tokens）
+    router_enabled: bool = True
+    fast_model_name: str = "doubao-seed-1-6-flash-250828"
+    fast_max_tokens: int = 128
+    fast_thinking: Optional[str] = "disabled"
+    router_max_fast_chars: int = 30  # 超过这个字数直接走完整档
+    router_threshold: float = 0.3  # 复杂度打分阈值，低于阈值走快速档
+    # 上下文预算：按优先级装入系统提示词、记忆、历史摘要、最近对话，提示词越长首字越慢
+    context_budget: int = 1200  # 整个请求（不含回复）的 token 上限
+    context_memory_tokens: int = 300  # 记忆上下文的 token 上限
+    context_history_tokens: int = 800  # 保留在历史中的对话 token 上限，超出的早期对话移入滚动摘要
+    summary_enabled: bool = True  # 是否在后台用快速档模型把移出的对话合并成摘要
 
 
 @dataclass
@@ -53,13 +82,67 @@ class ChatClient:
 
     基于 Doubao-Seed-1.6 HTTP API
     支持流式和非流式两种模式
+
+    同步和异步调用各自复用一个长连接会话，start_keepalive() 预热连接并在空闲时保活，
+    省去每轮对话的 TCP/TLS 握手（100-300ms）
     """
 
+    # 预热请求超时（秒）
+    WARM_TIMEOUT = 5
+
     def __init__(self, config: ChatConfig):
         self.logger = get_logger()
         self.config = config
         self._history: List[Dict[str, str]] = []
 
+        # 长连接会话
+        self._session = None
+        if requests is not None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        self._aio_session = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._last_used = 0.0
+
+        # 对话接口不可用时熔断，请求直接失败，不再每轮等满超时
+        self.breaker = get_circuit_breaker("Chat", probe=self.probe)
+
+        # 首片段对冲
+        self.hedger = ChatHedger(
+            enabled=config.hedge_enabled,
+            percentile=config.hedge_percentile,
+            default_delay_ms=config.hedge_default_delay_ms,
+            min_delay_ms=config.hedge_min_delay_ms,
+            max_delay_ms=config.hedge_max_delay_ms,
+            max_per_minute=config.hedge_max_per_minute,
+            max_ratio=config.hedge_max_ratio
+        )
+
+        # 快慢路由
+        self.router = ChatRouter(
+            full_profile=ChatProfile(
+                name="full", model=config.model_name, max_tokens=config.max_tokens,
+                thinking=config.thinking, temperature=config.temperature
+            ),
+            fast_profile=ChatProfile(
+                name="fast", model=config.fast_model_name, max_tokens=config.fast_max_tokens,
+                thinking=config.fast_thinking, temperature=config.temperature
+            ),
+            enabled=config.router_enabled,
+            threshold=config.router_threshold,
+            max_fast_chars=config.router_max_fast_chars
+        )
+
+        # 上下文预算与历史摘要
+        self.context = ContextBuilder(
+            budget=config.context_budget,
+            memory_tokens=config.context_memory_tokens,
+            history_tokens=config.context_history_tokens,
+            summarize=self.summarize if config.summary_enabled else None
+        )
+
         # 回调函数
         self._on_chunk: Optional[Callable[[str], None]] = None
         self._on_complete: Optional[Callable[[str], None]] = None
@@ -76,13 +159,94 @@ class ChatClient:
         self._on_complete = on_complete
         self._on_error = on_error
 
+    async def start_keepalive(self):
+        """后台预热连接并启动保活任务（已启动时直接返回）"""
+        if self._session is None or (self._keepalive_task and not self._keepalive_task.done()):
+            return
+        self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self):
+        """启动时预热一次，之后空闲超过保活间隔就再发一次"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.warm)
+        if self.config.keepalive_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(1.0)
+            if time.time() - self._last_used >= self.config.keepalive_interval:
+                await loop.run_in_executor(None, self.warm)
+
+    def warm(self):
+        """并发发送轻量 HEAD 请求，让连接池中保持若干条已握手的连接（不调用模型）"""
+        parts = urlsplit(self.config.api_url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+
+        def ping() -> bool:
+            try:
+                self._session.head(origin, timeout=self.WARM_TIMEOUT).close()
+                return True
+            except requests.exceptions.RequestException as e:
+                self.logger.debug(f"Chat 连接预热失败: {e}")
+                return False
+
+        # 并发请求才会各自占用一条连接，串行请求只会复用同一条
+        from concurrent.futures import ThreadPoolExecutor
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.config.pool_size) as executor:
+            ok = sum(executor.map(lambda _: ping(), range(self.config.pool_size)))
+        self._last_used = time.time()
+        self.logger.debug(f"Chat 预热 {ok}/{self.config.pool_size} 条连接，耗时 {(time.time() - start) * 1000:.0f}ms")
+
+    def probe(self) -> bool:
+        """熔断期间的健康探测（HEAD 主机根路径，任何状态码都说明接口可达）"""
+        if self._session is None:
+            return False
+        parts = urlsplit(self.config.api_url)
+        try:
+            self._session.head(
+                f"{parts.scheme}://{parts.netloc}/",
+                timeout=get_circuit_monitor().config.probe_timeout
+            ).close()
+            return True
+        except requests.exceptions.RequestException:
+            return False
+
+    @staticmethod
+    def _release(response, reuse: bool = True):
+        """结束响应：读完剩余数据把连接放回连接池（reuse=False 时直接断开）"""
+        if reuse:
+            try:
+                response.raw.drain_conn()
+            except Exception:
+                pass
+        response.close()
+
+    async def close(self):
+        """停止保活任务、摘要线程并关闭所有连接"""
+        self.context.shutdown()
+        if self._keepalive_task:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._keepalive_task = None
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+        if self._session is not None:
+            self._session.close()
+
     def add_to_history(self, role: str, content: str):
-        """添加消息到历史"""
+        """添加消息到历史（每轮结束时压缩超出预算的早期对话）"""
         self._history.append({"role": role, "content": content})
+        if role == "assistant":
+            self._history = self.context.compact(self._history)
 
     def clear_history(self):
         """清空历史"""
         self._history.clear()
+        self.context.reset()
 
     def get_history(self) -> List[Dict[str, str]]:
         """获取历史"""
@@ -118,53 +282,89 @@ class ChatClient:
             "Content-Type": "application/json"
         }
 
-        # 构建消息列表
-        messages = []
-
-        # 系统提示词
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-
-        # 记忆上下文
-        if memory_context:
-            messages.append({"role": "system", "content": memory_context})
-
-        # 添加历史对话（只保留最近2轮）
-        recent_history = self._history[-4:] if len(self._history) > 4 else self._history
-        messages.extend(recent_history)
-
-        # 添加当前用户输入
+        # 按 token 预算装入系统提示词、记忆、历史摘要和最近对话
         if image_base64:
-            # 图文分析模式
+            # 图文分析模式（固定走完整档）
             prompt = self._build_image_prompt(user_input, image_base64)
-            messages.append({"role": "user", "content": prompt})
+            profile = self.router.full_profile
         else:
-            messages.append({"role": "user", "content": user_input})
+            prompt = user_input
+            profile = self.router.route(user_input).profile
+        messages = self.context.build(prompt, self._history, memory_context, system_prompt)
 
         data = {
-            "model": self.config.model_name,
+            "model": profile.model,
             "messages": messages,
-            "max_completion_tokens": self.config.max_tokens,
-            "temperature": self.config.temperature,
+            "max_completion_tokens": profile.max_tokens,
+            "temperature": profile.temperature,
             "stream": self.config.stream
         }
 
-        if self.config.thinking:
-            data["thinking"] = {"type": self.config.thinking}
+        if profile.thinking:
+            data["thinking"] = {"type": profile.thinking}
+
+        request_start = time.time()
+        first_chunk_time = None
+        if self.config.stream:
+            # 超过预算时间还没收到首片段时发出对冲请求，先到先用
+            stream = self.hedger.open(lambda: self._post(headers, data))
+            if stream is None:
+                return None
+            response = stream.response
+            first_chunk_time = time.time() - request_start
+        else:
+            response = self._post(headers, data)
+            if response is None:
+                return None
+
+        # 处理响应
+        try:
+            if self.config.stream:
+                reply = self._process_stream_response(stream.iter_lines(), user_input)
+            else:
+                reply = self._process_normal_response(response, user_input)
+            if reply:
+                self.router.record(profile.name, first_chunk_time, time.time() - request_start)
+            return reply
+        except Exception as e:
+            self.logger.error(f"Chat 处理响应异常: {e}")
+            if self._on_error:
+                self._on_error(str(e))
+            return None
+        finally:
+            self._release(response)
+
+    def _post(self, headers: dict, data: dict):
+        """
+        发送一次请求，429 限流时指数退避重试
+
+        Returns:
+            requests.Response，失败返回 None
+        """
+        response = None
 
         # 指数退避重试
         for attempt in range(self.config.max_retries):
+            if not self.breaker.allow():
+                self.logger.warning("Chat 接口熔断中，直接失败")
+                return None
             try:
-                response = requests.post(
+                self._last_used = time.time()
+                response = self._session.post(
                     self.config.api_url,
                     headers=headers,
                     data=json.dumps(data),
                     timeout=self.config.timeout,
                     stream=self.config.stream
                 )
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
 
                 # 处理 429 限流错误
                 if response.status_code == 429:
+                    self._release(response)
                     if attempt < self.config.max_retries - 1:
                         delay = 1.0 * (2 ** attempt)
                         self.logger.warning(f"Chat 限流，等待 {delay:.1f}s 后重试...")
@@ -178,22 +378,64 @@ class ChatClient:
                 break
 
             except requests.exceptions.Timeout:
+                self.breaker.record_failure()
                 self.logger.error("Chat 请求超时")
                 return None
+            except requests.exceptions.ConnectionError as e:
+                self.breaker.record_failure()
+                self.logger.error(f"Chat 连接失败: {e}")
+                return None
             except requests.exceptions.RequestException as e:
                 self.logger.error(f"Chat 请求异常: {e}")
                 return None
 
-        # 处理响应
+        return response
+
+    def summarize(self, synopsis: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        用快速档模型把移出历史的对话合并进已有摘要（在后台线程调用）
+
+        Args:
+            synopsis: 已有摘要
+            messages: 移出历史的消息
+
+        Returns:
+            新摘要，失败返回 None
+        """
+        # 熔断中不发摘要请求（移出的对话保留，恢复后再合并）
+        if self._session is None or self.breaker.state != self.breaker.CLOSED:
+            return None
+        dialogue = "\n".join(
+            f"{'用户' if m['role'] == 'user' else '助手'}：{m['content']}" for m in messages
+        )
+        prompt = (
+            "请把下面的对话合并进已有的对话摘要，输出新的摘要。\n\n"
+            f"已有摘要：\n{synopsis or '无'}\n\n新增对话：\n{dialogue}\n\n"
+            "要求：保留话题、用户提到的事实和偏好、尚未完成的约定；省略寒暄；不超过 150 字；只输出摘要本身。"
+        )
+        data = {
+            "model": self.config.fast_model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_completion_tokens": 300,
+            "temperature": 0.1,
+            "stream": False,
+            "thinking": {"type": "disabled"}
+        }
+        headers = {
+            "Authorization": f"Bearer {self.config.api_key}",
+            "Content-Type": "application/json"
+        }
         try:
-            if self.config.stream:
-                return self._process_stream_response(response, user_input)
-            else:
-                return self._process_normal_response(response, user_input)
-        except Exception as e:
-            self.logger.error(f"Chat 处理响应异常: {e}")
-            if self._on_error:
-                self._on_error(str(e))
+            response = self._session.post(
+                self.config.api_url, headers=headers, data=json.dumps(data), timeout=15
+            )
+            if response.status_code != 200:
+                self.logger.warning(f"生成对话摘要失败: HTTP {response.status_code}")
+                return None
+            content = response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
+            return content.strip() or None
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"生成对话摘要失败: {e}")
             return None
 
     def _build_image_prompt(self, user_question: str, image_base64: str) -> str:
@@ -209,13 +451,13 @@ class ChatClient:
 
     def _process_stream_response(
         self,
-        response,
+        lines,
         user_input: str
     ) -> Optional[str]:
-        """处理流式响应"""
+        """处理流式响应（lines 为按顺序的 SSE 行）"""
         full_reply = ""
 
-        for line in response.iter_lines():
+        for line in lines:
             if line:
                 line_str = line.decode('utf-8')
 
@@ -324,70 +566,85 @@ class ChatClient:
             "Content-Type": "application/json"
         }
 
-        # 构建消息列表
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        if memory_context:
-            messages.append({"role": "system", "content": memory_context})
-
-        recent_history = self._history[-4:] if len(self._history) > 4 else self._history
-        messages.extend(recent_history)
-        messages.append({"role": "user", "content": user_input})
+        # 按 token 预算装入系统提示词、记忆、历史摘要和最近对话
+        messages = self.context.build(user_input, self._history, memory_context, system_prompt)
 
+        profile = self.router.route(user_input).profile
         data = {
-            "model": self.config.model_name,
+            "model": profile.model,
             "messages": messages,
-            "max_completion_tokens": self.config.max_tokens,
-            "temperature": self.config.temperature,
+            "max_completion_tokens": profile.max_tokens,
+            "temperature": profile.temperature,
             "stream": self.config.stream
         }
+        if profile.thinking:
+            data["thinking"] = {"type": profile.thinking}
 
         full_reply = ""
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
+        if not self.breaker.allow():
+            self.logger.warning("Chat 接口熔断中，直接失败")
+            return None
+
+        # 复用同一个 ClientSession（连接池），不再每次调用新建
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.config.pool_size, keepalive_timeout=60)
+            )
+        self._last_used = time.time()
+
+        try:
+            response = await self._aio_session.post(
                 self.config.api_url,
                 headers=headers,
                 json=data,
                 timeout=aiohttp.ClientTimeout(total=self.config.timeout)
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    self.logger.error(f"Chat 请求失败: {response.status} - {error_text}")
-                    return None
-
-                if self.config.stream:
-                    async for line in response.content:
-                        line_str = line.decode('utf-8').strip()
-
-                        if not line_str or line_str.startswith(':'):
-                            continue
-
-                        if line_str.startswith('data: '):
-                            line_str = line_str[6:]
-
-                        if line_str == '[DONE]':
-                            break
-
-                        try:
-                            res = json.loads(line_str)
-                            choices = res.get("choices", [])
-                            if choices:
-                                delta = choices[0].get("delta", {})
-                                chunk = delta.get("content", "")
-                                if chunk:
-                                    full_reply += chunk
-                                    if self._on_chunk:
-                                        self._on_chunk(chunk)
-                        except json.JSONDecodeError:
-                            continue
-                else:
-                    res = await response.json()
-                    choices = res.get("choices", [])
-                    if choices:
-                        message = choices[0].get("message", {})
-                        full_reply = message.get("content", "")
+            )
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            self.breaker.record_failure()
+            raise
+        if response.status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        async with response:
+            if response.status != 200:
+                error_text = await response.text()
+                self.logger.error(f"Chat 请求失败: {response.status} - {error_text}")
+                return None
+
+            if self.config.stream:
+                async for line in response.content:
+                    line_str = line.decode('utf-8').strip()
+
+                    if not line_str or line_str.startswith(':'):
+                        continue
+
+                    if line_str.startswith('data: '):
+                        line_str = line_str[6:]
+
+                    if line_str == '[DONE]':
+                        break
+
+                    try:
+                        res = json.loads(line_str)
+                        choices = res.get("choices", [])
+                        if choices:
+                            delta = choices[0].get("delta", {})
+                            chunk = delta.get("content", "")
+                            if chunk:
+                                full_reply += chunk
+                                if self._on_chunk:
+                                    self._on_chunk(chunk)
+                    except json.JSONDecodeError:
+                        continue
+            else:
+                res = await response.json()
+                choices = res.get("choices", [])
+                if choices:
+                    message = choices[0].get("message", {})
+                    full_reply = message.get("content", "")
 
         if full_reply:
             self.add_to_history("user", user_input)
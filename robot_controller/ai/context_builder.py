@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+对话上下文构建 (Context Builder)
+
+功能：
+1. 本地估算 token 数（带缓存），每条消息只计算一次
+2. 按优先级把系统提示词、当前问题、记忆、历史摘要、最近对话装进固定的 token 预算
+3. 历史超出预算时，最早的几轮从历史中移出，后台合并进滚动摘要
+4. 记忆上下文超出记忆预算时截掉末尾（相关度最低）的记忆
+
+说明：
+- 豆包分词器不在本地，这里按字符类别估算：汉字约 1 token，英文/数字每 4 个字符约 1 token，
+  标点 1 token，每条消息另加固定开销；估算偏保守（宁可多算）
+- 摘要由调用方提供的函数生成（一般是快速档模型），在后台线程执行，当轮不等待
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+
+
+# 每条消息的固定开销（角色、分隔符）
+MESSAGE_OVERHEAD = 4
+
+# 汉字（含日韩文字和全角字符）、英文数字串、其余非空白字符
+_TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]|[A-Za-z0-9]+|\S')
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """估算文本的 token 数（结果按文本缓存）"""
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text or ""):
+        tokens += (len(piece) + 3) // 4 if piece[0].isascii() and piece[0].isalnum() else 1
+    return tokens
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """单条消息的 token 数（含固定开销）"""
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+class ContextBuilder:
+    """
+    对话上下文构建器
+
+    使用示例:
+        builder = ContextBuilder(budget=1200, summarize=client.summarize)
+        messages = builder.build(user_input, history, memory_context, system_prompt)
+        history = builder.compact(history)  # 每轮结束后压缩历史
+    """
+
+    def __init__(
+        self,
+        budget: int = 1200,
+        memory_tokens: int = 300,
+        history_tokens: int = 800,
+        summarize: Optional[Callable[[str, List[Dict[str, str]]], Optional[str]]] = None
+    ):
+        """
+        初始化构建器
+
+        Args:
+            budget: 整个请求（不含回复）的 token 预算
+            memory_tokens: 记忆上下文的 token 上限
+            history_tokens: 保留在历史中的对话 token 上限，超出部分移入摘要
+            summarize: 摘要函数 (已有摘要, 移出的消息) -> 新摘要，失败返回 None；None 表示不生成摘要
+        """
+        self.logger = get_logger()
+        self.budget = budget
+        self.memory_tokens = memory_tokens
+        self.history_tokens = history_tokens
+        self.summarize = summarize
+
+        self.synopsis = ""  # 被移出历史的早期对话的滚动摘要
+        self._pending: List[Dict[str, str]] = []  # 已移出历史、尚未合并进摘要的消息
+        self._summarizing = False
+        self._generation = 0  # reset() 后丢弃进行中的摘要结果
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+
+    def fit_memory_context(self, memory_context: Optional[str]) -> Optional[str]:
+        """记忆上下文超出记忆预算时从末尾逐行截掉（记忆按相关度降序排列）"""
+        if not memory_context or count_tokens(memory_context) <= self.memory_tokens:
+            return memory_context
+        lines = memory_context.split("\n")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.memory_tokens:
+            lines.pop()
+        self.logger.debug(f"记忆上下文超出预算，截断为 {len(lines)} 行")
+        return "\n".join(lines) if len(lines) > 1 else None
+
+    def build(
+        self,
+        user_input: str,
+        history: List[Dict[str, str]],
+        memory_context: Optional[str] = None,
+        system_prompt: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        按优先级在预算内组装消息列表
+
+        Args:
+            user_input: 当前用户输入
+            history: 对话历史（按时间顺序）
+            memory_context: 记忆上下文
+            system_prompt: 系统提示词
+
+        Returns:
+            messages 列表
+        """
+        head: List[Dict[str, str]] = []
+        if system_prompt:
+            head.append({"role": "system", "content": system_prompt})
+        memory_context = self.fit_memory_context(memory_context)
+        if memory_context:
+            head.append({"role": "system", "content": memory_context})
+        current = {"role": "user", "content": user_input}
+
+        used = sum(message_tokens(m) for m in head) + message_tokens(current)
+        if self.synopsis:
+            synopsis_message = {"role": "system", "content": f"之前的对话摘要：{self.synopsis}"}
+            tokens = message_tokens(synopsis_message)
+            if used + tokens <= self.budget:
+                head.append(synopsis_message)
+                used += tokens
+
+        # 从新到旧按整轮（用户 + 助手）装入最近对话
+        recent: List[Dict[str, str]] = []
+        index = len(history)
+        while index > 0:
+            start = index - 2 if index >= 2 and history[index - 2]["role"] == "user" else index - 1
+            turn = history[start:index]
+            tokens = sum(message_tokens(m) for m in turn)
+            if used + tokens > self.budget:
+                break
+            recent[:0] = turn
+            used += tokens
+            index = start
+
+        self.logger.debug(f"Chat 上下文 {used}/{self.budget} tokens（历史 {len(recent)}/{len(history)} 条）")
+        return head + recent + [current]
+
+    def compact(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        超出历史预算时把最早的几轮移出历史，后台合并进滚动摘要
+
+        Returns:
+            压缩后的历史（新列表）
+        """
+        total = sum(message_tokens(m) for m in history)
+        cut = 0
+        # 按整轮移出，至少保留最近一轮
+        while total > self.history_tokens and len(history) - cut > 2:
+            step = 2 if history[cut]["role"] == "user" and history[cut + 1]["role"] == "assistant" else 1
+            total -= sum(message_tokens(m) for m in history[cut:cut + step])
+            cut += step
+        if not cut:
+            return history
+
+        if self.summarize is not None:
+            with self._lock:
+                self._pending.extend(history[:cut])
+                if not self._summarizing:
+                    self._summarizing = True
+                    self.executor.submit(self._run_summary)
+        return history[cut:]
+
+    def _run_summary(self):
+        """把已移出历史的消息合并进滚动摘要（后台线程）"""
+        try:
+            while True:
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                    generation = self._generation
+                    if not pending:
+                        return
+                try:
+                    synopsis = self.summarize(self.synopsis, pending)
+                except Exception as e:
+                    self.logger.warning(f"生成对话摘要异常: {e}")
+                    synopsis = None
+                with self._lock:
+                    if generation != self._generation:
+                        continue
+                    if synopsis is None:
+                        # 失败时放回，下次压缩时再试
+                        self._pending[:0] = pending
+                        return
+                    self.synopsis = synopsis
+                self.logger.debug(f"更新对话摘要（{count_tokens(synopsis)} tokens）")
+        finally:
+            with self._lock:
+                self._summarizing = False
+
+    def reset(self):
+        """清空摘要（清空对话历史时调用）"""
+        with self._lock:
+            self.synopsis = ""
+            self._pending = []
+            self._generation += 1
+
+    def shutdown(self):
+        """停止后台摘要线程"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -14,6 +14,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import get_logger
+from ai.circuit_breaker import get_circuit_breaker, get_circuit_monitor
 
 try:
     import requests
@@ -39,6 +40,10 @@ class Mem0Config:
     timeout: int = 30
     enabled: bool = True
     search_top_k: int = 5
+    deadline_ms: int = 150  # 识别完成后等待记忆的截止时间（毫秒），超时不带记忆继续对话
+    migration_journal: str = "~/.xiaoyuan_robot/memory_migrations.json"  # 记忆迁移日志（中断后继续）
+    migration_batch_size: int = 10  # 迁移时每次 add_memory 合并的记忆条数
+    migration_workers: int = 4  # 迁移时并发请求数上限
 
 
 class Mem0Client:
@@ -51,6 +56,8 @@ class Mem0Client:
     def __init__(self, config: Mem0Config = None):
         self.logger = get_logger()
         self.config = config or Mem0Config()
+        # 服务不可用时熔断，请求直接失败，不再每次等满超时
+        self.breaker = get_circuit_breaker("Mem0", probe=self.probe)
 
     def _request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
         """发送 HTTP 请求"""
@@ -60,6 +67,8 @@ class Mem0Client:
 
         if not self.config.enabled:
             return None
+        if not self.breaker.allow():
+            return None
 
         url = f"{self.config.base_url.rstrip('/')}{endpoint}"
         kwargs.setdefault('timeout', self.config.timeout)
@@ -67,12 +76,18 @@ class Mem0Client:
 
         try:
             response = requests.request(method, url, **kwargs)
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
             response.raise_for_status()
             return response.json() if response.text else {}
         except requests.exceptions.Timeout:
+            self.breaker.record_failure()
             self.logger.warning(f"Mem0 请求超时: {endpoint}")
             return None
         except requests.exceptions.ConnectionError:
+            self.breaker.record_failure()
             self.logger.warning(f"Mem0 连接失败: {self.config.base_url}")
             return None
         except requests.exceptions.HTTPError as e:
@@ -87,11 +102,26 @@ class Mem0Client:
         result = self._request('GET', '/health')
         return result is not None
 
+    def probe(self) -> bool:
+        """熔断期间的健康探测（不经过熔断器，使用较短的超时）"""
+        if requests is None:
+            return False
+        try:
+            response = requests.get(
+                f"{self.config.base_url.rstrip('/')}/health",
+                timeout=get_circuit_monitor().config.probe_timeout
+            )
+            response.close()
+            return response.status_code < 500
+        except requests.exceptions.RequestException:
+            return False
+
     def add_memory(
         self,
         user_id: str,
         messages: List[Dict[str, str]],
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        infer: bool = True
     ) -> Optional[Dict]:
         """
         添加记忆
@@ -100,6 +130,7 @@ class Mem0Client:
             user_id: 用户 ID
             messages: 对话消息列表
             metadata: 可选的元数据
+            infer: 是否由 Mem0 的模型提取、合并记忆；False 时每条消息原样存为一条记忆
         """
         payload = {
             "messages": messages,
@@ -107,6 +138,8 @@ class Mem0Client:
         }
         if metadata:
             payload["metadata"] = metadata
+        if not infer:
+            payload["infer"] = False
 
         result = self._request('POST', '/api/v1/memories/add', json=payload)
         if result:
@@ -196,23 +229,13 @@ class Mem0Client:
         from_user_id: str,
         to_user_id: str
     ) -> int:
-        """迁移用户记忆（用于临时用户确认身份后）"""
-        memories = self.get_user_memories(from_user_id)
-        if not memories:
-            return 0
-
-        migrated = 0
-        for mem in memories:
-            result = self.add_memory(
-                to_user_id,
-                [{"role": "system", "content": mem.memory}]
-            )
-            if result:
-                self.delete_memory(mem.id)
-                migrated += 1
+        """
+        迁移用户记忆（用于临时用户确认身份后）
 
-        self.logger.info(f"Mem0 迁移记忆: {from_user_id} -> {to_user_id}, 共 {migrated} 条")
-        return migrated
+        分批并发写入、并发删除，中断后重新调用会继续（见 memory_migration.py）
+        """
+        from ai.memory_migration import MemoryMigrator
+        return MemoryMigrator(self).migrate(from_user_id, to_user_id)
 
     def build_context(
         self,
@@ -231,8 +254,20 @@ class Mem0Client:
         Returns:
             格式化的记忆上下文
         """
-        memories = self.search_memory(user_id, query)
+        return self.format_context(self.search_memory(user_id, query), threshold)
 
+    @staticmethod
+    def format_context(memories: List[MemoryItem], threshold: float = 0.3) -> str:
+        """
+        把搜索到的记忆格式化为上下文
+
+        Args:
+            memories: 搜索到的记忆
+            threshold: 相似度阈值
+
+        Returns:
+            格式化的记忆上下文
+        """
         # 过滤低相似度记忆
         relevant = [m for m in memories if m.score and m.score >= threshold]
 
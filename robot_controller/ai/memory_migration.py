@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+记忆迁移
+
+功能：
+1. 临时用户确认身份后，把临时用户的全部记忆迁移到正式用户
+2. 只拉取一次记忆列表，按批合并成一次 add_memory（一批多条 user 消息，关闭模型推理，每条原样存储）
+3. 批量写入和删除原记忆都通过有上限的线程池并发执行
+4. 进度写入日志文件（已写入目标用户的原记忆 ID），中断后重新执行不会重复写入
+
+说明：
+- Mem0 服务没有批量写入/删除接口，"批量"是把多条记忆合并进一次 add_memory，删除则并发执行
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+from ai.mem0_client import Mem0Client, MemoryItem
+
+
+def _stored_texts(result) -> List[str]:
+    """add_memory 返回结果中实际写入的记忆文本（结果为空或格式未知时返回空列表）"""
+    if result is None:
+        return []
+    items = result if isinstance(result, list) else result.get('results')
+    if not isinstance(items, list):
+        return []
+    return [item.get('memory', item.get('content', '')) for item in items if isinstance(item, dict)]
+
+
+class MemoryMigrator:
+    """
+    记忆迁移器
+
+    使用示例:
+        migrator = MemoryMigrator(mem0_client)
+        migrated = migrator.migrate("temp_1a2b3c4d", "xiaoming")
+        migrator.resume_pending()  # 启动时继续上次中断的迁移
+    """
+
+    def __init__(self, client: Mem0Client, journal_path: Optional[str] = None,
+                 batch_size: Optional[int] = None, workers: Optional[int] = None):
+        """
+        初始化迁移器
+
+        Args:
+            client: Mem0 客户端
+            journal_path: 迁移日志文件路径（支持 ~），默认取客户端配置
+            batch_size: 每次 add_memory 合并的记忆条数，默认取客户端配置
+            workers: 并发请求数上限，默认取客户端配置
+        """
+        self.logger = get_logger()
+        self.client = client
+        self.journal_path = os.path.expanduser(journal_path or client.config.migration_journal)
+        self.batch_size = batch_size or client.config.migration_batch_size
+        self.workers = workers or client.config.migration_workers
+        self._lock = threading.Lock()
+
+    # ==================== 迁移日志 ====================
+
+    def _load_journal(self) -> Dict[str, Dict]:
+        """读取迁移日志（不存在或损坏时返回空）"""
+        if not os.path.exists(self.journal_path):
+            return {}
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"读取迁移日志失败: {e}")
+            return {}
+
+    def _update_journal(self, key: str, entry: Optional[Dict]):
+        """更新一条迁移记录，entry 为 None 时删除（先写临时文件再替换）"""
+        with self._lock:
+            journal = self._load_journal()
+            if entry is None:
+                journal.pop(key, None)
+            else:
+                journal[key] = entry
+            try:
+                os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+                tmp_path = self.journal_path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(journal, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.journal_path)
+            except OSError as e:
+                self.logger.warning(f"写入迁移日志失败: {e}")
+
+    # ==================== 迁移 ====================
+
+    def migrate(self, from_user_id: str, to_user_id: str) -> int:
+        """
+        迁移记忆（可重复执行，已迁移的记忆不会重复写入）
+
+        Args:
+            from_user_id: 原用户 ID
+            to_user_id: 目标用户 ID
+
+        Returns:
+            已迁移到目标用户的记忆数量
+        """
+        if not from_user_id or not to_user_id or from_user_id == to_user_id:
+            return 0
+
+        key = f"{from_user_id}->{to_user_id}"
+        journal = self._load_journal()
+        entry = journal.get(key) or {"from": from_user_id, "to": to_user_id, "added": []}
+        added = set(entry["added"])
+
+        # 只拉取一次原用户记忆
+        memories = [m for m in self.client.get_user_memories(from_user_id) if m.id]
+        if not memories:
+            # get_user_memories 失败时也返回空列表，服务不可用时保留日志下次继续
+            if key in journal and self.client.health_check():
+                self._update_journal(key, None)
+            return 0
+        if key in journal:
+            # 上次可能在写入后、记入日志前中断：目标用户已有相同内容的记忆不再重复写入
+            existing = Counter(m.memory for m in self.client.get_user_memories(to_user_id))
+            for m in memories:
+                if m.id not in added and existing[m.memory] > 0:
+                    existing[m.memory] -= 1
+                    added.add(m.id)
+            entry["added"] = sorted(added)
+        self._update_journal(key, entry)
+
+        pending = [m for m in memories if m.id not in added]
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mem0-migrate") as executor:
+            # 1. 分批并发写入目标用户，每批成功后立即记入日志
+            futures = {executor.submit(self._add_batch, to_user_id, from_user_id, batch): batch
+                       for batch in batches}
+            for future in as_completed(futures):
+                ids = future.result()
+                if ids:
+                    added.update(ids)
+                    entry["added"] = sorted(added)
+                    self._update_journal(key, entry)
+
+            # 2. 并发删除已写入目标用户的原记忆
+            to_delete = [m.id for m in memories if m.id in added]
+            deleted = sum(executor.map(self.client.delete_memory, to_delete))
+
+        migrated = len(to_delete)
+        if migrated == len(memories) and deleted == len(to_delete):
+            self._update_journal(key, None)
+        else:
+            self.logger.warning(
+                f"记忆迁移未全部完成（写入 {migrated}/{len(memories)}，"
+                f"删除 {deleted}/{len(to_delete)}），下次继续"
+            )
+
+        self.logger.info(
+            f"Mem0 迁移记忆: {from_user_id} -> {to_user_id}, 共 {migrated} 条"
+            f"（{len(batches)} 批写入，删除 {deleted} 条）"
+        )
+        return migrated
+
+    def _add_batch(self, to_user_id: str, from_user_id: str, batch: List[MemoryItem]) -> List[str]:
+        """
+        一次 add_memory 写入一批记忆（user 消息，关闭推理：Mem0 不推理时会跳过 system 消息）
+
+        Returns:
+            服务端确认写入的原记忆 ID（按返回的记忆文本对应，只有这些记入日志）
+        """
+        try:
+            result = self.client.add_memory(
+                to_user_id,
+                [{"role": "user", "content": m.memory} for m in batch],
+                metadata={"migrated_from": from_user_id},
+                infer=False
+            )
+        except Exception as e:
+            self.logger.warning(f"写入迁移批次异常: {e}")
+            return []
+        stored = Counter(_stored_texts(result))
+        ids = []
+        for m in batch:
+            if stored[m.memory] > 0:
+                stored[m.memory] -= 1
+                ids.append(m.id)
+        if len(ids) < len(batch):
+            self.logger.warning(f"迁移批次只写入 {len(ids)}/{len(batch)} 条，其余下次继续")
+        return ids
+
+    def pending(self) -> List[Dict]:
+        """上次中断、还没完成的迁移"""
+        return list(self._load_journal().values())
+
+    def resume_pending(self) -> int:
+        """
+        继续上次中断的迁移
+
+        Returns:
+            本次迁移的记忆数量
+        """
+        total = 0
+        for entry in self.pending():
+            self.logger.info(f"继续未完成的记忆迁移: {entry['from']} -> {entry['to']}")
+            total += self.migrate(entry["from"], entry["to"])
+        return total
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+记忆预取 (Memory Prefetch)
+
+功能：
+1. 知道当前用户后，用识别中间结果在后台线程提前搜索记忆，与语音识别并行
+2. 识别完成后最多再等一个截止时间（默认识别完成后 150ms），到时没有结果就不带记忆继续对话
+3. 超过截止时间才返回的结果直接丢弃并计数，慢的 Mem0 服务不会拖慢回复，也不会阻塞事件循环
+
+复用规则：
+- 同一用户的预取查询是最终文本的前缀，且覆盖最终文本的大部分时直接复用（意思基本不变）
+- 否则用最终文本重新搜索
+- 每个用户同时只有一个预取请求，进行中再来的新查询先记下，完成后只补发最新的那个
+- 预取结果只在本轮使用：最终文本取走后清掉，下一轮问同样的问题会重新搜索（期间可能写入了新记忆）
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+from ai.mem0_client import Mem0Client, MemoryItem
+
+
+class MemoryPrefetcher:
+    """
+    记忆预取器
+
+    使用示例:
+        prefetcher = MemoryPrefetcher(mem0_client, deadline_ms=150)
+        prefetcher.prefetch(user_id, partial_text)      # 识别中间结果回调里
+        context = await prefetcher.build_context(user_id, final_text, asr_end + 0.15)
+    """
+
+    def __init__(self, client: Mem0Client, deadline_ms: float = 150,
+                 min_coverage: float = 0.6, workers: int = 2):
+        """
+        初始化预取器
+
+        Args:
+            client: Mem0 客户端
+            deadline_ms: 默认截止时间（毫秒，相对调用 get 的时刻）
+            min_coverage: 复用预取结果时预取查询至少占最终文本的比例
+            workers: 后台搜索线程数
+        """
+        self.logger = get_logger()
+        self.client = client
+        self.deadline = deadline_ms / 1000
+        self.min_coverage = min_coverage
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mem0-prefetch")
+
+        # 可重入：结果已就绪时 add_done_callback 会在持锁的当前线程里直接回调
+        self._lock = threading.RLock()
+        # 用户 -> 最近一次预取的 (查询, Future)
+        self._latest: Dict[str, Tuple[str, Future]] = {}
+        # 用户 -> 预取进行中时到来的最新查询
+        self._pending: Dict[str, str] = {}
+
+        # 统计信息
+        self.searches = 0   # 发出的搜索请求数
+        self.reused = 0     # 直接复用预取结果的次数
+        self.on_time = 0    # 截止时间内拿到结果的次数
+        self.late = 0       # 超过截止时间被丢弃的次数
+        self.errors = 0     # 搜索异常次数
+
+    @property
+    def enabled(self) -> bool:
+        return self.client.config.enabled
+
+    # ==================== 预取 ====================
+
+    def prefetch(self, user_id: Optional[str], query: str):
+        """
+        用识别中间结果提前搜索记忆（不阻塞）
+
+        Args:
+            user_id: 当前用户 ID
+            query: 识别中间结果
+        """
+        query = (query or "").strip()
+        if not user_id or not query or not self.enabled:
+            return
+        with self._lock:
+            latest = self._latest.get(user_id)
+            if latest and latest[0] == query:
+                return
+            if latest and not latest[1].done():
+                self._pending[user_id] = query
+                return
+            self._submit(user_id, query)
+
+    def _submit(self, user_id: str, query: str) -> Future:
+        """提交一次搜索（调用方持有锁）"""
+        self.searches += 1
+        future = self.executor.submit(self._search, user_id, query)
+        self._latest[user_id] = (query, future)
+        future.add_done_callback(lambda _: self._on_done(user_id))
+        return future
+
+    def _search(self, user_id: str, query: str) -> List[MemoryItem]:
+        try:
+            return self.client.search_memory(user_id, query)
+        except Exception as e:
+            self.errors += 1
+            self.logger.warning(f"记忆预取异常: {e}")
+            return []
+
+    def _on_done(self, user_id: str):
+        """预取完成后补发进行中到来的最新查询"""
+        with self._lock:
+            query = self._pending.pop(user_id, None)
+            latest = self._latest.get(user_id)
+            if query and not (latest and latest[0] == query):
+                self._submit(user_id, query)
+
+    # ==================== 取结果 ====================
+
+    def _covers(self, prefetched: str, query: str) -> bool:
+        """预取查询能否代表最终文本"""
+        return (query.startswith(prefetched)
+                and len(prefetched) >= len(query) * self.min_coverage)
+
+    async def get(self, user_id: Optional[str], query: str,
+                  deadline: Optional[float] = None) -> Optional[List[MemoryItem]]:
+        """
+        在截止时间之前取回与最终文本相关的记忆
+
+        Args:
+            user_id: 当前用户 ID
+            query: 最终识别文本
+            deadline: 截止时刻（time.time() 时间戳），默认为当前时刻加默认截止时间
+
+        Returns:
+            记忆列表；超过截止时间返回 None（结果到达后丢弃）
+        """
+        query = (query or "").strip()
+        if not user_id or not query or not self.enabled:
+            return []
+        if deadline is None:
+            deadline = time.time() + self.deadline
+
+        with self._lock:
+            latest = self._latest.get(user_id)
+            if latest and self._covers(latest[0], query):
+                future = latest[1]
+                self.reused += 1
+            else:
+                self._pending.pop(user_id, None)
+                future = self._submit(user_id, query)
+            # 本轮已取走，下一轮相同的问题重新搜索（期间可能写入了新记忆）
+            self._latest.pop(user_id, None)
+            self._pending.pop(user_id, None)
+
+        # 不用 wait_for：超时时不取消后台搜索，结果到达后直接丢弃
+        waiter = asyncio.wrap_future(future)
+        done, _ = await asyncio.wait({waiter}, timeout=max(0.0, deadline - time.time()))
+        if not done:
+            self.late += 1
+            self.logger.warning(f"记忆搜索超过截止时间，不带记忆继续（累计超时 {self.late} 次）")
+            return None
+        if waiter.cancelled():
+            return None
+
+        self.on_time += 1
+        return waiter.result()
+
+    async def build_context(self, user_id: Optional[str], query: str,
+                            deadline: Optional[float] = None) -> str:
+        """
+        在截止时间之前构建记忆上下文
+
+        Returns:
+            格式化的记忆上下文，无记忆或超时返回空字符串
+        """
+        memories = await self.get(user_id, query, deadline)
+        return self.client.format_context(memories) if memories else ""
+
+    def stats(self) -> Dict[str, int]:
+        """预取统计"""
+        return {
+            "searches": self.searches,
+            "reused": self.reused,
+            "on_time": self.on_time,
+            "late": self.late,
+            "errors": self.errors
+        }
+
+    def shutdown(self):
+        """停止后台线程（不等待进行中的请求）"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
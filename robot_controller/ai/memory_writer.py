@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+后台记忆写入队列 (Memory Writer)
+
+功能：
+1. 每轮对话结束只把 (用户, 问, 答) 追加到磁盘队列文件，不在事件循环里做网络请求
+2. 单个后台线程攒够几轮（或最早一轮等待超时）后，合并成一次 add_memory
+3. 存储失败时保留队列，按指数退避重试；程序重启后从队列文件继续
+4. 统计队列深度、最早一轮的等待时间（延迟）、批次数、重试次数
+
+说明：
+- 同一批只包含同一个用户的对话
+- 关键信息由 Mem0 服务端从对话中提取，这里不额外调用对话模型
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+from ai.mem0_client import Mem0Client
+
+
+class MemoryWriter:
+    """
+    后台记忆写入器
+
+    使用示例:
+        writer = MemoryWriter(mem0_client, "~/.xiaoyuan_robot/memory_queue.jsonl")
+        writer.start()
+        writer.enqueue(user_id, user_message, assistant_message)
+        ...
+        writer.stop()
+    """
+
+    def __init__(self, client: Mem0Client, queue_path: str, batch_turns: int = 3,
+                 max_delay: float = 60, retry_base: float = 2, retry_max: float = 120):
+        """
+        初始化写入器
+
+        Args:
+            client: Mem0 客户端
+            queue_path: 磁盘队列文件路径（支持 ~）
+            batch_turns: 攒够多少轮对话合并写入一次
+            max_delay: 最早一轮对话最多等待多少秒就写入（不足 batch_turns 轮也写）
+            retry_base: 失败重试的初始间隔（秒），每次失败翻倍
+            retry_max: 重试间隔上限（秒）
+        """
+        self.logger = get_logger()
+        self.client = client
+        self.queue_path = os.path.expanduser(queue_path)
+        self.batch_turns = batch_turns
+        self.max_delay = max_delay
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._flush_requested = False
+
+        self._records: List[Dict] = self._load()
+        self._failures = 0
+        self._retry_at = 0.0
+
+        # 统计信息
+        self.enqueued = 0  # 入队的对话轮数
+        self.batches = 0   # 成功写入的批次数
+        self.retries = 0   # 失败重试次数
+
+    # ==================== 磁盘队列 ====================
+
+    def _load(self) -> List[Dict]:
+        """读取上次未写完的队列（跳过损坏的行）"""
+        if not os.path.exists(self.queue_path):
+            return []
+        records = []
+        try:
+            with open(self.queue_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except OSError as e:
+            self.logger.warning(f"读取记忆队列失败: {e}")
+        if records:
+            self.logger.info(f"恢复未写入的对话 {len(records)} 轮")
+        return records
+
+    def _append(self, record: Dict):
+        """追加一条记录（调用方持有锁）"""
+        os.makedirs(os.path.dirname(self.queue_path) or ".", exist_ok=True)
+        with open(self.queue_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _rewrite(self):
+        """用内存中的剩余记录重写队列文件（调用方持有锁）"""
+        try:
+            tmp_path = self.queue_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in self._records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.queue_path)
+        except OSError as e:
+            self.logger.warning(f"更新记忆队列文件失败: {e}")
+
+    # ==================== 入队 ====================
+
+    def enqueue(self, user_id: Optional[str], user_message: str, assistant_message: str):
+        """
+        记录一轮对话（只写本地文件，立即返回）
+
+        Args:
+            user_id: 用户 ID
+            user_message: 用户消息
+            assistant_message: 助手回复
+        """
+        if not user_id or not user_message or not self.client.config.enabled:
+            return
+        record = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "user": user_message,
+            "assistant": assistant_message,
+            "time": time.time()
+        }
+        with self._lock:
+            self._records.append(record)
+            try:
+                self._append(record)
+            except OSError as e:
+                self.logger.warning(f"写入记忆队列文件失败（仅保存在内存中）: {e}")
+            self.enqueued += 1
+        self._wakeup.set()
+
+    def flush(self):
+        """不再等待攒批，尽快写入全部待写对话"""
+        self._flush_requested = True
+        self._wakeup.set()
+
+    # ==================== 后台线程 ====================
+
+    def start(self):
+        """启动后台写入线程（已启动时直接返回）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="mem0-writer")
+        self._thread.start()
+        if self._records:
+            self._wakeup.set()
+
+    def stop(self):
+        """停止后台线程（未写完的对话保留在队列文件中，下次启动继续）"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(timeout=1.0)
+            self._wakeup.clear()
+            if self._stop_event.is_set() or time.time() < self._retry_at:
+                continue
+
+            batch = self._next_batch()
+            if not batch:
+                continue
+            if self._write(batch):
+                self._failures = 0
+                self._retry_at = 0.0
+                with self._lock:
+                    done = {record["id"] for record in batch}
+                    self._records = [r for r in self._records if r["id"] not in done]
+                    self._rewrite()
+                    if not self._records:
+                        self._flush_requested = False
+                # 可能还有下一批已经就绪
+                self._wakeup.set()
+            else:
+                self._failures += 1
+                self.retries += 1
+                delay = min(self.retry_max, self.retry_base * 2 ** (self._failures - 1))
+                self._retry_at = time.time() + delay
+                self.logger.warning(f"记忆写入失败，{delay:.1f}s 后重试（队列 {self.depth} 轮）")
+
+    def _next_batch(self) -> List[Dict]:
+        """取最早待写用户的一批对话，未到攒批条件时返回空列表"""
+        with self._lock:
+            if not self._records:
+                return []
+            user_id = self._records[0]["user_id"]
+            turns = [r for r in self._records if r["user_id"] == user_id][:self.batch_turns]
+            ready = (len(turns) >= self.batch_turns
+                     or time.time() - turns[0]["time"] >= self.max_delay
+                     or self._flush_requested)
+            return turns if ready else []
+
+    def _write(self, batch: List[Dict]) -> bool:
+        """一次 add_memory 写入一批对话"""
+        messages = []
+        for record in batch:
+            messages.append({"role": "user", "content": record["user"]})
+            messages.append({"role": "assistant", "content": record["assistant"]})
+        try:
+            result = self.client.add_memory(batch[0]["user_id"], messages)
+        except Exception as e:
+            self.logger.warning(f"存储记忆异常: {e}")
+            return False
+        if result is None:
+            return False
+        self.batches += 1
+        self.logger.info(f"已存储记忆: user={batch[0]['user_id']}, {len(batch)} 轮对话")
+        return True
+
+    # ==================== 指标 ====================
+
+    @property
+    def depth(self) -> int:
+        """待写入的对话轮数"""
+        return len(self._records)
+
+    @property
+    def lag(self) -> float:
+        """最早一轮待写对话已等待的时间（秒）"""
+        with self._lock:
+            return time.time() - self._records[0]["time"] if self._records else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """队列指标"""
+        return {
+            "depth": self.depth,
+            "lag": round(self.lag, 1),
+            "enqueued": self.enqueued,
+            "batches": self.batches,
+            "retries": self.retries
+        }
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+流式合成文本切分 (Text Segmenter)
+
+功能：
+1. 中英文混合分词：汉字逐字、英文单词和数字整体、标点单独成词，按词边界切分，不会把单词或数字切开
+2. 第一段特殊处理：遇到第一个逗号（至少 first_min_chars 字）就切；
+   一直没有标点时，攒够几个字就在词边界强制切分，尽快出第一声
+3. 后续分段逐渐变长：逗号处切分的最小长度按 growth 倍递增，句末标点始终切分，语调更自然
+4. 按实测的文本到达速度调整：
+   - 第一段强制切分的长度 = 到达速度 × first_wait_ms（不少于 first_max_chars），
+     模型出字快时多等几个字，出字慢时尽早切
+   - 到达速度低于播报速度时后续分段不再变长，避免播放追上文本出现停顿
+
+说明：
+- 长度按"播报字数"计：汉字 1 字，英文单词和数字每 3 个字符约 1 字，标点和空白不计
+- 英文句点和逗号要看到下一个字符才能判断（小数点、千分位不切分）
+- 连续的句点（"..."）和省略号（"……"）整体算一个句末标点
+- 切分处后面紧跟的标点（"！！"、强制切分后的逗号等）并入前一段，下一段不会以标点开头；
+  没有可播报内容的分段（只有标点、符号）直接丢弃
+- 与 chatbot/text_segmenter.py 的切分规则一致
+"""
+
+import re
+import time
+from typing import List, Optional, Tuple
+
+
+# 汉字（含日韩文字）、英文单词/数字串、空白、省略号（连续句点）、其余单个字符（标点、符号、emoji）
+_TOKEN_PATTERN = re.compile(
+    r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[A-Za-z0-9]+(?:\'[A-Za-z]+)?|\s+|\.{2,}|…+|.', re.S
+)
+
+# 句末标点（始终切分）
+STRONG_DELIMITERS = set("。！？；!?;\n")
+
+# 句中停顿标点（长度够了才切分）
+WEAK_DELIMITERS = set("，、：,:—")
+
+# 开引号、开括号（属于后一段，切分时不并入前一段）
+_OPENING = set("“‘（(《「『[【")
+
+# 需要看下一个字符才能判断的英文标点（小数点、千分位）
+_AMBIGUOUS = set(".,")
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """
+    中英文混合分词
+
+    Args:
+        text: 文本
+
+    Returns:
+        [(类别, 词)]，类别为 cjk / word / space / punct
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text):
+        if token.isspace():
+            kind = "space"
+        elif token[0].isascii() and token[0].isalnum():
+            kind = "word"
+        elif len(token) == 1 and '\u3040' <= token <= '\ud7af':
+            kind = "cjk"
+        else:
+            kind = "punct"
+        tokens.append((kind, token))
+    return tokens
+
+
+def is_ellipsis(token: str) -> bool:
+    """是否是省略号（"..." 或 "……"）"""
+    return token[0] == "…" or (len(token) > 1 and token[0] == ".")
+
+
+def _is_separator(tokens: List[Tuple[str, str]], i: int) -> bool:
+    """tokens[i] 是否是数字、单词中间的英文句点或逗号（小数点、千分位）"""
+    return (0 < i < len(tokens) - 1 and tokens[i][1] in _AMBIGUOUS
+            and tokens[i - 1][0] == "word" and tokens[i + 1][0] == "word")
+
+
+def spoken_length(kind: str, token: str) -> float:
+    """词的播报字数"""
+    if kind == "cjk":
+        return 1.0
+    if kind == "word":
+        return max(1, (len(token) + 2) // 3)
+    return 0.0
+
+
+class TextSegmenter:
+    """
+    流式合成文本切分器（每轮回复一个实例）
+
+    使用示例:
+        segmenter = TextSegmenter()
+        for chunk in llm_stream:
+            for segment in segmenter.feed(chunk):
+                synthesize(segment)
+        tail = segmenter.flush()
+    """
+
+    def __init__(self, first_min_chars: int = 2, first_max_chars: int = 8,
+                 first_wait_ms: int = 400, min_chars: int = 10, growth: float = 1.5,
+                 max_chars: int = 60, speech_chars_per_second: float = 4.5):
+        """
+        初始化切分器
+
+        Args:
+            first_min_chars: 第一段在逗号处切分的最小字数
+            first_max_chars: 第一段没有标点时强制切分的最小字数
+            first_wait_ms: 第一段按到达速度最多等待的文本时长（毫秒）
+            min_chars: 第二段在逗号处切分的最小字数，之后逐段递增
+            growth: 逐段递增倍数
+            max_chars: 任一段没有标点时强制切分的字数
+            speech_chars_per_second: 播报速度（字/秒）
+        """
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self.first_wait = first_wait_ms / 1000
+        self.min_chars = min_chars
+        self.growth = growth
+        self.max_chars = max_chars
+        self.speech_rate = speech_chars_per_second
+
+        self.buffer = ""
+        self.segments = 0  # 已切出的段数
+        self._started_at: Optional[float] = None  # 收到第一个片段的时间
+        self._received = 0.0  # 已收到的播报字数
+
+    # ==================== 速度 ====================
+
+    def rate(self) -> Optional[float]:
+        """
+        文本到达速度（字/秒），收到文本不足 0.2 秒时返回 None
+        """
+        if self._started_at is None:
+            return None
+        elapsed = time.time() - self._started_at
+        if elapsed < 0.2:
+            return None
+        return self._received / elapsed
+
+    def _limits(self) -> Tuple[float, float]:
+        """
+        当前段的切分长度
+
+        Returns:
+            (逗号处切分的最小字数, 没有标点时强制切分的字数)
+        """
+        rate = self.rate()
+        if self.segments == 0:
+            force = self.first_max_chars
+            if rate is not None:
+                force = min(self.max_chars, max(force, rate * self.first_wait))
+            return self.first_min_chars, force
+        if rate is not None and rate < self.speech_rate:
+            # 文本到达比播报还慢：保持短分段，尽快把已有文本送去合成
+            return self.min_chars, self.max_chars
+        return min(self.max_chars, self.min_chars * self.growth ** (self.segments - 1)), self.max_chars
+
+    # ==================== 切分 ====================
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        接收文本片段，返回可以送去合成的完整分段
+
+        Args:
+            chunk: 文本片段
+
+        Returns:
+            分段列表（可能为空）
+        """
+        if not chunk:
+            return []
+        if self._started_at is None:
+            self._started_at = time.time()
+        self._received += sum(spoken_length(kind, token) for kind, token in tokenize(chunk))
+        self.buffer += chunk
+
+        result = []
+        while True:
+            end = self._find_split()
+            if end is None:
+                break
+            segment, self.buffer = self.buffer[:end].strip(), self.buffer[end:]
+            if self._is_spoken(segment):
+                result.append(segment)
+                self.segments += 1
+        return result
+
+    def flush(self) -> str:
+        """文本结束，返回缓冲区中剩余的文本（没有可播报内容时返回空字符串）"""
+        segment, self.buffer = self.buffer.strip(), ""
+        if not self._is_spoken(segment):
+            return ""
+        self.segments += 1
+        return segment
+
+    @staticmethod
+    def _is_spoken(segment: str) -> bool:
+        """分段是否有可播报的内容"""
+        return any(kind in ("cjk", "word") for kind, _ in tokenize(segment))
+
+    def _find_split(self) -> Optional[int]:
+        """在缓冲区中找当前段的切分位置（切分后的字符下标），没有返回 None"""
+        min_chars, force_chars = self._limits()
+        tokens = tokenize(self.buffer)
+        length = 0.0
+        offset = 0
+        boundary = None  # 最近一个已完整的词边界
+        forced = None  # 已达到强制切分长度时的切分位置（还要并入紧跟的标点）
+        for i, (kind, token) in enumerate(tokens):
+            offset += len(token)
+            is_last = i == len(tokens) - 1
+            if kind == "punct" and (is_last and (token in _AMBIGUOUS or is_ellipsis(token))):
+                # 还不知道是不是小数点、千分位，或者省略号还没收完
+                return None
+
+            if forced is not None:
+                if kind != "punct" or token in _OPENING:
+                    return forced
+                if _is_separator(tokens, i):
+                    # 数字还没结束（如 3.5），不能在小数点前切分
+                    forced = None
+                    continue
+                # 紧跟的标点并入这一段
+                forced = offset
+                if is_last:
+                    return forced
+                continue
+
+            if kind == "punct":
+                if _is_separator(tokens, i):
+                    continue
+                strong = is_ellipsis(token) or token == "." or token in STRONG_DELIMITERS
+                weak = token in WEAK_DELIMITERS and length >= min_chars
+                if strong or weak:
+                    if is_last:
+                        return offset
+                    forced = offset
+                continue
+
+            length += spoken_length(kind, token)
+            # 英文单词、数字在缓冲区末尾时可能还没收完
+            if kind != "word" or not is_last:
+                boundary = offset
+            if length >= force_chars and boundary is not None:
+                if boundary != offset:
+                    # 当前单词还没收完，切在它前面
+                    return boundary
+                forced = boundary
+        return None
+
+
+def split_segments(text: str, **params) -> List[str]:
+    """
+    一次性切分整段文本（非流式）
+
+    Args:
+        text: 文本
+        **params: TextSegmenter 参数
+
+    Returns:
+        分段列表
+    """
+    segmenter = TextSegmenter(**params)
+    segments = segmenter.feed(text)
+    tail = segmenter.flush()
+    if tail:
+        segments.append(tail)
+    return segments
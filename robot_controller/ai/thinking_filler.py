@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+思考垫音 (Thinking Filler)
+
+功能：
+1. 识别完成、开始调用对话模型时，立即从本地 PCM 播一句简短应答（"嗯"、"我想一下"），
+   填补等待整段回复和合成的静默
+2. 按意图选择垫音：闲聊、提问、长问题各一组，同类轮流使用
+3. 垫音短语启动后在后台合成（TTS 磁盘缓存命中后不再请求接口），不阻塞启动；没有合成好时播放本地生成的提示音
+4. 第一帧回复音频到达时垫音还没播完就截断（丢弃未播出的部分），回复不会排在整段垫音之后
+5. 被打断（唤醒词、中断、出错）时取消垫音
+6. 统计触发、截断、取消次数和垫音覆盖的静默时长
+
+说明：
+- 垫音和回复写入同一个流式播放器；截断用 StreamingAudioPlayer.interrupt()，播放器保持运行
+- 预合成使用独立的 TTS 连接（共用磁盘缓存），不影响对话中的合成会话和回调
+"""
+
+import re
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+from ai.tts_client import TTSClient
+
+
+@dataclass
+class FillerConfig:
+    """垫音配置"""
+    enabled: bool = True
+    long_chars: int = 20  # 超过这个字数的问题用较长的垫音
+    phrases: Dict[str, List[str]] = field(default_factory=lambda: {
+        "chat": ["嗯", "嗯嗯"],
+        "question": ["嗯，我想想", "我想一下"],
+        "long": ["嗯，让我好好想一想"],
+    })
+
+
+class ThinkingFiller:
+    """
+    思考垫音
+
+    使用示例:
+        filler = ThinkingFiller(tts_client, FillerConfig())
+        asyncio.create_task(filler.prepare())   # 启动时（后台）
+        await filler.play(stream_player, text)  # 开始调用对话模型时
+        filler.reply_ready(stream_player)       # 第一帧回复音频写入播放器前
+        await filler.cancel(stream_player)      # 被打断时
+    """
+
+    # 提问句特征
+    _QUESTION_PATTERN = re.compile(r'[吗呢？?]\s*$|什么|怎么|为什么|为啥|哪|几|多少|谁|是不是|能不能|可不可以|有没有')
+
+    def __init__(self, tts_client: TTSClient, config: FillerConfig):
+        self.logger = get_logger()
+        self.tts_client = tts_client
+        self.config = config
+        self.sample_rate = tts_client.config.sample_rate
+
+        self._audio: Dict[str, bytes] = {}  # 短语 -> PCM
+        self._turns: Dict[str, int] = {kind: 0 for kind in config.phrases}
+        self._chime: Optional[bytes] = None
+        self._fired_at = 0.0
+        self._duration = 0.0  # 本轮垫音时长（秒）
+
+        # 统计信息
+        self.fired = 0  # 播放垫音次数
+        self.cut_short = 0  # 回复音频到达时垫音还没播完（被截断）
+        self.cancelled = 0  # 被打断取消
+        self._gaps: List[float] = []  # 每次从垫音开始到回复开始合成的时长（秒）
+        self._covered: List[float] = []  # 每次垫音覆盖的静默时长（秒）
+
+    async def prepare(self):
+        """
+        合成全部垫音短语（只支持 PCM 输出；TTS 磁盘缓存命中时不请求接口）
+
+        启动后放在后台任务中执行；使用独立的 TTS 客户端，不会和对话中的合成会话共用连接和回调
+        """
+        if not self.config.enabled or self.tts_client.config.audio_format != "pcm":
+            return
+        client = TTSClient(replace(self.tts_client.config, cache_dir=""))
+        client.cache = self.tts_client.cache
+        for phrases in self.config.phrases.values():
+            for phrase in phrases:
+                try:
+                    audio = await client.synthesize(phrase)
+                except Exception as e:
+                    self.logger.warning(f"垫音合成失败: {phrase} {e}")
+                    continue
+                if audio:
+                    self._audio[phrase] = audio
+        self.logger.info(f"垫音就绪: {len(self._audio)} 句")
+
+    def select(self, text: str) -> Tuple[str, bytes]:
+        """
+        按意图选择垫音
+
+        Returns:
+            (短语, PCM)，短语没有合成好时返回提示音
+        """
+        if len(text) > self.config.long_chars:
+            kind = "long"
+        elif self._QUESTION_PATTERN.search(text):
+            kind = "question"
+        else:
+            kind = "chat"
+        phrases = self.config.phrases.get(kind) or [""]
+        phrase = phrases[self._turns.get(kind, 0) % len(phrases)]
+        self._turns[kind] = self._turns.get(kind, 0) + 1
+        if phrase in self._audio:
+            return phrase, self._audio[phrase]
+        return "提示音", self._chime_audio()
+
+    def _chime_audio(self) -> bytes:
+        """本地生成的提示音（两声短促的柔和正弦音）"""
+        if self._chime is None:
+            rate = self.sample_rate
+            notes = []
+            for frequency in (660.0, 880.0):
+                t = np.arange(int(rate * 0.09)) / rate
+                envelope = np.sin(np.pi * t / t[-1]) ** 2
+                notes.append(np.sin(2 * np.pi * frequency * t) * envelope * 3000)
+                notes.append(np.zeros(int(rate * 0.04)))
+            self._chime = np.concatenate(notes).astype(np.int16).tobytes()
+        return self._chime
+
+    async def play(self, player, text: str) -> bool:
+        """
+        开始调用对话模型时播放垫音
+
+        Args:
+            player: 流式播放器（StreamingAudioPlayer）
+            text: 用户输入
+
+        Returns:
+            是否播放了垫音
+        """
+        if not self.config.enabled or self.tts_client.config.audio_format != "pcm":
+            return False
+        phrase, audio = self.select(text)
+        await player.start(sample_rate=self.sample_rate, audio_format="pcm")
+        player.feed(audio)
+        self._fired_at = time.time()
+        self._duration = len(audio) / 2 / self.sample_rate
+        self.fired += 1
+        self.logger.info(f"播放垫音: {phrase}")
+        return True
+
+    def _audible(self) -> bool:
+        """垫音是否还在播放"""
+        return bool(self._fired_at) and time.time() - self._fired_at < self._duration
+
+    def reply_ready(self, player):
+        """
+        第一帧回复音频写入播放器前调用：截断还没播完的垫音，记录垫音覆盖的静默
+
+        Args:
+            player: 流式播放器（StreamingAudioPlayer）
+        """
+        if not self._fired_at:
+            return
+        gap = time.time() - self._fired_at
+        if self._audible():
+            player.interrupt()
+            self.cut_short += 1
+        self._fired_at = 0.0
+        self._gaps.append(gap)
+        self._covered.append(min(gap, self._duration))
+        self.logger.debug(f"回复音频就绪（垫音后 {gap * 1000:.0f}ms，垫音 {self._duration * 1000:.0f}ms）")
+
+    async def cancel(self, player):
+        """
+        被打断时取消垫音（停止播放器，丢弃未播出的部分）
+
+        Args:
+            player: 流式播放器（StreamingAudioPlayer）
+        """
+        if not self._fired_at:
+            return
+        if self._audible():
+            self.cancelled += 1
+        self._fired_at = 0.0
+        # 播放器是垫音启动的，回复还没开始，垫音播完也一并停掉
+        await player.stop()
+
+    def stats(self) -> Dict[str, float]:
+        """垫音统计"""
+        result = {"fired": self.fired, "cut": self.cut_short, "cancelled": self.cancelled}
+        if self._gaps:
+            result["gap_ms_avg"] = round(float(np.mean(self._gaps)) * 1000)
+            result["covered_ms_avg"] = round(float(np.mean(self._covered)) * 1000)
+        return result
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+合成音频磁盘缓存 (TTS Cache)
+
+功能：
+1. 固定提示语合成一次后保存到磁盘，再次播报直接读文件，不建立合成连接，也不产生合成计费
+2. 缓存键是文本、音色、格式、采样率、语速、音量拼接后的哈希，任一参数变化都不会命中旧音频
+3. 目录大小有上限，超过时淘汰最久未使用的文件（LRU）
+4. 统计命中率
+
+说明：
+- 每条缓存一个文件：<哈希>.<格式>，先写临时文件再替换
+- 不单独保存索引：启动时扫描目录，按修改时间恢复使用顺序；命中时更新文件修改时间
+- 只缓存短文本，对话回复很少逐字重复
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.logger import get_logger
+
+
+class TTSCache:
+    """
+    合成音频磁盘缓存
+
+    使用示例:
+        cache = TTSCache("~/.xiaoyuan_robot/tts_cache", max_mb=50)
+        key = TTSCache.key(text, speaker, "pcm", 24000, 1.0, 1.0)
+        audio = cache.get(key)
+        if audio is None:
+            audio = synthesize(text)
+            cache.put(key, audio)
+    """
+
+    def __init__(self, directory: str, max_mb: float = 50, max_chars: int = 60):
+        """
+        初始化缓存
+
+        Args:
+            directory: 缓存文件目录（支持 ~）
+            max_mb: 目录大小上限（MB）
+            max_chars: 超过这个字数的文本不缓存
+        """
+        self.logger = get_logger()
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_chars = max_chars
+        self.enabled = True
+
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # 文件名 -> 字节数，最久未使用在前
+        self._total = 0
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.lookups = 0    # 查询次数
+        self.hits = 0       # 命中次数
+        self.evictions = 0  # 淘汰文件数
+
+        self._load_index()
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间恢复使用顺序"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        os.remove(entry.path)
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except OSError as e:
+            self.logger.warning(f"读取合成缓存目录失败，禁用缓存: {e}")
+            self.enabled = False
+            return
+
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total += size
+        if entries:
+            self.logger.info(f"加载 {len(self._index)} 条合成缓存（{self._total / 1024 / 1024:.1f}MB）")
+        self._evict()
+
+    @staticmethod
+    def key(text: str, speaker: str, audio_format: str, sample_rate: int,
+            speech_rate: float, loudness_rate: float) -> str:
+        """
+        计算缓存文件名
+
+        Returns:
+            <哈希>.<格式>
+        """
+        parts = [text.strip(), speaker, audio_format, str(sample_rate), str(speech_rate), str(loudness_rate)]
+        digest = hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+        return f"{digest}.{audio_format}"
+
+    def is_cacheable(self, text: str) -> bool:
+        """文本是否适合缓存（非空且不超过字数上限）"""
+        text = text.strip()
+        return self.enabled and 0 < len(text) <= self.max_chars
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        查询缓存
+
+        Args:
+            key: TTSCache.key() 的结果
+
+        Returns:
+            缓存的音频，未命中返回 None
+        """
+        path = os.path.join(self.directory, key)
+        with self._lock:
+            self.lookups += 1
+            if key not in self._index:
+                return None
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)  # 记录使用时间，重启后仍能恢复 LRU 顺序
+            except OSError:
+                self._total -= self._index.pop(key)
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, key: str, audio: bytes) -> bool:
+        """
+        写入缓存（超过目录大小上限时淘汰最久未使用的文件）
+
+        Args:
+            key: TTSCache.key() 的结果
+            audio: 完整的合成音频
+
+        Returns:
+            是否写入
+        """
+        if not self.enabled or not audio or len(audio) > self.max_bytes:
+            return False
+        path = os.path.join(self.directory, key)
+        with self._lock:
+            try:
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.logger.warning(f"写入合成缓存失败: {e}")
+                return False
+            self._total += len(audio) - self._index.pop(key, 0)
+            self._index[key] = len(audio)
+            self._evict()
+            return True
+
+    def _evict(self):
+        """淘汰最久未使用的文件，直到目录大小不超过上限"""
+        while self._total > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, float]:
+        """缓存统计"""
+        return {
+            "entries": len(self._index),
+            "size_mb": round(self._total / 1024 / 1024, 2),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "evictions": self.evictions
+        }
@@ -15,6 +15,8 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import get_logger
+from ai.tts_cache import TTSCache
+from ai.text_segmenter import TextSegmenter, split_segments
 
 try:
     import websockets
@@ -34,6 +36,9 @@ class TTSConfig:
     sample_rate: int = 24000
     speech_rate: float = 1.0
     loudness_rate: float = 1.0
+    cache_dir: str = ""  # 合成音频缓存目录，空字符串表示不缓存
+    cache_max_mb: float = 50  # 缓存目录大小上限（MB）
+    cache_max_chars: int = 60  # 超过这个字数的文本不缓存
 
 
 class TTSClient:
@@ -72,6 +77,11 @@ class TTSClient:
         self._connected = False
         self._session_id = None
 
+        # 固定提示语的合成音频缓存
+        self.cache: Optional[TTSCache] = None
+        if config.cache_dir:
+            self.cache = TTSCache(config.cache_dir, config.cache_max_mb, config.cache_max_chars)
+
         # 回调函数
         self._on_audio_chunk: Optional[Callable[[bytes], None]] = None
         self._on_complete: Optional[Callable[[], None]] = None
@@ -115,6 +125,8 @@ class TTSClient:
         """
         合成语音
 
+        每收到一帧音频立即调用 on_audio_chunk 回调（可直接接流式播放器），返回值为完整音频
+
         Args:
             text: 要合成的文本
 
@@ -127,7 +139,24 @@ class TTSClient:
         if not text.strip():
             return b""
 
+        # 命中合成缓存时直接返回，不建立连接
+        cache_key = None
+        if self.cache and self.cache.is_cacheable(text):
+            cache_key = TTSCache.key(
+                text, self.config.speaker, self.config.audio_format, self.config.sample_rate,
+                self.config.speech_rate, self.config.loudness_rate
+            )
+            cached = self.cache.get(cache_key)
+            if cached:
+                self.logger.debug(f"命中合成缓存: {text[:20]}")
+                if self._on_audio_chunk:
+                    self._on_audio_chunk(cached)
+                if self._on_complete:
+                    self._on_complete()
+                return cached
+
         audio_data = bytearray()
+        completed = False
 
         # 构造请求头
         headers = {
@@ -213,6 +242,7 @@ class TTSClient:
 
                         elif event == self.EVENT_SESSION_FINISHED:
                             self.logger.debug("TTS 会话结束")
+                            completed = True
                             break
 
                         elif event in (self.EVENT_SESSION_CANCELED, self.EVENT_CONNECTION_FAILED):
@@ -254,6 +284,10 @@ class TTSClient:
             self._websocket = None
             self._session_id = None
 
+        # 完整合成的短文本写入缓存
+        if cache_key and completed and audio_data:
+            self.cache.put(cache_key, bytes(audio_data))
+
         return bytes(audio_data)
 
     async def synthesize_stream(
@@ -312,14 +346,11 @@ class TTSClient:
                     raise Exception(f"会话启动失败: {res}")
 
                 # 流式发送文本并接收音频
-                text_buffer = ""
+                # 第一段在第一个逗号或几个字后就切出，后续分段逐渐变长
+                segmenter = TextSegmenter()
 
                 async for text_chunk in text_generator:
-                    text_buffer += text_chunk
-
-                    # 按句子分割发送
-                    sentences = self._split_sentences(text_buffer)
-                    for sentence in sentences[:-1]:
+                    for sentence in segmenter.feed(text_chunk):
                         if sentence.strip():
                             await websocket.send(self._build_request(
                                 self.EVENT_TASK_REQUEST,
@@ -350,9 +381,8 @@ class TTSClient:
                                 except asyncio.TimeoutError:
                                     break
 
-                    text_buffer = sentences[-1] if sentences else ""
-
                 # 发送剩余文本
+                text_buffer = segmenter.flush()
                 if text_buffer.strip():
                     await websocket.send(self._build_request(
                         self.EVENT_TASK_REQUEST,
@@ -401,24 +431,8 @@ class TTSClient:
             self._websocket = None
 
     def _split_sentences(self, text: str) -> list:
-        """按句子分割文本"""
-        import re
-        # 中英文标点分割
-        pattern = r'([。！？.!?])'
-        parts = re.split(pattern, text)
-
-        sentences = []
-        current = ""
-        for part in parts:
-            current += part
-            if part in '。！？.!?':
-                sentences.append(current)
-                current = ""
-
-        if current:
-            sentences.append(current)
-
-        return sentences
+        """按切分规则分割整段文本（与流式合成一致）"""
+        return split_segments(text)
 
     def is_connected(self) -> bool:
         """检查是否已连接"""
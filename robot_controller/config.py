@@ -16,6 +16,8 @@ AUDIO_CONFIG = {
     "channels": 1,
     "bit_depth": 16,
     "chunk_size": 3200,  # 200ms @ 16kHz
+    # 唤醒前保留的音频（毫秒），大于 0 时麦克风常开写入环形缓冲区，唤醒后开头的字不会丢
+    "preroll_ms": 500,
 }
 
 # 降噪板串口配置
@@ -79,6 +81,9 @@ ASR_CONFIG = {
     "enable_punc": True,     # 自动标点
     "enable_ddc": True,      # 语音活动检测
     "show_utterances": True, # 显示句子级结果
+    "pool_size": 1,          # 预热连接数（0 表示关闭预热）
+    "pool_max_idle": 30,     # 预热连接最长空闲时间（秒）
+    "final_timeout": 5.0,    # 说完后等待最终识别结果的超时时间（秒）
 }
 
 # 对话模型 (Chat)
@@ -88,6 +93,14 @@ CHAT_CONFIG = {
     "max_tokens": 4096,
     "temperature": 0.7,
     "stream": True,
+    "pool_size": 2,  # 长连接池大小（启动时预热，省去每轮对话的 TCP/TLS 握手）
+    "keepalive_interval": 20,  # 空闲多久（秒）后发送一次保活请求，0 表示不保活
+    "hedge_enabled": False,  # 首片段超过预算时间再发一个相同请求，先到先用（会增加调用费用）
+    "router_enabled": True,  # 简单闲聊走快速档，需要推理/生成的问题走完整档
+    "fast_model_name": "doubao-seed-1-6-flash-250828",  # 快速档模型
+    "fast_max_tokens": 128,  # 快速档最大生成 tokens 数
+    "context_budget": 1200,  # 请求（不含回复）的 token 上限：按优先级装入提示词、记忆、摘要、最近对话
+    "context_history_tokens": 800,  # 保留在历史中的对话 token 上限，超出的早期对话后台合并成摘要
 }
 
 # 语音合成 (TTS)
@@ -95,14 +108,47 @@ TTS_CONFIG = {
     "ws_url": "wss://openspeech.bytedance.com/api/v3/tts/bidirection",
     "resource_id": "seed-tts-2.0",
     "speaker": "zh_female_xiaohe_uranus_bigtts",  # 小何2.0音色
-    "audio_format": "mp3",
+    "audio_format": "pcm",  # pcm 直接写入 aplay 边收边播；mp3 需要 mpg123 从标准输入解码
     "sample_rate": 24000,
+    "jitter_buffer_ms": 60,  # 流式播放抖动缓冲（毫秒），攒够后才开始出声
+    # 合成音频缓存：固定提示语合成一次后保存，再次播报直接读文件（键含文本、音色、格式、采样率、语速、音量）
+    "cache_dir": "~/.xiaoyuan_robot/tts_cache",  # 空字符串表示不缓存
+    "cache_max_mb": 50,  # 缓存目录大小上限（MB），超过时淘汰最久未使用的
+    "cache_max_chars": 60,  # 超过这个字数的文本不缓存
+}
+
+# 思考垫音：开始调用对话模型时先从本地 PCM 播一句简短应答，填补等待回复的静默（需要 audio_format 为 pcm）
+FILLER_CONFIG = {
+    "enabled": True,
+    "long_chars": 20,  # 超过这个字数的问题用较长的垫音
+    "phrases": {  # 同类多句轮流使用
+        "chat": ["嗯", "嗯嗯"],
+        "question": ["嗯，我想想", "我想一下"],
+        "long": ["嗯，让我好好想一想"],
+    },
 }
 
 # 记忆服务 (Mem0)
 MEM0_CONFIG = {
     "base_url": "http://tenyuan.tech:9000",
     "enabled": True,
+    "deadline_ms": 150,  # 识别完成后等待记忆的截止时间（毫秒），超时不带记忆继续对话
+    # 后台记忆写入：每轮对话只追加到磁盘队列，攒几轮合并成一次 add_memory，失败退避重试
+    "queue_path": "~/.xiaoyuan_robot/memory_queue.jsonl",
+    "batch_turns": 3,  # 攒够几轮对话合并写入一次
+    "max_delay": 60,  # 最早一轮对话最多等待多少秒（不足几轮也写入）
+    # 记忆迁移：分批并发写入、并发删除，进度写入日志，中断后可继续
+    "migration_journal": "~/.xiaoyuan_robot/memory_migrations.json",
+    "migration_workers": 4,
+}
+
+# 熔断：Mem0 和对话接口连续失败后熔断，请求直接失败；后台定期健康探测，恢复后自动闭合
+CIRCUIT_CONFIG = {
+    "enabled": True,
+    "failure_threshold": 2,  # 连续失败多少次后熔断（超时、连接失败、5xx）
+    "reset_timeout": 30,  # 熔断多久（秒）后放行一个试探请求
+    "probe_interval": 5,  # 熔断期间健康探测间隔（秒）
+    "probe_timeout": 2,  # 健康探测超时（秒）
 }
 
 
@@ -130,9 +176,10 @@ SYSTEM_CONFIG = {
     "log_file": "/var/log/robot/robot.log",
 
     # 静音检测
-    "silence_threshold": 500,       # 静音阈值
-    "silence_duration": 1.5,        # 静音持续时间（秒）
+    "silence_threshold": 500,       # 静音阈值（RMS，自适应噪声阈值的下限）
+    "silence_duration": 1.0,        # 静音持续时间（秒，VAD 拖尾平滑后可低于 1.5s）
     "max_record_duration": 30,      # 最大录音时长（秒）
+    "no_speech_timeout": 5.0,       # 唤醒后一直不说话的等待时长（秒）
 
     # 性能配置
     "enable_face_recognition": True,
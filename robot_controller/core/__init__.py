@@ -4,10 +4,15 @@
 from .state_machine import RobotStateMachine, RobotState
 from .audio_recorder import AudioRecorder
 from .audio_player import AudioPlayer
+from .vad import VoiceActivityDetector, VADConfig
+from .audio_ring import AudioRingBuffer
 
 __all__ = [
     "RobotStateMachine",
     "RobotState",
     "AudioRecorder",
     "AudioPlayer",
+    "VoiceActivityDetector",
+    "VADConfig",
+    "AudioRingBuffer",
 ]
@@ -24,6 +24,7 @@ class PlaybackConfig:
     sample_rate: int = 24000  # TTS 默认采样率
     channels: int = 1
     bit_depth: int = 16
+    jitter_buffer_ms: int = 60  # 流式播放抖动缓冲：攒够这么多音频再写入播放进程
 
 
 class AudioPlayer:
@@ -251,7 +252,11 @@ class StreamingAudioPlayer:
     """
     流式音频播放器
 
-    支持边接收边播放，适用于 TTS 流式输出
+    支持边接收边播放，适用于 TTS 流式输出：
+    - 每帧音频通过 feed() 放入队列，播放循环立即写入播放进程（PCM 用 aplay，MP3 用 mpg123 从标准输入解码）
+    - 开始时先攒够 jitter_buffer_ms 的 PCM 再写入，避免网络抖动导致刚出声就断续
+    - finish() 等待已放入的音频全部播完，stop() 立即中断
+    - interrupt() 丢弃还没播出的音频（如思考垫音），之后放入的音频换一个新的播放进程接着播
     """
 
     def __init__(self, config: Optional[PlaybackConfig] = None):
@@ -262,40 +267,75 @@ class StreamingAudioPlayer:
         self._queue: asyncio.Queue = None
         self._process: Optional[asyncio.subprocess.Process] = None
         self._play_task: Optional[asyncio.Task] = None
+        self._jitter_bytes = 0
+        self._on_start: Optional[Callable] = None
+        self._sample_rate = 24000
+        self._audio_format = "pcm"
+        self._restart = False  # 下一帧音频写入前重启播放进程（interrupt() 设置）
 
-    async def start(self, sample_rate: int = 24000):
-        """启动流式播放"""
+    async def start(self, sample_rate: int = 24000, audio_format: str = "pcm"):
+        """
+        启动流式播放
+
+        Args:
+            sample_rate: 采样率（PCM）
+            audio_format: 音频格式，pcm 或 mp3
+        """
         if self._playing:
             return
 
         self._playing = True
         self._queue = asyncio.Queue()
+        self._sample_rate = sample_rate
+        self._audio_format = audio_format
+        self._restart = False
 
-        # 启动 aplay 进程
-        cmd = [
-            "aplay",
-            "-D", self.config.device,
-            "-f", "S16_LE",
-            "-r", str(sample_rate),
-            "-c", str(self.config.channels),
-            "-t", "raw",
-            "-q",
-            "-"
-        ]
+        if audio_format == "mp3":
+            # MP3 帧长度不固定，由 mpg123 自己缓冲
+            self._jitter_bytes = 0
+        else:
+            bytes_per_second = sample_rate * self.config.channels * self.config.bit_depth // 8
+            self._jitter_bytes = bytes_per_second * self.config.jitter_buffer_ms // 1000
+
+        self._process = await self._spawn(sample_rate, audio_format)
 
-        self._process = await asyncio.create_subprocess_exec(
+        # 启动播放任务
+        self._play_task = asyncio.create_task(self._play_loop())
+        self.logger.info("流式播放器启动")
+
+    async def _spawn(self, sample_rate: int, audio_format: str) -> Optional[asyncio.subprocess.Process]:
+        """启动从标准输入读取音频的播放进程"""
+        if audio_format == "mp3":
+            cmd = ["mpg123", "-q", "-a", self.config.device, "-"]
+        else:
+            cmd = [
+                "aplay",
+                "-D", self.config.device,
+                "-f", "S16_LE",
+                "-r", str(sample_rate),
+                "-c", str(self.config.channels),
+                "-t", "raw",
+                "-q",
+                "-"
+            ]
+
+        return await asyncio.create_subprocess_exec(
             *cmd,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
 
-        # 启动播放任务
-        self._play_task = asyncio.create_task(self._play_loop())
-        self.logger.info("流式播放器启动")
+    async def _output(self, chunk: bytes):
+        """把一段音频写入播放进程"""
+        if self._process and self._process.stdin:
+            self._process.stdin.write(chunk)
+            await self._process.stdin.drain()
 
     async def _play_loop(self):
         """播放循环"""
+        pending = bytearray()
+        started = False
         while self._playing:
             try:
                 # 等待音频数据
@@ -305,13 +345,30 @@ class StreamingAudioPlayer:
                 )
 
                 if chunk is None:
-                    # 收到结束信号
+                    # 收到结束信号，写入抖动缓冲中剩余的数据
+                    if pending:
+                        await self._output(bytes(pending))
                     break
 
+                if self._restart:
+                    # interrupt() 之后的第一帧：丢弃旧进程中还没播出的音频，换新进程重新攒抖动缓冲
+                    self._restart = False
+                    await self._respawn()
+                    pending.clear()
+                    started = False
+
+                if not started:
+                    pending += chunk
+                    if len(pending) < self._jitter_bytes:
+                        continue
+                    started = True
+                    chunk = bytes(pending)
+                    pending.clear()
+                    if self._on_start:
+                        self._on_start()
+
                 # 写入播放进程
-                if self._process and self._process.stdin:
-                    self._process.stdin.write(chunk)
-                    await self._process.stdin.drain()
+                await self._output(chunk)
 
             except asyncio.TimeoutError:
                 continue
@@ -319,13 +376,72 @@ class StreamingAudioPlayer:
                 self.logger.error(f"流式播放异常: {e}")
                 break
 
+    async def _respawn(self):
+        """终止当前播放进程（其中已写入但还没播出的音频一并丢弃），启动新的播放进程"""
+        if self._process:
+            try:
+                self._process.terminate()
+                await asyncio.wait_for(self._process.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                self._process.kill()
+                await self._process.wait()
+            except Exception as e:
+                self.logger.warning(f"重启播放进程异常: {e}")
+        self._process = await self._spawn(self._sample_rate, self._audio_format)
+
+    def interrupt(self):
+        """
+        丢弃已放入但还没播出的音频，播放器保持运行（非阻塞，可在 TTS 回调中调用）
+
+        队列中的音频立即丢弃；已写入播放进程的部分在下一帧音频到达时随旧进程一起终止
+        """
+        if not self._playing or not self._queue:
+            return
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._restart = True
+
+    def feed(self, audio_data: bytes):
+        """放入一帧音频（非阻塞，可直接作为 TTS 的 on_audio_chunk 回调）"""
+        if self._queue and self._playing and audio_data:
+            self._queue.put_nowait(audio_data)
+
     async def write(self, audio_data: bytes):
         """写入音频数据"""
-        if self._queue and self._playing:
-            await self._queue.put(audio_data)
+        self.feed(audio_data)
+
+    async def finish(self) -> bool:
+        """
+        结束输入并等待已放入的音频全部播放完毕
+
+        Returns:
+            是否正常播放完成
+        """
+        if not self._playing:
+            return False
+
+        await self._queue.put(None)
+        if self._play_task:
+            await self._play_task
+            self._play_task = None
+
+        completed = self._playing
+        if self._process:
+            try:
+                if self._process.stdin:
+                    self._process.stdin.close()
+                await self._process.wait()
+            except Exception as e:
+                self.logger.warning(f"等待播放进程结束异常: {e}")
+            finally:
+                self._process = None
+
+        self._playing = False
+        self.logger.info("流式播放完成")
+        return completed
 
     async def stop(self):
-        """停止流式播放"""
+        """停止流式播放（丢弃未播放的音频）"""
         self._playing = False
 
         # 发送结束信号
@@ -338,12 +454,12 @@ class StreamingAudioPlayer:
                 await asyncio.wait_for(self._play_task, timeout=2.0)
             except asyncio.TimeoutError:
                 self._play_task.cancel()
+            self._play_task = None
 
         # 关闭进程
         if self._process:
             try:
-                if self._process.stdin:
-                    self._process.stdin.close()
+                self._process.terminate()
                 await asyncio.wait_for(self._process.wait(), timeout=1.0)
             except asyncio.TimeoutError:
                 self._process.kill()
@@ -355,6 +471,10 @@ class StreamingAudioPlayer:
 
         self.logger.info("流式播放器停止")
 
+    def set_on_start(self, callback: Callable):
+        """设置开始出声回调（抖动缓冲攒够、第一次写入播放进程时调用）"""
+        self._on_start = callback
+
     def is_playing(self) -> bool:
         """检查是否正在播放"""
         return self._playing
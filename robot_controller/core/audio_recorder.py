@@ -2,10 +2,13 @@
 """
 ALSA 音频录制模块
 适用于 RK3568 嵌入式平台
+
+录音数据写入固定容量的环形缓冲区（见 audio_ring.py），read_chunk() 返回缓冲区的零拷贝视图。
+配置了 pre-roll 时麦克风常开，start() 从唤醒/按键之前 preroll_ms 的位置开始读取。
 """
 
 import asyncio
-import struct
+import threading
 import time
 from typing import Optional, Callable, AsyncGenerator
 from dataclasses import dataclass
@@ -15,6 +18,8 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import get_logger
+from core.vad import VoiceActivityDetector, VADConfig, frame_features
+from core.audio_ring import AudioRingBuffer, as_bytes_view
 
 
 @dataclass
@@ -25,13 +30,16 @@ class AudioConfig:
     channels: int = 1
     bit_depth: int = 16
     chunk_size: int = 3200  # 200ms @ 16kHz
+    preroll_ms: int = 0  # 开始录音前保留的音频（毫秒），大于 0 时麦克风常开
+    buffer_seconds: float = 30.0  # 环形缓冲区保留的最长录音（秒）
 
 
 class AudioRecorder:
     """
     ALSA 音频录制器
 
-    支持异步录音和静音检测
+    支持异步录音和静音检测。arecord 输出由后台采集任务写入环形缓冲区，
+    内存占用固定为 buffer_seconds + preroll_ms 的音频，与录音时长无关。
     """
 
     def __init__(self, config: Optional[AudioConfig] = None):
@@ -39,50 +47,55 @@ class AudioRecorder:
         self.config = config or AudioConfig()
 
         self._recording = False
-        self._audio_buffer = bytearray()
         self._process: Optional[asyncio.subprocess.Process] = None
+        self._capture_task: Optional[asyncio.Task] = None
+        self._data_event: Optional[asyncio.Event] = None  # 在 open() 中创建，绑定运行中的事件循环
+
+        # 录音环形缓冲区（arecord 按字节读取，chunk_size 为字节数）
+        self.always_on = self.config.preroll_ms > 0
+        self._ring = AudioRingBuffer.for_duration(
+            self.config.buffer_seconds + self.config.preroll_ms / 1000,
+            self.config.sample_rate * self.config.channels
+        )
+        self._chunk_samples = max(1, self.config.chunk_size // 2)
+        self._session_start = 0
+        self._cursor = 0
 
         # 静音检测参数
         self._silence_threshold = 500
         self._silence_duration = 1.5  # 秒
         self._last_sound_time = 0
+        self._vad = VoiceActivityDetector(VADConfig(
+            sample_rate=self.config.sample_rate,
+            min_threshold=self._silence_threshold
+        ))
 
     def set_silence_params(self, threshold: int, duration: float):
-        """设置静音检测参数"""
+        """设置静音检测参数（threshold 为自适应阈值的下限）"""
         self._silence_threshold = threshold
         self._silence_duration = duration
+        self._vad.config.min_threshold = threshold
 
     def _calculate_rms(self, audio_data: bytes) -> float:
         """计算音频 RMS（均方根）值"""
-        if len(audio_data) < 2:
-            return 0
-
-        # 16-bit PCM 数据
-        sample_count = len(audio_data) // 2
-        if sample_count == 0:
-            return 0
-
-        samples = struct.unpack(f"<{sample_count}h", audio_data)
-        sum_squares = sum(s * s for s in samples)
-        return (sum_squares / sample_count) ** 0.5
+        return frame_features(audio_data).rms
 
     def _is_silence(self, audio_data: bytes) -> bool:
-        """检测是否为静音"""
-        rms = self._calculate_rms(audio_data)
-        return rms < self._silence_threshold
+        """检测是否为静音（自适应噪声基底 + 拖尾平滑）"""
+        return not self._vad.process(audio_data)
 
-    async def start(self) -> bool:
+    def is_open(self) -> bool:
+        """麦克风是否在采集"""
+        return self._capture_task is not None and not self._capture_task.done()
+
+    async def open(self) -> bool:
         """
-        启动录音
+        打开麦克风，开始向环形缓冲区采集音频（已打开时直接返回）
 
         使用 arecord 命令进行 ALSA 录音
         """
-        if self._recording:
-            self.logger.warning("录音已在进行中")
-            return False
-
-        self._audio_buffer.clear()
-        self._last_sound_time = time.time()
+        if self.is_open():
+            return True
 
         # 构建 arecord 命令
         cmd = [
@@ -102,26 +115,44 @@ class AudioRecorder:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            self._recording = True
-            self.logger.info(f"录音启动: {self.config.device}")
+            self._data_event = asyncio.Event()
+            self._capture_task = asyncio.create_task(self._capture_loop(self._process))
+            self.logger.info(f"麦克风打开: {self.config.device}")
             return True
 
         except Exception as e:
             self.logger.error(f"录音启动失败: {e}")
             return False
 
-    async def stop(self) -> bytes:
-        """
-        停止录音
-
-        Returns:
-            录音数据
-        """
-        if not self._recording:
-            return bytes(self._audio_buffer)
+    async def _capture_loop(self, process: asyncio.subprocess.Process):
+        """后台采集：arecord 输出持续写入环形缓冲区"""
+        try:
+            while True:
+                chunk = await process.stdout.read(self.config.chunk_size)
+                if not chunk:
+                    self.logger.warning("arecord 输出结束")
+                    break
+                self._ring.write(chunk)
+                self._data_event.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"采集音频失败: {e}")
+        finally:
+            self._data_event.set()
 
+    async def close(self):
+        """关闭麦克风"""
         self._recording = False
 
+        if self._capture_task:
+            self._capture_task.cancel()
+            try:
+                await self._capture_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._capture_task = None
+
         if self._process:
             try:
                 self._process.terminate()
@@ -134,46 +165,98 @@ class AudioRecorder:
             finally:
                 self._process = None
 
-        self.logger.info(f"录音停止，数据长度: {len(self._audio_buffer)} bytes")
-        return bytes(self._audio_buffer)
+    async def start(self) -> bool:
+        """
+        启动录音
 
-    async def read_chunk(self) -> Optional[bytes]:
+        常开模式下从 preroll_ms 之前的缓冲位置开始读取，否则现场启动 arecord
+        """
+        if self._recording:
+            self.logger.warning("录音已在进行中")
+            return False
+
+        if not await self.open():
+            return False
+
+        preroll = self._ring.samples_for(self.config.preroll_ms / 1000)
+        self._session_start = max(self._ring.position - preroll, self._ring.oldest)
+        self._cursor = self._session_start
+        self._last_sound_time = time.time()
+        self._vad.reset()
+        self._recording = True
+        self.logger.info(f"录音启动（pre-roll {self._pending_samples() / self._ring.sample_rate * 1000:.0f}ms）")
+        return True
+
+    async def stop(self) -> bytes:
+        """
+        停止录音
+
+        Returns:
+            录音数据（含 pre-roll，超出缓冲区容量时只保留最近部分）
+        """
+        if self._recording:
+            self._recording = False
+            if self._data_event:
+                self._data_event.set()
+            if not self.always_on:
+                await self.close()
+            self.logger.info(f"录音停止，数据长度: {self._session_samples() * 2} bytes")
+        elif not self.always_on and self.is_open():
+            await self.close()
+
+        return self.get_buffer()
+
+    def _pending_samples(self) -> int:
+        """已采集但尚未读取的采样数"""
+        return self._ring.position - max(self._cursor, self._ring.oldest)
+
+    def _session_samples(self) -> int:
+        """本次录音已读取的采样数（受缓冲区容量限制）"""
+        return self._cursor - max(self._session_start, self._ring.oldest)
+
+    async def read_chunk(self) -> Optional[memoryview]:
         """
         读取一个音频块
 
         Returns:
-            音频数据块，如果录音已停止则返回 None
+            指向环形缓冲区的音频数据视图，超时返回 b""，如果录音已停止则返回 None
         """
-        if not self._recording or not self._process:
+        if not self._recording:
             return None
 
-        try:
-            chunk = await asyncio.wait_for(
-                self._process.stdout.read(self.config.chunk_size),
-                timeout=1.0
-            )
+        deadline = time.monotonic() + 1.0
+        while self._pending_samples() < self._chunk_samples:
+            if not self._recording or not self.is_open():
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._data_event.clear()
+            try:
+                await asyncio.wait_for(self._data_event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
 
-            if chunk:
-                self._audio_buffer.extend(chunk)
+        if not self._recording:
+            return None
 
-                # 更新静音检测
-                if not self._is_silence(chunk):
-                    self._last_sound_time = time.time()
+        samples, self._cursor = self._ring.read_since(self._cursor, self._chunk_samples)
+        if len(samples) == 0:
+            return b"" if self.is_open() else None
 
-                return chunk
-            else:
-                return None
+        chunk = as_bytes_view(samples)
 
-        except asyncio.TimeoutError:
-            return b""
-        except Exception as e:
-            self.logger.error(f"读取音频块失败: {e}")
-            return None
+        # 更新静音检测
+        if not self._is_silence(chunk):
+            self._last_sound_time = time.time()
+
+        return chunk
 
     async def stream_audio(
         self,
         on_silence: Optional[Callable] = None,
-        max_duration: float = 30.0
+        max_duration: float = 30.0,
+        no_speech_timeout: Optional[float] = None
     ) -> AsyncGenerator[bytes, None]:
         """
         流式录音生成器
@@ -181,9 +264,11 @@ class AudioRecorder:
         Args:
             on_silence: 检测到静音时的回调
             max_duration: 最大录音时长（秒）
+            no_speech_timeout: 一直没有检测到语音时的等待时长（秒），
+                为 None 时与静音持续时间相同
 
         Yields:
-            音频数据块
+            音频数据块（环形缓冲区视图，在缓冲区写满一圈前有效）
         """
         start_time = time.time()
 
@@ -196,9 +281,14 @@ class AudioRecorder:
             if len(chunk) > 0:
                 yield chunk
 
-            # 检查静音超时
-            silence_time = time.time() - self._last_sound_time
-            if silence_time > self._silence_duration:
+            # 检查静音超时：说话后按 VAD 尾部静音计时，说话前按等待时长计时
+            if self._vad.has_speech:
+                silence_time = self._vad.trailing_silence
+                timeout = self._silence_duration
+            else:
+                silence_time = time.time() - self._last_sound_time
+                timeout = self._silence_duration if no_speech_timeout is None else no_speech_timeout
+            if silence_time > timeout:
                 self.logger.info(f"检测到静音 {silence_time:.1f}s")
                 if on_silence:
                     on_silence()
@@ -211,7 +301,7 @@ class AudioRecorder:
 
     def get_buffer(self) -> bytes:
         """获取当前录音缓冲"""
-        return bytes(self._audio_buffer)
+        return self._ring.view(self._session_start, self._cursor).tobytes()
 
     def is_recording(self) -> bool:
         """检查是否正在录音"""
@@ -219,20 +309,14 @@ class AudioRecorder:
 
     def get_duration(self) -> float:
         """获取录音时长（秒）"""
-        bytes_per_sample = self.config.bit_depth // 8
-        bytes_per_second = (
-            self.config.sample_rate *
-            self.config.channels *
-            bytes_per_sample
-        )
-        return len(self._audio_buffer) / bytes_per_second if bytes_per_second > 0 else 0
+        return self._session_samples() / self._ring.sample_rate
 
 
 class PyAudioRecorder:
     """
     PyAudio 音频录制器
 
-    作为 ALSA arecord 的备选方案
+    作为 ALSA arecord 的备选方案，回调模式写入环形缓冲区（chunk_size 为采样数）
     """
 
     def __init__(self, config: Optional[AudioConfig] = None):
@@ -240,52 +324,58 @@ class PyAudioRecorder:
         self.config = config or AudioConfig()
 
         self._recording = False
-        self._audio_buffer = bytearray()
         self._stream = None
         self._audio = None
 
+        # 录音环形缓冲区
+        self.always_on = self.config.preroll_ms > 0
+        self._ring = AudioRingBuffer.for_duration(
+            self.config.buffer_seconds + self.config.preroll_ms / 1000,
+            self.config.sample_rate * self.config.channels
+        )
+        self._data_ready = threading.Condition()
+        self._session_start = 0
+        self._cursor = 0
+
         # 静音检测参数
         self._silence_threshold = 500
         self._silence_duration = 1.5
         self._last_sound_time = 0
+        self._vad = VoiceActivityDetector(VADConfig(
+            sample_rate=self.config.sample_rate,
+            min_threshold=self._silence_threshold
+        ))
 
     def set_silence_params(self, threshold: int, duration: float):
-        """设置静音检测参数"""
+        """设置静音检测参数（threshold 为自适应阈值的下限）"""
         self._silence_threshold = threshold
         self._silence_duration = duration
+        self._vad.config.min_threshold = threshold
 
     def _calculate_rms(self, audio_data: bytes) -> float:
         """计算音频 RMS 值"""
-        if len(audio_data) < 2:
-            return 0
-
-        sample_count = len(audio_data) // 2
-        if sample_count == 0:
-            return 0
-
-        samples = struct.unpack(f"<{sample_count}h", audio_data)
-        sum_squares = sum(s * s for s in samples)
-        return (sum_squares / sample_count) ** 0.5
+        return frame_features(audio_data).rms
 
     def _is_silence(self, audio_data: bytes) -> bool:
-        """检测是否为静音"""
-        rms = self._calculate_rms(audio_data)
-        return rms < self._silence_threshold
+        """检测是否为静音（自适应噪声基底 + 拖尾平滑）"""
+        return not self._vad.process(audio_data)
+
+    def open(self, device_index: Optional[int] = None) -> bool:
+        """打开麦克风，开始向环形缓冲区采集音频（已打开时直接返回）"""
+        if self._stream is not None:
+            return True
 
-    def start(self, device_index: Optional[int] = None) -> bool:
-        """启动录音"""
         try:
             import pyaudio
         except ImportError:
             self.logger.error("PyAudio 未安装")
             return False
 
-        if self._recording:
-            self.logger.warning("录音已在进行中")
-            return False
-
-        self._audio_buffer.clear()
-        self._last_sound_time = time.time()
+        def on_audio(in_data, frame_count, time_info, status):
+            self._ring.write(in_data)
+            with self._data_ready:
+                self._data_ready.notify_all()
+            return (None, pyaudio.paContinue)
 
         try:
             self._audio = pyaudio.PyAudio()
@@ -296,9 +386,9 @@ class PyAudioRecorder:
                 input=True,
                 input_device_index=device_index,
                 frames_per_buffer=self.config.chunk_size,
+                stream_callback=on_audio,
             )
-            self._recording = True
-            self.logger.info("PyAudio 录音启动")
+            self.logger.info("PyAudio 麦克风打开")
             return True
 
         except Exception as e:
@@ -306,11 +396,32 @@ class PyAudioRecorder:
             self.cleanup()
             return False
 
+    def start(self, device_index: Optional[int] = None) -> bool:
+        """启动录音"""
+        if self._recording:
+            self.logger.warning("录音已在进行中")
+            return False
+
+        if not self.open(device_index):
+            return False
+
+        preroll = self._ring.samples_for(self.config.preroll_ms / 1000)
+        self._session_start = max(self._ring.position - preroll, self._ring.oldest)
+        self._cursor = self._session_start
+        self._last_sound_time = time.time()
+        self._vad.reset()
+        self._recording = True
+        self.logger.info("PyAudio 录音启动")
+        return True
+
     def stop(self) -> bytes:
         """停止录音"""
         self._recording = False
-        self.cleanup()
-        return bytes(self._audio_buffer)
+        with self._data_ready:
+            self._data_ready.notify_all()
+        if not self.always_on:
+            self.cleanup()
+        return self.get_buffer()
 
     def cleanup(self):
         """清理资源"""
@@ -329,30 +440,34 @@ class PyAudioRecorder:
                 pass
             self._audio = None
 
-    def read_chunk(self) -> Optional[bytes]:
-        """读取一个音频块"""
+    def _pending_samples(self) -> int:
+        """已采集但尚未读取的采样数"""
+        return self._ring.position - max(self._cursor, self._ring.oldest)
+
+    def read_chunk(self) -> Optional[memoryview]:
+        """读取一个音频块（环形缓冲区视图）"""
         if not self._recording or not self._stream:
             return None
 
-        try:
-            chunk = self._stream.read(
-                self.config.chunk_size,
-                exception_on_overflow=False
+        with self._data_ready:
+            self._data_ready.wait_for(
+                lambda: not self._recording or self._pending_samples() >= self.config.chunk_size,
+                timeout=1.0
             )
-            self._audio_buffer.extend(chunk)
+        if not self._recording:
+            return None
 
-            if not self._is_silence(chunk):
-                self._last_sound_time = time.time()
+        samples, self._cursor = self._ring.read_since(self._cursor, self.config.chunk_size)
+        chunk = as_bytes_view(samples)
 
-            return chunk
+        if len(chunk) and not self._is_silence(chunk):
+            self._last_sound_time = time.time()
 
-        except Exception as e:
-            self.logger.error(f"读取音频块失败: {e}")
-            return None
+        return chunk
 
     def get_buffer(self) -> bytes:
         """获取当前录音缓冲"""
-        return bytes(self._audio_buffer)
+        return self._ring.view(self._session_start, self._cursor).tobytes()
 
     def is_recording(self) -> bool:
         """检查是否正在录音"""
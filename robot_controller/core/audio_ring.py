@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+音频环形缓冲区模块
+
+功能：
+1. 固定容量的 int16 PCM 环形缓冲区（NumPy），录音时长再长内存占用也不变
+2. 镜像存储：每个采样同时写在 i 和 i + capacity 两处，任意不超过容量的区间都是连续内存，
+   读取时直接返回视图，不做拼接和拷贝
+3. 采样位置用单调递增的绝对计数表示，读者各自保存游标，互不干扰
+4. 常开录音时保留按下按钮/唤醒之前的一段音频（pre-roll），开头的字不会被截掉
+"""
+
+import threading
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class AudioRingBuffer:
+    """
+    int16 PCM 环形缓冲区
+
+    单写多读：写入方（录音回调/录音协程）调用 write()，读取方保存自己的绝对采样位置，
+    用 view()/read_since() 取出区间视图。视图指向内部存储，在被后续写入覆盖前有效，
+    超过容量未读取的数据会被丢弃（读取时游标自动跳到最旧的可用位置）。
+
+    使用示例:
+        ring = AudioRingBuffer.for_duration(30.0, 16000)
+        ring.write(chunk)
+        cursor = ring.position - ring.samples_for(0.5)  # 回溯 500ms
+        data, cursor = ring.read_since(cursor)
+    """
+
+    def __init__(self, capacity: int, sample_rate: int = 16000):
+        """
+        初始化缓冲区
+
+        Args:
+            capacity: 容量（采样数）
+            sample_rate: 采样率，仅用于时长换算
+        """
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于 0")
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self._data = np.zeros(capacity * 2, dtype=np.int16)
+        self._position = 0  # 已写入的采样总数（绝对位置）
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_duration(cls, seconds: float, sample_rate: int = 16000) -> "AudioRingBuffer":
+        """按时长创建缓冲区"""
+        return cls(max(1, int(seconds * sample_rate)), sample_rate)
+
+    def samples_for(self, seconds: float) -> int:
+        """时长（秒）换算为采样数"""
+        return int(seconds * self.sample_rate)
+
+    @property
+    def position(self) -> int:
+        """写入位置（已写入的采样总数）"""
+        return self._position
+
+    @property
+    def oldest(self) -> int:
+        """仍保留在缓冲区中的最旧采样位置"""
+        return max(0, self._position - self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        """内部存储占用的字节数（固定）"""
+        return self._data.nbytes
+
+    def clear(self):
+        """清空缓冲区（位置计数同时归零）"""
+        with self._lock:
+            self._position = 0
+
+    def write(self, audio_data: BytesLike) -> int:
+        """
+        写入 16-bit PCM 数据
+
+        Args:
+            audio_data: 16-bit 小端 PCM 数据（奇数字节时截掉最后一个字节）
+
+        Returns:
+            写入后的绝对位置
+        """
+        samples = np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+        capacity = self.capacity
+
+        with self._lock:
+            # 一次写入超过容量时只保留最后 capacity 个采样
+            skipped = max(0, len(samples) - capacity)
+            if skipped:
+                samples = samples[skipped:]
+            count = len(samples)
+            if count == 0:
+                return self._position
+
+            start = (self._position + skipped) % capacity
+            end = start + count
+            data = self._data
+            data[start:end] = samples
+            if end <= capacity:
+                data[start + capacity:end + capacity] = samples
+            else:
+                split = capacity - start
+                data[start + capacity:] = samples[:split]
+                data[:end - capacity] = samples[split:]
+
+            self._position += skipped + count
+            return self._position
+
+    def view(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """
+        获取 [start, end) 区间的只读视图（零拷贝）
+
+        Args:
+            start: 起始绝对位置，早于 oldest 时自动截到 oldest
+            end: 结束绝对位置，None 表示当前写入位置
+
+        Returns:
+            int16 数组视图
+        """
+        with self._lock:
+            position = self._position
+            end = position if end is None else min(end, position)
+            start = max(start, position - self.capacity, 0)
+            if end <= start:
+                return self._data[:0]
+            offset = start % self.capacity
+            view = self._data[offset:offset + end - start]
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+    def latest(self, count: int) -> np.ndarray:
+        """获取最近 count 个采样的视图"""
+        return self.view(self._position - count)
+
+    def read_since(self, cursor: int, max_samples: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        读取游标之后的新数据
+
+        Args:
+            cursor: 读者上次读到的绝对位置
+            max_samples: 最多读取的采样数，None 表示全部
+
+        Returns:
+            (int16 数组视图, 新的游标位置)
+        """
+        start = max(cursor, self.oldest)
+        end = self._position
+        if max_samples is not None:
+            end = min(end, start + max_samples)
+        data = self.view(start, end)
+        return data, start + len(data)
+
+
+def as_bytes_view(samples: np.ndarray) -> memoryview:
+    """
+    把 int16 数组视图转换为字节 memoryview（零拷贝）
+
+    len() 为字节数，可直接交给 VAD、协议编码器和 websocket.send()
+    """
+    return memoryview(samples).cast("B")
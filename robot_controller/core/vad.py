@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+语音活动检测（VAD）模块
+NumPy 向量化计算峰值/RMS/过零率，自适应噪声基底 + 拖尾平滑
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class VADConfig:
+    """VAD 配置"""
+    sample_rate: int = 16000
+    min_threshold: float = 500.0  # RMS 阈值下限
+    noise_ratio: float = 3.0      # 语音判定阈值 = 噪声基底 × noise_ratio
+    hangover: float = 0.2         # 拖尾时长（秒）
+    min_speech: float = 0.2       # 连续语音超过此时长（秒）才算开始说话
+
+
+@dataclass
+class FrameFeatures:
+    """单帧音频特征"""
+    peak: int = 0       # 峰值振幅
+    rms: float = 0.0    # 均方根能量
+    zcr: float = 0.0    # 过零率（0-1）
+
+
+def frame_features(audio_data: bytes) -> FrameFeatures:
+    """计算 16-bit PCM 音频帧特征"""
+    sample_count = len(audio_data) // 2
+    if sample_count == 0:
+        return FrameFeatures()
+
+    # 零拷贝视图，奇数字节时截掉最后一个字节
+    samples = np.frombuffer(audio_data, dtype=np.int16, count=sample_count)
+
+    # 用 int 比较避免 abs(-32768) 在 int16 下溢出
+    peak = max(int(samples.max()), -int(samples.min()))
+
+    floats = samples.astype(np.float32)
+    rms = float(np.sqrt(np.dot(floats, floats) / sample_count))
+
+    if sample_count > 1:
+        signs = np.signbit(samples)
+        zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / (sample_count - 1)
+    else:
+        zcr = 0.0
+
+    return FrameFeatures(peak=peak, rms=rms, zcr=zcr)
+
+
+class VoiceActivityDetector:
+    """
+    自适应语音活动检测器
+
+    静音帧持续更新背景噪声估计，判定阈值随环境噪声浮动；
+    语音结束后保持 hangover 秒的有声状态，避免字间停顿被误判为静音
+    """
+
+    # 过零率高于此值且能量接近阈值时视为清辅音
+    FRICATIVE_ZCR = 0.25
+    FRICATIVE_RATIO = 0.6
+    # 连续"语音"超过此时长（秒）仍无一帧低于阈值且能量起伏很小，视为稳定噪声（风扇、空调），用期间最小 RMS 重估噪声基底
+    STATIONARY_RESET = 5.0
+    # 稳定噪声判定：期间最大 RMS 不超过最小 RMS 的这个倍数（说话时能量起伏远大于此）
+    STATIONARY_SPREAD = 2.0
+    # 噪声基底上升时的平滑系数（取小值避免被轻声字尾逐帧抬高）
+    NOISE_ALPHA = 0.02
+    # 只有 RMS 低于噪声基底这个倍数的静音帧才用来抬高基底
+    NOISE_ADAPT_RATIO = 1.5
+
+    def __init__(self, config: Optional[VADConfig] = None):
+        self.config = config or VADConfig()
+        self.reset()
+
+    def reset(self):
+        """重置状态"""
+        self.noise_floor: Optional[float] = None
+        self.features = FrameFeatures()
+        self.is_speech = False          # 平滑后的有声状态
+        self.has_speech = False         # 是否检测到过有效语音
+        self.trailing_silence = 0.0     # 尾部静音时长（秒，按音频时长累计）
+        self._speech_run = 0.0
+        self._run_min_rms = 0.0
+        self._run_max_rms = 0.0
+        self._hangover_left = 0.0
+
+    @property
+    def threshold(self) -> float:
+        """当前语音判定阈值"""
+        if self.noise_floor is None:
+            return self.config.min_threshold
+        return max(self.config.min_threshold, self.noise_floor * self.config.noise_ratio)
+
+    def process(self, audio_data: bytes) -> bool:
+        """
+        处理一帧音频
+
+        Returns:
+            平滑后的有声状态
+        """
+        features = frame_features(audio_data)
+        self.features = features
+        duration = (len(audio_data) // 2) / self.config.sample_rate
+        if duration <= 0:
+            return self.is_speech
+
+        threshold = self.threshold
+        raw_speech = features.rms > threshold or (
+            features.rms > threshold * self.FRICATIVE_RATIO
+            and features.zcr >= self.FRICATIVE_ZCR
+        )
+
+        if raw_speech:
+            if self._speech_run == 0:
+                self._run_min_rms = self._run_max_rms = features.rms
+            else:
+                self._run_min_rms = min(self._run_min_rms, features.rms)
+                self._run_max_rms = max(self._run_max_rms, features.rms)
+            self._speech_run += duration
+            if self._speech_run >= self.STATIONARY_RESET:
+                # 能量起伏小才是稳定噪声；持续说话时能量起伏大，不重估，避免说话中途抬高阈值
+                if self._run_max_rms <= self._run_min_rms * self.STATIONARY_SPREAD:
+                    self.noise_floor = self._run_min_rms
+                self._speech_run = 0.0
+            self._hangover_left = self.config.hangover
+            if self._speech_run >= self.config.min_speech:
+                self.has_speech = True
+            self.is_speech = True
+            self.trailing_silence = 0.0
+        else:
+            self._speech_run = 0.0
+            if self._hangover_left > 0:
+                # 拖尾期间可能是轻声的字尾，不用来估计噪声
+                self._hangover_left -= duration
+                self.is_speech = True
+            else:
+                self._update_noise_floor(features.rms)
+                self.is_speech = False
+                self.trailing_silence += duration
+
+        return self.is_speech
+
+    def _update_noise_floor(self, rms: float):
+        """
+        用拖尾之外的静音帧更新噪声基底
+
+        噪声变小时立即跟随；变大时只接受明显低于阈值的帧（低于噪声基底的 NOISE_ADAPT_RATIO 倍），
+        并缓慢跟随，接近阈值的轻声语音不会把基底逐帧抬高
+        """
+        if self.noise_floor is None or rms < self.noise_floor:
+            self.noise_floor = rms
+            return
+        # 基底很低（接近数字静音）时按阈值下限对应的基底判断，否则基底永远抬不起来
+        reference = max(self.noise_floor, self.config.min_threshold / self.config.noise_ratio)
+        if rms < reference * self.NOISE_ADAPT_RATIO:
+            self.noise_floor += self.NOISE_ALPHA * (rms - self.noise_floor)
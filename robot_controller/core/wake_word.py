@@ -5,7 +5,6 @@
 """
 
 import asyncio
-import struct
 import time
 from abc import ABC, abstractmethod
 from typing import Optional, Callable, List
@@ -16,6 +15,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.logger import get_logger
+from core.vad import VoiceActivityDetector, VADConfig, frame_features
 
 
 @dataclass
@@ -71,26 +71,27 @@ class EnergyWakeWordDetector(WakeWordDetector):
     def __init__(self, config: Optional[WakeWordConfig] = None):
         super().__init__(config)
         self._process = None
-        self._energy_threshold = 1000  # 能量阈值
+        # 能量阈值（RMS，自适应阈值的下限）：原来按平均绝对值取 1000，
+        # 语音的 RMS 约为平均绝对值的 1.1~1.4 倍，按 1.25 倍换算，保持原来的唤醒灵敏度
+        self._energy_threshold = 1250
         self._min_duration = 0.3  # 最小持续时间（秒）
         self._cooldown = 2.0  # 冷却时间（秒）
         self._last_wake_time = 0
+        # 唤醒只看持续的高能量，不需要拖尾
+        self._vad = VoiceActivityDetector(VADConfig(
+            sample_rate=self.config.sample_rate,
+            min_threshold=self._energy_threshold,
+            hangover=0.0
+        ))
 
     def set_threshold(self, threshold: int):
-        """设置能量阈值"""
+        """设置能量阈值（RMS）"""
         self._energy_threshold = threshold
+        self._vad.config.min_threshold = threshold
 
     def _calculate_energy(self, audio_data: bytes) -> float:
-        """计算音频能量"""
-        if len(audio_data) < 2:
-            return 0
-
-        sample_count = len(audio_data) // 2
-        if sample_count == 0:
-            return 0
-
-        samples = struct.unpack(f"<{sample_count}h", audio_data)
-        return sum(abs(s) for s in samples) / sample_count
+        """计算音频能量（RMS）"""
+        return frame_features(audio_data).rms
 
     async def start(self):
         """启动能量检测"""
@@ -132,9 +133,11 @@ class EnergyWakeWordDetector(WakeWordDetector):
                     if not chunk:
                         continue
 
-                    energy = self._calculate_energy(chunk)
+                    # 噪声基底随环境自适应，风扇等稳定噪声不会触发唤醒
+                    is_speech = self._vad.process(chunk)
+                    energy = self._vad.features.rms
 
-                    if energy > self._energy_threshold:
+                    if is_speech:
                         if high_energy_start is None:
                             high_energy_start = time.time()
                         elif time.time() - high_energy_start >= self._min_duration:
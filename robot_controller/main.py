@@ -16,6 +16,8 @@ import asyncio
 import signal
 import sys
 import os
+import time
+from typing import Optional
 
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -25,7 +27,9 @@ from config import (
     ASR_CONFIG,
     CHAT_CONFIG,
     TTS_CONFIG,
+    FILLER_CONFIG,
     MEM0_CONFIG,
+    CIRCUIT_CONFIG,
     WAKE_WORD_CONFIG,
     SYSTEM_CONFIG,
     SYSTEM_PROMPT
@@ -39,7 +43,7 @@ from core.state_machine import (
     ConversationContext
 )
 from core.audio_recorder import AudioRecorder, AudioConfig
-from core.audio_player import AudioPlayer, PlaybackConfig
+from core.audio_player import AudioPlayer, StreamingAudioPlayer, PlaybackConfig
 from core.wake_word import (
     WakeWordConfig,
     create_wake_word_detector,
@@ -48,7 +52,11 @@ from core.wake_word import (
 from ai.asr_client import ASRClient, ASRConfig
 from ai.chat_client import ChatClient, ChatConfig
 from ai.tts_client import TTSClient, TTSConfig
+from ai.thinking_filler import ThinkingFiller, FillerConfig
 from ai.mem0_client import Mem0Client, Mem0Config
+from ai.memory_prefetch import MemoryPrefetcher
+from ai.memory_writer import MemoryWriter
+from ai.circuit_breaker import CircuitConfig, get_circuit_monitor
 
 
 class VoiceAssistantRobot:
@@ -77,14 +85,27 @@ class VoiceAssistantRobot:
             device=AUDIO_CONFIG["device"],
             sample_rate=AUDIO_CONFIG["sample_rate"],
             channels=AUDIO_CONFIG["channels"],
-            chunk_size=AUDIO_CONFIG["chunk_size"]
+            chunk_size=AUDIO_CONFIG["chunk_size"],
+            preroll_ms=AUDIO_CONFIG.get("preroll_ms", 0),
+            buffer_seconds=SYSTEM_CONFIG["max_record_duration"]
         ))
+        self.audio_recorder.set_silence_params(
+            SYSTEM_CONFIG["silence_threshold"],
+            SYSTEM_CONFIG["silence_duration"]
+        )
 
         self.audio_player = AudioPlayer(PlaybackConfig(
             device=AUDIO_CONFIG["device"],
             sample_rate=TTS_CONFIG.get("sample_rate", 24000)
         ))
 
+        # 流式播放器：TTS 每收到一帧音频就写入播放进程
+        self.stream_player = StreamingAudioPlayer(PlaybackConfig(
+            device=AUDIO_CONFIG["device"],
+            sample_rate=TTS_CONFIG.get("sample_rate", 24000),
+            jitter_buffer_ms=TTS_CONFIG.get("jitter_buffer_ms", 60)
+        ))
+
         # 初始化唤醒模块
         self.wake_detector = create_wake_word_detector(
             WakeWordConfig(
@@ -94,13 +115,24 @@ class VoiceAssistantRobot:
             )
         )
 
+        # 后端服务熔断（需在创建 Chat/Mem0 客户端之前配置）
+        self.circuit_monitor = get_circuit_monitor(CircuitConfig(
+            enabled=CIRCUIT_CONFIG.get("enabled", True),
+            failure_threshold=CIRCUIT_CONFIG.get("failure_threshold", 2),
+            reset_timeout=CIRCUIT_CONFIG.get("reset_timeout", 30),
+            probe_interval=CIRCUIT_CONFIG.get("probe_interval", 5),
+            probe_timeout=CIRCUIT_CONFIG.get("probe_timeout", 2)
+        ))
+
         # 初始化 AI 服务
         self.asr_client = ASRClient(ASRConfig(
             ws_url=ASR_CONFIG["ws_url"],
             resource_id=ASR_CONFIG["resource_id"],
             appid=self._get_secret("ASR_APPID"),
             access_token=self._get_secret("ASR_ACCESS_TOKEN"),
-            sample_rate=AUDIO_CONFIG["sample_rate"]
+            sample_rate=AUDIO_CONFIG["sample_rate"],
+            pool_size=ASR_CONFIG.get("pool_size", 1),
+            pool_max_idle=ASR_CONFIG.get("pool_max_idle", 30)
         ))
 
         self.chat_client = ChatClient(ChatConfig(
@@ -108,7 +140,15 @@ class VoiceAssistantRobot:
             api_key=self._get_secret("CHAT_API_KEY"),
             model_name=CHAT_CONFIG["model_name"],
             max_tokens=CHAT_CONFIG["max_tokens"],
-            temperature=CHAT_CONFIG["temperature"]
+            temperature=CHAT_CONFIG["temperature"],
+            pool_size=CHAT_CONFIG.get("pool_size", 2),
+            keepalive_interval=CHAT_CONFIG.get("keepalive_interval", 20),
+            hedge_enabled=CHAT_CONFIG.get("hedge_enabled", False),
+            router_enabled=CHAT_CONFIG.get("router_enabled", True),
+            fast_model_name=CHAT_CONFIG.get("fast_model_name", "doubao-seed-1-6-flash-250828"),
+            fast_max_tokens=CHAT_CONFIG.get("fast_max_tokens", 128),
+            context_budget=CHAT_CONFIG.get("context_budget", 1200),
+            context_history_tokens=CHAT_CONFIG.get("context_history_tokens", 800)
         ))
 
         self.tts_client = TTSClient(TTSConfig(
@@ -118,17 +158,47 @@ class VoiceAssistantRobot:
             access_token=self._get_secret("TTS_ACCESS_TOKEN"),
             speaker=TTS_CONFIG["speaker"],
             audio_format=TTS_CONFIG["audio_format"],
-            sample_rate=TTS_CONFIG["sample_rate"]
+            sample_rate=TTS_CONFIG["sample_rate"],
+            cache_dir=TTS_CONFIG.get("cache_dir", ""),
+            cache_max_mb=TTS_CONFIG.get("cache_max_mb", 50),
+            cache_max_chars=TTS_CONFIG.get("cache_max_chars", 60)
+        ))
+
+        # 思考垫音（等待对话模型时先播一句简短应答）
+        self.thinking_filler = ThinkingFiller(self.tts_client, FillerConfig(
+            enabled=FILLER_CONFIG.get("enabled", True),
+            long_chars=FILLER_CONFIG.get("long_chars", 20),
+            phrases=FILLER_CONFIG.get("phrases") or FillerConfig().phrases
         ))
 
         self.mem0_client = Mem0Client(Mem0Config(
             base_url=MEM0_CONFIG["base_url"],
-            enabled=MEM0_CONFIG["enabled"]
+            enabled=MEM0_CONFIG["enabled"],
+            deadline_ms=MEM0_CONFIG.get("deadline_ms", 150),
+            migration_journal=MEM0_CONFIG.get("migration_journal", "~/.xiaoyuan_robot/memory_migrations.json"),
+            migration_workers=MEM0_CONFIG.get("migration_workers", 4)
         ))
+        # 识别过程中用中间结果提前搜索记忆
+        self.memory_prefetcher = MemoryPrefetcher(
+            self.mem0_client, deadline_ms=self.mem0_client.config.deadline_ms
+        )
+        # 对话记忆在后台攒批写入
+        self.memory_writer = MemoryWriter(
+            self.mem0_client,
+            queue_path=MEM0_CONFIG.get("queue_path", "~/.xiaoyuan_robot/memory_queue.jsonl"),
+            batch_turns=MEM0_CONFIG.get("batch_turns", 3),
+            max_delay=MEM0_CONFIG.get("max_delay", 60)
+        )
 
         # 注册状态回调
         self._register_callbacks()
 
+        # 实时识别任务（LISTENING 中启动，RECOGNIZING 中取结果）
+        self._asr_task: Optional[asyncio.Task] = None
+        self._asr_live_failed = False
+        self._asr_final_time = 0.0  # 识别完成时刻（记忆截止时间从这里算起）
+        self._filler_task: Optional[asyncio.Task] = None  # 后台合成垫音
+
         # 运行标志
         self._running = False
 
@@ -181,57 +251,109 @@ class VoiceAssistantRobot:
         )
 
     async def _on_enter_listening(self, context: ConversationContext):
-        """进入监听状态"""
+        """
+        进入监听状态
+
+        录音的同时把音频实时送入 ASR，用户说完时识别结果基本同步返回
+        """
         self.logger.info("开始录音...")
         context.audio_buffer = b""
+        self._asr_live_failed = False
+
+        # 唤醒词打断时丢弃还没播完的垫音
+        await self.thinking_filler.cancel(self.stream_player)
 
         # 启动录音
-        if await self.audio_recorder.start():
-            # 收集音频数据
-            async for chunk in self.audio_recorder.stream_audio(
-                max_duration=SYSTEM_CONFIG["max_record_duration"]
-            ):
-                context.audio_buffer += chunk
-
-            # 停止录音并发送识别事件
-            await self.audio_recorder.stop()
-            await self.state_machine.emit_event(RobotEvent.SILENCE_DETECTED)
-        else:
+        if not await self.audio_recorder.start():
             await self.state_machine.emit_event(
                 RobotEvent.ASR_ERROR,
                 "录音启动失败"
             )
-
-    async def _on_enter_recognizing(self, context: ConversationContext):
-        """进入识别状态"""
-        self.logger.info("语音识别中...")
-
-        if not context.audio_buffer:
-            self.logger.warning("没有录音数据")
-            await self.state_machine.emit_event(RobotEvent.ASR_ERROR, "没有录音数据")
             return
 
-        # 创建音频生成器
-        async def audio_generator():
-            chunk_size = AUDIO_CONFIG["chunk_size"]
-            data = context.audio_buffer
-            for i in range(0, len(data), chunk_size):
-                yield data[i:i+chunk_size]
+        speech_ended = asyncio.Event()
+
+        async def live_audio():
+            """边录边送：静音或超时后生成器结束，ASR 随即发送最后一包"""
+            stream = self.audio_recorder.stream_audio(
+                max_duration=SYSTEM_CONFIG["max_record_duration"],
+                no_speech_timeout=SYSTEM_CONFIG.get("no_speech_timeout", 5.0)
+            )
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+                speech_ended.set()
 
-        # 执行语音识别
         def on_partial(text):
             self.logger.info(f"[ASR] 识别中: {text}")
+            # 已知当前用户时，用中间结果在后台提前搜索记忆
+            self.memory_prefetcher.prefetch(context.user_id, text)
 
         def on_final(text):
             context.recognized_text = text
             self.logger.info(f"[ASR] 识别完成: {text}")
 
-        self.asr_client.set_callbacks(on_partial=on_partial, on_final=on_final)
+        def on_error(message):
+            self._asr_live_failed = True
+
+        self.asr_client.set_callbacks(
+            on_partial=on_partial, on_final=on_final, on_error=on_error
+        )
+        live = live_audio()
+        self._asr_task = asyncio.create_task(
+            self.asr_client.recognize_stream(live)
+        )
+
+        try:
+            # 等待用户说完；如果 ASR 会话提前失败（含发送中断），继续录完这句话，交给识别状态重放
+            speech_wait = asyncio.create_task(speech_ended.wait())
+            await asyncio.wait(
+                {self._asr_task, speech_wait},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            speech_wait.cancel()
+            stopped_early = not speech_ended.is_set()
+            if stopped_early:
+                # 实时会话已结束，生成器停在半路，先关闭再继续录音
+                await live.aclose()
+            if stopped_early and not self._asr_task.result():
+                self._asr_live_failed = True
+                async for _ in self.audio_recorder.stream_audio(
+                    max_duration=SYSTEM_CONFIG["max_record_duration"],
+                    no_speech_timeout=SYSTEM_CONFIG.get("no_speech_timeout", 5.0)
+                ):
+                    pass
+        finally:
+            if self._asr_task.done():
+                await live.aclose()
+
+        # 停止录音并发送识别事件
+        context.audio_buffer = await self.audio_recorder.stop()
+        await self.state_machine.emit_event(RobotEvent.SILENCE_DETECTED)
+
+    async def _on_enter_recognizing(self, context: ConversationContext):
+        """进入识别状态：等待实时识别的最终结果"""
+        self.logger.info("语音识别中...")
+
+        text = ""
+        asr_task, self._asr_task = self._asr_task, None
 
         try:
-            text = await self.asr_client.recognize_stream(audio_generator())
+            if asr_task is not None:
+                text = await asyncio.wait_for(
+                    asr_task, timeout=ASR_CONFIG.get("final_timeout", 5.0)
+                )
+
+            # 实时会话失败时，用录好的音频重新识别一次
+            if not text and self._asr_live_failed and context.audio_buffer:
+                self.logger.warning("实时识别失败，重放录音识别")
+                text = await self._recognize_buffer(context)
+
             if text:
                 context.recognized_text = text
+                self._asr_final_time = time.time()
                 await self.state_machine.emit_event(
                     RobotEvent.ASR_FINAL_RESULT,
                     text
@@ -241,10 +363,23 @@ class VoiceAssistantRobot:
                     RobotEvent.ASR_ERROR,
                     "识别结果为空"
                 )
+        except asyncio.TimeoutError:
+            self.logger.error("ASR 等待最终结果超时")
+            await self.state_machine.emit_event(RobotEvent.ASR_ERROR, "识别超时")
         except Exception as e:
             self.logger.error(f"ASR 异常: {e}")
             await self.state_machine.emit_event(RobotEvent.ASR_ERROR, str(e))
 
+    async def _recognize_buffer(self, context: ConversationContext) -> str:
+        """重放整段录音进行识别（实时识别失败时的兜底）"""
+        async def audio_generator():
+            chunk_size = AUDIO_CONFIG["chunk_size"]
+            data = memoryview(context.audio_buffer)
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i+chunk_size]
+
+        return await self.asr_client.recognize_stream(audio_generator())
+
     async def _on_enter_thinking(self, context: ConversationContext):
         """进入思考状态"""
         self.logger.info("AI 思考中...")
@@ -254,17 +389,20 @@ class VoiceAssistantRobot:
             await self.state_machine.emit_event(RobotEvent.CHAT_ERROR, "输入为空")
             return
 
-        # 搜索相关记忆
+        # 取回识别过程中预取的记忆（最多等到识别完成后 deadline_ms）
         memory_context = ""
         if self.mem0_client.config.enabled and context.user_id:
-            memory_context = self.mem0_client.build_context(
+            memory_context = await self.memory_prefetcher.build_context(
                 context.user_id,
-                user_input
+                user_input,
+                deadline=self._asr_final_time + self.mem0_client.config.deadline_ms / 1000
             )
             if memory_context:
                 self.logger.info(f"注入记忆上下文: {len(memory_context)} 字符")
 
-        # 调用对话模型
+        # 先播一句垫音，再调用对话模型
+        await self.thinking_filler.play(self.stream_player, user_input)
+
         def on_chunk(chunk):
             context.ai_response += chunk
             self.logger.debug(f"[Chat] {chunk}")
@@ -272,11 +410,13 @@ class VoiceAssistantRobot:
         self.chat_client.set_callbacks(on_chunk=on_chunk)
 
         try:
-            response = self.chat_client.chat(
+            # 同步请求放到线程池执行，事件循环继续把垫音写入播放进程
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, lambda: self.chat_client.chat(
                 user_input,
                 system_prompt=SYSTEM_PROMPT,
                 memory_context=memory_context
-            )
+            ))
 
             if response:
                 context.ai_response = response
@@ -305,24 +445,33 @@ class VoiceAssistantRobot:
             return
 
         try:
-            # 合成语音
-            audio_data = await self.tts_client.synthesize(text)
+            # 边合成边播放：每收到一帧音频立即交给流式播放器，不等整段合成完
+            # （垫音播放时播放器已启动，第一帧回复音频到达时截断还没播完的垫音）
+            await self.stream_player.start(
+                sample_rate=TTS_CONFIG["sample_rate"],
+                audio_format=TTS_CONFIG.get("audio_format", "pcm")
+            )
+            first_frame = True
 
-            if audio_data:
-                self.logger.info(f"TTS 合成完成，播放音频...")
-
-                # 播放音频
-                audio_format = TTS_CONFIG.get("audio_format", "mp3")
-                if audio_format == "mp3":
-                    await self.audio_player.play_mp3(audio_data)
-                else:
-                    await self.audio_player.play_pcm(
-                        audio_data,
-                        sample_rate=TTS_CONFIG["sample_rate"]
-                    )
+            def on_audio_chunk(chunk: bytes):
+                nonlocal first_frame
+                if first_frame:
+                    first_frame = False
+                    self.thinking_filler.reply_ready(self.stream_player)
+                self.stream_player.feed(chunk)
+
+            self.tts_client.set_callbacks(on_audio_chunk=on_audio_chunk)
+            try:
+                audio_data = await self.tts_client.synthesize(text)
+            finally:
+                self.tts_client.set_callbacks()
 
+            if audio_data:
+                self.logger.info(f"TTS 合成完成，等待播放结束...")
+                await self.stream_player.finish()
                 await self.state_machine.emit_event(RobotEvent.TTS_COMPLETED)
             else:
+                await self.stream_player.stop()
                 await self.state_machine.emit_event(
                     RobotEvent.TTS_ERROR,
                     "语音合成失败"
@@ -330,27 +479,26 @@ class VoiceAssistantRobot:
 
         except Exception as e:
             self.logger.error(f"TTS 异常: {e}")
+            await self.stream_player.stop()
             await self.state_machine.emit_event(RobotEvent.TTS_ERROR, str(e))
 
     async def _on_enter_idle(self, context: ConversationContext):
         """进入待机状态"""
         self.logger.info("待机中，等待唤醒...")
 
-        # 存储记忆（如果有用户和对话内容）
+        # 中断时丢弃还没播完的垫音
+        await self.thinking_filler.cancel(self.stream_player)
+
+        # 存储记忆（如果有用户和对话内容）：只追加到后台写入队列，不阻塞事件循环
         if (self.mem0_client.config.enabled and
             context.user_id and
             context.recognized_text and
             context.ai_response):
-            try:
-                self.mem0_client.add_memory(
-                    context.user_id,
-                    [
-                        {"role": "user", "content": context.recognized_text},
-                        {"role": "assistant", "content": context.ai_response}
-                    ]
-                )
-            except Exception as e:
-                self.logger.warning(f"存储记忆失败: {e}")
+            self.memory_writer.enqueue(
+                context.user_id,
+                context.recognized_text,
+                context.ai_response
+            )
 
         # 重置上下文
         self.state_machine.reset_context()
@@ -358,6 +506,8 @@ class VoiceAssistantRobot:
     async def _on_enter_error(self, context: ConversationContext):
         """进入错误状态"""
         self.logger.error("发生错误，等待恢复...")
+        # 丢弃还没播完的垫音
+        await self.stream_player.stop()
         await asyncio.sleep(2)
         # 自动恢复到待机状态
         self.state_machine._state = RobotState.IDLE
@@ -390,6 +540,22 @@ class VoiceAssistantRobot:
 
         self.wake_detector.set_on_wake(on_wake)
 
+        # 预热 ASR 连接
+        await self.asr_client.start_pool()
+
+        # 预热对话接口长连接
+        await self.chat_client.start_keepalive()
+
+        # 启动后台记忆写入（继续写入上次未完成的队列）
+        self.memory_writer.start()
+
+        # 后台准备垫音（TTS 磁盘缓存命中时不请求接口），不阻塞启动；没准备好时播放提示音
+        self._filler_task = asyncio.create_task(self.thinking_filler.prepare())
+
+        # 常开麦克风，环形缓冲区保留唤醒前的 pre-roll
+        if self.audio_recorder.always_on:
+            await self.audio_recorder.open()
+
         # 启动唤醒检测
         wake_task = asyncio.create_task(self.wake_detector.start())
 
@@ -412,8 +578,23 @@ class VoiceAssistantRobot:
         # 停止各模块
         await self.wake_detector.stop()
         await self.audio_recorder.stop()
+        await self.audio_recorder.close()
         await self.audio_player.stop()
+        await self.stream_player.stop()
         await self.state_machine.stop()
+        await self.asr_client.close()
+        await self.chat_client.close()
+        if self._filler_task and not self._filler_task.done():
+            self._filler_task.cancel()
+        self.memory_prefetcher.shutdown()
+        self.logger.info(f"记忆预取统计: {self.memory_prefetcher.stats()}")
+        self.memory_writer.stop()
+        self.logger.info(f"记忆写入队列: {self.memory_writer.stats()}")
+        self.circuit_monitor.stop()
+        self.logger.info(f"熔断统计: {self.circuit_monitor.stats()}")
+        if self.tts_client.cache:
+            self.logger.info(f"合成缓存统计: {self.tts_client.cache.stats()}")
+        self.logger.info(f"垫音统计: {self.thinking_filler.stats()}")
 
         self.logger.info("机器人已关闭")
 
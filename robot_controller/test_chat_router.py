@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对话快慢路由测试
+验证默认走完整档、只有明确的闲聊走快速档（ai/chat_router.py，与 chatbot/chat_router.py 规则一致）
+
+运行：
+    python test_chat_router.py
+    或 python -m pytest test_chat_router.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai.chat_router import ChatRouter, ChatProfile
+
+
+def make_router(**params):
+    """用占位参数创建路由器"""
+    full = ChatProfile(name="full", model="full-model", max_tokens=4096, thinking=None, temperature=0.7)
+    fast = ChatProfile(name="fast", model="fast-model", max_tokens=128, thinking="disabled", temperature=0.7)
+    return ChatRouter(full, fast, **params)
+
+
+def route(text, **params):
+    """路由名"""
+    return make_router(**params).route(text).profile.name
+
+
+# ==================== 完整档 ====================
+
+def test_full_knowledge_questions():
+    """知识问答、观点类问题走完整档"""
+    for text in ("给我讲讲量子力学", "介绍一下长城", "你觉得人生的意义是什么", "地球到月球有多远"):
+        assert route(text) == "full", text
+
+
+def test_full_english_question():
+    """和示例句都不像的英文问题走完整档"""
+    assert route("what is the capital of France") == "full"
+
+
+def test_full_reasoning_keywords():
+    """解释、生成类问题走完整档"""
+    for text in ("为什么天空是蓝色的", "怎么做红烧肉", "写一首关于春天的诗"):
+        assert route(text) == "full", text
+
+
+def test_full_calculation():
+    """计算类问题走完整档"""
+    assert route("23乘以47") == "full"
+
+
+def test_full_long_input():
+    """超过字数上限走完整档"""
+    assert route("你好" * 20) == "full"
+
+
+def test_full_keyword_beats_greeting():
+    """带问候的知识问题仍走完整档"""
+    assert route("你好，给我介绍一下长城") == "full"
+
+
+# ==================== 快速档 ====================
+
+def test_fast_greetings():
+    """问候、应答走快速档"""
+    for text in ("你好呀", "早上好", "谢谢你", "再见", "晚安啦"):
+        assert route(text) == "fast", text
+
+
+def test_fast_small_talk():
+    """与快速档示例明显相近的闲聊走快速档"""
+    for text in ("你叫什么名字", "你在干嘛呀", "你真可爱"):
+        assert route(text) == "fast", text
+
+
+def test_disabled_always_full():
+    """关闭路由时全部走完整档"""
+    assert route("你好呀", enabled=False) == "full"
+
+
+def main():
+    """主函数"""
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  [OK] {name}")
+        except AssertionError as e:
+            print(f"  [FAIL] {name}: {e}")
+            failed += 1
+    print(f"\n路由测试: {len(tests) - failed} 通过, {failed} 失败")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
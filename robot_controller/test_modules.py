@@ -23,6 +23,9 @@ def test_imports():
         ("core.audio_recorder", "音频录制"),
         ("core.audio_player", "音频播放"),
         ("core.wake_word", "语音唤醒"),
+        ("core.vad", "语音活动检测"),
+        ("core.audio_ring", "录音环形缓冲区"),
+        ("ai.volc_protocol", "语音协议编解码"),
         ("ai.asr_client", "ASR 客户端"),
         ("ai.chat_client", "Chat 客户端"),
         ("ai.tts_client", "TTS 客户端"),
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成文本切分测试
+验证中英文混合分词和流式切分规则（ai/text_segmenter.py，与 chatbot/text_segmenter.py 规则一致）
+
+运行：
+    python test_text_segmenter.py
+    或 python -m pytest test_text_segmenter.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai.text_segmenter import TextSegmenter, tokenize, split_segments
+
+
+def words(text):
+    """分词结果中的非空白词"""
+    return [token for kind, token in tokenize(text) if kind != "space"]
+
+
+# ==================== 分词 ====================
+
+def test_tokenize_cjk():
+    """汉字逐字成词"""
+    assert tokenize("你好") == [("cjk", "你"), ("cjk", "好")]
+
+
+def test_tokenize_english_words():
+    """英文单词整体成词，空白单独成词"""
+    assert tokenize("hello world") == [("word", "hello"), ("space", " "), ("word", "world")]
+
+
+def test_tokenize_contraction():
+    """英文缩写（it's、don't）不拆开"""
+    assert words("it's fine, don't worry") == ["it's", "fine", ",", "don't", "worry"]
+
+
+def test_tokenize_mixed():
+    """中英文混合"""
+    assert words("我用Python写代码") == ["我", "用", "Python", "写", "代", "码"]
+
+
+def test_tokenize_decimal():
+    """小数点单独成词，由切分规则判断"""
+    assert words("3.14") == ["3", ".", "14"]
+
+
+def test_tokenize_ellipsis():
+    """连续句点和省略号整体成词"""
+    assert words("好的...嗯……") == ["好", "的", "...", "嗯", "……"]
+
+
+# ==================== 切分 ====================
+
+def test_first_comma():
+    """第一段在第一个逗号处切分"""
+    assert split_segments("你好，我是小元。") == ["你好，", "我是小元。"]
+
+
+def test_later_segments_grow():
+    """后续分段逗号处不轻易切分，句末标点始终切分"""
+    assert split_segments("你好，我是小元。今天天气很好，适合出去走走，也可以在家看看书，或者听听音乐。") == [
+        "你好，", "我是小元。", "今天天气很好，适合出去走走，也可以在家看看书，", "或者听听音乐。"
+    ]
+
+
+def test_decimal_not_split():
+    """小数点不是句末"""
+    assert split_segments("圆周率是3.14，很有意思。") == ["圆周率是3.14，", "很有意思。"]
+    assert split_segments("It is 3.5 degrees. Tomorrow it rains.") == ["It is 3.5 degrees.", "Tomorrow it rains."]
+
+
+def test_thousands_separator_not_split():
+    """千分位逗号不切分"""
+    assert split_segments("我们有1,000个星星。") == ["我们有1,000个星星。"]
+
+
+def test_ellipsis_is_one_delimiter():
+    """省略号整体算一个句末标点"""
+    assert split_segments("好的...我知道了") == ["好的...", "我知道了"]
+    assert split_segments("好的……我知道了") == ["好的……", "我知道了"]
+
+
+def test_repeated_punctuation_merged():
+    """连续的句末标点并入前一段"""
+    assert split_segments("太好了！！我们走吧。") == ["太好了！！", "我们走吧。"]
+
+
+def test_forced_split_absorbs_punctuation():
+    """强制切分处紧跟的标点并入前一段，下一段不以标点开头"""
+    assert split_segments("今天气温是3.5度，明天会下雨。") == ["今天气温是3.5度，", "明天会下雨。"]
+
+
+def test_forced_split_without_punctuation():
+    """第一段没有标点时攒够字数就切"""
+    assert split_segments("这是一个没有任何标点符号的很长的句子") == ["这是一个没有任何", "标点符号的很长的句子"]
+
+
+def test_forced_split_keeps_words():
+    """强制切分落在英文单词边界上"""
+    text = "Hello there this is a long English sentence without a period"
+    segments = split_segments(text)
+    assert len(segments) > 1
+    assert " ".join(segments) == text
+
+
+def test_opening_quote_starts_next_segment():
+    """开引号属于后一段"""
+    assert split_segments("他说：“你好。”然后走了。") == ["他说：", "“你好。”", "然后走了。"]
+
+
+def test_punctuation_only_dropped():
+    """只有标点的分段丢弃"""
+    assert split_segments("！！") == []
+
+
+# ==================== 流式 ====================
+
+def test_stream_waits_for_ellipsis():
+    """句点在片段末尾时等下一个字符再判断"""
+    segmenter = TextSegmenter()
+    assert segmenter.feed("好的..") == []
+    assert segmenter.feed(".我知道了") == ["好的..."]
+    assert segmenter.flush() == "我知道了"
+
+
+def test_stream_waits_for_decimal():
+    """片段末尾的句点可能是小数点"""
+    segmenter = TextSegmenter()
+    assert segmenter.feed("气温3.") == []
+    assert segmenter.feed("5度。") == ["气温3.5度。"]
+
+
+def test_stream_keeps_partial_word():
+    """片段末尾的英文单词可能还没收完，不在它中间切分"""
+    segmenter = TextSegmenter()
+    segments = segmenter.feed("one two three four five six seve")
+    segments += segmenter.feed("n eight")
+    segments.append(segmenter.flush())
+    assert " ".join(segments) == "one two three four five six seven eight"
+
+
+def test_stream_punctuation_after_split_dropped():
+    """上一段已经切出后才到的句末标点不单独成段"""
+    segmenter = TextSegmenter()
+    assert segmenter.feed("太好了！") == ["太好了！"]
+    assert segmenter.feed("！我们") == []
+    assert segmenter.flush() == "我们"
+
+
+def main():
+    """主函数"""
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  [OK] {name}")
+        except AssertionError as e:
+            print(f"  [FAIL] {name}: {e}")
+            failed += 1
+    print(f"\n切分测试: {len(tests) - failed} 通过, {failed} 失败")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音活动检测测试
+验证帧特征计算和自适应 VAD 的判定（core/vad.py，与 chatbot/vad.py 规则一致）
+
+运行：
+    python test_vad.py
+    或 python -m pytest test_vad.py
+"""
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.vad import VoiceActivityDetector, VADConfig, frame_features
+
+
+SAMPLE_RATE = 16000
+FRAME = 0.02  # 每帧 20ms
+
+
+def pcm(samples) -> bytes:
+    """浮点样本转 16-bit PCM"""
+    return np.clip(np.round(samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+def tone(freq: float, rms: float, seconds: float = FRAME) -> bytes:
+    """正弦波（按 RMS 指定幅度）"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return pcm(np.sqrt(2) * rms * np.sin(2 * np.pi * freq * t))
+
+
+def noise(rms: float, seconds: float = FRAME, seed: int = 0) -> bytes:
+    """白噪声（过零率约 0.5）"""
+    rng = np.random.default_rng(seed)
+    return pcm(rng.normal(0, rms, int(SAMPLE_RATE * seconds)))
+
+
+def make_vad(**params) -> VoiceActivityDetector:
+    """阈值下限 500、拖尾 0.2s 的检测器"""
+    config = dict(sample_rate=SAMPLE_RATE, min_threshold=500.0, noise_ratio=3.0, hangover=0.2, min_speech=0.2)
+    config.update(params)
+    return VoiceActivityDetector(VADConfig(**config))
+
+
+def feed(vad: VoiceActivityDetector, frame: bytes, count: int) -> bool:
+    """连续送入 count 帧，返回最后一帧的有声状态"""
+    result = False
+    for _ in range(count):
+        result = vad.process(frame)
+    return result
+
+
+# ==================== 帧特征 ====================
+
+def test_features_silence():
+    """数字静音：峰值、RMS、过零率都为 0"""
+    features = frame_features(bytes(640))
+    assert (features.peak, features.rms, features.zcr) == (0, 0.0, 0.0)
+
+
+def test_features_empty():
+    """空数据和单个字节不报错"""
+    assert frame_features(b"").rms == 0.0
+    assert frame_features(b"\x01").rms == 0.0
+
+
+def test_features_tone():
+    """1kHz 正弦波：RMS 为峰值的 1/√2，过零率约 2×1000/16000"""
+    features = frame_features(tone(1000, 5000, seconds=0.2))
+    assert abs(features.rms - 5000) < 50
+    assert abs(features.peak - 5000 * np.sqrt(2)) < 10
+    assert abs(features.zcr - 0.125) < 0.01
+
+
+def test_features_full_scale_peak():
+    """-32768 的峰值不溢出"""
+    assert frame_features(pcm([-32768, 0, 100])).peak == 32768
+
+
+# ==================== VAD ====================
+
+def test_vad_silence():
+    """安静环境：不判为语音，尾部静音按音频时长累计"""
+    vad = make_vad()
+    assert not feed(vad, noise(30), 50)
+    assert not vad.has_speech
+    assert abs(vad.trailing_silence - 50 * FRAME) < 1e-6
+
+
+def test_vad_tone():
+    """超过阈值的持续声音判为语音，超过最短时长后记为已开始说话"""
+    vad = make_vad()
+    feed(vad, noise(30), 10)
+    assert vad.process(tone(300, 3000))
+    assert not vad.has_speech
+    assert feed(vad, tone(300, 3000), 10)
+    assert vad.has_speech
+    assert vad.trailing_silence == 0.0
+
+
+def test_vad_fricative_rescue():
+    """略低于阈值的清辅音（过零率高）判为语音，同样能量的低频声音不算"""
+    vad = make_vad()
+    feed(vad, noise(30), 10)
+    assert vad.threshold == 500.0
+    assert vad.process(noise(400, seed=1))
+    vad = make_vad()
+    feed(vad, noise(30), 10)
+    assert not vad.process(tone(200, 400))
+
+
+def test_vad_hangover():
+    """语音之后的拖尾时间内仍为有声，拖尾结束后才开始静音计时"""
+    vad = make_vad()
+    feed(vad, noise(30), 10)
+    feed(vad, tone(300, 3000), 20)
+    # 拖尾 0.2s = 10 帧
+    assert feed(vad, noise(30), 10)
+    assert vad.trailing_silence == 0.0
+    assert not feed(vad, noise(30), 2)
+    assert vad.trailing_silence > 0.0
+
+
+def test_vad_noise_floor_not_raised_by_speech():
+    """说话中略低于阈值的轻声字尾不会抬高噪声基底"""
+    vad = make_vad()
+    feed(vad, noise(30), 20)
+    floor = vad.noise_floor
+    for _ in range(20):
+        feed(vad, tone(300, 3000), 10)
+        feed(vad, tone(200, 400), 15)
+    assert vad.noise_floor < floor * 1.5
+    assert vad.threshold == 500.0
+
+
+def test_vad_stationary_noise_reset():
+    """持续的稳定噪声（风扇）重估噪声基底，之后不再判为语音"""
+    vad = make_vad()
+    feed(vad, noise(30), 10)
+    feed(vad, noise(800, seed=2), int(VoiceActivityDetector.STATIONARY_RESET / FRAME) + 1)
+    assert vad.noise_floor > 500
+    assert not feed(vad, noise(800, seed=3), 20)
+
+
+def main():
+    """主函数"""
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"  [OK] {name}")
+        except AssertionError as e:
+            print(f"  [FAIL] {name}: {e}")
+            failed += 1
+    print(f"\nVAD 测试: {len(tests) - failed} 通过, {failed} 失败")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)